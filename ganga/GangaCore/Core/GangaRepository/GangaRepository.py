@@ -110,6 +110,13 @@ class GangaRepository(object):
         """
         raise NotImplementedError
 
+    def flush_index(self):
+        """flush_index() --> None
+        Writes any summary index kept of all the objects to the persistency layer so it remains valid if Ganga exits abruptly.
+        Does not have to be implemented.
+        """
+        pass
+
     def lock(self, ids):
         """lock(ids) --> bool
         Locks the specified IDs against modification from other Ganga sessions
@@ -1,182 +1,653 @@
-
 # Note: Following stuff must be considered in a GangaRepository:
 #
 # * lazy loading
 # * locking
 
 from .GangaRepository import GangaRepository, RepositoryError
+from GangaCore.Core.exceptions import InaccessibleObjectError
 import os
 import os.path
+import time
+import threading
+from contextlib import contextmanager
+from io import StringIO
 
 import sqlite3
 
-try:
-    import pickle as pickle
-except:
-    import pickle
+import pickle
+
+from GangaCore.Core.GangaRepository.VStreamer import to_file as xml_to_file
+from GangaCore.Core.GangaRepository.VStreamer import from_file as xml_from_file
+from GangaCore.Core.GangaRepository.VStreamer import EmptyGangaObject, XMLFileError
+from GangaCore.Core.GangaRepository.SessionLock import SessionLockManager, dry_run_unix_locks
+from GangaCore.Core.GangaRepository.FixedLock import FixedLockManager
+from GangaCore.Core.GangaRepository.SubJobSQLiteList import SubJobSQLiteList
+from GangaCore.GPIDev.Base.Objects import Node
+from GangaCore.GPIDev.Base.Proxy import isType, stripProxy, getName
+from GangaCore.Utility.Config import getConfig
 
 import GangaCore.Utility.logging
 logger = GangaCore.Utility.logging.getLogger()
 
+# Bump this whenever the layout of the tables changes
+# Version 1 stored the subjobs in the XML of their master, these are moved into their own rows when the master is next flushed
+_schema_version = 2
+
+# Keep the number of bound parameters of a single 'IN (...)' query well below SQLITE_MAX_VARIABLE_NUMBER
+_max_query_ids = 500
+
+_create_statements = [
+    "CREATE TABLE IF NOT EXISTS objects ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " classname TEXT NOT NULL,"
+    " category TEXT NOT NULL,"
+    " status TEXT,"
+    " backend TEXT,"
+    " name TEXT,"
+    " modified REAL NOT NULL DEFAULT 0,"
+    " idx BLOB,"
+    " data BLOB)",
+    "CREATE INDEX IF NOT EXISTS objects_status ON objects (status)",
+    "CREATE INDEX IF NOT EXISTS objects_backend ON objects (backend)",
+    "CREATE INDEX IF NOT EXISTS objects_name ON objects (name)",
+    "CREATE TABLE IF NOT EXISTS subjobs ("
+    " master INTEGER NOT NULL,"
+    " id INTEGER NOT NULL,"
+    " status TEXT,"
+    " modified REAL NOT NULL DEFAULT 0,"
+    " idx BLOB,"
+    " data BLOB,"
+    " PRIMARY KEY (master, id))",
+]
+
+
+def _index_column(cache, key):
+    """
+    Return the value stored in an index cache as something which can go into an indexed TEXT column
+    Args:
+        cache (dict): The index cache of an object as returned by Registry.getIndexCache
+        key (str): The key we want to extract from the cache
+    """
+    value = cache.get(key)
+    if value is None:
+        return None
+    return str(value)
+
 
 class GangaRepositorySQLite(GangaRepository):
 
-    """GangaRepository SQLite"""
+    """GangaRepository SQLite
 
-    def startup(self):
-        """ Starts an repository and reads in a directory structure."""
-        self._load_timestamp = {}
-        self._cache_load_timestamp = {}
+    All index rows and the XML of every object are kept in a single SQLite database per registry.
+    Subjobs are stored as rows of their own keyed on the id of their master and loaded only when needed by a SubJobSQLiteList.
+    The database is run in WAL mode so a flush is a single fsync'd transaction and
+    startup is a single query over the index columns rather than a directory walk.
+    Ids and locks between sessions are handled by the same lock managers as GangaRepositoryLocal.
+    """
+
+    def __init__(self, registry):
+        """
+        Initialize a Repository from within a Registry and keep a reference to the Registry which 'owns' it
+        Args:
+            registry (Registry): This is the registry which manages this Repo
+        """
+        super(GangaRepositorySQLite, self).__init__(registry)
+        self.root = os.path.join(self.registry.location, "6.0", self.registry.name)
+        self.lockroot = os.path.join(self.registry.location, "6.0")
+        self.dbfile = os.path.join(self.root, "repository.db")
+        self.sub_split = "subjobs"
+        self.con = None
+        self.cur = None
+        self.sessionlock = None
+        self._db_lock = threading.RLock()
         self._fully_loaded = {}
+        self._load_timestamp = {}
         self.known_bad_ids = []
-        self.root = os.path.join(
-            self.registry.location, "0.1", self.registry.name)
+
+    def startup(self):
+        """ Opens the database, creating the tables if needed, and reads in the index of all objects.
+        Raise RepositoryError"""
+        self._fully_loaded = {}
+        self._load_timestamp = {}
+        if getConfig('Configuration')['lockingStrategy'] == "UNIX":
+            # First test the UNIX locks are working as expected
+            try:
+                dry_run_unix_locks(self.lockroot)
+            except Exception as err:
+                # Locking has not worked, lets raise an error
+                logger.error("Error: %s" % err)
+                msg="\n\nUnable to launch due to underlying filesystem not working with unix locks."
+                msg+="Please try launching again with [Configuration]lockingStrategy=FIXED to start Ganga without multiple session support."
+                raise RepositoryError(self, msg)
+            self.sessionlock = SessionLockManager(self, self.lockroot, self.registry.name)
+        elif getConfig('Configuration')['lockingStrategy'] == "FIXED":
+            self.sessionlock = FixedLockManager(self, self.lockroot, self.registry.name)
+        else:
+            raise RepositoryError(self, "Unable to launch due to unknown file-locking Strategy: \"%s\"" % getConfig('Configuration')['lockingStrategy'])
+        self.sessionlock.startup()
         try:
-            os.makedirs(self.root)
-        except OSError as x:
-            pass
-        self.con = sqlite3.connect(os.path.join(self.root, "database.db"))
-        logger.debug("Connected to ", os.path.join(self.root, "database.db"))
-        self.cur = self.con.cursor()
-        tables = self.cur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' and name LIKE 'objects'")
-        if len(self.cur.fetchall()) == 0:
-            self.cur.execute(
-                "CREATE TABLE objects (id INTEGER PRIMARY KEY, classname VARCHAR(30), category VARCHAR(20), idx VARCHAR(100), data VARCHAR(1000))")
-        self.con.commit()
-        self.update_index(verbose=True)
+            if not os.path.exists(self.root):
+                os.makedirs(self.root)
+            self.con = sqlite3.connect(self.dbfile, timeout=60, isolation_level=None, check_same_thread=False)
+            self.cur = self.con.cursor()
+            self.cur.execute("PRAGMA journal_mode=WAL")
+            self.cur.execute("PRAGMA synchronous=FULL")
+            with self._transaction() as cur:
+                for statement in _create_statements:
+                    cur.execute(statement)
+                cur.execute("PRAGMA user_version")
+                version = cur.fetchone()[0]
+                if version in (0, 1):
+                    cur.execute("PRAGMA user_version = %i" % _schema_version)
+                elif version != _schema_version:
+                    raise RepositoryError(self, "Unknown SQLite repository schema version %s in '%s'" % (version, self.dbfile))
+        except (OSError, sqlite3.Error) as err:
+            raise RepositoryError(self, "Could not open SQLite repository '%s': %s" % (self.dbfile, err))
+        logger.debug("Connected to %s" % self.dbfile)
+        self.update_index(verbose=True, firstRun=True)
 
     def shutdown(self):
         """Shutdown the repository. Flushing is done by the Registry
         Raise RepositoryError"""
-        self.cur.close()
-        self.con.close()
+        logger.debug("Shutting Down GangaRepositorySQLite: %s" % self.registry.name)
+        with self._db_lock:
+            if self.con is not None:
+                try:
+                    self.cur.close()
+                    self.con.close()
+                except sqlite3.Error as err:
+                    raise RepositoryError(self, "Error closing SQLite repository '%s': %s" % (self.dbfile, err))
+                finally:
+                    self.con = None
+                    self.cur = None
+        if self.sessionlock is not None:
+            self.sessionlock.shutdown()
 
-    def update_index(self, id=None, verbose=False):
-        """ Update the list of available objects
-        Raise RepositoryError"""
-        # First locate and load the index files
+    @contextmanager
+    def _transaction(self):
+        """
+        Run the enclosed statements as a single transaction which is committed (and fsync'd) on exit
+        or rolled back if any exception is raised
+        """
+        with self._db_lock:
+            if self.con is None:
+                raise RepositoryError(self, "SQLite repository '%s' is not connected" % self.dbfile)
+            self.cur.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.cur
+            except BaseException:
+                self.cur.execute("ROLLBACK")
+                raise
+            else:
+                self.cur.execute("COMMIT")
+
+    def _query(self, statement, args=()):
+        """
+        Run a read-only query and return all of the rows
+        Args:
+            statement (str): The SQL statement with '?' placeholders
+            args (tuple): The values to bind to the placeholders
+        """
+        with self._db_lock:
+            if self.con is None:
+                raise RepositoryError(self, "SQLite repository '%s' is not connected" % self.dbfile)
+            try:
+                self.cur.execute(statement, args)
+                return self.cur.fetchall()
+            except sqlite3.Error as err:
+                raise RepositoryError(self, "Error querying SQLite repository '%s': %s" % (self.dbfile, err))
+
+    def _select_ids(self, statement, ids):
+        """
+        Run a query with an 'IN (%s)' clause over a possibly very long list of ids, in chunks
+        Args:
+            statement (str): The SQL statement containing a single '%s' to be replaced with the placeholders
+            ids (list): The ids to bind to the placeholders
+        """
+        rows = []
+        for i in range(0, len(ids), _max_query_ids):
+            chunk = ids[i:i + _max_query_ids]
+            rows.extend(self._query(statement % ",".join("?" * len(chunk)), tuple(chunk)))
+        return rows
+
+    def updateLocksNow(self):
+        """
+        Trigger the session locks to all be updated now
+        """
+        self.sessionlock.updateNow()
+
+    def update_index(self, this_id=None, verbose=False, firstRun=False):
+        """ Update the list of available objects from the index columns of the database
+        Returns a list of ids of objects which changed/were removed/were added
+        Raise RepositoryError
+        Args:
+            this_id (int): This is the id we want to explicitly check the index for
+            verbose (bool): Should we be verbose
+            firstRun (bool): Is this the call from the Repo startup
+        """
+        # Like GangaRepositoryLocal the whole index is always checked, but only the index caches of rows
+        # which have been modified since we last saw them are actually read and unpickled
         logger.debug("updating index...")
-        self.cur.execute("SELECT id,classname,category,idx FROM objects")
-        for e in self.cur:
-            id = int(e[0])
-            if e[1] is None:  # deleted object
-                continue
+        rows = self._query("SELECT id, classname, category, modified FROM objects")
+
+        locked_ids = self.sessionlock.locked
+
+        to_read = {}
+        found_ids = set()
+        for _id, classname, category, modified in rows:
+            found_ids.add(_id)
             # Locked IDs can be ignored
-            # if id in self.sessionlock.locked:
-            #    continue
-            # Now we treat unlocked IDs
-            if id in self.objects:
-                obj = self.objects[id]
-            else:
-                obj = self._make_empty_object_(id, e[2], e[1])
-            obj._index_cache = pickle.loads(e[3])
+            if _id in locked_ids:
+                continue
+            if _id in self.incomplete_objects or _id in self._fully_loaded:
+                continue
+            if _id in self.objects and self._load_timestamp.get(_id) == modified:
+                continue
+            to_read[_id] = (classname, category, modified)
+
+        # Make sure we never hand out an id which is already in the database
+        if found_ids and max(found_ids) >= self.sessionlock.count:
+            self.sessionlock.count = max(found_ids) + 1
+            self.sessionlock.cnt_write()
+
+        changed_ids = []
+        for _id, idx in self._select_ids("SELECT id, idx FROM objects WHERE id IN (%s)", list(to_read.keys())):
+            classname, category, modified = to_read[_id]
+            try:
+                if _id in self.objects:
+                    obj = self.objects[_id]
+                else:
+                    obj = self._make_empty_object_(_id, category, classname)
+                obj._index_cache = pickle.loads(idx) if idx is not None else {}
+            except Exception as err:
+                logger.debug("update_index: Failed to load index %i: %s" % (_id, err))
+                if _id not in self.known_bad_ids:
+                    logger.error("Registry '%s': Failed to load index of object #%s due to: %s" % (self.registry.name, _id, err))
+                    self.known_bad_ids.append(_id)
+                if _id not in self.incomplete_objects:
+                    self.incomplete_objects.append(_id)
+                continue
+            self._load_timestamp[_id] = modified
+            changed_ids.append(_id)
+
+        deleted_ids = [_id for _id in self.objects if _id not in found_ids and _id not in self._fully_loaded and _id not in locked_ids]
+        for _id in deleted_ids:
+            self._internal_del__(_id)
+            changed_ids.append(_id)
+        if deleted_ids and not firstRun:
+            logger.warning("Registry '%s': Job %s externally deleted." % (self.registry.name, ",".join(map(str, deleted_ids))))
+
         logger.debug("updated index done")
+        return changed_ids
 
-    def constructDataDict(self, obj):
-        data_dict = {}
-        for attr_name, attr in obj._schema.allItems():
-            if not attr['getter']:
-                data_dict[attr_name] = getattr(obj, attr_name)
-        return data_dict
+    def _serialize(self, obj):
+        """
+        Return the (idx, data, status, backend, name) values to be stored for an object, without its subjobs
+        Args:
+            obj (GangaObject): The object which is to be written to the database
+        """
+        obj = stripProxy(obj)
+        new_idx_cache = self.registry.getIndexCache(obj)
+        sio = StringIO()
+        xml_to_file(obj, sio, self.sub_split)
+        return (pickle.dumps(new_idx_cache), sio.getvalue().encode('utf-8'),
+                _index_column(new_idx_cache, 'status'), _index_column(new_idx_cache, 'display:backend'), _index_column(new_idx_cache, 'name'))
+
+    def _serialize_subjobs(self, this_id, obj):
+        """
+        Return the number of subjobs of an object and the (index cache, row) of each subjob which has to be written to the database
+        Args:
+            this_id (int): The id of the master object
+            obj (GangaObject): The master object which is to be written to the database
+        """
+        subjobs = getattr(obj, self.sub_split, None) if self.sub_split else None
+        if subjobs is None:
+            return 0, {}
+        if isinstance(subjobs, SubJobSQLiteList):
+            to_write = subjobs._dirtySubJobs()
+        else:
+            # Constructed in this session, rows which don't exist yet are written along with the modified subjobs
+            stored = set(_id for (_id,) in self._query("SELECT id FROM subjobs WHERE master = ?", (this_id,)))
+            to_write = [(i, sj) for i, sj in enumerate(subjobs) if sj._dirty or i not in stored]
+        written = {}
+        for i, sj in to_write:
+            sj = stripProxy(sj)
+            if sj is sj._getRoot():
+                raise RepositoryError(self, "Subjob #%s of object #%s has no parent set" % (i, this_id))
+            sj_idx_cache = self.registry.getIndexCache(sj)
+            sio = StringIO()
+            xml_to_file(sj, sio, "")
+            written[i] = (sj_idx_cache, (this_id, i, _index_column(sj_idx_cache, 'status'), pickle.dumps(sj_idx_cache), sio.getvalue().encode('utf-8')))
+        return len(subjobs), written
 
     def add(self, objs, force_ids=None):
         """ Add the given objects to the repository, forcing the IDs if told to.
-        Raise RepositoryError"""
-        ids = []
-        # assume the ids are already locked by Registry
-        if not force_ids is None:
+        Only the id and class of each object is recorded here, the content is written at the next flush
+        Raise RepositoryError
+        Args:
+            objs (list): GangaObject-s which we want to add to the Repo
+            force_ids (list, None): IDs to assign to object, None for auto-assign
+        """
+        if force_ids not in [None, []]:  # assume the ids are already locked by Registry
             if not len(objs) == len(force_ids):
-                raise RepositoryError(
-                    self, "Internal Error: add with different number of objects and force_ids!")
+                raise RepositoryError(self, "Internal Error: add with different number of objects and force_ids!")
             ids = force_ids
-        for i in range(0, len(objs)):
-            cls = objs[i]._name
-            cat = objs[i]._category
-            objs[i]._index_cache = self.registry.getIndexCache(objs[i])
-            data = pickle.dumps(self.constructDataDict(obj)).replace("'", "''")
-            idx = pickle.dumps(objs[i]._index_cache).replace("'", "''")
-            if force_ids is None:
-                self.cur.execute("INSERT INTO objects (id,classname,category,idx,data) VALUES (NULL,'%s','%s','%s','%s')" % (
-                    cls, cat, idx, data))
-            else:
-                self.cur.execute("INSERT INTO objects (id,classname,category,idx,data) VALUES (%i,'%s','%s','%s','%s')" % (
-                    force_ids[i], cls, cat, idx, data))
-            ids.append(self.cur.lastrowid)
-            self._internal_setitem__(ids[i], objs[i])
-        self.con.commit()
+        else:
+            ids = self.sessionlock.make_new_ids(len(objs))
+
+        now = time.time()
+        try:
+            with self._transaction() as cur:
+                cur.executemany("INSERT OR REPLACE INTO objects (id, classname, category, modified) VALUES (?, ?, ?, ?)",
+                                [(this_id, getName(obj), obj._category, now) for this_id, obj in zip(ids, objs)])
+        except sqlite3.Error as err:
+            raise RepositoryError(self, "Error adding objects to SQLite repository '%s': %s" % (self.dbfile, err))
+
+        for this_id, obj in zip(ids, objs):
+            self._internal_setitem__(this_id, obj)
+            self._fully_loaded[this_id] = obj
         return ids
 
     def flush(self, ids):
-        for id in ids:
-            obj = self.objects[id]
-            if obj._name != "EmptyGangaObject":
-                obj._index_cache = self.registry.getIndexCache(obj)
-                data = pickle.dumps(self.constructDataDict(obj)).replace("'", "''")
-                idx = pickle.dumps(obj._index_cache).replace("'", "''")
-                self.cur.execute(
-                    "UPDATE objects SET idx='%s',data='%s' WHERE id=%s" % (idx, data, id))
-                # print "flushing id ", id, " backend ", obj.backend._name
-        self.con.commit()
+        """
+        Write the objects corresponding to "ids" to the database in a single batched transaction
+        Raise RepositoryError
+        Args:
+            ids (list): List of integers, used as keys to objects in the self.objects dict
+        """
+        logger.debug("Flushing: %s" % ids)
+        rows = []
+        sj_rows = []
+        sj_counts = []
+        sj_written = {}
+        modified = time.time()
+        for this_id in ids:
+            if this_id in self.incomplete_objects:
+                logger.debug("Should NEVER re-flush an incomplete object, it's now 'bad' respect this!")
+                continue
+            obj = self.objects[this_id]
+            if isType(obj, EmptyGangaObject):
+                raise RepositoryError(self, "Cannot flush an Empty object for ID: %s" % this_id)
+            try:
+                idx, data, status, backend, name = self._serialize(obj)
+                sj_count, written = self._serialize_subjobs(this_id, obj)
+            except XMLFileError as err:
+                raise RepositoryError(self, "Error of type: %s on flushing id '%s': %s" % (type(err), this_id, err))
+            rows.append((status, backend, name, modified, idx, data, this_id))
+            sj_counts.append((this_id, sj_count))
+            sj_rows.extend(row + (modified,) for _, row in written.values())
+            sj_written[this_id] = dict((i, sj_idx_cache) for i, (sj_idx_cache, _) in written.items())
+
+        if not rows:
+            return
+
+        try:
+            with self._transaction() as cur:
+                cur.executemany("UPDATE objects SET status = ?, backend = ?, name = ?, modified = ?, idx = ?, data = ? WHERE id = ?", rows)
+                cur.executemany("INSERT OR REPLACE INTO subjobs (master, id, status, idx, data, modified) VALUES (?, ?, ?, ?, ?, ?)", sj_rows)
+                # Drop the rows of subjobs which no longer exist
+                cur.executemany("DELETE FROM subjobs WHERE master = ? AND id >= ?", sj_counts)
+        except sqlite3.Error as err:
+            raise RepositoryError(self, "Error of type: %s on flushing ids '%s': %s" % (type(err), ids, err))
+
+        for row in rows:
+            this_id = row[-1]
+            self._load_timestamp[this_id] = modified
+            if this_id not in self._fully_loaded:
+                self._fully_loaded[this_id] = self.objects[this_id]
+            subjobs = getattr(self.objects[this_id], self.sub_split, None)
+            if isinstance(subjobs, SubJobSQLiteList):
+                subjobs._setWritten(sj_written[this_id], modified)
+            self.objects[this_id]._setFlushed()
+
+    def _parse_xml(self, this_id, tmpobj):
+        """
+        Replace the attributes of "objects[this_id]" with those of the object just read from the database
+        Args:
+            this_id (int): This is the integer key of the object in the self.objects dict
+            tmpobj (GangaObject): This contains the object which has been read in from the database
+        """
+        if this_id not in self.objects:
+            self._internal_setitem__(this_id, tmpobj)
+            obj = tmpobj
+        else:
+            obj = self.objects[this_id]
+            for key, val in tmpobj._data.items():
+                obj.setSchemaAttribute(key, val)
+            for attr_name, attr_val in obj._schema.allItems():
+                if attr_name not in tmpobj._data:
+                    obj.setSchemaAttribute(attr_name, obj._schema.getDefaultValue(attr_name))
+
+        from GangaCore.GPIDev.Base.Objects import do_not_copy
+        for node_key, node_val in obj._data.items():
+            if isType(node_val, Node):
+                if node_key not in do_not_copy:
+                    node_val._setParent(obj)
+
+        obj._index_cache = {}
+        return obj
 
     def load(self, ids):
-        self.cur.execute("SELECT id,classname,category,data FROM objects WHERE id IN (%s)" % (
-            ",".join(map(str, ids))))
-        for e in self.cur:
-            # print "load: ",e
-            _id = int(e[0])
-            if e[1] is None:  # deleted object
-                continue
-            if not _id in self.objects:
-                obj = self._make_empty_object_(_id, e[2], e[1])
-            else:
-                obj = self.objects[_id]
-            if _id not in self._fully_loaded:
-                new_data = pickle.loads(e[3])
-                for k, v in new_data:
-                    setattr(obj, k, v)
-            self._fully_loaded[_id] = obj
-            ids.remove(_id)
-        if len(ids) > 0:
-            raise KeyError(ids[0])
+        """
+        Load the following "ids" from the database
+        Raise KeyError
+        Raise RepositoryError
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+        """
+        logger.debug("Loading Repo object(s): %s" % ids)
+        ids = list(ids)
+        if not ids:
+            return
+        for this_id in ids:
+            if this_id in self.incomplete_objects:
+                raise RepositoryError(self, "Trying to re-load a corrupt repository id: %s" % this_id)
+
+        found = {}
+        for _id, modified, data in self._select_ids("SELECT id, modified, data FROM objects WHERE id IN (%s)", ids):
+            found[_id] = (modified, data)
+        has_subjobs = set(_id for (_id,) in self._select_ids("SELECT DISTINCT master FROM subjobs WHERE master IN (%s)", ids))
+
+        for this_id in ids:
+            if this_id not in found:
+                if this_id in self.objects:
+                    self._internal_del__(this_id)
+                raise KeyError(this_id)
+            modified, data = found[this_id]
+            if data is None:
+                # Added but never flushed, nothing to load beyond what is already in memory
+                if this_id in self._fully_loaded:
+                    continue
+                if this_id not in self.incomplete_objects:
+                    self.incomplete_objects.append(this_id)
+                raise InaccessibleObjectError(self, this_id, "No data stored for object #%s" % this_id)
+            try:
+                tmpobj, errs = xml_from_file(StringIO(data.decode('utf-8')))
+            except Exception as err:
+                errs = [err]
+            if len(errs) > 0:
+                logger.error("#%s Error(s) Loading object #%s from: %s" % (len(errs), this_id, self.dbfile))
+                for err in errs:
+                    logger.error("err: %s" % err)
+                logger.error("Adding id: %s to Corrupt IDs will not attempt to re-load this session" % this_id)
+                if this_id not in self.incomplete_objects:
+                    self.incomplete_objects.append(this_id)
+                raise InaccessibleObjectError(self, this_id, errs[0])
+
+            obj = self._parse_xml(this_id, tmpobj)
+            if this_id in has_subjobs:
+                obj.setSchemaAttribute(self.sub_split, SubJobSQLiteList(self, this_id, obj))
+            self._load_timestamp[this_id] = modified
+            self._fully_loaded[this_id] = obj
+            obj._setFlushed()
+
+        logger.debug("Finished 'load'-ing of: %s" % ids)
+
+    def _subjob_statuses(self, master_id):
+        """
+        Return the (id, status, modified) of every subjob of a master object, in order
+        Args:
+            master_id (int): The id of the master object
+        """
+        return self._query("SELECT id, status, modified FROM subjobs WHERE master = ? ORDER BY id", (master_id,))
+
+    def _subjob_index_caches(self, master_id):
+        """
+        Return the index cache of every subjob of a master object keyed by subjob id
+        Args:
+            master_id (int): The id of the master object
+        """
+        caches = {}
+        for sj_id, idx in self._query("SELECT id, idx FROM subjobs WHERE master = ?", (master_id,)):
+            try:
+                caches[sj_id] = pickle.loads(idx)
+            except Exception as err:
+                logger.debug("Failed to load the index of subjob %s.%s: %s" % (master_id, sj_id, err))
+        return caches
+
+    def _load_subjob(self, master_id, sj_id):
+        """
+        Read a single subjob from the database
+        Raise RepositoryError
+        Args:
+            master_id (int): The id of the master object
+            sj_id (int): The id of the subjob
+        """
+        rows = self._query("SELECT data FROM subjobs WHERE master = ? AND id = ?", (master_id, sj_id))
+        if not rows or rows[0][0] is None:
+            raise RepositoryError(self, "Subjob %s.%s not found in '%s'" % (master_id, sj_id, self.dbfile))
+        try:
+            sj, errs = xml_from_file(StringIO(rows[0][0].decode('utf-8')))
+        except Exception as err:
+            errs = [err]
+        if len(errs) > 0:
+            raise RepositoryError(self, "Error loading subjob %s.%s: %s" % (master_id, sj_id, errs[0]))
+        return sj
 
     def delete(self, ids):
-        for id in ids:
-            self.cur.execute(
-                "UPDATE objects SET classname=NULL,category=NULL,idx=NULL,data=NULL WHERE id=%s" % (id))
-            self._internal_del__(id)
-        self.con.commit()
+        """
+        Remove the following "ids" from the database
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+        """
+        try:
+            with self._transaction() as cur:
+                cur.executemany("DELETE FROM objects WHERE id = ?", [(this_id,) for this_id in ids])
+                cur.executemany("DELETE FROM subjobs WHERE master = ?", [(this_id,) for this_id in ids])
+        except sqlite3.Error as err:
+            raise RepositoryError(self, "Error deleting ids '%s' from SQLite repository '%s': %s" % (ids, self.dbfile, err))
+        for this_id in ids:
+            self._internal_del__(this_id)
+            self._fully_loaded.pop(this_id, None)
+            self._load_timestamp.pop(this_id, None)
 
     def lock(self, ids):
-        return ids
+        """
+        Request a session lock for the following ids
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+        """
+        return self.sessionlock.lock_ids(ids)
 
     def unlock(self, ids):
-        return ids
+        """
+        Unlock (release file locks of) the following ids
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+        """
+        released_ids = self.sessionlock.release_ids(ids)
+        if len(released_ids) < len(ids):
+            logger.error("The write locks of some objects could not be released!")
 
-    def get_lock_session(self, id):
+    def get_lock_session(self, this_id):
         """get_lock_session(id)
         Tries to determine the session that holds the lock on id for information purposes, and return an informative string.
         Returns None on failure
+        Args:
+            this_id (int): Get the id of the session which has a lock on the object with this id
         """
-        return ""
+        return self.sessionlock.get_lock_session(this_id)
 
     def get_other_sessions(self):
         """get_session_list()
         Tries to determine the other sessions that are active and returns an informative string for each of them.
         """
-        return []
+        return self.sessionlock.get_other_sessions()
 
     def reap_locks(self):
         """reap_locks() --> True/False
         Remotely clear all foreign locks from the session.
         WARNING: This is not nice.
         Returns True on success, False on error."""
-        return False
+        return self.sessionlock.reap_locks()
 
     def clean(self):
         """clean() --> True/False
         Clear EVERYTHING in this repository, counter, all jobs, etc.
         WARNING: This is not nice."""
+        from GangaCore.Core.GangaRepository.GangaRepositoryXML import rmrf
         self.shutdown()
-        os.unlink(os.path.join(self.root, "database.db"))
+        try:
+            rmrf(self.root)
+        except Exception as err:
+            logger.error("Failed to correctly clean repository due to: %s" % err)
         self.startup()
+
+    def isObjectLoaded(self, obj):
+        """
+        This will return a true false if an object has been fully loaded into memory
+        Args:
+            obj (GangaObject): The object we want to know if it was loaded into memory
+        """
+        return any(o is obj for o in self._fully_loaded.values())
+
+    def migrate_from_xml(self, xml_root):
+        """
+        Import all of the objects of a GangaRepositoryLocal (LocalXML) tree into this repository.
+        Objects which already exist here are skipped, so this can safely be re-run.
+        Returns the list of ids which were imported.
+        Args:
+            xml_root (str): The top of the XML tree for this registry, i.e. <gangadir>/repository/<user>/LocalXML/6.0/<registry>
+        """
+        from GangaCore.Core.GangaRepository.SubJobXMLList import SubJobXMLList
+        from GangaCore.GPIDev.Lib.GangaList.GangaList import makeGangaList
+
+        if not os.path.isdir(xml_root):
+            raise RepositoryError(self, "Cannot migrate from '%s' as it is not a directory" % xml_root)
+
+        existing = set(_id for (_id,) in self._query("SELECT id FROM objects"))
+        obj_dirs = []
+        for chunk in os.listdir(xml_root):
+            if not (chunk.endswith("xxx") and chunk[:-3].isdigit()):
+                continue
+            for entry in os.listdir(os.path.join(xml_root, chunk)):
+                if entry.isdigit() and int(entry) not in existing:
+                    obj_dirs.append((int(entry), os.path.join(xml_root, chunk, entry)))
+
+        imported = []
+        for this_id, obj_dir in sorted(obj_dirs):
+            fn = os.path.join(obj_dir, "data")
+            if not os.path.isfile(fn):
+                logger.warning("Not migrating object #%s as there is no data file in: %s" % (this_id, obj_dir))
+                continue
+            try:
+                with open(fn, "r") as fobj:
+                    obj, errs = xml_from_file(fobj)
+                if len(errs) > 0:
+                    raise errs[0]
+                if SubJobXMLList.checkJobHasChildren(obj_dir, "data"):
+                    sj_list = SubJobXMLList(obj_dir, self.registry, "data", False, obj)
+                    subjobs = makeGangaList([sj_list[i] for i in range(len(sj_list))])
+                    obj.setSchemaAttribute(self.sub_split, subjobs)
+                    subjobs._setParent(obj)
+                if len(self.lock([this_id])) == 0:
+                    raise RepositoryError(self, "Could not lock id #%s" % this_id)
+                self.add([obj], [this_id])
+                self.flush([this_id])
+            except Exception as err:
+                logger.error("Failed to migrate object #%s from '%s': %s" % (this_id, obj_dir, err))
+                continue
+            imported.append(this_id)
+
+        logger.info("Migrated %s objects of registry '%s' from '%s'" % (len(imported), self.registry.name, xml_root))
+        return imported
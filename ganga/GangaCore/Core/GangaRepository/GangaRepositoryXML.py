@@ -10,7 +10,10 @@ import os.path
 import time
 import errno
 import copy
+import pickle
+import tempfile
 import threading
+import zlib
 
 from GangaCore import GANGA_SWAN_INTEGRATION
 
@@ -37,6 +40,9 @@ logger = GangaCore.Utility.logging.getLogger()
 
 save_all_history = False
 
+# Version of the layout of master.idx, the pickled entries are stored along with this and their checksum
+_master_index_version = 1
+
 def check_app_hash(obj):
     """Writes a file safely, raises IOError on error
     Args:
@@ -116,6 +122,42 @@ def safe_save(fn, _obj, to_file, ignore_subs=''):
 # Global lock for above function - See issue #185
 safe_save.lock = threading.Lock()
 
+def _pack_master_cache(this_master_cache):
+    """Return the master index entries wrapped with the format version and a checksum so that readers can trust them
+    Args:
+        this_master_cache (list): The master index entries
+    """
+    payload = pickle.dumps(this_master_cache, pickle.HIGHEST_PROTOCOL)
+    return (_master_index_version, zlib.crc32(payload), payload)
+
+def _current_umask():
+    """Return the umask of the process. It is read from /proc where possible as setting it to find it out isn't thread safe"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+def _unpack_master_cache(packed_cache):
+    """Return the master index entries from the content of master.idx, raising ValueError if it can't be trusted
+    Args:
+        packed_cache (tuple, list): The object read from master.idx
+    """
+    if isinstance(packed_cache, list):
+        # Written by an older version of Ganga without any checksum
+        return packed_cache
+    version, checksum, payload = packed_cache
+    if version != _master_index_version:
+        raise ValueError("Unknown master index version: %s" % version)
+    if zlib.crc32(payload) != checksum:
+        raise ValueError("Master index checksum mismatch")
+    return pickle.loads(payload)
+
 def rmrf(name, count=0):
     """
     Safely recursively remove a file/folder from disk by first moving it then removing it
@@ -220,6 +262,8 @@ class GangaRepositoryLocal(GangaRepository):
         self._cached_cls = {}
         self._cached_obj = {}
         self._master_index_timestamp = 0
+        # ids whose master index entry has to be regenerated the next time it's written
+        self._master_cache_dirty = set()
 
         self.known_bad_ids = []
         if "XML" in self.registry.type:
@@ -332,6 +376,7 @@ class GangaRepositoryLocal(GangaRepository):
             self._cached_cat[this_id] = cat
             self._cached_cls[this_id] = cls
             self._cached_obj[this_id] = cache
+            self._master_cache_dirty.add(this_id)
             return True
         elif this_id not in self.objects:
             self.objects[this_id] = self._make_empty_object_(this_id, self._cached_cat[this_id], self._cached_cls[this_id])
@@ -410,7 +455,7 @@ class GangaRepositoryLocal(GangaRepository):
                 logger.debug("Reading Master index")
                 self._master_index_timestamp = os.stat(_master_idx).st_ctime
                 with open(_master_idx, 'rb') as input_f:
-                    this_master_cache = pickle_from_file(input_f)[0]
+                    this_master_cache = _unpack_master_cache(pickle_from_file(input_f)[0])
                 for this_cache in this_master_cache:
                     if this_cache[1] >= 0:
                         this_id = this_cache[0]
@@ -425,102 +470,119 @@ class GangaRepositoryLocal(GangaRepository):
             logger.debug("Master Index corrupt, ignoring it")
             logger.debug("Exception: %s" % err)
             self._clear_stored_cache()
-        finally:
-            rmrf(os.path.join(self.root, 'master.idx'))
 
     def _clear_stored_cache(self):
         """
         clear the master cache(s) which have been stored in memory
         """
-        for k, v in self._cache_load_timestamp.items():
-            self._cache_load_timestamp.pop(k)
-        for k, v in self._cached_cat.items():
-            self._cached_cat.pop(k)
-        for k, v in self._cached_cls.items():
-            self._cached_cls.pop(k)
-        for k, v in self._cached_obj.items():
-            self._cached_obj.pop(k)
+        self._cache_load_timestamp.clear()
+        self._cached_cat.clear()
+        self._cached_cls.clear()
+        self._cached_obj.clear()
+
+    def _update_master_cache_entry(self, this_id):
+        """
+        regenerate the in-memory master index entry for one object from the object and its index file
+        Args:
+            this_id (int): This is the id of the object whose entry we want to update
+        """
+        obj = self.objects.get(this_id)
+        fn_ctime = -1
+        if obj is not None and this_id not in self.incomplete_objects:
+            try:
+                fn_ctime = os.stat(self.get_idxfn(this_id)).st_ctime
+            except OSError as err:
+                logger.debug("_update_master_cache_entry: %s" % err)
+        if fn_ctime < 0 or (this_id not in self._fully_loaded and this_id not in self._cached_obj):
+            for this_cache in (self._cache_load_timestamp, self._cached_cat, self._cached_cls, self._cached_obj):
+                this_cache.pop(this_id, None)
+            return
+        if this_id in self._fully_loaded:
+            self._cached_obj[this_id] = self.registry.getIndexCache(stripProxy(obj))
+        self._cache_load_timestamp[this_id] = fn_ctime
+        self._cached_cat[this_id] = obj._category
+        self._cached_cls[this_id] = getName(obj)
 
     def _write_master_cache(self, shutdown=False):
         """
-        write a master index cache once per 300sec
+        write the master index cache so that it is always a valid description of the repository.
+        Only the entries of objects which have changed since the last write are regenerated and the file is
+        replaced atomically so a reader never sees a partially written index
         Args:
-            shutdown (boool): True causes this to be written now
+            shutdown (boool): True causes the index of all loaded objects to be written and all entries to be regenerated
         """
         try:
             _master_idx = os.path.join(self.root, 'master.idx')
-            this_master_cache = []
-            if os.path.isfile(_master_idx) and not shutdown:
-                if abs(self._master_index_timestamp - os.stat(_master_idx).st_ctime) < 300:
-                    return
 
-            items_to_save = iter(self.objects.items())
-            for k, v in items_to_save:
-                if k in self.incomplete_objects:
-                    continue
+            if shutdown:
+                items_to_save = list(self.objects.items())
+                for k, v in items_to_save:
+                    if k in self.incomplete_objects:
+                        continue
+                    try:
+                        if k in self._fully_loaded:
+                            # Check and write index first
+                            obj = v#self.objects[k]
+                            new_index = None
+                            if obj is not None:
+                                new_index = self.registry.getIndexCache(stripProxy(obj))
+
+                            if new_index is not None:
+                                #logger.debug("k: %s" % k)
+                                arr_k = [k]
+                                if len(self.lock(arr_k)) != 0:
+                                    self.index_write(k)
+                                    self.unlock(arr_k)
+                                    self._cached_obj[k] = new_index
+
+                    except Exception as err:
+                        logger.debug("Failed to update index: %s on startup/shutdown" % k)
+                        logger.debug("Reason: %s" % err)
+                self._master_cache_dirty.update(self._cache_load_timestamp.keys())
+            elif not self._master_cache_dirty and os.path.isfile(_master_idx):
+                return
+
+            dirty_ids, self._master_cache_dirty = self._master_cache_dirty, set()
+            for k in dirty_ids:
                 try:
-                    if k in self._fully_loaded:
-                        # Check and write index first
-                        obj = v#self.objects[k]
-                        new_index = None
-                        if obj is not None:
-                            new_index = self.registry.getIndexCache(stripProxy(obj))
-
-                        if new_index is not None:
-                            #logger.debug("k: %s" % k)
-                            arr_k = [k]
-                            if len(self.lock(arr_k)) != 0:
-                                self.index_write(k)
-                                self.unlock(arr_k)
-                                self._cached_obj[k] = new_index
-
+                    self._update_master_cache_entry(k)
                 except Exception as err:
-                    logger.debug("Failed to update index: %s on startup/shutdown" % k)
+                    logger.debug("Failed to update master index entry: %s" % k)
                     logger.debug("Reason: %s" % err)
 
-            iterables = iter(self._cache_load_timestamp.items())
-            for k, v in iterables:
-                if k in self.incomplete_objects:
+            this_master_cache = []
+            for k, v in list(self._cache_load_timestamp.items()):
+                if k in self.incomplete_objects or k not in self.objects or k not in self._cached_obj or v <= 0:
                     continue
-                cached_list = []
-                cached_list.append(k)
-                try:
-                    fn = self.get_idxfn(k)
-                    if os.path.isfile(fn):
-                        time = os.stat(fn).st_ctime
-                    else:
-                        time = -1
-                except OSError as err:
-                    logger.debug("_write_master_cache: %s" % err)
-                    logger.debug("_cache_load_timestamp: %s" % self._cache_load_timestamp)
-                    import errno
-                    if err.errno == errno.ENOENT:  # If file is not found
-                        time = -1
-                    else:
-                        raise
-
-                if time > 0:
-                    cached_list.append(time)
-                    cached_list.append(self._cached_cat[k])
-                    cached_list.append(self._cached_cls[k])
-                    cached_list.append(self._cached_obj[k])
-                    this_master_cache.append(cached_list)
+                this_master_cache.append([k, v, self._cached_cat[k], self._cached_cls[k], self._cached_obj[k]])
 
+            fd, temp_name = tempfile.mkstemp(prefix='master.idx.', dir=self.root)
             try:
-                with open(_master_idx, 'wb') as of:
-                    pickle_to_file(this_master_cache, of)
-            except IOError as err:
+                # mkstemp only lets the owner read the file, give it the permissions of any other file of the repository
+                os.fchmod(fd, 0o666 & ~_current_umask())
+                with os.fdopen(fd, 'wb') as of:
+                    pickle_to_file(_pack_master_cache(this_master_cache), of)
+                    of.flush()
+                    os.fsync(of.fileno())
+                os.rename(temp_name, _master_idx)
+                self._master_index_timestamp = os.stat(_master_idx).st_ctime
+            except (IOError, OSError) as err:
                 logger.debug("write_master: %s" % err)
-                try:
-                    os.remove(os.path.join(self.root, 'master.idx'))
-                except OSError as x:
-                    GangaCore.Utility.logging.log_user_exception(True)
+                self._master_cache_dirty.update(dirty_ids)
+                if os.path.exists(temp_name):
+                    os.remove(temp_name)
         except Exception as err:
             logger.debug("write_error2: %s" % err)
             GangaCore.Utility.logging.log_unknown_exception()
 
         return
 
+    def flush_index(self):
+        """
+        Bring master.idx up to date with any objects which have changed since it was last written
+        """
+        self._write_master_cache()
+
     def updateLocksNow(self):
         """
         Trigger the session locks to all be updated now
@@ -640,8 +702,8 @@ class GangaRepositoryLocal(GangaRepository):
         logger.debug("updated index done")
 
         if len(changed_ids) != 0:
-            isShutdown = not firstRun
-            self._write_master_cache(isShutdown)
+            self._master_cache_dirty.update(changed_ids)
+            self._write_master_cache()
 
         return changed_ids
 
@@ -712,6 +774,7 @@ class GangaRepositoryLocal(GangaRepository):
                     getattr(obj, self.sub_split).flush()
                 else:
                     # I have been constructed in this session, I don't know how to flush!
+                    written_ids = []
                     if hasattr(getattr(obj, self.sub_split)[0], "_dirty"):
                         split_cache = getattr(obj, self.sub_split)
                         for i in range(len(split_cache)):
@@ -725,6 +788,7 @@ class GangaRepositoryLocal(GangaRepository):
                                 logger.debug("Using Folder: %s" % os.path.dirname(sfn))
                             safe_save(sfn, split_cache[i], self.to_file)
                             split_cache[i]._setFlushed()
+                            written_ids.append(i)
                     # Now generate an index file to take advantage of future non-loading goodness
                     tempSubJList = SubJobXMLList(os.path.dirname(fn), self.registry, self.dataFileName, False, obj)
                     ## equivalent to for sj in job.subjobs
@@ -733,6 +797,7 @@ class GangaRepositoryLocal(GangaRepository):
                     for sj in getattr(obj, self.sub_split):
                         job_dict[sj.id] = stripProxy(sj)
                     tempSubJList._reset_cachedJobs(job_dict)
+                    tempSubJList._setIndexDirty(written_ids)
                     tempSubJList.flush(ignore_disk=True)
                     del tempSubJList
 
@@ -788,6 +853,7 @@ class GangaRepositoryLocal(GangaRepository):
                 except:
                     logger.debug("Index write failed")
                     pass
+                self._master_cache_dirty.add(this_id)
 
                 if this_id not in self._fully_loaded:
                     self._fully_loaded[this_id] = self.objects[this_id]
@@ -1134,6 +1200,7 @@ class GangaRepositoryLocal(GangaRepository):
                 del self._fully_loaded[this_id]
             if this_id in self.objects:
                 del self.objects[this_id]
+            self._master_cache_dirty.add(this_id)
 
     def lock(self, ids):
         """
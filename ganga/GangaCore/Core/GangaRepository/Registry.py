@@ -270,6 +270,7 @@ class RegistryFlusher(GangaThread):
             logger.debug('Auto-flushing: %s', self.registry.name)
             if regConf['EnableAutoFlush']:
                 self.registry.flush_all()
+                self.registry.flush_index()
         logger.debug("Auto-Flusher shutting down for Registry: %s" % self.registry.name)
 
 
@@ -531,6 +532,18 @@ class Registry(object):
         if self.metadata and self.metadata.hasStarted():
             self.metadata.flush_all()
 
+    @synchronised_flush_lock
+    def flush_index(self):
+        """
+        This will write the summary index of the repository (if it has one) so that a restart after an abrupt exit
+        doesn't have to rebuild it from every object.
+        """
+        if self.hasStarted():
+            self.repository.flush_index()
+
+        if self.metadata and self.metadata.hasStarted():
+            self.metadata.flush_index()
+
     def _load(self, obj):
         """
         Use this function to load an object from disk as it will check if the object is already loaded *outside*
@@ -0,0 +1,158 @@
+from GangaCore.GPIDev.Schema.Schema import Schema, Version
+from GangaCore.Utility.logging import getLogger
+from GangaCore.Core.exceptions import GangaException
+from GangaCore.Core.GangaRepository.SubJobXMLList import SubJobXMLList
+from GangaCore.Core.GangaRepository.SubJobStatusIndex import SubJobStatusIndex
+import copy
+import threading
+
+logger = getLogger()
+
+
+class SubJobSQLiteList(SubJobXMLList):
+    """
+        SUBJOBSQLITELIST class for managing the subjobs stored as rows of a GangaRepositorySQLite so they're loaded only when needed
+    """
+
+    _category = 'internal'
+    _exportmethods = ['__getitem__', '__len__', '__iter__', 'getAllCachedData', 'values']
+    _hidden = True
+    _name = 'SubJobSQLiteList'
+
+    _schema = Schema(Version(1, 0), {})
+
+    def __init__(self, repository=None, master_id=None, parent=None):
+        """ Constructor for SubJobSQLiteList
+        Args:
+            repository (GangaRepositorySQLite): the repository holding the subjob rows
+            master_id (int): id of the master job the subjobs belong to
+            parent (Job): parent of self after construction
+        """
+        # None of the files managed by SubJobXMLList exist here
+        super(SubJobXMLList, self).__init__()
+
+        self._repository = repository
+        self._registry = repository.registry if repository is not None else None
+        self._masterId = master_id
+        self._cachedJobs = {}
+        self._definedParent = None
+
+        # Number of subjobs stored, the status index always has this length
+        self._length = 0
+        self._statusIndex = SubJobStatusIndex()
+        # Index caches of all subjobs, only read from the database when first needed
+        self._subjobIndexData = None
+
+        self._storedKeys = {}
+        self._load_lock = threading.Lock()
+
+        if repository is None:
+            return
+
+        if parent:
+            self._setParent(parent)
+        self.load_statusIndex()
+
+    def __deepcopy__(self, memo=None):
+        obj = SubJobSQLiteList()
+        obj._repository = self._repository
+        obj._registry = self._registry
+        obj._masterId = self._masterId
+        obj._length = self._length
+        obj._statusIndex = copy.deepcopy(self._statusIndex, memo)
+        obj._subjobIndexData = copy.deepcopy(self._subjobIndexData, memo)
+        return obj
+
+    def load_statusIndex(self):
+        """Build the status index of all subjobs from the status column of their rows"""
+        rows = self._repository._subjob_statuses(self._masterId)
+        status_index = SubJobStatusIndex()
+        status_index.resize(len(rows))
+        for sj_id, status, modified in rows:
+            status_index.set(sj_id, status, None, modified)
+        self._statusIndex = status_index
+        self._length = len(rows)
+
+    def _getIndexData(self):
+        """Return the index caches of all subjobs, reading them from the database the first time"""
+        if self._subjobIndexData is None:
+            self._subjobIndexData = self._repository._subjob_index_caches(self._masterId)
+        return self._subjobIndexData
+
+    def _getStatusIndex(self):
+        """Return the status index for all subjobs, refreshing the subjobs held in memory which have been modified since they were last flushed"""
+        status_index = self._statusIndex
+        for sj_id, this_sj in list(self._cachedJobs.items()):
+            if this_sj._dirty and sj_id < len(status_index):
+                status_index.set(sj_id, this_sj.status, getattr(this_sj.backend, 'id', None))
+        return status_index
+
+    def _dirtySubJobs(self):
+        """Return the (index, subjob) of every subjob in memory which has to be written to the database"""
+        return [(index, self._cachedJobs[index]) for index in sorted(self._cachedJobs)
+                if index < self._length and self._cachedJobs[index]._dirty]
+
+    def _setWritten(self, caches, modified):
+        """Record the index caches of the subjobs which have just been written to the database
+        Args:
+            caches (dict): the index cache of each subjob which was written, keyed by subjob id
+            modified (float): the time they were written
+        """
+        for sj_id, this_cache in caches.items():
+            self._statusIndex.set(sj_id, this_cache['status'], this_cache.get('backend:id'), modified)
+            if self._subjobIndexData is not None:
+                self._subjobIndexData[sj_id] = this_cache
+
+    def __len__(self):
+        """Return the number of subjobs stored in the database"""
+        return self._length
+
+    def _getItem(self, index):
+        """Load the subjob from the database if it isn't in memory yet, storing it in _cachedJobs for future use
+        Args:
+            index (int): The index corresponding to the subjob object we want
+        """
+        logger.debug("Requesting subjob: #%s" % index)
+
+        if index not in self._cachedJobs:
+
+            # obtain a lock to make sure multiple loads of the same object don't happen
+            with self._load_lock:
+
+                # just make sure we haven't loaded this object already while waiting on the lock
+                if index in self._cachedJobs:
+                    return self._cachedJobs[index]
+
+                if not 0 <= index < len(self):
+                    raise GangaException("Subjob: %s does NOT exist" % index)
+
+                logger.debug("Loading subjob #%s of job #%s from the database" % (index, self.getMasterID()))
+                loaded_sj = self._repository._load_subjob(self._masterId, index)
+                loaded_sj._setParent(self._definedParent)
+                loaded_sj._setFlushed()
+                self._cachedJobs[index] = loaded_sj
+
+        return self._cachedJobs[index]
+
+    def getCachedData(self, index):
+        """Get the cached data from the index for one of the subjobs
+        Args:
+            index (int): index for the subjob we're interested in
+        """
+        if index >= len(self) or index < 0:
+            return None
+
+        if self.isLoaded(index) or index not in self._getIndexData():
+            return self._registry.getIndexCache(self.__getitem__(index))
+        return self._subjobIndexData[index]
+
+    def getAllCachedData(self):
+        """Get the cached data from the index for all subjobs"""
+        return [self.getCachedData(i) for i in range(len(self))]
+
+    def flush(self, ignore_disk=False):
+        """Write the modified subjobs to the database along with their master
+        Args:
+            ignore_disk (bool): Unused, the rows in the database always describe all of the subjobs
+        """
+        self._repository.flush([self._masterId])
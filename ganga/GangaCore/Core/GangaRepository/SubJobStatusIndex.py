@@ -0,0 +1,172 @@
+from array import array
+import re
+
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+_status_index_version = 1
+
+
+class SubJobStatusIndex(object):
+    """
+    Compact columnar store of the subjob status, backend id and last modified time of all the subjobs of a master job.
+    Statuses are stored as small integer codes in an array('b') so that counts and 'ids in state X' queries run over a
+    flat buffer rather than a list of per-subjob dictionaries
+    """
+
+    __slots__ = ('_names', '_codes', '_backend_ids', '_modified')
+
+    def __init__(self, names=None):
+        """ Constructor for SubJobStatusIndex
+        Args:
+            names (list): status names corresponding to the codes 1..len(names), code 0 means unknown
+        """
+        self._names = list(names) if names else []
+        self._codes = array('b')
+        self._backend_ids = []
+        self._modified = array('d')
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __deepcopy__(self, memo=None):
+        obj = SubJobStatusIndex(self._names)
+        obj._codes = array('b', self._codes)
+        obj._backend_ids = list(self._backend_ids)
+        obj._modified = array('d', self._modified)
+        return obj
+
+    def _getCode(self, status):
+        """Return the code used to store status, registering the status if it hasn't been seen before
+        Args:
+            status (str): status of a subjob
+        """
+        if status is None:
+            return 0
+        try:
+            return self._names.index(status) + 1
+        except ValueError:
+            if len(self._names) >= 127:
+                raise ValueError("Too many different subjob statuses to index: %s" % status)
+            self._names.append(status)
+            return len(self._names)
+
+    def resize(self, length):
+        """Grow or shrink the index to contain exactly length subjobs, new entries have an unknown status
+        Args:
+            length (int): the number of subjobs
+        """
+        current = len(self._codes)
+        if length > current:
+            self._codes.extend(bytes(length - current))
+            self._backend_ids.extend([None] * (length - current))
+            self._modified.extend([0.] * (length - current))
+        elif length < current:
+            del self._codes[length:]
+            del self._backend_ids[length:]
+            del self._modified[length:]
+
+    def set(self, index, status, backend_id=None, modified=None):
+        """Store the status (and optionally the backend id and modification time) of a subjob
+        Args:
+            index (int): the id of the subjob
+            status (str): the status of the subjob
+            backend_id (str): the id of the subjob according to its backend
+            modified (float): the time the subjob was last written to disk
+        """
+        if index >= len(self._codes):
+            self.resize(index + 1)
+        self._codes[index] = self._getCode(status)
+        if backend_id is not None:
+            self._backend_ids[index] = backend_id
+        if modified is not None:
+            self._modified[index] = modified
+
+    def getStatus(self, index):
+        """Return the status of a single subjob
+        Args:
+            index (int): the id of the subjob
+        """
+        code = self._codes[index]
+        return self._names[code - 1] if code else None
+
+    def getBackendId(self, index):
+        """Return the backend id of a single subjob
+        Args:
+            index (int): the id of the subjob
+        """
+        return self._backend_ids[index]
+
+    def getModified(self, index):
+        """Return the last time a single subjob was written to disk
+        Args:
+            index (int): the id of the subjob
+        """
+        return self._modified[index]
+
+    def statuses(self):
+        """Return the list of the statuses of all subjobs"""
+        names = [None] + self._names
+        return [names[code] for code in self._codes]
+
+    def counts(self):
+        """Return a dict of the number of subjobs in each status present"""
+        buf = self._codes.tobytes()
+        counts = {}
+        for code, name in enumerate(self._names, 1):
+            this_count = buf.count(bytes((code,)))
+            if this_count:
+                counts[name] = this_count
+        return counts
+
+    def count(self, *statuses):
+        """Return the number of subjobs in any of the given statuses
+        Args:
+            statuses (str): statuses of interest
+        """
+        buf = self._codes.tobytes()
+        return sum(buf.count(bytes((self._names.index(s) + 1,))) for s in set(statuses) if s in self._names)
+
+    def ids(self, *statuses):
+        """Return the ordered list of ids of the subjobs in any of the given statuses
+        Args:
+            statuses (str): statuses of interest
+        """
+        codes = [self._names.index(s) + 1 for s in set(statuses) if s in self._names]
+        if not codes:
+            return []
+        pattern = re.compile(b'[' + b''.join(re.escape(bytes((c,))) for c in codes) + b']')
+        return [match.start() for match in pattern.finditer(self._codes.tobytes())]
+
+    def to_file(self, fobj):
+        """Write the index to a file object opened for binary writing
+        Args:
+            fobj (file): the file to write to
+        """
+        from GangaCore.Core.GangaRepository.PickleStreamer import to_file
+        to_file({'version': _status_index_version,
+                 'names': self._names,
+                 'codes': self._codes.tobytes(),
+                 'backend_ids': self._backend_ids,
+                 'modified': self._modified.tobytes()}, fobj)
+
+    @staticmethod
+    def from_file(fobj):
+        """Read an index from a file object opened for binary reading, returns None if the content can't be used
+        Args:
+            fobj (file): the file to read from
+        """
+        from GangaCore.Core.GangaRepository.PickleStreamer import from_file
+        data = from_file(fobj)[0]
+        if not isinstance(data, dict) or data.get('version') != _status_index_version:
+            logger.debug("Ignoring subjob status index with unknown format")
+            return None
+        obj = SubJobStatusIndex(data['names'])
+        obj._codes.frombytes(data['codes'])
+        obj._backend_ids = list(data['backend_ids'])
+        obj._modified.frombytes(data['modified'])
+        if not len(obj._codes) == len(obj._backend_ids) == len(obj._modified):
+            logger.debug("Ignoring inconsistent subjob status index")
+            return None
+        return obj
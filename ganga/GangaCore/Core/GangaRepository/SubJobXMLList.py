@@ -5,14 +5,18 @@ from GangaCore.Core.GangaRepository.GangaRepository import RepositoryError
 from GangaCore.Core.exceptions import GangaException
 from GangaCore.GPIDev.Base.Proxy import stripProxy
 from GangaCore.Core.GangaRepository.VStreamer import XMLFileError
+from GangaCore.Core.GangaRepository.SubJobStatusIndex import SubJobStatusIndex
 import errno
 import copy
 import threading
 import shutil
-from os import listdir, path, stat
+from os import listdir, path, rename, stat, unlink
 
 logger = getLogger()
 
+# The journal of index updates is folded back into subjobs.idx once it holds more records than this or half the subjobs
+_journal_min_records = 100
+
 ##FIXME There has to be a better way of doing this?
 class SJXLIterator(object):
     """Class for iterating over SJXMLList, potentially very unstable, dangerous and only supports looping forwards ever"""
@@ -70,6 +74,15 @@ class SubJobXMLList(GangaObject):
         self._definedParent = None
 
         self._subjob_master_index_name = "subjobs.idx"
+        self._subjob_status_index_name = "subjobs.status"
+        self._subjob_journal_name = "subjobs.idx.journal"
+
+        # Subjobs written since the index was last written, and the number of records in the journal (-1 forces a rewrite)
+        self._dirtyIndex = set()
+        self._journalRecords = 0
+
+        # Columnar copy of the subjob statuses, (re)built lazily by _getStatusIndex
+        self._statusIndex = None
 
         if jobDirectory == '' and registry is None:
             return
@@ -78,6 +91,8 @@ class SubJobXMLList(GangaObject):
         if parent:
             self._setParent(parent)
         self.load_subJobIndex()
+        self.load_subJobJournal()
+        self.load_statusIndex()
 
         self._cached_filenames = {}
         self._stored_len = []
@@ -101,6 +116,9 @@ class SubJobXMLList(GangaObject):
         obj._load_backup = copy.deepcopy(self._load_backup, memo)
         obj._cached_filenames = copy.deepcopy(self._cached_filenames, memo)
         obj._stored_len = copy.deepcopy(self._stored_len, memo)
+        obj._statusIndex = copy.deepcopy(self._statusIndex, memo)
+        obj._dirtyIndex = set(self._dirtyIndex)
+        obj._journalRecords = self._journalRecords
 
         ## Manually define unsafe/uncopyable objects
         obj._definedParent = None
@@ -114,6 +132,13 @@ class SubJobXMLList(GangaObject):
         """
         self._cachedJobs = obj
 
+    def _setIndexDirty(self, indices):
+        """Mark the index records of subjobs which have been written to disk by someone else as needing to be re-written
+        Args:
+            indices (list): ids of the subjobs which were written
+        """
+        self._dirtyIndex.update(indices)
+
     def isLoaded(self, subjob_id):
         """Has the subjob been loaded? True/False
         Args:
@@ -175,6 +200,80 @@ class SubJobXMLList(GangaObject):
             self._setDirty()
         return
 
+    def load_subJobJournal(self):
+        """Replay the journal of index records written since subjobs.idx was last compacted on top of _subjobIndexData"""
+        journal_file = path.join(self._jobDirectory, self._subjob_journal_name)
+        if not path.isfile(journal_file):
+            return
+        import pickle
+        records = 0
+        try:
+            with open(journal_file, "rb") as journal_file_obj:
+                while True:
+                    try:
+                        new_caches = pickle.load(journal_file_obj)
+                    except EOFError:
+                        break
+                    self._subjobIndexData.update(new_caches)
+                    records += len(new_caches)
+        except Exception as err:
+            # Most likely a record which was only partially written, everything before it is still good
+            logger.debug("Subjob index journal read error: %s" % err)
+            records = -1
+        self._journalRecords = records
+
+    def load_statusIndex(self):
+        """Load the columnar status index of all subjobs if it was written after subjobs.idx and its journal, otherwise leave it to be rebuilt"""
+        status_file = path.join(self._jobDirectory, self._subjob_status_index_name)
+        index_file = path.join(self._jobDirectory, self._subjob_master_index_name)
+        journal_file = path.join(self._jobDirectory, self._subjob_journal_name)
+        self._statusIndex = None
+        try:
+            status_time = stat(status_file).st_mtime
+            if status_time < stat(index_file).st_mtime or (path.isfile(journal_file) and status_time < stat(journal_file).st_mtime):
+                logger.debug("Subjob status index older than %s, rebuilding" % index_file)
+                return
+            with open(status_file, "rb") as status_file_obj:
+                status_index = SubJobStatusIndex.from_file(status_file_obj)
+        except OSError:
+            return
+        except Exception as err:
+            logger.debug("Subjob status index open, error: %s" % err)
+            return
+        if status_index is not None and len(status_index) == len(self._subjobIndexData):
+            self._statusIndex = status_index
+
+    def _getStatusIndex(self):
+        """Return the columnar status index for all subjobs, rebuilding it if the number of subjobs changed.
+        Subjobs held in memory which have been modified since they were last flushed are refreshed"""
+        sj_len = len(self)
+        status_index = self._statusIndex
+        if status_index is None or len(status_index) != sj_len:
+            status_index = SubJobStatusIndex()
+            status_index.resize(sj_len)
+            for sj_id in range(sj_len):
+                if not self.isLoaded(sj_id) and sj_id in self._subjobIndexData:
+                    index_data = self._subjobIndexData[sj_id]
+                    status_index.set(sj_id, index_data['status'], index_data.get('backend:id'), index_data.get('modified'))
+                else:
+                    this_sj = self.__getitem__(sj_id)
+                    status_index.set(sj_id, this_sj.status, getattr(this_sj.backend, 'id', None))
+            self._statusIndex = status_index
+        else:
+            for sj_id, this_sj in list(self._cachedJobs.items()):
+                if this_sj._dirty and sj_id < sj_len:
+                    status_index.set(sj_id, this_sj.status, getattr(this_sj.backend, 'id', None))
+        return status_index
+
+    def updateSJStatus(self, index, status):
+        """Record the new status of a subjob in the status index without waiting for the next flush
+        Args:
+            index (int): index of the subjob whose status changed
+            status (str): the new status
+        """
+        if self._statusIndex is not None and 0 <= index < len(self._statusIndex):
+            self._statusIndex.set(index, status)
+
     def write_subJobIndex(self, ignore_disk=False):
         """interface for writing the index which captures errors and alerts the user vs throwing uncaught exception
         Args:
@@ -188,41 +287,92 @@ class SubJobXMLList(GangaObject):
             logger.debug("Error: %s" % err)
 
     def __really_writeIndex(self, ignore_disk=False):
-        """Do the actual work of writing the index for all subjobs
+        """Do the actual work of writing the index for all subjobs.
+        Only the records of subjobs which have been written since the last call are re-generated and appended to the
+        journal, the full index is only re-written when the journal has grown too large or is no longer consistent
         Args:
             ignore_disk (bool): Optional flag to force the class to ignore all on-disk data when flushing
         """
 
-        all_caches = {}
+        dirty_ids = self._dirtyIndex
+        self._dirtyIndex = set()
+        compact = self._journalRecords < 0
+
         if ignore_disk:
-            range_limit = list(self._cachedJobs.keys())
+            # The subjobs in memory are all the subjobs there are
+            valid_ids = set(self._cachedJobs)
+            dirty_ids.update(sj_id for sj_id in valid_ids if sj_id not in self._subjobIndexData)
         else:
-            range_limit = list(range(len(self)))
-
-        for sj_id in range_limit:
-            if sj_id in self._cachedJobs:
-                this_cache = self._registry.getIndexCache(self.__getitem__(sj_id))
-                all_caches[sj_id] = this_cache
-                disk_location = self.__get_dataFile(sj_id)
-                all_caches[sj_id]['modified'] = stat(disk_location).st_ctime
-            else:
-                if sj_id in self._subjobIndexData:
-                    all_caches[sj_id] = self._subjobIndexData[sj_id]
-                else:
-                    this_cache = self._registry.getIndexCache(self.__getitem__(sj_id))
-                    all_caches[sj_id] = this_cache
-                    disk_location = self.__get_dataFile(sj_id)
-                    all_caches[sj_id]['modified'] = stat(disk_location).st_ctime
+            valid_ids = None
+            sj_len = len(self)
+            if len(self._subjobIndexData) != sj_len or any(sj_id not in self._subjobIndexData for sj_id in dirty_ids):
+                valid_ids = set(range(sj_len))
+                dirty_ids.update(sj_id for sj_id in valid_ids if sj_id not in self._subjobIndexData)
+
+        if valid_ids is not None:
+            for sj_id in [sj_id for sj_id in self._subjobIndexData if sj_id not in valid_ids]:
+                del self._subjobIndexData[sj_id]
+                compact = True
+            dirty_ids.intersection_update(valid_ids)
+
+        new_caches = {}
+        for sj_id in sorted(dirty_ids):
+            this_cache = self._registry.getIndexCache(self.__getitem__(sj_id))
+            disk_location = self.__get_dataFile(sj_id)
+            this_cache['modified'] = stat(disk_location).st_ctime
+            new_caches[sj_id] = this_cache
+        self._subjobIndexData.update(new_caches)
+
+        index_file = path.join(self._jobDirectory, self._subjob_master_index_name)
+        journal_file = path.join(self._jobDirectory, self._subjob_journal_name)
+
+        if not compact and new_caches:
+            compact = not path.isfile(index_file) or \
+                self._journalRecords + len(new_caches) > max(_journal_min_records, len(self._subjobIndexData) // 2)
+
+        if not new_caches and not compact:
+            return
 
+        from GangaCore.Core.GangaRepository.PickleStreamer import to_file
         try:
-            from GangaCore.Core.GangaRepository.PickleStreamer import to_file
-            index_file = path.join(self._jobDirectory, self._subjob_master_index_name)
-            index_file_obj = open(index_file, "wb")
-            to_file(all_caches, index_file_obj)
-            index_file_obj.close()
+            # Always journal first so that an interrupted compaction replays to the same content
+            if new_caches and (path.isfile(index_file) or path.isfile(journal_file)):
+                with open(journal_file, "ab") as journal_file_obj:
+                    to_file(new_caches, journal_file_obj)
+                self._journalRecords += len(new_caches)
+            if compact:
+                temp_file = index_file + '.new'
+                with open(temp_file, "wb") as index_file_obj:
+                    to_file(self._subjobIndexData, index_file_obj)
+                rename(temp_file, index_file)
+                if path.isfile(journal_file):
+                    unlink(journal_file)
+                self._journalRecords = 0
         ## Once I work out what the other exceptions here are I'll add them
         except (IOError,) as err:
             logger.debug("cache write error: %s" % err)
+            self._journalRecords = -1
+            return
+
+        if not compact:
+            # Only some of the subjobs were written, keep the rest of the status index as it is
+            if self._statusIndex is not None:
+                for sj_id, this_cache in new_caches.items():
+                    self._statusIndex.set(sj_id, this_cache['status'], this_cache.get('backend:id'), this_cache.get('modified'))
+            return
+
+        status_index = SubJobStatusIndex()
+        status_index.resize(len(self._subjobIndexData))
+        for sj_id, this_cache in self._subjobIndexData.items():
+            status_index.set(sj_id, this_cache['status'], this_cache.get('backend:id'), this_cache.get('modified'))
+        self._statusIndex = status_index
+
+        try:
+            status_file = path.join(self._jobDirectory, self._subjob_status_index_name)
+            with open(status_file, "wb") as status_file_obj:
+                status_index.to_file(status_file_obj)
+        except (IOError,) as err:
+            logger.debug("status index write error: %s" % err)
 
     def __iter__(self):
         """Return iterator for this class"""
@@ -485,17 +635,21 @@ class SubJobXMLList(GangaObject):
         """
         Returns the cached statuses of the subjobs whilst respecting the Lazy loading
         """
-        sj_statuses = []
-        if len(self._subjobIndexData) == len(self):
-            for i in range(len(self)):
-                if self.isLoaded(i):
-                    sj_statuses.append(self.__getitem__(i).status)
-                else:
-                    sj_statuses.append(self._subjobIndexData[i]['status'])
-        else:
-            for i in range(len(self)):
-                sj_statuses.append(self.__getitem__(i).status)
-        return sj_statuses
+        return self._getStatusIndex().statuses()
+
+    def getSJStatusCounts(self):
+        """
+        Returns a dict of the number of subjobs in each status whilst respecting the Lazy loading
+        """
+        return self._getStatusIndex().counts()
+
+    def getSJIdsWithStatus(self, *statuses):
+        """
+        Returns the ids of the subjobs in any of the given statuses whilst respecting the Lazy loading
+        Args:
+            statuses (str): The statuses we're interested in
+        """
+        return self._getStatusIndex().ids(*statuses)
 
     def flush(self, ignore_disk=False):
         """Flush all subjobs to disk using XML methods
@@ -507,23 +661,24 @@ class SubJobXMLList(GangaObject):
         from GangaCore.Core.GangaRepository.VStreamer import to_file
 
         if ignore_disk:
-            range_limit = list(self._cachedJobs.keys())
+            range_limit = sorted(self._cachedJobs.keys())
         else:
-            range_limit = list(range(len(self)))
+            sj_len = len(self)
+            range_limit = sorted(index for index in self._cachedJobs if index < sj_len)
 
         for index in range_limit:
-            if index in self._cachedJobs:
-                ## If it ain't dirty skip it
-                if not self._cachedJobs[index]._dirty:
-                    continue
+            ## If it ain't dirty skip it
+            if not self._cachedJobs[index]._dirty:
+                continue
 
-                subjob_data = self.__get_dataFile(str(index))
-                subjob_obj = self._cachedJobs[index]
+            subjob_data = self.__get_dataFile(str(index))
+            subjob_obj = self._cachedJobs[index]
 
-                if subjob_obj is subjob_obj._getRoot():
-                    raise GangaException(self, "Subjob parent not set correctly in flush.")
+            if subjob_obj is subjob_obj._getRoot():
+                raise GangaException(self, "Subjob parent not set correctly in flush.")
 
-                safe_save( subjob_data, subjob_obj, to_file )
+            safe_save( subjob_data, subjob_obj, to_file )
+            self._dirtyIndex.add(index)
 
         self.write_subJobIndex(ignore_disk)
 
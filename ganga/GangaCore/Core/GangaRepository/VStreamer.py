@@ -10,13 +10,14 @@ from GangaCore.Utility.Config import config_scope
 
 from GangaCore.Utility.Plugin import PluginManagerError, allPlugins
 
-from GangaCore.GPIDev.Base.Objects import GangaObject, ObjectMetaclass
+from GangaCore.GPIDev.Base.Objects import GangaObject, Node, ObjectMetaclass
 from GangaCore.GPIDev.Schema import Schema, Version
 from GangaCore.GPIDev.Lib.GangaList.GangaList import makeGangaList
 
 from .GangaRepository import SchemaVersionError
 
 import xml.sax.saxutils
+import ast
 import copy
 from io import StringIO
 
@@ -24,6 +25,12 @@ logger = getLogger()
 
 _cached_eval_strings = {}
 
+# Classes found by the FastLoader keyed by (category, name, version) from the XML
+_cached_class_factories = {}
+
+# Values of these types are never modified in place so can be shared between loaded objects
+_immutable_value_types = (str, int, float, bool, type(None), bytes, complex)
+
 ##########################################################################
 # Ganga Project. http://cern.ch/ganga
 #
@@ -56,24 +63,23 @@ def _raw_to_file(j, fobj=None, ignore_subs=[]):
     vstreamer.end_root()
     print(sio.getvalue(), file=fobj)
 
+def _raw_fast_to_file(j, fobj=None, ignore_subs=[]):
+    if fobj is None:
+        import sys
+        fobj = sys.stdout
+    FastXMLWriter(fobj, selection=ignore_subs).write_root(j)
+
 def to_file(j, fobj=None, ignore_subs=[]):
     #used to debug write problems - rcurrie
     #_raw_to_file(j, fobj, ignore_subs)
     #return
     _ignore_subs = [ignore_subs] if not isinstance(ignore_subs, list) else ignore_subs
     try:
-        _raw_to_file(j, fobj, _ignore_subs)
+        _raw_fast_to_file(j, fobj, _ignore_subs)
     except Exception as err:
         logger.error("XML to-file error for file:\n%s" % (err))
         raise XMLFileError(err, "to-file error")
 
-# Faster, but experimental version of to_file without accept()
-# def to_file(j,f=None,ignore_subs=''):
-#    sl = ["<root>"]
-#    sl.extend(fastXML(j,'   ',ignore_subs=ignore_subs))
-#    sl.append("</root>\n")
-#    f.write("".join(sl))
-
 # load object (job) from file f
 # if len(errors) > 0 the object was not loaded correctly.
 # Typical exceptions are:
@@ -87,7 +93,11 @@ def _raw_from_file(f):
     # logger.debug('----------------------------')
     ###logger.debug('Parsing file: %s',f.name)
     xml_content = f.read()
-    obj, errors = Loader().parse(xml_content)
+    from GangaCore.Utility.Config import getConfig
+    if getConfig('Configuration')['fastXMLLoader']:
+        obj, errors = FastLoader().parse(xml_content)
+    else:
+        obj, errors = Loader().parse(xml_content)
     return obj, errors
 
 def from_file(f):
@@ -110,40 +120,174 @@ def escape(s):
 def unescape(s):
     return xml.sax.saxutils.unescape(s)
 
-# An experimental, fast way to print a tree of Ganga Objects to file
-# Unused at the moment
-
-
-def fastXML(obj, indent='', ignore_subs=''):
-    if hasattr(obj, "__iter__") and not hasattr(obj, "iteritems"):
-        sl = ["\n", indent, "<sequence>", "\n"]
-        for so in obj:
-            sl.append(indent)
-            sl.extend(fastXML(so, indent + ' ', ignore_subs))
-        sl.append(indent)
-        sl.append("</sequence>")
-        return sl
-    elif hasattr(obj, '_data'):
-        v = obj._schema.version
-        sl = ['\n', indent, '<class name="%s" version="%i.%i" category="%s">\n' % (getName(obj), v.major, v.minor, obj._category)]
-        for attr_name in obj._schema.allItemNames():
-            k = attr_name
-            o = getattr(obj, k)
-            if k != ignore_subs:
-                try:
-                    if not obj._schema[k]._meta["transient"]:
-                        sl.append(indent)
-                        sl.append('<attribute name="%s">' % k)
-                        sl.extend(fastXML(o, indent + '  ', ignore_subs))
-                        sl.append('</attribute>\n')
-                except KeyError as err:
-                    logger.debug("KeyError: %s" % err)
-                    pass
-        sl.append(indent)
-        sl.append('</class>')
-        return sl
-    else:
-        return ["<value>", escape(repr(obj)), "</value>"]
+# Attributes written for each class in the order used by GangaObject.accept, keyed by class
+_cached_write_plans = {}
+
+
+def _getWritePlan(cls):
+    """
+    Return the list of (name, component, sequence, transient, getter) for the attributes of cls which are visited when
+    it is written with the VStreamer. Component attributes are written as by VStreamer.componentAttribute and the
+    others as by VStreamer.simpleAttribute
+    Args:
+        cls (class): a GangaObject class
+    """
+    schema = cls._schema
+    try:
+        plan_schema, plan = _cached_write_plans[cls]
+        if plan_schema is schema:
+            return plan
+    except KeyError:
+        pass
+    plan = []
+    for name, item in schema.simpleItems():
+        if cls.accept is GangaList.accept and name == '_list':
+            # GangaList writes its list like a component sequence to support nested lists
+            plan.append((name, True, 1, item['transient'], item['getter']))
+        elif item['visitable']:
+            plan.append((name, False, item['sequence'], item['transient'], item['getter']))
+    for name, item in schema.sharedItems():
+        if item['visitable']:
+            plan.append((name, False, item['sequence'], item['transient'], item['getter']))
+    for name, item in schema.componentItems():
+        if item['visitable']:
+            plan.append((name, True, item['sequence'], item['transient'], item['getter']))
+    _cached_write_plans[cls] = (schema, plan)
+    return plan
+
+
+class FastXMLWriter(object):
+
+    """
+    Write an object tree as XML producing exactly the same text as the VStreamer visitor.
+    The tree is walked directly using a cached plan of the attributes of each class, each object is locked once rather
+    than for every attribute and the text is written to the file object in chunks as it is produced
+    """
+
+    # Number of pieces of text collected before they're written to the file object
+    chunk_size = 4096
+
+    def __init__(self, fobj, selection=[]):
+        """
+        Args:
+            fobj (file): file-like output stream to write to
+            selection (list): names of the attributes of the root object which should not be written e.g. 'subjobs'
+        """
+        self.fobj = fobj
+        self.selection = selection
+        self.out = []
+
+    def _emit(self):
+        """ Write the text collected so far to the file object"""
+        self.fobj.write(''.join(self.out))
+        del self.out[:]
+
+    def _visit(self, node, level):
+        """ Fall back to the node's own accept method with a VStreamer at the given level"""
+        sio = StringIO()
+        vstreamer = VStreamer(out=sio, selection=self.selection)
+        vstreamer.level = level
+        node.accept(vstreamer)
+        self.out.append(sio.getvalue())
+
+    def write_root(self, obj):
+        """ Write the complete XML for obj, the same as VStreamer.begin_root, obj.accept and VStreamer.end_root
+        Args:
+            obj (GangaObject): the root object to write
+        """
+        self.out.append('<root>\n')
+        self.write_node(obj, 1)
+        self.out.append('</root>\n\n')
+        self._emit()
+
+    def write_node(self, node, level):
+        """ Write a GangaObject as a <class> element like GangaObject.accept does with a VStreamer
+        Args:
+            node (GangaObject): the object to write
+            level (int): the level of the VStreamer after nodeBegin(node)
+        """
+        cls = type(node)
+        if cls.accept not in (GangaObject.accept, GangaList.accept) or getattr(cls, '_schema', None) is None:
+            self._visit(node, level - 1)
+            return
+
+        out = self.out
+        schema = cls._schema
+        pad = ' ' * ((level - 1) * 3)
+        out.append('%s <class name="%s" version="%d.%d" category="%s">\n' % (pad, schema.name, schema.version.major, schema.version.minor, schema.category))
+        with node._getRoot()._lock:
+            data = node._data_dict
+            for name, component, sequence, transient, getter in _getWritePlan(cls):
+                if transient or (level <= 1 and name in self.selection):
+                    continue
+                if getter is None and name in data:
+                    value = data[name]
+                else:
+                    value = getattr(node, name)
+                if component:
+                    self._componentAttribute(name, value, sequence, level)
+                else:
+                    self._simpleAttribute(name, value, sequence, level)
+        out.append('%s </class>\n' % pad)
+        if len(out) > self.chunk_size:
+            self._emit()
+
+    def _simpleAttribute(self, name, value, sequence, level):
+        """ Write an attribute like VStreamer.simpleAttribute"""
+        out = self.out
+        pad = ' ' * (level * 3)
+        inner_pad = ' ' * ((level + 1) * 3)
+        out.append('%s <attribute name="%s"> ' % (pad, name))
+        if sequence:
+            out.append('\n%s <sequence>\n' % inner_pad)
+            for v in value:
+                self._optional(v, level + 2)
+            out.append('%s </sequence>\n%s </attribute>\n' % (inner_pad, pad))
+        else:
+            if isinstance(value, GangaObject):
+                out.append('\n')
+                self._optional(value, level + 2)
+            else:
+                out.append('\n %s <value>%s</value>\n' % (inner_pad, escape(repr(value))))
+            out.append('%s </attribute>\n' % pad)
+
+    def _componentAttribute(self, name, value, sequence, level):
+        """ Write an attribute like VStreamer.componentAttribute"""
+        out = self.out
+        pad = ' ' * (level * 3)
+        out.append('%s <attribute name="%s">\n' % (pad, name))
+        if sequence:
+            inner_pad = ' ' * ((level + 1) * 3)
+            out.append('%s <sequence>\n' % inner_pad)
+            for v in value:
+                self._optional(v, level + 2)
+            out.append('%s </sequence>\n' % inner_pad)
+        else:
+            self._optional(value, level + 1)
+        out.append('%s </attribute>\n' % pad)
+
+    def _optional(self, s, level):
+        """ Write a value like VStreamer.acceptOptional
+        Args:
+            s (unknown): the value to write
+            level (int): the level of the VStreamer when acceptOptional is called
+        """
+        pad = ' ' * (level * 3)
+        if s is None:
+            self.out.append('%s <value>None</value>\n' % pad)
+        elif type(s) is str or isType(s, str):
+            self.out.append('%s <value>%s</value>\n' % (pad, escape(repr(s))))
+        elif isinstance(s, GangaObject):
+            self.write_node(s, level + 2)
+        elif hasattr(s, 'accept'):
+            self._visit(s, level + 1)
+        elif isType(s, (list, tuple, GangaList)):
+            self.out.append('%s <sequence>\n' % pad)
+            for sub_s in s:
+                self._optional(sub_s, level + 1)
+            self.out.append('%s </sequence>\n' % pad)
+        else:
+            self.out.append('\n %s <value>%s</value>\n' % (pad, escape(repr(s))))
 
 ##########################################################################
 # A visitor to print the object tree into XML.
@@ -451,3 +595,192 @@ class Loader(object):
                 raise AssertionError("incomplete XML file")
         return obj, self.errors
 
+
+
+def _findClassFactory(category, name, version):
+    """
+    Return the class to construct for a <class> element, the result of the plugin lookup and the schema version check is
+    cached so that this is a single dict lookup for every class after the first. Errors are not cached and are raised as
+    the same PluginManagerError or SchemaVersionError raised by the Loader
+    Args:
+        category (str): category of the plugin
+        name (str): name of the plugin
+        version (str): schema version of the plugin as 'major.minor'
+    """
+    key = (category, name, version)
+    try:
+        return _cached_class_factories[key]
+    except KeyError:
+        pass
+    cls = allPlugins.find(category, name)
+    if not cls._schema.version.isCompatible(Version(*[int(v) for v in version.split('.')])):
+        currversion = '%s.%s' % (cls._schema.version.major, cls._schema.version.minor)
+        raise SchemaVersionError('Incompatible schema of %s, repository is %s currently in use is %s' % (name, version, currversion))
+    _cached_class_factories[key] = cls
+    return cls
+
+
+def _evalValue(s):
+    """
+    Return the python object stored in the text of a <value> element.
+    Literals are decoded with ast.literal_eval and anything else is evaluated in the config_scope as the Loader does
+    Args:
+        s (str): the content of the <value> element
+    """
+    if '&' in s:
+        s = unescape(s)
+    if 'L' in s:
+        s = re.sub(r'(\d)L(\})', r'\1\2', s)
+    try:
+        eval_str = _cached_eval_strings[s]
+    except KeyError:
+        try:
+            eval_str = ast.literal_eval(s)
+        except Exception:
+            eval_str = eval(s, config_scope)
+        _cached_eval_strings[s] = eval_str
+    if type(eval_str) in _immutable_value_types:
+        return eval_str
+    return copy.deepcopy(eval_str)
+
+
+def _adoptValue(value, parent):
+    """
+    Set the parent of a value which has just been loaded.
+    Nothing else can hold a reference to an object while it is being loaded so the parent lock taken by Node._setParent isn't needed
+    Args:
+        value (Node): the loaded attribute value
+        parent (GangaObject): the object which owns the attribute
+    """
+    if type(value) is GangaList:
+        value._parent = parent
+        for elem in value._list:
+            if isinstance(elem, GangaObject):
+                _adoptValue(elem, parent)
+    elif type(value)._setParent is Node._setParent:
+        value._parent = parent
+    else:
+        value._setParent(parent)
+
+
+class FastLoader(object):
+
+    """ Job object tree loader producing the same objects as Loader with less work for each XML element.
+    Classes are looked up once per session, literal values are decoded without eval and the attributes of each object
+    are assigned in bulk once its </class> element is reached.
+    This is selected with [Configuration]fastXMLLoader
+    """
+
+    def __init__(self):
+        self.errors = []  # list of exception objects in case of data errors
+
+    def parse(self, s):
+        """ Parse and load object from string s using internal XML parser (expat).
+        """
+        import xml.parsers.expat
+
+        errors = self.errors
+        # object tree under construction, this holds objects, attribute names and values
+        stack = []
+        # attributes waiting to be assigned to each of the objects being constructed on the stack
+        pending = []
+        # positions in the stack where each open sequence begins
+        sequence_start = []
+        # buffer for <value> elements, [count of ignored nested elements, root seen, value buffer]
+        state = [0, False, None]
+
+        def start_element(name, attrs):
+            # if higher level element had error, ignore the corresponding part of the XML tree as we go down
+            if state[0]:
+                state[0] += 1
+                return
+
+            if name == 'value':
+                state[2] = []
+            elif name == 'attribute':
+                stack.append(attrs['name'])
+            elif name == 'class':
+                try:
+                    cls = _findClassFactory(attrs['category'], attrs['name'], attrs['version'])
+                except (PluginManagerError, SchemaVersionError) as err:
+                    errors.append(err)
+                    stack.append(EmptyGangaObject())
+                    # ignore all elements until the corresponding </class> is reached
+                    state[0] = 1
+                else:
+                    stack.append(cls.getNew())
+                    pending.append({})
+            elif name == 'sequence':
+                sequence_start.append(len(stack))
+            elif name == 'root':
+                assert not state[1], "duplicated <root> element"
+                state[1] = True
+                return
+
+            assert state[1], "missing <root> element"
+
+        def end_element(name):
+            # if higher level element had error, ignore the corresponding part of the XML tree as we go up
+            if state[0]:
+                state[0] -= 1
+                return
+
+            if name == 'value':
+                try:
+                    stack.append(_evalValue(''.join(state[2])))
+                except:
+                    raise GangaException("ERROR in loading XML, failed to correctly parse attribute value: \'%s\'" % ''.join(state[2]))
+                state[2] = None
+            elif name == 'attribute':
+                value = stack.pop()
+                pending[-1][stack.pop()] = value
+            elif name == 'class':
+                obj = stack[-1]
+                attributes = pending.pop()
+                try:
+                    if type(obj).setSchemaAttribute is not GangaObject.setSchemaAttribute:
+                        # Classes which intercept the loading of their attributes get them one at a time
+                        for aname, value in attributes.items():
+                            obj.setSchemaAttribute(aname, value)
+                    else:
+                        obj._data_dict.update(attributes)
+                        for value in attributes.values():
+                            if isinstance(value, Node) and value._parent is not obj:
+                                _adoptValue(value, obj)
+                except:
+                    raise GangaException("ERROR in loading XML, failed to set attributes %s for class %s" % (list(attributes.keys()), getName(obj)))
+            elif name == 'sequence':
+                pos = sequence_start.pop()
+                # The content of the list is known so skip populating it from the schema defaults
+                alist = GangaList.getNew()
+                alist._data_dict = {'_list': stack[pos:], '_is_preparable': False}
+                alist._is_a_ref = False
+                del stack[pos:]
+                stack.append(alist)
+
+        def char_data(data):
+            # char_data may be called many times in one CDATA section so collect the pieces of the <value>
+            if state[2] is not None:
+                state[2].append(data)
+
+        # start parsing using callbacks
+        p = xml.parsers.expat.ParserCreate()
+        p.buffer_text = True
+
+        p.StartElementHandler = start_element
+        p.EndElementHandler = end_element
+        p.CharacterDataHandler = char_data
+
+        p.Parse(s)
+
+        if len(stack) != 1:
+            errors.append(AssertionError('multiple objects inside <root> element'))
+
+        obj = stack[-1]
+
+        # Raise Exception if object is incomplete, attributes which have been loaded don't need to go through the descriptors
+        loaded = obj._data_dict
+        for attr in obj._schema.allItemNames():
+            if attr not in loaded and not hasattr(obj, attr):
+                raise AssertionError("incomplete XML file")
+        return obj, errors
@@ -1,5 +1,6 @@
 
 import collections
+from concurrent.futures import wait, ALL_COMPLETED, FIRST_COMPLETED
 from GangaCore.Core.GangaThread.WorkerThreads.WorkerThreadPool import WorkerThreadPool
 from GangaCore.Utility.Config import getConfig
 from GangaCore.Utility.logging import getLogger
@@ -204,6 +205,11 @@ class ThreadPoolQueueMonitor(object):
                    priority    = The thread queuing system is a priority
                                  queue with lower number = higher priority.
                                  This then should be an int normally 0-9
+
+        returns:
+        -------
+                   A future for the return value of worker_code which can be
+                   given to queues.waitForAll or queues.waitForAny
         """
         if not isinstance(worker_code, collections.abc.Callable):
             logger.error('Only python callable objects can be added to the queue using queues.add()')
@@ -211,10 +217,10 @@ class ThreadPoolQueueMonitor(object):
             logger.error('e.g. Incorrect:     queues.add(myfunc()) *NOTE the brackets*')
             logger.error('e.g. Correct  :     queues.add(myfunc)')
             return
-        self._user_threadpool.add_function(worker_code,
-                                           args=args,
-                                           kwargs=kwargs,
-                                           priority=priority)
+        return self._user_threadpool.add_function(worker_code,
+                                                  args=args,
+                                                  kwargs=kwargs,
+                                                  priority=priority)
 
     def _addSystem(self, worker_code, args=(), kwargs={}, priority=5, name=None):
 
@@ -227,11 +233,11 @@ class ThreadPoolQueueMonitor(object):
                 logger.warning("Queue System is frozen not adding any more System processes!")
             return
 
-        self._monitoring_threadpool.add_function(worker_code,
-                                                 args=args,
-                                                 kwargs=kwargs,
-                                                 priority=priority,
-                                                 name=name)
+        return self._monitoring_threadpool.add_function(worker_code,
+                                                        args=args,
+                                                        kwargs=kwargs,
+                                                        priority=priority,
+                                                        name=name)
 
     def addProcess(self,
                    command,
@@ -254,7 +260,7 @@ class ThreadPoolQueueMonitor(object):
         Note:
         ----
 
-        There will be no return value from this method as it runs the code asynchronously.
+        This method returns a future rather than the output as it runs the code asynchronously.
         stdout will go through the callback_func so if you want it displayed then use a printing function
 
         In[2]: def printer(x): print x
@@ -312,20 +318,54 @@ class ThreadPoolQueueMonitor(object):
                 logger.warning("Queues system is frozen. Not adding any more processes!")
             return
 
-        self._user_threadpool.add_process(command,
-                                          timeout=timeout,
-                                          env=env,
-                                          cwd=cwd,
-                                          shell=shell,
-                                          eval_includes=eval_includes,
-                                          update_env=update_env,
-                                          priority=priority,
-                                          callback_func=callback_func,
-                                          callback_args=callback_args,
-                                          callback_kwargs=callback_kwargs,
-                                          fallback_func=fallback_func,
-                                          fallback_args=fallback_args,
-                                          fallback_kwargs=fallback_kwargs)
+        return self._user_threadpool.add_process(command,
+                                                 timeout=timeout,
+                                                 env=env,
+                                                 cwd=cwd,
+                                                 shell=shell,
+                                                 eval_includes=eval_includes,
+                                                 update_env=update_env,
+                                                 priority=priority,
+                                                 callback_func=callback_func,
+                                                 callback_args=callback_args,
+                                                 callback_kwargs=callback_kwargs,
+                                                 fallback_func=fallback_func,
+                                                 fallback_args=fallback_args,
+                                                 fallback_kwargs=fallback_kwargs)
+
+    def waitForAll(self, futures, timeout=None):
+        """
+        Wait until all of the given futures returned by queues.add or queues.addProcess have finished
+
+        args:
+        ----
+                   futures = The futures to wait on. Any None entries, returned
+                             when a task couldn't be added, are ignored
+                   timeout = The maximum number of seconds to wait, or None to
+                             wait for as long as it takes
+
+        returns:
+        -------
+                   A (done, not_done) tuple of the sets of futures
+        """
+        return wait([f for f in futures if f is not None], timeout=timeout, return_when=ALL_COMPLETED)
+
+    def waitForAny(self, futures, timeout=None):
+        """
+        Wait until at least one of the given futures returned by queues.add or queues.addProcess has finished
+
+        args:
+        ----
+                   futures = The futures to wait on. Any None entries, returned
+                             when a task couldn't be added, are ignored
+                   timeout = The maximum number of seconds to wait, or None to
+                             wait for as long as it takes
+
+        returns:
+        -------
+                   A (done, not_done) tuple of the sets of futures
+        """
+        return wait([f for f in futures if f is not None], timeout=timeout, return_when=FIRST_COMPLETED)
 
     def threadStatus(self):
         statuses = []
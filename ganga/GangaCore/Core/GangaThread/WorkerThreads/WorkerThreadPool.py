@@ -1,8 +1,10 @@
 #!/usr/bin/env python
+import sys
 import queue
 import traceback
 import threading
 import collections
+from concurrent.futures import Future
 from GangaCore.Core.exceptions import GangaException, GangaTypeError
 from GangaCore.Core.GangaThread import GangaThread
 from GangaCore.Utility.execute import execute
@@ -16,7 +18,7 @@ timeout = getConfig('Queues')['ShutDownTimeout']
 timeout = 0.1 if timeout==None else timeout
 
 logger = getLogger()
-QueueElement = namedtuple('QueueElement',  ['priority', 'command_input', 'callback_func', 'fallback_func', 'name'])
+QueueElement = namedtuple('QueueElement',  ['priority', 'command_input', 'callback_func', 'fallback_func', 'name', 'future'])
 CommandInput = namedtuple('CommandInput',  ['command', 'timeout', 'env', 'cwd', 'shell', 'python_setup', 'eval_includes', 'update_env'])
 class FunctionInput(namedtuple('FunctionInput', ['function', 'args', 'kwargs'])):
     def __gt__(self, other):
@@ -25,6 +27,18 @@ class FunctionInput(namedtuple('FunctionInput', ['function', 'args', 'kwargs']))
         pass
 
 
+class QueueFuture(Future):
+    """
+    Future for the result of an element added to the queue.
+
+    It is resolved once the callback_func (or fallback_func) has been run. Like
+    FunctionInput it takes no part in ordering the queue.
+    """
+    def __gt__(self, other):
+        return False
+    def __lt__(self, other):
+        return False
+
 
 class WorkerThreadPool(object):
 
@@ -112,8 +126,15 @@ class WorkerThreadPool(object):
             else:
                 logger.error("Unrecognised input command type: '%s'" % repr(item.command_input))
                 logger.error("                       expected: ('FunctionInput' or 'CommandInput')")
+                item.future.set_exception(GangaTypeError("Unrecognised input command type: '%s'" % repr(item.command_input)))
+                self.__queue.task_done()
+                thread.unregister()
+                continue
+
+            if not item.future.set_running_or_notify_cancel():
                 self.__queue.task_done()
                 thread.unregister()
+                thread.gangaName = oldname
                 continue
 
             try:
@@ -143,6 +164,11 @@ class WorkerThreadPool(object):
                         else:
                             logger.error("Unrecognised fallback_func type: '%s'" % repr(item.fallback_func))
                             logger.error("                       expected: 'FunctionInput'")
+                item.future.set_exception(e)
+            except BaseException as e:
+                # e.g. SystemExit or KeyboardInterrupt, resolve the future so that nothing waits on it forever
+                item.future.set_exception(e)
+                raise
             else:
                 if item.callback_func.function is not None:
                     if isinstance(item.callback_func, FunctionInput):
@@ -160,7 +186,11 @@ class WorkerThreadPool(object):
                     else:
                         logger.error("Unrecognised callback_func type: '%s'" % repr(item.callback_func))
                         logger.error("                       expected: 'FunctionInput'")
+                item.future.set_result(result)
             finally:
+                if not item.future.done():
+                    # the callback_func was interrupted by something other than an Exception
+                    item.future.set_exception(sys.exc_info()[1])
                 # unregister as a working thread bcoz free
                 thread._command = 'idle'
                 thread._timeout = 'N/A'
@@ -174,6 +204,11 @@ class WorkerThreadPool(object):
                      callback_func=None, callback_args=(), callback_kwargs={},
                      fallback_func=None, fallback_args=(), fallback_kwargs={},
                      name=None):
+        """
+        Add a python callable to the queue and return a QueueFuture for its result,
+        or None if nothing was added. The future is resolved once the callback_func
+        or fallback_func has been run so waiting on it also waits for those.
+        """
 
         if not isinstance(function, collections.abc.Callable):
             logger.error('Only a python callable object may be added to the queue using the add_function() method')
@@ -182,13 +217,16 @@ class WorkerThreadPool(object):
             if not self._shutdown:
                 logger.warning("Cannot Add Process as Queue is frozen!")
             return
+        future = QueueFuture()
         self.__queue.put(QueueElement(priority=priority,
                                       command_input=FunctionInput(
                                           function, args, kwargs),
                                       callback_func=FunctionInput(
                                           callback_func, callback_args, callback_kwargs),
-                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name
+                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name,
+                                      future=future
                                       ))
+        return future
 
     def add_process(self,
                     command, timeout=None, env=None, cwd=None, shell=False,
@@ -196,6 +234,10 @@ class WorkerThreadPool(object):
                     callback_func=None, callback_args=(), callback_kwargs={},
                     fallback_func=None, fallback_args=(), fallback_kwargs={},
                     name=None):
+        """
+        Add a command to be executed to the queue and return a QueueFuture for its
+        output, or None if nothing was added.
+        """
 
         if not isinstance(command, str):
             logger.error("Input command must be of type 'string'")
@@ -204,30 +246,36 @@ class WorkerThreadPool(object):
             if self._shutdown:
                 logger.warning("Cannot Add Process as Queue is frozen!")
             return
+        future = QueueFuture()
         self.__queue.put(QueueElement(priority=priority,
                                       command_input=CommandInput(
                                           command, timeout, env, cwd, shell, python_setup, eval_includes, update_env),
                                       callback_func=FunctionInput(
                                           callback_func, callback_args, callback_kwargs),
-                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name
+                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name,
+                                      future=future
                                       ))
+        return future
 
     def map(self, function, *iterables):
+        """
+        Add function to the queue once for each set of args and return the list of QueueFutures
+        """
         if not isinstance(function, collections.abc.Callable):
             raise GangaTypeError('must be a function')
         if self.isfrozen() is True:
             logger.error("Cannot map a Function as Queue is frozen!")
-        for args in zip(*iterables):
-            self.__queue.put(QueueElement(priority=5,
-                                          command_input=FunctionInput(
-                                              function, args, {})
-                                          ))
+            return []
+        return [self.add_function(function, args) for args in zip(*iterables)]
 
     def clear_queue(self):
         """
-        Purges the thread pools queue.
+        Purges the thread pools queue, cancelling the futures of anything which was waiting to run.
         """
-        self.__queue.queue = []
+        with self.__queue.mutex:
+            purged, self.__queue.queue = self.__queue.queue, []
+        for item in purged:
+            item.future.cancel()
 
     def get_queue(self):
         """
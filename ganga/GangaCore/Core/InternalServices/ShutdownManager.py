@@ -6,6 +6,7 @@ Attributes:
 """
 
 import atexit
+import sys
 
 # Ganga imports
 from GangaCore.Core.GangaThread import GangaThreadPool
@@ -88,6 +89,23 @@ def _unprotected_ganga_exitfuncs():
     except Exception as err:
         logger.exception("Exception raised while stopping Tasks: %s" % err)
 
+    # Stop starting the local jobs waiting for a slot, the next session starts them
+    # Plugins are only looked at if they were loaded, importing one this late fails
+    try:
+        local_scheduler_module = sys.modules.get('GangaCore.Lib.Localhost.LocalScheduler')
+        if local_scheduler_module:
+            local_scheduler_module.local_scheduler.clear_pending()
+    except Exception as err:
+        logger.exception("Exception raised while stopping the local job scheduler: %s" % err)
+
+    # Stop starting LCG output downloads
+    try:
+        lcg_module = sys.modules.get('GangaCore.Lib.LCG.LCG')
+        if lcg_module:
+            lcg_module.stop_lcg_output_downloader()
+    except Exception as err:
+        logger.exception("Exception raised while stopping the LCG output downloads: %s" % err)
+
     # purge the monitoring queues
     try:
         _purge_actions_queue()
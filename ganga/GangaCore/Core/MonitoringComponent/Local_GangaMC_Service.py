@@ -489,6 +489,19 @@ def get_jobs_in_bunches(jobList_fromset, blocks_of_size=5, stripProxies=True):
     return list_of_bunches
 
 
+def _jobStateSignature(j):
+    """
+    Return something which changes when the status of the job or of any of its subjobs changes
+    Args:
+        j (Job): the job being monitored
+    """
+    raw_job = stripProxy(j)
+    subjobs = raw_job.subjobs
+    if hasattr(subjobs, 'getSJStatusCounts'):
+        return raw_job.status, sorted(subjobs.getSJStatusCounts().items())
+    return raw_job.status, [sj.status for sj in subjobs]
+
+
 class JobRegistry_Monitor(GangaThread):
     """Job monitoring service thread."""
     
@@ -496,7 +509,7 @@ class JobRegistry_Monitor(GangaThread):
     minPollRate = 1.
     global_count = 0
 
-    __slots__ = ('registry_slice', '__sleepCounter', '__updateTimeStamp', 'progressCallback', 'callbackHookDict', 'clientCallbackDict', 'alive', 'enabled', 'steps', 'activeBackends', 'updateJobStatus', 'errors', 'updateDict_ts', '__mainLoopCond', '__cleanUpEvent', '__monStepsTerminatedEvent', 'stopIter', '_runningNow')
+    __slots__ = ('registry_slice', '__sleepCounter', '__updateTimeStamp', 'progressCallback', 'callbackHookDict', 'clientCallbackDict', 'alive', 'enabled', 'steps', 'activeBackends', 'updateJobStatus', 'errors', 'updateDict_ts', '__mainLoopCond', '__cleanUpEvent', '__monStepsTerminatedEvent', 'stopIter', '_runningNow', '_backendPolling', '_rescanActiveJobs')
 
     def __init__(self, registry_slice):
         GangaThread.__init__(self, name="JobRegistry_Monitor")
@@ -544,9 +557,32 @@ class JobRegistry_Monitor(GangaThread):
 
         self._runningNow = False
 
+        # per backend polling state used to back off from backends whose jobs aren't changing
+        self._backendPolling = {}
+        # rebuild the set of active jobs from the registry at the next step
+        self._rescanActiveJobs = False
+
         if GANGA_SWAN_INTEGRATION:
             self.newly_discovered_jobs = []
 
+    def _getJobRegistry(self):
+        """
+        Return the registry being monitored if it keeps track of the active jobs, None otherwise
+        """
+        registry = getattr(stripProxy(self.registry_slice), 'objects', None)
+        if hasattr(registry, 'getActiveJobIds'):
+            return registry
+        return None
+
+    def __newActiveJobs(self):
+        """
+        Return True if a job has become active since the last step and the last step isn't too recent to run another
+        """
+        registry = self._getJobRegistry()
+        if registry is None or not registry.activeJobsChanged.is_set():
+            return False
+        return time.time() - self.__updateTimeStamp >= self.minPollRate
+
     def isEnabled( self, useRunning = True ):
         if useRunning:
             return self.enabled or self.__isInProgress() and not self.steps
@@ -611,6 +647,11 @@ class JobRegistry_Monitor(GangaThread):
                     for i in range(int(self.uPollRate * 20)):
                         if self.enabled:
                             self.__mainLoopCond.wait(self.uPollRate * 0.05)
+                    if self.enabled and self.__newActiveJobs():
+                        # a job has just been submitted so don't wait for the end of the delay to look at it
+                        log.debug("New active jobs, running the next step now")
+                        self.__sleepCounter = 0.0
+                        break
                     if not self.enabled:
                         if not self.alive:  # stopped?
                             self.__cleanUp()
@@ -814,6 +855,8 @@ class JobRegistry_Monitor(GangaThread):
             self.enabled = True
             # infinite loops
             self.steps = -1
+            # jobs may have changed while the loop was disabled
+            self._rescanActiveJobs = True
             # enable job list iterators
             self.stopIter.clear()
             log.debug('Monitoring loop enabled')
@@ -1021,9 +1064,20 @@ class JobRegistry_Monitor(GangaThread):
             new_jobs = stripProxy(self.registry_slice).objects.repository.update_index(True, True)
             self.newly_discovered_jobs = list(set(self.newly_discovered_jobs) | set(new_jobs))
 
+        # Only the jobs which the registry knows to be active need to be looked at
+        registry = self._getJobRegistry()
+        if registry is not None and not GANGA_SWAN_INTEGRATION:
+            registry.activeJobsChanged.clear()
+            active_ids = registry.getActiveJobIds(rescan=self._rescanActiveJobs)
+            self._rescanActiveJobs = False
+            if jobSlice is not None:
+                slice_ids = set(jobSlice.ids())
+                fixed_ids = [i for i in active_ids if i in slice_ids]
+            else:
+                fixed_ids = active_ids
         # FIXME: this is not thread safe: if the new jobs are added then
         # iteration exception is raised
-        if jobSlice is not None:
+        elif jobSlice is not None:
             fixed_ids = jobSlice.ids()
         else:
             fixed_ids = self.registry_slice.ids()
@@ -1048,6 +1102,9 @@ class JobRegistry_Monitor(GangaThread):
                         backend_name = getName(backend_obj)
                         active_backends.setdefault(backend_name, [])
                         active_backends[backend_name].append(j)
+                elif registry is not None and job_status not in registry.active_statuses:
+                    # The job's status was changed without a transition so drop it from the active jobs
+                    registry.updateActiveJob(i, job_status)
             except RegistryKeyError as err:
                 log.debug("RegistryKeyError: The job was most likely removed")
                 log.debug("RegError %s" % str(err))
@@ -1092,6 +1149,7 @@ class JobRegistry_Monitor(GangaThread):
             jobList_fromset.extend(masterJobList_fromset)
             # print jobList_fromset
             self.updateDict_ts.clearEntry(getName(backendObj))
+            states_before = [_jobStateSignature(j) for j in jobList_fromset]
             try:
                 log.debug("[Update Thread %s] Updating %s with %s." % (currentThread, getName(backendObj), [x.id for x in jobList_fromset]))
 
@@ -1122,28 +1180,29 @@ class JobRegistry_Monitor(GangaThread):
 
                 all_exceptions = []
 
-                for this_job_list in all_job_bunches:
-
-                    if self.enabled is False and self.alive is False:
-                        log.debug("NOT enabled, breaking loop")
-                        break
-
-                    ### This tries to loop over ALL jobs in 'this_job_list' with the maximum amount of redundancy to keep
-                    ### going and attempting to update all (sub)jobs if some fail
-                    ### ALL ERRORS AND EXCEPTIONS ARE REPORTED VIA log.error SO NO INFORMATION IS LOST/IGNORED HERE!
-                    job_ids = ''
-                    for this_job in this_job_list:
-                        job_ids += ' %s' % str(this_job.id) 
-                    log.debug("Updating Jobs: %s" % job_ids)
-                    try:
-                        stripProxy(backendObj).master_updateMonitoringInformation(this_job_list)
-                    except Exception as err:
-                        #raise err
-                        log.debug("Err: %s" % str(err))
-                        ## We want to catch ALL of the exceptions
-                        ## This would allow us to continue in the case of errors due to bad job/backend combinations
-                        if err not in all_exceptions:
-                            all_exceptions.append(err)
+                with stripProxy(backendObj).monitoringCycle(jobList_fromset):
+                    for this_job_list in all_job_bunches:
+
+                        if self.enabled is False and self.alive is False:
+                            log.debug("NOT enabled, breaking loop")
+                            break
+
+                        ### This tries to loop over ALL jobs in 'this_job_list' with the maximum amount of redundancy to keep
+                        ### going and attempting to update all (sub)jobs if some fail
+                        ### ALL ERRORS AND EXCEPTIONS ARE REPORTED VIA log.error SO NO INFORMATION IS LOST/IGNORED HERE!
+                        job_ids = ''
+                        for this_job in this_job_list:
+                            job_ids += ' %s' % str(this_job.id) 
+                        log.debug("Updating Jobs: %s" % job_ids)
+                        try:
+                            stripProxy(backendObj).master_updateMonitoringInformation(this_job_list)
+                        except Exception as err:
+                            #raise err
+                            log.debug("Err: %s" % str(err))
+                            ## We want to catch ALL of the exceptions
+                            ## This would allow us to continue in the case of errors due to bad job/backend combinations
+                            if err not in all_exceptions:
+                                all_exceptions.append(err)
 
                 if all_exceptions != []:
                     for err in all_exceptions:
@@ -1154,6 +1213,8 @@ class JobRegistry_Monitor(GangaThread):
                 autoKill_if_required(jobList_fromset)
                 resubmit_if_required(jobList_fromset)
 
+                self._recordBackendActivity(getName(backendObj), states_before != [_jobStateSignature(j) for j in jobList_fromset])
+
             except BackendError as x:
                 self._handleError(x, x.backend_name, 0)
             except Exception as err:
@@ -1211,6 +1272,10 @@ class JobRegistry_Monitor(GangaThread):
             else:
                 pRate = config['default_backend_poll_rate']
 
+            if not thisMonitor._isBackendDue(b_name, jList):
+                log.debug("Backing off from %s, checking it again in %ss" % (b_name, thisMonitor._backendPolling[b_name]['interval']))
+                continue
+
             # TODO: To include an if statement before adding entry to
             #       updateDict. Entry is added only if credential requirements
             #       of the particular backend is satisfied.
@@ -1222,6 +1287,43 @@ class JobRegistry_Monitor(GangaThread):
             log.debug("jList: %s" % str(summary))
 
 
+    def _isBackendDue(self, backend_name, jobList):
+        """
+        Return True if the jobs of this backend should be checked now.
+        A backend is checked at every step when its jobs are changing or when monitoring was requested by runMonitoring.
+        Otherwise the interval between checks doubles up to the poll rate configured for the backend.
+        Args:
+            backend_name (str): name of the backend
+            jobList (list): the active jobs of this backend
+        """
+        job_ids = frozenset(stripProxy(j).getFQID('.') for j in jobList)
+        now = time.time()
+        state = self._backendPolling.get(backend_name)
+        if state is None or state['jobs'] != job_ids:
+            # New jobs to look at so start again from the fastest rate
+            self._backendPolling[backend_name] = {'interval': config['base_poll_rate'], 'last': now, 'jobs': job_ids}
+            return True
+        if self.steps > 0 or now - state['last'] >= state['interval']:
+            state['last'] = now
+            return True
+        return False
+
+    def _recordBackendActivity(self, backend_name, changed):
+        """
+        Adapt how often a backend is checked after its jobs have been updated
+        Args:
+            backend_name (str): name of the backend
+            changed (bool): whether any of the jobs changed during the update
+        """
+        state = self._backendPolling.get(backend_name)
+        if state is None:
+            return
+        if changed:
+            state['interval'] = config['base_poll_rate']
+        else:
+            max_rate = config[backend_name] if backend_name in config else config['default_backend_poll_rate']
+            state['interval'] = max(min(state['interval'] * 2, max_rate), config['base_poll_rate'])
+
     def makeUpdateJobStatusFunction(self, makeActiveBackendsFunc=None, jobSlice=None):
         log.debug("makeUpdateJobStatusFunction")
         if makeActiveBackendsFunc is None:
@@ -1,12 +1,21 @@
 
 import os
 import sys
+import stat
+import time
+import shutil
+import hashlib
+import tarfile
 import mimetypes
+import threading
+from io import BytesIO
 import GangaCore.Utility.logging
 logger = GangaCore.Utility.logging.getLogger(modulename=True)
 
 from .WNSandbox import OUTPUT_TARBALL_NAME, PYTHON_DIR
 from GangaCore.Core.exceptions import GangaException, GangaIOError
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.files import ParallelGzipWriter, block_size
 
 
 class SandboxError(GangaException):
@@ -21,43 +30,164 @@ class SandboxError(GangaException):
 
 # FIXME: os.system error handling missing in this module!
 
+# The name of the directory at the top of the input workspace in which the packed sandboxes are cached by content
+SANDBOX_CACHE_DIR = 'sandbox_cache'
+
+# Cached packed sandboxes which are no longer linked into any job are only removed once they are this old, in seconds,
+# so that a sandbox just built by another session is not removed before it is linked
+_sandbox_cache_grace = 600
+
+# (path, device, inode, size, modification time) -> sha256 of the contents of the files added to sandboxes
+_file_digests = {}
+
+
+def _fileDigest(name):
+    """ Return the sha256 of the contents of the file, only reading it again if it has changed """
+    st = os.stat(name)
+    stamp = (os.path.abspath(name), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    try:
+        return _file_digests[stamp]
+    except KeyError:
+        pass
+    digest = hashlib.sha256()
+    with open(name, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    _file_digests[stamp] = digest.hexdigest()
+    return _file_digests[stamp]
+
+
+def _sandboxEntries(sandbox_files):
+    """ Return the (file, name in the tarball, contents) of each of the sandbox files, where contents are the bytes of a
+    FileBuffer or None for a File """
+    from GangaCore.GPIDev.Lib.File.FileBuffer import FileBuffer
+    from GangaCore.GPIDev.Base.Proxy import isType
+
+    entries = []
+    for f in sandbox_files:
+        if isType(f, FileBuffer):
+            contents = f.getContents()
+            if not isinstance(contents, bytes):
+                contents = contents.encode("utf-8")
+            # FIX for Ganga/test/Internals/FileBuffer_Sandbox
+            # Don't keep the './' on files as looking for an exact filename
+            # afterwards won't work
+            if f.subdir == os.curdir:
+                arcname = os.path.basename(f.name)
+            else:
+                arcname = os.path.join(f.subdir, os.path.basename(f.name))
+        else:
+            if not os.path.isfile(f.name):
+                raise SandboxError("File '%s' does not exist." % f.name)
+            contents = None
+            arcname = os.path.join(f.subdir, os.path.basename(f.name))
+        entries.append((f, arcname, contents))
+    return entries
+
+
+def _sandboxKey(entries, file_format):
+    """ Return a key identifying the tarball made of the entries by their names, modes and contents """
+    key = hashlib.sha256(file_format.encode('utf-8'))
+    for f, arcname, contents in entries:
+        if contents is None:
+            mode = stat.S_IMODE(os.stat(f.name).st_mode)
+            digest = _fileDigest(f.name)
+        else:
+            mode = 0
+            digest = hashlib.sha256(contents).hexdigest()
+        key.update(('%s\0%o\0%d\0%s\0' % (arcname, mode, bool(f.isExecutable()), digest)).encode('utf-8'))
+    return key.hexdigest()
+
+
+def _writePackedSandbox(entries, tgzfile, file_format):
+    """ Write the tarball of the entries, compressing it on several threads if it is gzipped """
+    threads = getConfig('Configuration')['packedSandboxThreads']
+    with open(tgzfile, 'wb') as out_file:
+        writer = ParallelGzipWriter(out_file, threads) if file_format == 'gz' else None
+        try:
+            if writer is not None:
+                tf = tarfile.open(fileobj=writer, mode='w|')
+            else:
+                tf = tarfile.open(fileobj=out_file, mode='w:%s' % file_format)
+            with tf:
+                tf.dereference = True  # --not needed in Windows
+
+                for f, arcname, contents in entries:
+                    if contents is not None:
+                        fileobj = BytesIO(contents)
+                        tinfo = tarfile.TarInfo()
+                        tinfo.name = arcname
+                        tinfo.mtime = time.time()
+                        tinfo.size = len(contents)
+                    else:
+                        logger.debug("Opening file for sandbox: %s" % f.name)
+                        try:
+                            fileobj = open(f.name, 'rb')
+                        except Exception as err:
+                            raise SandboxError("File '%s' does not exist." % f.name)
+
+                        tinfo = tf.gettarinfo(f.name, arcname)
+
+                    if f.isExecutable():
+                        tinfo.mode = tinfo.mode | stat.S_IXUSR
+                    with fileobj:
+                        tf.addfile(tinfo, fileobj)
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+def _buildCachedSandbox(entries, cached, file_format):
+    """ Write the tarball into the cache, it only appears there once it's complete """
+    tmp_file = '%s.%s.%s.tmp' % (cached, os.getpid(), threading.get_ident())
+    try:
+        _writePackedSandbox(entries, tmp_file, file_format)
+        os.replace(tmp_file, cached)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def _linkSandbox(cached, tgzfile):
+    """ Hard link the cached tarball to tgzfile, copying it if they are on different file systems """
+    if os.path.lexists(tgzfile):
+        os.remove(tgzfile)
+    try:
+        os.link(cached, tgzfile)
+    except OSError as err:
+        logger.debug("Cannot link the cached sandbox %s, copying it: %s" % (cached, err))
+        shutil.copyfile(cached, tgzfile)
+
+
+def _pruneSandboxCache(cache_dir):
+    """ Remove the cached tarballs which aren't linked into the input workspace of any job """
+    now = time.time()
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+            if st.st_nlink == 1 and now - st.st_mtime > _sandbox_cache_grace:
+                logger.debug("Removing the unused cached sandbox %s" % path)
+                os.remove(path)
+        except OSError as err:
+            logger.debug("Cannot prune the cached sandbox %s: %s" % (path, err))
+
+
 def createPackedInputSandbox(sandbox_files, inws, name):
     """Put all sandbox_files into tarball called name and write it into to the input workspace.
        This function is called by Ganga client at the submission time.
+       Identical sandboxes are only built once: the tarball is cached under the contents of its files at the top of the
+       input workspace and hard linked into the input workspace of each job using it.
        Arguments:
                 'sandbox_files': a list of File or FileBuffer objects.
                 'inws': a InputFileWorkspace object
        Return: a list containing a path to the tarball
        """
 
-#    from GangaCore.Core import FileWorkspace
-#    from GangaCore.GPIDev.Lib.File import File
-
-#    tgzfile = os.path.join(tmpdir,name)
-
     tgzfile = inws.getPath(name)
 
-    import tarfile
-    import stat
-
     logger.debug("Creating packed Sandbox with %s many sandbox files." % len(sandbox_files))
 
-#
-# Curent release with os module
-#
-
-#   wsdir = os.path.join(tmpdir,"ws")
-#   ws = FileWorkspace.FileWorkspace(wsdir)
-#   ws.create()
-#   for f in sandbox_files:
-#       ws.writefile(f)
-
-    # if os.system("tar -C %s -czf %s ."%(wsdir,tgzfile)) !=0:
-    #       print "ERROR:: can't create tarball file with InputSandbox"
-
-#
-# Future release with tarball module
-
     if mimetypes.guess_type(tgzfile)[1] in ['gzip']:
         file_format = 'gz'
     elif mimetypes.guess_type(tgzfile)[1] in ['bzip2']:
@@ -65,54 +195,31 @@ def createPackedInputSandbox(sandbox_files, inws, name):
     else:
         file_format = ''
 
-    with tarfile.open(tgzfile, 'w:%s' % file_format) as tf:
-        tf.dereference = True  # --not needed in Windows
-
-        from GangaCore.GPIDev.Lib.File.FileBuffer import FileBuffer
-        from GangaCore.GPIDev.Lib.File.File import File
-        from GangaCore.GPIDev.Base.Proxy import isType
-
-        for f in sandbox_files:
-            fileobj = None
-            if isType(f, FileBuffer):
-                contents = f.getContents()   # is it FileBuffer?
-                # print "Getting FileBuffer Contents"
-
-                from io import BytesIO
-                if isinstance(contents, bytes):
-                    fileobj = BytesIO(contents)
-                else:
-                    fileobj = BytesIO(contents.encode("utf-8"))
-
-                tinfo = tarfile.TarInfo()
-                # FIX for Ganga/test/Internals/FileBuffer_Sandbox
-                # Don't keep the './' on files as looking for an exact filename
-                # afterwards won't work
-                if f.subdir == os.curdir:
-                    tinfo.name = os.path.basename(f.name)
-                else:
-                    tinfo.name = os.path.join(f.subdir, os.path.basename(f.name))
-                import time
-                tinfo.mtime = time.time()
-                tinfo.size = len(fileobj.getvalue())
-
-            else:
-                #   except AttributeError as err:         # File
-                # print "Getting File %s" % f.name
-                # tf.add(f.name,os.path.join(f.subdir,os.path.basename(f.name)))
-                logger.debug("Opening file for sandbox: %s" % f.name)
-                try:
-                    fileobj = open(f.name, 'rb')
-                except Exception as err:
-                    raise SandboxError("File '%s' does not exist." % f.name)
-
-                tinfo = tf.gettarinfo(f.name, os.path.join(f.subdir, os.path.basename(f.name)))
-
-            if f.isExecutable():
-                tinfo.mode = tinfo.mode | stat.S_IXUSR
-            tf.addfile(tinfo, fileobj)
-            fileobj.close()
-
+    entries = _sandboxEntries(sandbox_files)
+
+    if not getConfig('Configuration')['packedSandboxCache']:
+        _writePackedSandbox(entries, tgzfile, file_format)
+        return [tgzfile]
+
+    cache_dir = os.path.join(inws.top, SANDBOX_CACHE_DIR)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    cached = os.path.join(cache_dir, _sandboxKey(entries, file_format) + ('.tar.' + file_format if file_format else '.tar'))
+
+    try:
+        # Refresh the cached tarball so that no session prunes it before it's linked into the workspace
+        os.utime(cached)
+        logger.debug("Using the cached sandbox %s" % cached)
+    except FileNotFoundError:
+        _buildCachedSandbox(entries, cached, file_format)
+        _pruneSandboxCache(cache_dir)
+
+    try:
+        _linkSandbox(cached, tgzfile)
+    except FileNotFoundError:
+        logger.debug("The cached sandbox %s was pruned before it was linked, building it again" % cached)
+        _buildCachedSandbox(entries, cached, file_format)
+        _linkSandbox(cached, tgzfile)
     return [tgzfile]
 
 
@@ -4,6 +4,8 @@
 # $Id: IBackend.py,v 1.2 2008-10-02 10:31:05 moscicki Exp $
 ##########################################################################
 
+from contextlib import contextmanager
+
 from GangaCore.Core.exceptions import GangaKeyError, IncompleteJobSubmissionError
 from GangaCore.Core.GangaRepository.SubJobXMLList import SubJobXMLList
 from GangaCore.GPIDev.Base import GangaObject
@@ -20,7 +22,6 @@ from GangaCore.Core.exceptions import GangaException, IncompleteJobSubmissionErr
 
 import os
 import itertools
-import time
 from collections import defaultdict
 
 from GangaCore.Core.GangaThread.WorkerThreads import getQueues
@@ -148,7 +149,7 @@ class IBackend(GangaObject):
 
             from GangaCore.Core.GangaThread.WorkerThreads import getQueues
 
-            threads_before = getQueues().totalNumIntThreads()
+            submissions = []
 
             for sc, sj in zip(subjobconfigs, rjobs):
 
@@ -164,19 +165,15 @@ class IBackend(GangaObject):
 
                 fqid = sj.getFQID('.')
                 # FIXME would be nice to move this to the internal threads not user ones
-                getQueues()._monitoring_threadpool.add_function(self._parallel_submit, (b, sj, sc, master_input_sandbox, fqid, logger), callback_func = self._successfulSubmit, callback_args = (sj, incomplete_subjobs))
-
-            def subjob_status_check(rjobs):
-                has_submitted = True
-                for sj in rjobs:
-                    if sj.status not in ["submitted","failed","completed","running","completing"] and sj.getFQID('.') not in incomplete_subjobs:
-                        has_submitted = False
-                        break
-                return has_submitted
+                future = getQueues()._monitoring_threadpool.add_function(self._parallel_submit, (b, sj, sc, master_input_sandbox, fqid, logger), callback_func = self._successfulSubmit, callback_args = (sj, incomplete_subjobs))
+                if future is None:
+                    # The queues are frozen so this subjob will never be submitted
+                    incomplete_subjobs.append(fqid)
+                else:
+                    submissions.append(future)
 
-            while not subjob_status_check(rjobs):
-                import time
-                time.sleep(1.)
+            # The futures are only resolved after _successfulSubmit has run for each subjob
+            getQueues().waitForAll(submissions)
 
             if incomplete_subjobs:
                 raise IncompleteJobSubmissionError(
@@ -402,6 +399,16 @@ class IBackend(GangaObject):
         """
         pass
 
+    @staticmethod
+    @contextmanager
+    def monitoringCycle(jobs):
+        """ Entered by the monitoring loop around each check of the jobs of
+        this backend, which passes them to master_updateMonitoringInformation()
+        in bunches. Backends can override this to do work once per check
+        rather than once per bunch.
+        """
+        yield
+
     @staticmethod
     def master_updateMonitoringInformation(jobs):
         """ Update monitoring information for  jobs: jobs is a list of
@@ -436,6 +443,7 @@ class IBackend(GangaObject):
         # are not locked by an active session of ganga
 
         queues = getQueues()
+        monitoring_tasks = []
 
         for j in jobs:
             ## All subjobs should have same backend
@@ -444,16 +452,8 @@ class IBackend(GangaObject):
                 monitorable_subjob_ids = []
 
                 if isType(j.subjobs, SubJobXMLList):
-                    cache = j.subjobs.getAllCachedData()
-                    for sj_id in range(0,len(j.subjobs)):
-                        if cache[sj_id]['status'] in ['submitted', 'running']:
-                            if j.subjobs.isLoaded(sj_id):
-                                ## SJ may have changed from cache in memory
-                                this_sj = j.subjobs(sj_id)
-                                if this_sj.status in ['submitted', 'running']:
-                                    monitorable_subjob_ids.append(sj_id)
-                            else:
-                                monitorable_subjob_ids.append(sj_id)
+                    ## The status index already reflects any subjobs which have changed in memory
+                    monitorable_subjob_ids = j.subjobs.getSJIdsWithStatus('submitted', 'running')
                 else:
                     for sj in j.subjobs:
                         if sj.status in ['submitted', 'running']:
@@ -491,7 +491,7 @@ class IBackend(GangaObject):
                             subjobs_to_monitor.append(j.subjobs[sj_id])
                         if multiThreadMon:
                             if queues.totalNumIntThreads() < getConfig("Queues")['NumWorkerThreads']:
-                                queues._addSystem(j.backend.updateMonitoringInformation, args=(subjobs_to_monitor,), name="Backend Monitor")
+                                monitoring_tasks.append(queues._addSystem(j.backend.updateMonitoringInformation, args=(subjobs_to_monitor,), name="Backend Monitor"))
                         else:
                             j.backend.updateMonitoringInformation(subjobs_to_monitor)
                     except Exception as err:
@@ -510,8 +510,8 @@ class IBackend(GangaObject):
                 logger.debug('Monitoring jobs: %s', repr([jj._repr() for jj in simple_jobs[this_backend]]))
                 if multiThreadMon:
                     if queues.totalNumIntThreads() < getConfig("Queues")['NumWorkerThreads']:
-                        queues._addSystem(stripProxy(simple_jobs[this_backend][0].backend).updateMonitoringInformation,
-                                          args=(simple_jobs[this_backend],), name="Backend Monitor")
+                        monitoring_tasks.append(queues._addSystem(stripProxy(simple_jobs[this_backend][0].backend).updateMonitoringInformation,
+                                                                  args=(simple_jobs[this_backend],), name="Backend Monitor"))
                 else:
                     stripProxy(simple_jobs[this_backend][0].backend).updateMonitoringInformation(simple_jobs[this_backend])
 
@@ -520,14 +520,7 @@ class IBackend(GangaObject):
         if not multiThreadMon:
             return
 
-        loop = True
-        while loop:
-            for stat in queues._monitoring_threadpool.worker_status():
-                loop = False;
-                if stat[0] is not None and stat[0].startswith("Backend Monitor"):
-                    loop = True;
-                    break;
-            time.sleep(1.)
+        queues.waitForAll(monitoring_tasks)
 
     @staticmethod
     def updateMonitoringInformation(jobs):
@@ -4,12 +4,68 @@
 # $Id: ISplitter.py,v 1.1 2008-07-17 16:40:52 moscicki Exp $
 ##########################################################################
 
+import copy
 from GangaCore.GPIDev.Base import GangaObject
+from GangaCore.GPIDev.Base.Objects import do_not_copy
 from GangaCore.GPIDev.Base.Proxy import TypeMismatchError, isType, stripProxy, getName
-from GangaCore.GPIDev.Schema import Schema, Version
+from GangaCore.GPIDev.Schema import Schema, Version, SharedItem
 from GangaCore.Utility.util import containsGangaObjects
 from GangaCore.Core.exceptions import GangaException, SplitterError
 
+# Values which can't be changed in place so may be shared between the subjobs
+_shared_types = (type(None), str, bytes, int, float)
+
+
+def _cloneValue(value):
+    """ Copy an attribute value of a subjob for another subjob, sharing it if it can't be changed in place
+    Args:
+        value (unknown): The value of the schema attribute
+    """
+    from GangaCore.GPIDev.Lib.GangaList.GangaList import GangaList, makeGangaListByRef
+    if isinstance(value, _shared_types):
+        return value
+    if isinstance(value, GangaList):
+        # As GangaList.__deepcopy__ but without the checks on the elements
+        if not value._list:
+            new_list = GangaList()
+            new_list._is_preparable = value._is_preparable
+            return new_list
+        return makeGangaListByRef([_cloneValue(elem) for elem in value._list], preparable=value._is_preparable)
+    if isinstance(value, GangaObject) and value._schema is not None and type(value).__deepcopy__ is GangaObject.__deepcopy__:
+        return _cloneObject(value)
+    return copy.deepcopy(value)
+
+
+def _cloneObject(obj):
+    """ Copy a GangaObject as GangaObject.__deepcopy__ would, but filling the schema data of the copy directly
+    rather than through the attribute descriptors as the values have already been checked when set on obj
+    Args:
+        obj (GangaObject): The object to be copied
+    """
+    new_obj = obj.getNew()
+    schema = obj._schema
+    new_data = {}
+    for name, item in schema.allItems():
+        if item['getter'] is not None:
+            continue
+        if not item['copyable'] or name in do_not_copy or not hasattr(obj, name):
+            new_data[name] = schema.getDefaultValue(name)
+        else:
+            new_data[name] = _cloneValue(getattr(obj, name))
+        if item.isA(SharedItem) and hasattr(new_data[name], 'name'):
+            from GangaCore.Core.GangaRepository import getRegistry
+            getRegistry("prep").getShareRef().increase(new_data[name])
+    new_obj._data = new_data
+
+    for key, value in getattr(obj, '__dict__', {}).items():
+        if key not in do_not_copy:
+            try:
+                new_obj.__dict__[key] = copy.deepcopy(value)
+            except:
+                new_obj.__dict__[key] = value
+    new_obj._registry = obj._registry
+    return new_obj
+
 
 class ISplitter(GangaObject):
 
@@ -39,6 +95,36 @@ class ISplitter(GangaObject):
         j.inputdata = None
         return j
 
+    def createSubjobs(self, job, count, additional_skip_args=None):
+        """ Create count new subjobs at once. The master job is only copied once, with createSubjob, and the other
+        subjobs are cloned from that copy sharing the values which can't be changed in place. Splitters should then only
+        set the attributes they split on.
+        Args:
+            job (Job): The master job
+            count (int): The number of subjobs to create
+            additional_skip_args (list): Attributes of the master job which are not to be copied to the subjobs
+        """
+        if count <= 0:
+            return []
+        if additional_skip_args is None:
+            additional_skip_args = []
+
+        template = self.createSubjob(job, additional_skip_args)
+        subjobs = [template]
+
+        # Each copy of the application is another reference to its prepared sandbox, as in copyFrom
+        _app = job.application
+        count_share = 'application' not in additional_skip_args and hasattr(_app, 'is_prepared') and _app.is_prepared not in [None, True]
+
+        for i in range(1, count):
+            sj = _cloneObject(template)
+            for attr in template._additional_slots:
+                setattr(sj, attr, None)
+            if count_share:
+                _app.incrementShareCounter(_app.is_prepared)
+            subjobs.append(sj)
+        return subjobs
+
     def split(self, job):
         """ Return a list of subjobs generated from a master job.  The
         original  master  job should  not  be  modified.  This  method
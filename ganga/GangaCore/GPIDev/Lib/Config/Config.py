@@ -323,6 +323,16 @@ def createOptionProxy(section_name, option_name):
 def bootstrap():
     """ Create GPI proxies for all configuration sections.
     """
+    # the plugins which are not imported yet but have default values in the configuration must make their sections now
+    from GangaCore.Utility.Config.Config import unknownConfigFileValues, unknownUserConfigValues
+    from GangaCore.GPIDev.Schema.Schema import defaultConfigSectionName
+    from GangaCore.Utility.Plugin import allPlugins
+    configured = set(unknownConfigFileValues) | set(unknownUserConfigValues)
+    for category, names in allPlugins.lazyPlugins().items():
+        for name, (module, plugin_name) in names.items():
+            if defaultConfigSectionName(plugin_name) in configured:
+                allPlugins.find(category, name)
+
     for name in stripProxy(config):
         createSectionProxy(name)
     import GangaCore.Utility.Config.Config
@@ -121,12 +121,17 @@ class GangaList(GangaObject):
                                     })
     _enable_config = 1
 
-    _additional_slots = ['_is_a_ref']
+    _additional_slots = ['_is_a_ref', '_mutations']
 
     def __init__(self):
         self._is_a_ref = False
+        self._mutations = 0
         super(GangaList, self).__init__()
 
+    def _changed(self):
+        """Count a change to the list so that anything worked out from its contents knows to do it again"""
+        self._mutations = getattr(self, '_mutations', 0) + 1
+
     # convenience methods
     @staticmethod
     def is_list(obj):
@@ -299,6 +304,7 @@ class GangaList(GangaObject):
 
     def __delitem__(self, obj):
         self._list.__delitem__(self.strip_proxy(obj))
+        self._changed()
 
     def _export___delitem__(self, obj):
         self.checkReadOnly()
@@ -306,6 +312,7 @@ class GangaList(GangaObject):
 
     def __delslice__(self, start, end):
         self._list.__delslice__(start, end)
+        self._changed()
 
     def _export___delslice__(self, start, end):
         self.checkReadOnly()
@@ -373,6 +380,7 @@ class GangaList(GangaObject):
 
     def __iadd__(self, obj_list):
         self._list.__iadd__(self.strip_proxy_list(obj_list, True))
+        self._changed()
         return self
 
     def _export___iadd__(self, obj_list):
@@ -381,6 +389,7 @@ class GangaList(GangaObject):
 
     def __imul__(self, number):
         self._list.__imul__(number)
+        self._changed()
         return self
 
     def _export___imul__(self, number):
@@ -439,6 +448,7 @@ class GangaList(GangaObject):
 
     def __setitem__(self, index, obj):
         self._list.__setitem__(index, self.strip_proxy(obj, True))
+        self._changed()
 
     def _export___setitem__(self, index, obj):
         self.checkReadOnly()
@@ -446,6 +456,7 @@ class GangaList(GangaObject):
 
     def __setslice__(self, start, end, obj_list):
         self._list.__setslice__(start, end, self.strip_proxy_list(obj_list, True))
+        self._changed()
 
     def _export___setslice__(self, start, end, obj_list):
         self.checkReadOnly()
@@ -472,6 +483,7 @@ class GangaList(GangaObject):
         return self.toString()
 
     def append(self, obj, my_filter=True):
+        self._changed()
         if isType(obj, GangaList):
             stripped_o = stripProxy(obj)
             stripped_o._setParent(self._getParent())
@@ -518,16 +530,19 @@ class GangaList(GangaObject):
         if isType(obj, GangaObject):
             stripProxy(obj)._setParent(stripProxy(self)._getParent())
         self._list.insert(index, self.strip_proxy(obj, True))
+        self._changed()
 
     def _export_insert(self, index, obj):
         self.checkReadOnly()
         self.insert(index, obj)
 
     def pop(self, index=-1):
+        self._changed()
         return self._list.pop(index)
 
     def clear(self):
         self._list.clear()
+        self._changed()
 
     def _export_pop(self, index=-1):
         self.checkReadOnly()
@@ -540,6 +555,7 @@ class GangaList(GangaObject):
             obj (unknown): Remove this object from the list if it exists
         """
         self._list.remove(self.strip_proxy(obj))
+        self._changed()
 
     def _export_remove(self, obj):
         """
@@ -552,6 +568,7 @@ class GangaList(GangaObject):
 
     def reverse(self):
         self._list.reverse()
+        self._changed()
 
     def _export_reverse(self):
         self.checkReadOnly()
@@ -560,6 +577,7 @@ class GangaList(GangaObject):
     def sort(self, cmpfunc=None):
         # TODO: Should comparitor have access to unproxied objects?
         self._list.sort(cmpfunc)
+        self._changed()
 
     def _export_sort(self, cmpfunc=None):
         """
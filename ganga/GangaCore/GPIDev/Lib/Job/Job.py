@@ -1,5 +1,6 @@
 
 
+from collections import Counter
 import copy
 import errno
 import glob
@@ -613,9 +614,25 @@ class Job(GangaObject):
 
         if final_status != initial_status and self.master is None:
             logger.info('job %s status changed to "%s"', self.getFQID('.'), final_status)
+        if self.master is not None and isinstance(self.master.subjobs, SubJobXMLList):
+            self.master.subjobs.updateSJStatus(self.id, final_status)
+        if self.master is None:
+            # keep the active jobs known to the monitoring loop up to date
+            registry = self._getRegistry()
+            if hasattr(registry, 'updateActiveJob'):
+                registry.updateActiveJob(self.id, final_status)
+        if final_status != initial_status:
+            self._notifyStatusChange()
         if update_master and self.master is not None:
             self.master.updateMasterJobStatus()
 
+    def _notifyStatusChange(self):
+        """Let anything following the status of the master job and its subjobs, e.g. Tasks, know that it has changed"""
+        root_job = self if self.master is None else self.master
+        registry = root_job._getRegistry()
+        if hasattr(registry, 'jobStatusChanged'):
+            registry.jobStatusChanged(root_job.id)
+
     def transition_update(self, new_status):
         """Propagate status transitions"""
 
@@ -736,20 +753,19 @@ class Job(GangaObject):
         """
 
         if isinstance(self.subjobs, SubJobXMLList):
-            stats = set(self.subjobs.getAllSJStatus())
+            stats = set(self.subjobs.getSJStatusCounts())
         else:
             stats = set(sj.status for sj in self.subjobs)
 
         return stats
 
     def returnSubjobStatuses(self):
-        stats = []
         if isinstance(self.subjobs, SubJobXMLList):
-            stats = self.subjobs.getAllSJStatus()
+            stats = self.subjobs.getSJStatusCounts()
         else:
-            stats = [sj.status for sj in self.subjobs]
+            stats = Counter(sj.status for sj in self.subjobs)
 
-        return "%s/%s/%s/%s" % (stats.count('running'), stats.count('failed') + stats.count('killed'), stats.count('completing'), stats.count('completed'))
+        return "%s/%s/%s/%s" % (stats.get('running', 0), stats.get('failed', 0) + stats.get('killed', 0), stats.get('completing', 0), stats.get('completed', 0))
 
     def updateMasterJobStatus(self):
         """
@@ -1237,11 +1253,10 @@ class Job(GangaObject):
         return jobmasterconfig
 
     @staticmethod
-    def _prepare_sj( rtHandler, i, app, sub_c, app_master_c, job_master_c, finished):
+    def _prepare_sj(rtHandler, app, sub_c, app_master_c, job_master_c):
         if app.is_prepared in [None, False]:
             app.prepare()
-        finished[i] = rtHandler.prepare(app, sub_c, app_master_c, job_master_c)
-        return
+        return rtHandler.prepare(app, sub_c, app_master_c, job_master_c)
 
     def _getJobSubConfig(self, subjobs):
 
@@ -1264,19 +1279,17 @@ class Job(GangaObject):
                     jobsubconfig = [rtHandler.prepare(sub_job.application, sub_conf, appmasterconfig, jobmasterconfig) for (sub_job, sub_conf) in zip(subjobs, appsubconfig)]
                 else:
 
-                    finished = {}
-
                     from GangaCore.Core.GangaThread.WorkerThreads import getQueues
-                    index = 0
-                    for sub_j, sub_conf in zip(subjobs, appsubconfig):
-                        getQueues()._monitoring_threadpool.add_function(self._prepare_sj, (rtHandler, index, sub_j.application, sub_conf, appmasterconfig, jobmasterconfig, finished))
-                        index += 1
+                    preparations = [getQueues()._monitoring_threadpool.add_function(self._prepare_sj, (rtHandler, sub_j.application, sub_conf, appmasterconfig, jobmasterconfig))
+                                    for sub_j, sub_conf in zip(subjobs, appsubconfig)]
 
-                    while len(finished) != len(subjobs):
-                        time.sleep(0.25)
+                    getQueues().waitForAll(preparations)
 
-                    for index in finished.keys():
-                        jobsubconfig[index] = finished[index]
+                    for index, preparation in enumerate(preparations):
+                        if preparation is None:
+                            raise JobError("Could not prepare subjob %s as the queues are frozen" % index)
+                        # This raises any exception from preparing the subjob
+                        jobsubconfig[index] = preparation.result()
 
         else:
             #   I am a sub-job, lets calculate my config
@@ -2031,6 +2044,7 @@ class Job(GangaObject):
             logger.error("failed to resubmit job, %s" % x)
             logger.warning('reverting job %s to the %s status', fqid, oldstatus)
             self.status = oldstatus
+            self._notifyStatusChange()
             raise
 
     def auto_kill(self):
@@ -8,6 +8,9 @@
 #from GangaCore.Utility.external.ordereddict import oDict
 from GangaCore.Utility.external.OrderedDict import OrderedDict as oDict
 
+import threading
+from collections import Counter
+
 from GangaCore.Core.exceptions import GangaException
 from GangaCore.Core.GangaRepository.Registry import Registry, RegistryKeyError, RegistryAccessError, RegistryFlusher
 
@@ -15,7 +18,7 @@ from GangaCore.GPIDev.Base.Proxy import stripProxy, isType
 
 import GangaCore.Utility.logging
 
-from GangaCore.GPIDev.Lib.Job.Job import Job
+from GangaCore.GPIDev.Lib.Job.Job import Job, lazyLoadJobStatus
 
 from .RegistrySlice import RegistrySlice
 
@@ -29,11 +32,28 @@ logger = GangaCore.Utility.logging.getLogger()
 
 class JobRegistry(Registry):
 
+    # Statuses of the jobs which the monitoring loop has to follow
+    active_statuses = ('submitted', 'running', 'completing')
+
     def __init__(self, name, doc):
         super(JobRegistry, self).__init__(name, doc)
         self.stored_slice = JobRegistrySlice(self.name)
         self.stored_slice.objects = self
         self.stored_proxy = JobRegistrySliceProxy(self.stored_slice)
+        # ids of the active jobs, this is built from the index the first time it's needed and then kept up to date by
+        # Job.updateStatus so that the monitoring doesn't have to check the status of every job in the registry
+        self._active_ids = None
+        # status transitions seen while the active ids are being rebuilt
+        self._active_updates = None
+        self._active_lock = threading.Lock()
+        # set whenever a job becomes active so that the monitoring loop can react without waiting for its next step
+        self.activeJobsChanged = threading.Event()
+        # job id -> Counter of the status of its subjobs (or of the job itself), dropped whenever one of them changes
+        self._status_counts = {}
+        # incremented by every status change so that anything derived from the status counts knows when to re-count
+        self.status_generation = 0
+        # functions called with the id of a job when the status of the job or one of its subjobs changes
+        self._status_listeners = []
 
     def getSlice(self):
         return self.stored_slice
@@ -59,12 +79,17 @@ class JobRegistry(Registry):
                 value = None
         del this_slice
 
+        # store the backend id so the subjob status index can be built without loading the subjob
+        try:
+            cache["backend:id"] = getattr(obj.backend, 'id', None)
+        except Exception as err:
+            logger.debug("Cannot index backend id: %s" % err)
+
         # store subjob status
         if hasattr(obj, "subjobs"):
             cache["subjobs:status"] = []
-            if hasattr(obj.subjobs, "getAllCachedData"):
-                for sj in obj.subjobs.getAllCachedData():
-                    cache["subjobs:status"].append(sj['status'])
+            if hasattr(obj.subjobs, "getAllSJStatus"):
+                cache["subjobs:status"] = obj.subjobs.getAllSJStatus()
             else:
                 for sj in obj.subjobs:
                     cache["subjobs:status"].append(sj.status)
@@ -72,10 +97,129 @@ class JobRegistry(Registry):
         #print("Cache: %s" % str(cache))
         return cache
 
+    def updateActiveJob(self, job_id, status):
+        """
+        Record the new status of a job so that the active jobs known to the monitoring stay up to date
+        Args:
+            job_id (int): id of the job in this registry
+            status (str): the new status of the job
+        """
+        with self._active_lock:
+            if self._active_updates is not None:
+                self._active_updates[job_id] = status
+            if self._active_ids is None:
+                return
+            if status in self.active_statuses:
+                if job_id not in self._active_ids:
+                    self._active_ids.add(job_id)
+                    self.activeJobsChanged.set()
+            else:
+                self._active_ids.discard(job_id)
+
+    def jobStatusChanged(self, job_id):
+        """
+        Called by Job.updateStatus when the status of a job, or of one of its subjobs, changes.
+        The status counts of the job are dropped and the status listeners are told about the change
+        Args:
+            job_id (int): id of the (master) job in this registry
+        """
+        with self._active_lock:
+            self.status_generation += 1
+            self._status_counts.pop(job_id, None)
+            listeners = list(self._status_listeners)
+        for listener in listeners:
+            try:
+                listener(job_id)
+            except Exception as err:
+                logger.debug("Error in job status listener %s: %s" % (listener, err))
+
+    def addStatusListener(self, listener):
+        """
+        Call listener(job_id) whenever the status of a job or one of its subjobs changes.
+        Listeners are called from the thread changing the status so they must be quick
+        Args:
+            listener (callable): function taking the id of the job which changed
+        """
+        with self._active_lock:
+            if listener not in self._status_listeners:
+                self._status_listeners.append(listener)
+
+    def removeStatusListener(self, listener):
+        with self._active_lock:
+            if listener in self._status_listeners:
+                self._status_listeners.remove(listener)
+
+    def getJobStatusCounts(self, job_id):
+        """
+        Return a Counter of the number of subjobs of a job in each status, or of the status of the job itself if it
+        has no subjobs. This is taken from the index when the job isn't loaded and is kept until the status of the job
+        or one of its subjobs changes, so it shouldn't be modified.
+        Args:
+            job_id (int): id of the job in this registry
+        """
+        with self._active_lock:
+            counts = self._status_counts.get(job_id)
+            generation = self.status_generation
+        if counts is not None:
+            return counts
+
+        this_job = self[job_id]
+        index_cache = this_job._index_cache if not self.has_loaded(this_job) else None
+        if isinstance(index_cache, dict) and 'subjobs:status' in index_cache:
+            counts = Counter(index_cache['subjobs:status'] or [index_cache['status']])
+        elif this_job.subjobs:
+            if hasattr(this_job.subjobs, 'getAllSJStatus'):
+                counts = Counter(this_job.subjobs.getAllSJStatus())
+            else:
+                counts = Counter(sj.status for sj in this_job.subjobs)
+        else:
+            counts = Counter([this_job.status])
+
+        with self._active_lock:
+            # Don't keep counts which may have been made before the last change
+            if generation == self.status_generation:
+                self._status_counts[job_id] = counts
+        return counts
+
+    def getActiveJobIds(self, rescan=False):
+        """
+        Return the sorted list of the ids of the jobs which are submitted, running or completing.
+        The status of every job is only checked the first time this is called or when a rescan is requested
+        Args:
+            rescan (bool): rebuild the active ids from the status of every job in the registry
+        """
+        with self._active_lock:
+            if self._active_ids is not None and not rescan:
+                return sorted(self._active_ids)
+            self._active_updates = {}
+
+        active_ids = set()
+        try:
+            for this_id in self.ids():
+                try:
+                    if lazyLoadJobStatus(self[this_id]) in self.active_statuses:
+                        active_ids.add(this_id)
+                except (RegistryKeyError, RegistryAccessError) as err:
+                    logger.debug("Job %s not checked for activity: %s" % (this_id, err))
+        finally:
+            with self._active_lock:
+                # Anything which changed while we were looking takes precedence
+                for this_id, status in self._active_updates.items():
+                    if status in self.active_statuses:
+                        active_ids.add(this_id)
+                    else:
+                        active_ids.discard(this_id)
+                self._active_updates = None
+                self._active_ids = active_ids
+
+        return sorted(active_ids)
+
     def startup(self):
         """
             This is the main startup method of the Registry
         """
+        self._active_ids = None
+        self._status_counts = {}
         self._needs_metadata = True
         super(JobRegistry, self).startup()
         if len(self.metadata.ids()) == 0:
@@ -162,7 +306,10 @@ class JobRegistry(Registry):
         return self.jobtree
 
     def _remove(self, obj, auto_removed=0):
+        this_id = getattr(obj, 'id', None)
         super(JobRegistry, self)._remove(obj, auto_removed)
+        self.updateActiveJob(this_id, 'removed')
+        self.jobStatusChanged(this_id)
         try:
             self.jobtree.cleanlinks()
         except Exception as err:
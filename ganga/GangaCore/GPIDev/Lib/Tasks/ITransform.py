@@ -12,8 +12,9 @@ from GangaCore.GPIDev.Base.Proxy import stripProxy, isType, getName
 from .IUnit import IUnit
 import time
 import os
+from collections import Counter
 from GangaCore.GPIDev.Lib.Tasks.ITask import addInfoString
-from GangaCore.GPIDev.Lib.Tasks.common import getJobByID
+from GangaCore.GPIDev.Lib.Tasks.common import getJobByID, getJobStatusGeneration
 from GangaCore.GPIDev.Adapters.IGangaFile import IGangaFile
 from GangaCore.GPIDev.Lib.File.File import File
 
@@ -60,6 +61,8 @@ class ITransform(GangaObject):
                       'showInfo', 'showUnitInfo', 'pause', 'n_all', 'n_status' ]
     _hidden = 0
 
+    _additional_slots = ['_status_counts']
+
     def showInfo(self):
         """Print out the info in a nice way"""
         print("\n".join( self.info ))
@@ -126,6 +129,7 @@ class ITransform(GangaObject):
 # Special methods:
     def __init__(self):
         super(ITransform, self).__init__()
+        self._status_counts = None
         self.initialize()
 
     def _auto__init__(self):
@@ -413,11 +417,24 @@ class ITransform(GangaObject):
     def n_active(self):
         return sum([u.n_active() for u in self.units])
 
+    def _statusCounts(self):
+        """Return a Counter of the status of the (sub)jobs of all the units, only re-counted when the units, their
+        active jobs or the status of a job change"""
+        key = (getJobStatusGeneration(), tuple(tuple(u.active_job_ids) for u in self.units))
+        if self._status_counts is not None and self._status_counts[0] == key:
+            return self._status_counts[1]
+
+        counts = Counter()
+        for u in self.units:
+            counts.update(u._statusCounts())
+        self._status_counts = (key, counts)
+        return counts
+
     def n_all(self):
-        return sum([u.n_all() for u in self.units])
+        return sum(self._statusCounts().values())
 
     def n_status(self, status):
-        return sum([u.n_status(status) for u in self.units])
+        return self._statusCounts()[status]
 
     def info(self):
         logger.info(markup("%s '%s'" % (getName(self), self.name), status_colours[self.status]))
@@ -428,6 +445,11 @@ class ITransform(GangaObject):
     def updateStatus(self, status):
         """Update the transform status"""
         self.status = status
+        # let the Tasks loop know there may be units to create or jobs to submit
+        task = self._getParent()
+        registry = task._getRegistry() if task is not None else None
+        if registry is not None and hasattr(registry, 'wakeUp'):
+            registry.wakeUp()
 
     def createUnitCopyOutputDS(self, unit_id):
         """Create a the Copy Output dataset to use with this unit. Overload to handle more than the basics"""
@@ -5,10 +5,11 @@ from GangaCore.GPIDev.Schema import Schema, Version, SimpleItem, ComponentItem,
 from GangaCore.Utility.logging import getLogger
 from GangaCore.Utility.ColourText import status_colours, overview_colours, ANSIMarkup
 markup = ANSIMarkup()
-from GangaCore.GPIDev.Lib.Tasks.common import getJobByID
+from GangaCore.GPIDev.Lib.Tasks.common import getJobByID, getJobStatus, getJobStatusCounts, getJobStatusGeneration
 from GangaCore.Core.exceptions import ApplicationConfigurationError
 from GangaCore.GPIDev.Base.Proxy import stripProxy
 import time
+from collections import Counter
 from GangaCore.GPIDev.Lib.Tasks.ITask import addInfoString
 import sys
 import traceback
@@ -51,9 +52,12 @@ class IUnit(GangaObject):
     _exportmethods = []
     _hidden = 0
 
+    _additional_slots = ['_status_counts']
+
 # Special methods:
     def __init__(self):
         super(IUnit, self).__init__()
+        self._status_counts = None
         
     def _auto__init__(self):
         self.updateStatus("new")
@@ -123,8 +127,7 @@ class IUnit(GangaObject):
         if len(self.active_job_ids) == 0:
             return False
         else:
-            job = getJobByID(self.active_job_ids[0])
-            if job.status in ["failed", "killed"]:
+            if getJobStatus(self.active_job_ids[0]) in ["failed", "killed"]:
                 return True
 
             return False
@@ -232,8 +235,10 @@ class IUnit(GangaObject):
         for jid in self.active_job_ids:
 
             # we have an active job so see if this job is OK and resubmit if
-            # not
+            # not. Jobs which are still going don't need loading
             try:
+                if getJobStatus(jid) not in ["completed", "failed", "killed"]:
+                    continue
                 job = getJobByID(jid)
             except Exception as err:
                 logger.debug("Update2 Err: %s" % str(err))
@@ -345,117 +350,40 @@ class IUnit(GangaObject):
             self.updateStatus("running")
 
     # Info routines
-    def n_active(self):
-
-        if self.status == 'completed':
-            return 0
-
-        tot_active = 0
-        active_states = ['submitted', 'running']
-
+    def _statusCounts(self):
+        """Return a Counter of the status of the (sub)jobs of the active jobs of this unit.
+        This is only re-counted when the active jobs or the status of a job change"""
+        key = (getJobStatusGeneration(), tuple(self.active_job_ids))
+        if self._status_counts is not None and self._status_counts[0] == key:
+            return self._status_counts[1]
+
+        counts = Counter()
         for jid in self.active_job_ids:
-
             try:
-                job = getJobByID(jid)
+                counts.update(getJobStatusCounts(jid))
             except Exception as err:
-                logger.debug("n_active Err: %s" % str(err))
+                logger.debug("status count Err: %s" % str(err))
                 task = self._getParent()._getParent()
                 trf = self._getParent()
                 logger.warning("Cannot find job with id %d. Maybe reset this unit with: tasks(%d).transforms[%d].resetUnit(%d)" %
                                (jid, task.id, trf.getID(), self.getID()))
-                continue
 
-            j = stripProxy(job)
-
-            # try to preserve lazy loading
-            if hasattr(j, '_index_cache') and j._index_cache and 'subjobs:status' in j._index_cache:
-                if len(j._index_cache['subjobs:status']) > 0:
-                    for sj_stat in j._index_cache['subjobs:status']:
-                        if sj_stat in active_states:
-                            tot_active += 1
-                else:
-                    if j._index_cache['status'] in active_states:
-                        tot_active += 1
-            else:
-                #logger.warning("WARNING: (active check) No index cache for job object %d" % jid)
-                if j.status in active_states:
-                    if j.subjobs:
-                        for sj in j.subjobs:
-                            if sj.status in active_states:
-                                tot_active += 1
-                    else:
-                        tot_active += 1
-
-        return tot_active
-
-    def n_status(self, status):
-        tot_active = 0
-        for jid in self.active_job_ids:
-
-            try:
-                job = getJobByID(jid)
-            except Exception as err:
-                logger.debug("n_status Err: %s" % str(err))
-                task = self._getParent()._getParent()
-                trf = self._getParent()
-                logger.warning("Cannot find job with id %d. Maybe reset this unit with: tasks(%d).transforms[%d].resetUnit(%d)" %
-                               (jid, task.id, trf.getID(), self.getID()))
-                continue
+        self._status_counts = (key, counts)
+        return counts
 
-            j = stripProxy(job)
+    def n_active(self):
 
-            # try to preserve lazy loading
-            if hasattr(j, '_index_cache') and j._index_cache and 'subjobs:status' in j._index_cache:
-                if len(j._index_cache['subjobs:status']) > 0:
-                    for sj_stat in j._index_cache['subjobs:status']:
-                        if sj_stat == status:
-                            tot_active += 1
-                else:
-                    if j._index_cache['status'] == status:
-                        tot_active += 1
+        if self.status == 'completed':
+            return 0
 
-            else:
-                #logger.warning("WARNING: (status check) No index cache for job object %d" % jid)
-                if j.subjobs:
-                    for sj in j.subjobs:
-                        if sj.status == status:
-                            tot_active += 1
-                else:
-                    if j.status == status:
-                        tot_active += 1
+        counts = self._statusCounts()
+        return counts['submitted'] + counts['running']
 
-        return tot_active
+    def n_status(self, status):
+        return self._statusCounts()[status]
 
     def n_all(self):
-        total = 0
-        for jid in self.active_job_ids:
-
-            try:
-                job = getJobByID(jid)
-            except Exception as err:
-                logger.debug("n_all Err: %s" % str(err))
-                task = self._getParent()._getParent()
-                trf = self._getParent()
-                logger.warning("Cannot find job with id %d. Maybe reset this unit with: tasks(%d).transforms[%d].resetUnit(%d)" %
-                               (jid, task.id, trf.getID(), self.getID()))
-                continue
-
-            j = stripProxy(job)
-
-            # try to preserve lazy loading
-            if hasattr(j, '_index_cache') and j._index_cache and 'subjobs:status' in j._index_cache:
-                if len(j._index_cache['subjobs:status']) != 0:
-                    total += len(j._index_cache['subjobs:status'])
-                else:
-                    total += 1
-            else:
-                #logger.warning("WARNING: (status check) No index cache for job object %d" % jid)
-                if j.subjobs:
-                    total = len(j.subjobs)
-                else:
-                    total = 1
-
-        return total
+        return sum(self._statusCounts().values())
 
     def overview(self):
         """Print an overview of this unit"""
@@ -2,6 +2,7 @@
 import time
 import traceback
 import sys
+import threading
 import GangaCore.GPIDev.Lib.Registry.RegistrySlice
 from GangaCore.GPIDev.Lib.Registry.JobRegistry import JobRegistrySliceProxy
 from GangaCore.Core.GangaRepository.Registry import Registry, RegistryError, RegistryKeyError, RegistryAccessError, RegistryFlusher
@@ -29,6 +30,13 @@ class TaskRegistry(Registry):
 
         self._main_thread = None
 
+        # ids of the jobs whose status changed since the tasks were last updated
+        self._changed_job_ids = set()
+        self._jobs_changed = threading.Event()
+        self._changed_lock = threading.Lock()
+        # job id -> id of the task which has it as an active job of one of its units
+        self._job_tasks = {}
+
         self.stored_slice = TaskRegistrySlice(self.name)
         self.stored_slice.objects = self
         self.stored_proxy = TaskRegistrySliceProxy(self.stored_slice)
@@ -76,14 +84,29 @@ class TaskRegistry(Registry):
                 logger.error("Exiting: err=%s" % str(err))
                 return
 
+        # follow the status changes of the jobs rather than polling every task
+        jobs_registry = getRegistry("jobs")
+        jobs_registry.addStatusListener(self._jobStatusChanged)
+
         logger.debug("Entering main loop")
 
+        last_full_update = 0
+
         # Main loop
         while self._main_thread is not None and not self._main_thread.should_stop():
 
-            # If monitoring is enabled (or forced for Tasks) loop over each one and update
+            # If monitoring is enabled (or forced for Tasks) loop over the tasks which need it and update
             if (config['ForceTaskMonitoring'] or monitoring_component.enabled) and not config['disableTaskMon']:
-                for tid in self.ids():
+
+                self._jobs_changed.clear()
+                with self._changed_lock:
+                    changed_job_ids, self._changed_job_ids = self._changed_job_ids, set()
+
+                full_update = time.time() - last_full_update >= config['TaskFullUpdateFrequency']
+                if full_update:
+                    last_full_update = time.time()
+
+                for tid in self._tasksToUpdate(changed_job_ids, full_update):
 
                     logger.debug("Running over tid: %s" % str(tid))
 
@@ -107,11 +130,72 @@ class TaskRegistry(Registry):
 
             logger.debug("TaskRegistry Sleeping for: %s seconds" % str(config['TaskLoopFrequency']))
 
-            # Sleep interruptible for 10 seconds
-            for i in range(0, int(config['TaskLoopFrequency'] * 100)):
-                if self._main_thread.should_stop():
+            # Sleep interruptible until a job changes status or the loop frequency has passed
+            wake_time = time.time() + config['TaskLoopFrequency']
+            while time.time() < wake_time and not self._main_thread.should_stop():
+                if self._jobs_changed.wait(0.1):
                     break
-                time.sleep(0.01)
+
+        jobs_registry.removeStatusListener(self._jobStatusChanged)
+
+    def _jobStatusChanged(self, job_id):
+        """ Called by the job registry when the status of a job or one of its subjobs changes """
+        with self._changed_lock:
+            self._changed_job_ids.add(job_id)
+        self._jobs_changed.set()
+
+    def wakeUp(self):
+        """ Run the Tasks loop now rather than waiting for TaskLoopFrequency, e.g. when a transform is started """
+        self._jobs_changed.set()
+
+    def _tasksToUpdate(self, changed_job_ids, full_update=False):
+        """
+        Return the ids of the tasks which need updating: the ones with an active job whose status changed and the
+        running ones with units waiting to submit a job. Every task is updated when full_update is set
+        Args:
+            changed_job_ids (set): ids of the jobs whose status changed since the last update
+            full_update (bool): update all of the tasks
+        """
+        rebuild = full_update or any(jid not in self._job_tasks for jid in changed_job_ids)
+        if rebuild:
+            self._job_tasks = {}
+
+        task_ids = set()
+        for tid in self.ids():
+            try:
+                task = self[tid]
+                if rebuild:
+                    for trf in task.transforms:
+                        for unit in trf.units:
+                            for jid in unit.active_job_ids:
+                                self._job_tasks[jid] = tid
+                if full_update or self._isWaiting(task):
+                    task_ids.add(tid)
+            except Exception as err:
+                logger.debug("Cannot check task %s: %s" % (tid, err))
+                task_ids.add(tid)
+
+        for jid in changed_job_ids:
+            # remember the jobs which don't belong to a task so that they don't cause a rebuild every time
+            tid = self._job_tasks.setdefault(jid, None)
+            if tid is not None:
+                task_ids.add(tid)
+        return sorted(task_ids)
+
+    @staticmethod
+    def _isWaiting(task):
+        """ Whether a task has a running transform with no units yet or with units waiting to submit a job """
+        if task.status in ["new", "pause", "completed"]:
+            return False
+        for trf in task.transforms:
+            if trf.status != "running":
+                continue
+            if len(trf.units) == 0:
+                return True
+            for unit in trf.units:
+                if unit.active and unit.status not in ["completed", "recreating"] and len(unit.active_job_ids) == 0:
+                    return True
+        return False
 
     def startup(self):
         """ Start a background thread that periodically run()s"""
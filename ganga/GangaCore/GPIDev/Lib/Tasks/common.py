@@ -6,6 +6,22 @@ def getJobByID(this_id):
     """returns proxied job according to this_id"""
     return getObjectByID(this_id, 'jobs')
 
+def getJobStatus(this_id):
+    """returns the status of the job with this_id without loading it from disk"""
+    from GangaCore.Core.GangaRepository import getRegistry
+    from GangaCore.GPIDev.Lib.Job.Job import lazyLoadJobStatus
+    return lazyLoadJobStatus(getRegistry('jobs')[this_id])
+
+def getJobStatusCounts(this_id):
+    """returns a Counter of the status of the subjobs of the job with this_id, or of the job itself if it has no subjobs"""
+    from GangaCore.Core.GangaRepository import getRegistry
+    return getRegistry('jobs').getJobStatusCounts(this_id)
+
+def getJobStatusGeneration():
+    """returns a number which changes whenever the status of any job changes"""
+    from GangaCore.Core.GangaRepository import getRegistry
+    return getRegistry('jobs').status_generation
+
 def getObjectByID(this_id, reg_name):
     """returns proxies object from a repo based upon it's ID"""
     from GangaCore.Core.GangaRepository import getRegistryProxy
@@ -3,6 +3,8 @@ import time
 import os
 import re
 import os.path
+import threading
+from contextlib import contextmanager
 
 import GangaCore.Utility.logging
 import GangaCore.Utility.Config
@@ -51,6 +53,31 @@ def shell_cmd(cmd, soutfile=None, allowed_exit=[0]):
     return rc, soutfile, m is None
 
 
+def query_queue(config):
+    """Run the queue query of a batch system once and return a dict of the batch id to the queue status of each job.
+    Returns None if no query is configured or it failed, in which case the status file of each job has to be read.
+    Args:
+        config (PackageConfig): The config of the batch system
+    """
+    if not config['queue_query_str']:
+        return None
+    rc, soutfile, ef = shell_cmd(config['queue_query_str'])
+    try:
+        with open(soutfile) as sout_file:
+            sout = sout_file.read()
+    finally:
+        if os.path.exists(soutfile):
+            os.remove(soutfile)
+    if rc != 0 or not ef:
+        logger.debug('Queue query failed, reading the status file of every job instead:\n%s', sout)
+        return None
+    pattern = re.compile(config['queue_query_res_pattern'], re.M)
+    return dict((m.group('id'), m.group('status')) for m in pattern.finditer(sout))
+
+# The result of the queue query for each batch system, made by the monitoring loop running in this thread
+_queue_snapshots = threading.local()
+
+
 class Batch(IBackend):
 
     """ Batch submission backend.
@@ -486,6 +513,19 @@ class Batch(IBackend):
 
         return job.getInputWorkspace().writefile(FileBuffer('__jobscript__', text), executable=1)
 
+    @staticmethod
+    @contextmanager
+    def monitoringCycle(jobs):
+        """Query each batch system's queue once for all of the jobs and subjobs being monitored in this loop,
+        rather than once for every bunch of jobs"""
+        from GangaCore.Utility.Config import getConfig
+        _queue_snapshots.states = dict((backend_name, query_queue(getConfig(backend_name)))
+                                       for backend_name in set(getName(j.backend) for j in jobs))
+        try:
+            yield
+        finally:
+            del _queue_snapshots.states
+
     @staticmethod
     def updateMonitoringInformation(jobs):
         global re
@@ -542,8 +582,24 @@ class Batch(IBackend):
             return pid, queue, actualCE, exitcode
 
         from GangaCore.Utility.Config import getConfig
+        # Use the queue query made for this monitoring loop, only querying here when called on our own
+        queue_snapshots = dict(getattr(_queue_snapshots, 'states', {}))
         for j in jobs:
             stripProxy(j)._getSessionLock()
+            backend_name = getName(j.backend)
+            config = getConfig(backend_name)
+            if backend_name not in queue_snapshots:
+                queue_snapshots[backend_name] = query_queue(config)
+            queue_states = queue_snapshots[backend_name]
+
+            if queue_states is not None:
+                queue_status = queue_states.get(str(j.backend.id))
+                if queue_status in config['queue_pending_states']:
+                    continue
+                if queue_status in config['queue_running_states'] and j.status == 'running':
+                    continue
+                # The job has started or left the queue so check its status file
+
             outw = j.getOutputWorkspace()
 
             statusfile = os.path.join(outw.getPath(), '__jobstatus__')
@@ -574,7 +630,6 @@ class Batch(IBackend):
                 else:
                     # Job is still running. Check if alive
                     time = get_last_alive(heartbeatfile)
-                    config = getConfig(getName(j.backend))
                     if time > config['timeout']:
                         logger.warning(
                             'Job %s has disappeared from the batch system.', str(j.getFQID('.')))
@@ -54,11 +54,19 @@ def get_lcg_output_downloader():
 
         number_of_threads = config['OutputDownloaderThread']
 
-        _lcg_output_downloader = LCGOutputDownloader(numThread=number_of_threads)
+        _lcg_output_downloader = LCGOutputDownloader(numThread=number_of_threads, maxPerCE=config['OutputDownloaderPerCE'])
         _lcg_output_downloader.start()
 
     return _lcg_output_downloader
 
+
+def stop_lcg_output_downloader():
+    """
+    Stops starting LCG output downloads and closes their journal, the queued downloads are resumed by the next session
+    """
+    if _lcg_output_downloader:
+        _lcg_output_downloader.stop()
+
 # helper routines
 
 
@@ -1619,6 +1627,9 @@ sys.exit(0)
     def updateMonitoringInformation(jobs):
         """Monitoring loop for normal jobs"""
 
+        # resume the downloads left unfinished by the last session
+        get_lcg_output_downloader()
+
         jobdict = dict([(job.backend.id, job) for job in jobs if job.backend.id])
 
         # Group jobs by the backend's credential requirements
@@ -1683,6 +1694,9 @@ sys.exit(0)
     def master_bulk_updateMonitoringInformation(jobs):
         '''Monitoring loop for glite bulk jobs'''
 
+        # resume the downloads left unfinished by the last session
+        get_lcg_output_downloader()
+
         # split up the master job into several LCG bulk job ids
         # - checking subjob status and excluding the master jobs with all subjobs in a final state)
         # - excluding the resubmitted jobs
@@ -1,5 +1,13 @@
+import os
+import json
+import time
+import threading
+from collections import Counter, OrderedDict
+
 from GangaCore.Utility.logging import getLogger
-from GangaCore.Core.GangaThread.MTRunner import MTRunner, Data, Algorithm
+from GangaCore.Utility.files import expandfilename
+from GangaCore.Core.GangaThread.WorkerThreads import getQueues
+from GangaCore.GPIDev.Base.Proxy import stripProxy
 from GangaCore.Lib.LCG import Grid
 
 logger = getLogger()
@@ -11,10 +19,11 @@ class LCGOutputDownloadTask(object):
     Class for defining a data object for each output downloading task.
     """
 
-    _attributes = ('gridObj', 'jobObj')
+    _attributes = ('jobObj', 'resumed')
 
-    def __init__(self, jobObj):
+    def __init__(self, jobObj, resumed=False):
         self.jobObj = jobObj
+        self.resumed = resumed
 
     def __eq__(self, other):
         """
@@ -25,6 +34,9 @@ class LCGOutputDownloadTask(object):
         else:
             return False
 
+    def __hash__(self):
+        return hash(self.jobObj.getFQID('.'))
+
     def __str__(self):
         """
         represents the task by the job object
@@ -32,7 +44,21 @@ class LCGOutputDownloadTask(object):
         return 'downloading task for job %s' % self.jobObj.getFQID('.')
 
 
-class LCGOutputDownloadAlgorithm(Algorithm):
+def _outputSize(path):
+    """
+    Returns the total size in bytes of the files under path
+    """
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
+
+
+class LCGOutputDownloadAlgorithm(object):
 
     """
     Class for implementing the logic of each downloading task.
@@ -40,7 +66,7 @@ class LCGOutputDownloadAlgorithm(Algorithm):
 
     def process(self, item):
         """
-        downloads output of one LCG job 
+        downloads output of one LCG job and returns the number of bytes in its output directory afterwards
         """
 
         pps_check = (True, None)
@@ -49,17 +75,19 @@ class LCGOutputDownloadAlgorithm(Algorithm):
 
         # it is very likely that the job's downloading task has been
         # created and assigned in a previous monitoring loop
-        # ignore such kind of cases
-        if job.status in ['completing', 'completed', 'failed']:
-            return True
+        # ignore such kind of cases, unless the download was left unfinished
+        # by the last session
+        if job.status in ['completed', 'failed'] or (job.status == 'completing' and not item.resumed):
+            return 0
 
         # it can also happen that the job was killed/removed by user between
         # the downloading task was created in queue and being taken by one of
         # the downloading thread. Ignore suck kind of cases
         if job.status in ['removed', 'killed']:
-            return True
+            return 0
 
-        job.updateStatus('completing')
+        if job.status != 'completing':
+            job.updateStatus('completing')
         outw = job.getOutputWorkspace()
 
         pps_check = Grid.get_output(job.backend.id, outw.getPath(), job.backend.credential_requirements)
@@ -81,35 +109,295 @@ class LCGOutputDownloadAlgorithm(Algorithm):
         if job.master:
             job.master.updateMasterJobStatus()
 
-        self.__appendResult__(job.getFQID('.'), True)
+        return _outputSize(outw.getPath())
 
-        return True
 
+def _jobCE(job):
+    """
+    Returns the CE the job ran on, or the one it was sent to if that isn't known
+    """
+    return getattr(job.backend, 'actualCE', '') or getattr(job.backend, 'CE', '') or ''
 
-class LCGOutputDownloader(MTRunner):
 
+def _findJob(fqid):
     """
-    Class for managing the LCG output downloading activities based on MTRunner.
+    Returns the job or subjob with the given FQID, or None if it no longer exists
     """
+    from GangaCore.Core.GangaRepository import getRegistrySlice
+    try:
+        return stripProxy(getRegistrySlice('jobs')(fqid))
+    except Exception as err:
+        logger.debug('Cannot find job %s to download its output: %s' % (fqid, err))
+        return None
 
-    def __init__(self, numThread=10):
 
-        MTRunner.__init__(self, name='lcg_output_downloader', data=Data(
-            collection=[]), algorithm=LCGOutputDownloadAlgorithm())
+class LCGOutputDownloader(object):
 
-        self.keepAlive = True
-        self.numThread = numThread
+    """
+    Class for managing the LCG output downloading activities on the monitoring worker thread pool.
 
-    def countAliveAgent(self):
+    At most numThread downloads run at once, and at most maxPerCE of them for jobs which ran on the same CE. As the
+    downloads block the threads they run on, they never take more than half of the threads of the pool so that the
+    other monitoring tasks, like the finalisation of DIRAC jobs, still get to run.
+    The jobs waiting for their output are recorded in a journal file so that the downloads which were still
+    queued or running when Ganga exited are resumed by the next session.
+    """
 
-        return self.__cnt_alive_threads__()
+    def __init__(self, numThread=10, maxPerCE=0, journal=None, pool=None):
+        """
+        Args:
+            numThread (int): The maximum number of downloads running at once
+            maxPerCE (int): The maximum number of downloads running at once for jobs from the same CE, 0 for no limit
+            journal (str): The file to record the queued downloads in, lcg_output_downloads in the workspace by default
+            pool (WorkerThreadPool): The pool to run the downloads on, the monitoring thread pool by default
+        """
+        if journal is None:
+            from GangaCore.Core.FileWorkspace import gettop
+            journal = os.path.join(expandfilename(gettop()), 'lcg_output_downloads')
+        self.numThread = max(1, numThread)
+        self.maxPerCE = maxPerCE
+        self.journal = journal
+        self.algorithm = LCGOutputDownloadAlgorithm()
+        self._pool = pool
+        self._lock = threading.RLock()
+        # CE -> FQIDs of the jobs waiting for a download slot, in the order they were added
+        self._queued = OrderedDict()
+        # FQID -> CE of the jobs which are queued or being downloaded
+        self._ces = {}
+        # FQID -> job, for the jobs added in this session
+        self._jobs = {}
+        # FQIDs of the jobs resumed from the journal
+        self._resumed = set()
+        self._running = set()
+        self._running_per_ce = Counter()
+        self._bytes = Counter()
+        self._seconds = Counter()
+        self._downloads = Counter()
+        self._journal_file = None
+        self._started = False
+
+    def _getPool(self):
+        if self._pool is not None:
+            return self._pool
+        queues = getQueues()
+        if queues is None:
+            return None
+        return queues._monitoring_threadpool
+
+    def _maxRunning(self, pool):
+        """
+        Returns the number of downloads which can run on the pool at once
+        """
+        return max(1, min(self.numThread, len(pool.worker_status()) // 2))
 
-    def addTask(self, job):
+    def _readJournal(self):
+        """
+        Returns an OrderedDict of FQID -> CE of the jobs added to the journal and not yet downloaded
+        """
+        pending = OrderedDict()
+        if not os.path.exists(self.journal):
+            return pending
+        try:
+            with open(self.journal) as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # the end of a line which was being written when Ganga stopped
+                        continue
+                    if entry[0] == '+':
+                        pending[entry[1]] = entry[2]
+                    elif entry[0] == '-':
+                        pending.pop(entry[1], None)
+        except (IOError, OSError) as err:
+            logger.warning('Cannot read the LCG output download journal %s: %s' % (self.journal, err))
+        return pending
+
+    def _writeJournal(self, *entry):
+        """
+        Appends an entry to the journal, ('+', FQID, CE) for a job to download or ('-', FQID) for one which is done
+        """
+        try:
+            if not self._started:
+                # a download which finished after the downloader was stopped, don't keep the journal open
+                with open(self.journal, 'a') as journal:
+                    journal.write(json.dumps(entry) + '\n')
+                return
+            if self._journal_file is None:
+                self._journal_file = open(self.journal, 'a')
+            self._journal_file.write(json.dumps(entry) + '\n')
+            self._journal_file.flush()
+        except (IOError, OSError) as err:
+            logger.debug('Cannot write the LCG output download journal %s: %s' % (self.journal, err))
+
+    def _compactJournal(self, pending):
+        """
+        Replaces the journal with one listing only the pending downloads
+        """
+        journal_dir = os.path.dirname(self.journal)
+        try:
+            if journal_dir and not os.path.isdir(journal_dir):
+                os.makedirs(journal_dir)
+            tmp_journal = self.journal + '.tmp'
+            with open(tmp_journal, 'w') as journal:
+                for fqid, ce in pending.items():
+                    journal.write(json.dumps(('+', fqid, ce)) + '\n')
+            os.rename(tmp_journal, self.journal)
+        except (IOError, OSError) as err:
+            logger.warning('Cannot write the LCG output download journal %s: %s' % (self.journal, err))
+
+    def start(self):
+        """
+        Queues the downloads left in the journal by the last session
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            pending = self._readJournal()
+            self._compactJournal(pending)
+            for fqid, ce in pending.items():
+                self._queue(fqid, ce)
+                self._resumed.add(fqid)
+        if pending:
+            logger.info('Resuming the output download of %d LCG jobs' % len(pending))
+        self._schedule()
+
+    def stop(self):
+        """
+        Stops starting new downloads. The queued ones are kept in the journal for the next session
+        """
+        with self._lock:
+            self._started = False
+            for fqids in self._queued.values():
+                for fqid in fqids:
+                    self._ces.pop(fqid, None)
+                    self._jobs.pop(fqid, None)
+                    self._resumed.discard(fqid)
+            self._queued.clear()
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+
+    def _queue(self, fqid, ce):
+        self._ces[fqid] = ce
+        self._queued.setdefault(ce, OrderedDict())[fqid] = None
 
-        task = LCGOutputDownloadTask(job)
+    def addTask(self, job):
+        """
+        Queues the download of the output of the job, unless it is already queued or being downloaded
+        """
+        fqid = job.getFQID('.')
+        with self._lock:
+            if fqid in self._ces:
+                return True
+            ce = _jobCE(job)
+            self._queue(fqid, ce)
+            self._jobs[fqid] = job
+            self._writeJournal('+', fqid, ce)
 
-        logger.debug('add output downloading task: job %s' % job.getFQID('.'))
+        logger.debug('add output downloading task: job %s' % fqid)
 
-        self.addDataItem(task)
+        self._schedule()
 
         return True
+
+    def _schedule(self):
+        """
+        Starts downloads on the thread pool while there are free slots, taking a job from each CE in turn
+        """
+        pool = self._getPool()
+        if pool is None:
+            # the queues aren't running, the downloads are started by the next call
+            return
+        max_running = self._maxRunning(pool)
+        to_start = []
+        with self._lock:
+            if not self._started:
+                return
+            while self._queued and len(self._running) < max_running:
+                started = False
+                for ce in list(self._queued):
+                    if len(self._running) >= max_running:
+                        break
+                    if self.maxPerCE and self._running_per_ce[ce] >= self.maxPerCE:
+                        continue
+                    fqids = self._queued[ce]
+                    fqid = next(iter(fqids))
+                    del fqids[fqid]
+                    if not fqids:
+                        del self._queued[ce]
+                    self._running.add(fqid)
+                    self._running_per_ce[ce] += 1
+                    to_start.append(fqid)
+                    started = True
+                if not started:
+                    break
+
+        for fqid in to_start:
+            if pool.add_function(self._download, (fqid,), priority=7, name='LCG output download') is None:
+                # the pool is frozen as Ganga is stopping, leave the job in the journal for the next session
+                with self._lock:
+                    self._finished(fqid)
+
+    def _finished(self, fqid):
+        ce = self._ces.pop(fqid, '')
+        self._running.discard(fqid)
+        self._running_per_ce[ce] -= 1
+        if self._running_per_ce[ce] <= 0:
+            del self._running_per_ce[ce]
+        self._jobs.pop(fqid, None)
+        self._resumed.discard(fqid)
+        return ce
+
+    def _download(self, fqid):
+        """
+        Downloads the output of the job with the given FQID in a worker thread
+        """
+        start_time = time.time()
+        size = 0
+        try:
+            with self._lock:
+                job = self._jobs.get(fqid)
+                resumed = fqid in self._resumed
+            if job is None:
+                job = _findJob(fqid)
+            if job is not None:
+                size = self.algorithm.process(LCGOutputDownloadTask(job, resumed))
+        except Exception as err:
+            logger.error('Error downloading the output of job %s: %s' % (fqid, err))
+        finally:
+            elapsed = time.time() - start_time
+            with self._lock:
+                ce = self._finished(fqid)
+                self._bytes[ce] += size
+                self._seconds[ce] += elapsed
+                self._downloads[ce] += 1
+                self._writeJournal('-', fqid)
+            if size:
+                logger.debug('downloaded %d bytes of output of job %s from %s in %.1f s' % (size, fqid, ce or 'unknown CE', elapsed))
+            self._schedule()
+
+    def countAliveAgent(self):
+        """
+        Returns the number of downloads running
+        """
+        with self._lock:
+            return len(self._running)
+
+    def getStatistics(self):
+        """
+        Returns a dict of the number of downloads queued and running, and for each CE the number of downloads done,
+        the bytes downloaded, the time spent downloading and the average rate in bytes/s
+        """
+        with self._lock:
+            per_ce = {}
+            for ce in self._downloads:
+                seconds = self._seconds[ce]
+                per_ce[ce] = {'downloads': self._downloads[ce],
+                              'bytes': self._bytes[ce],
+                              'seconds': seconds,
+                              'rate': self._bytes[ce] / seconds if seconds > 0 else 0.}
+            return {'queued': sum(len(fqids) for fqids in self._queued.values()),
+                    'running': len(self._running),
+                    'CEs': per_ce}
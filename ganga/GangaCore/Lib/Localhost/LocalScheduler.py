@@ -0,0 +1,223 @@
+import os
+import time
+import subprocess
+import threading
+import collections
+
+import GangaCore.Utility.logging
+import GangaCore.Utility.Config
+
+logger = GangaCore.Utility.logging.getLogger()
+config = GangaCore.Utility.Config.getConfig('Local')
+
+
+def available_memory():
+    """Return the memory available for new processes on this host in MB, or None if it can't be found"""
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except (IOError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _alive(pid):
+    """Whether a process with this pid exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LocalScheduler(object):
+    """
+    Limits the number of Localhost job wrapper scripts running at once on this host.
+
+    A job is only started when there is a free slot; the number of slots is Local.max_concurrent_jobs, with no limit
+    when that is 0, and a new job is not started while the available memory is below Local.min_free_memory unless
+    nothing is running. The wrapper scripts still running from an earlier session take up a slot once the monitoring
+    has found them. Jobs waiting for a slot are started in turn as soon as one is free, whether or not the monitoring
+    is running. The scheduler keeps the processes it started so that their completion is found by waiting on them
+    rather than by reading the status files.
+    """
+
+    # How often to look for a free slot while jobs are waiting for one, in seconds
+    poll_interval = 1.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # wrapper pid -> Popen of the running wrapper scripts
+        self._running = {}
+        # wrapper pid -> return code of the wrapper scripts which have exited but not yet been seen by the monitoring
+        self._exited = {}
+        # pids of the wrapper scripts started by an earlier session which are still running
+        self._adopted = set()
+        # key -> (args, on_start) of the wrapper scripts waiting for a slot, in the order they were queued
+        self._pending = collections.OrderedDict()
+        # key -> Popen of the waiting wrapper scripts which have been started but not yet claimed by their job
+        self._unclaimed = {}
+        self._watcher = None
+
+    def max_jobs(self):
+        return config['max_concurrent_jobs']
+
+    def _reap(self):
+        """Find the wrapper scripts which have exited and start the waiting ones in the slots they free"""
+        for pid, process in list(self._running.items()):
+            if process.poll() is not None:
+                self._exited[pid] = self._running.pop(pid).returncode
+        for pid in list(self._adopted):
+            if not _alive(pid):
+                self._adopted.discard(pid)
+        return self._start_pending()
+
+    def _has_free_slot(self):
+        running = len(self._running) + len(self._adopted)
+        max_jobs = self.max_jobs()
+        if max_jobs and running >= max_jobs:
+            return False
+        min_free_memory = config['min_free_memory']
+        if min_free_memory and running:
+            free_memory = available_memory()
+            if free_memory is not None and free_memory < min_free_memory:
+                logger.debug('Only %sMB of memory available, not starting any more local jobs', free_memory)
+                return False
+        return True
+
+    def _popen(self, args):
+        process = subprocess.Popen(args, stdin=subprocess.DEVNULL)
+        self._running[process.pid] = process
+        return process
+
+    def _start_pending(self):
+        """Start the waiting wrapper scripts while there are free slots and return a list of (key, process, on_start)"""
+        started = []
+        while self._pending and self._has_free_slot():
+            key, (args, on_start) = self._pending.popitem(last=False)
+            try:
+                process = self._popen(args)
+            except OSError as err:
+                logger.error('cannot start a job process: %s', str(err))
+                continue
+            self._unclaimed[key] = process
+            started.append((key, process, on_start))
+        return started
+
+    @staticmethod
+    def _notify(started):
+        """
+        Tell the owners of the waiting wrapper scripts which have been started, outside of the lock. This may be done
+        from the watcher thread so the job itself is only updated once it claims the process
+        """
+        for key, process, on_start in started:
+            try:
+                on_start(process)
+            except Exception as err:
+                logger.error('Error recording the start of local job %s: %s', key, str(err))
+
+    def _watch(self):
+        """Start the waiting wrapper scripts as slots are freed until none are left waiting"""
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                started = self._reap()
+                finished = not self._pending
+                if finished:
+                    self._watcher = None
+            self._notify(started)
+            if finished:
+                return
+
+    def start(self, args, wait_for_slot=False, key=None, on_start=None):
+        """
+        Start a job wrapper script and return its process
+        Args:
+            args (list): The command line of the wrapper script
+            wait_for_slot (bool): If True, return None rather than starting the script when there is no free slot
+            key (str): Identifies the job when waiting for a slot, it is only queued once and can be cancelled by this
+            on_start (callable): Queue the script to be started once there is a free slot, calling this with its
+                                 process when it is. Asking again with the same key returns the process once started
+        """
+        with self._lock:
+            started = self._reap()
+            process = self._unclaimed.pop(key, None) if key is not None else None
+            if process is None:
+                if wait_for_slot and (key in self._pending or not self._has_free_slot()):
+                    if on_start is not None and key not in self._pending:
+                        self._pending[key] = (args, on_start)
+                        if self._watcher is None:
+                            self._watcher = threading.Thread(target=self._watch, name='LocalScheduler')
+                            self._watcher.daemon = True
+                            self._watcher.start()
+                else:
+                    process = self._popen(args)
+        self._notify([this for this in started if this[0] != key or key is None])
+        return process
+
+    def cancel(self, key):
+        """Stop waiting to start the wrapper script queued with this key, returns whether it was waiting"""
+        with self._lock:
+            return self._pending.pop(key, None) is not None
+
+    def claim(self, key):
+        """Return the process of the wrapper script queued with this key if it has been started since, only once"""
+        with self._lock:
+            return self._unclaimed.pop(key, None)
+
+    def clear_pending(self):
+        """Stop waiting to start any wrapper script, e.g. when Ganga exits. The next session starts them instead"""
+        with self._lock:
+            self._pending.clear()
+
+    def adopt(self, pid):
+        """Count a wrapper script still running from an earlier session against the slots until it exits"""
+        with self._lock:
+            if pid > 0 and pid not in self._running and pid not in self._exited and _alive(pid):
+                self._adopted.add(pid)
+
+    def owns(self, pid):
+        """Whether the wrapper script with this pid was started by this scheduler and hasn't been forgotten"""
+        with self._lock:
+            return pid in self._running or pid in self._exited
+
+    def poll(self, pid):
+        """Return the return code of the wrapper script with this pid, or None if it is still running"""
+        with self._lock:
+            started = self._reap()
+            returncode = self._exited.get(pid)
+        self._notify(started)
+        return returncode
+
+    def wait(self, pid):
+        """Wait for the wrapper script with this pid to exit, e.g. after it has been killed, and return its return code"""
+        with self._lock:
+            process = self._running.pop(pid, None)
+        if process is not None:
+            returncode = process.wait()
+            with self._lock:
+                self._exited[pid] = returncode
+        return self.poll(pid)
+
+    def forget(self, pid):
+        """Stop tracking a wrapper script once its job has finished, freeing its place"""
+        with self._lock:
+            self._running.pop(pid, None)
+            self._exited.pop(pid, None)
+            self._adopted.discard(pid)
+            started = self._start_pending()
+        self._notify(started)
+
+    def numRunning(self):
+        with self._lock:
+            started = self._reap()
+            running = len(self._running) + len(self._adopted)
+        self._notify(started)
+        return running
+
+
+local_scheduler = LocalScheduler()
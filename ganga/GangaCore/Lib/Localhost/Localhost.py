@@ -8,6 +8,7 @@ from GangaCore.GPIDev.Lib.File import FileBuffer
 
 import os
 import os.path
+import functools
 import re
 import errno
 
@@ -24,14 +25,44 @@ import GangaCore.Utility.Virtualization
 
 from GangaCore.GPIDev.Base.Proxy import getName, stripProxy
 
+from GangaCore.Lib.Localhost.LocalScheduler import local_scheduler
+
 logger = GangaCore.Utility.logging.getLogger()
 config = GangaCore.Utility.Config.getConfig('Local')
 
+
+def _write_started(pidfile, process):
+    """Record the pid and host of a wrapper script started from the queue next to it in the job's input workspace"""
+    with open(pidfile, 'w') as f:
+        f.write('%d %s\n' % (process.pid, GangaCore.Utility.util.hostname()))
+
+
+def _read_started(pidfile):
+    """Return the (pid, host) recorded by _write_started, or None if the wrapper script hasn't been started"""
+    try:
+        with open(pidfile) as f:
+            pid, host = f.read().split()
+        return int(pid), host
+    except (IOError, ValueError):
+        return None
+
+
+def _remove_started(pidfile):
+    try:
+        os.remove(pidfile)
+    except OSError as x:
+        if x.errno != errno.ENOENT:
+            raise
+
+
 class Localhost(IBackend):
 
     """Run jobs in the background on local host.
 
     The job is run in the workdir (usually in /tmp).
+
+    At most [Local]max_concurrent_jobs jobs run at once when that is set. Jobs which can't start straight away stay
+    in the submitted state and are started as soon as a slot is free.
     """
     _schema = Schema(Version(1, 2), {'id': SimpleItem(defvalue=-1, protected=1, copyable=0, doc='Process id.'),
                                      'status': SimpleItem(defvalue=None, typelist=[None, str], protected=1, copyable=0, hidden=1, doc='*NOT USED*'),
@@ -54,8 +85,9 @@ class Localhost(IBackend):
 
     def submit(self, jobconfig, master_input_sandbox):
         prepared = self.preparejob(jobconfig, master_input_sandbox)
-        self.run(prepared)
-        return 1
+        self.wrapper_pid = -1
+        _remove_started(self._startedPath())
+        return self.run(prepared, wait_for_slot=True)
 
     def resubmit(self):
         job = self.getJobObject()
@@ -78,17 +110,58 @@ class Localhost(IBackend):
             if not os.path.isdir(self.workdir):
                 logger.error('cannot make the workdir %s, %s', self.workdir, str(x))
                 return 0
-        return self.run(job.getInputWorkspace().getPath('__jobscript__'))
+        self.wrapper_pid = -1
+        _remove_started(self._startedPath())
+        return self.run(job.getInputWorkspace().getPath('__jobscript__'), wait_for_slot=True)
 
-    def run(self, scriptpath):
+    def run(self, scriptpath, wait_for_slot=False):
+        """
+        Start the job wrapper script
+        Args:
+            scriptpath (str): The path of the wrapper script
+            wait_for_slot (bool): If there is no free slot leave the job waiting to be started by the monitoring
+        """
+        fqid = self.getJobObject().getFQID('.')
+        on_start = functools.partial(_write_started, self._startedPath())
         try:
-            process = subprocess.Popen(["python2", scriptpath, 'subprocess'], stdin=subprocess.DEVNULL)
+            process = local_scheduler.start(["python2", scriptpath, 'subprocess'], wait_for_slot, key=fqid, on_start=on_start)
         except OSError as x:
             logger.error('cannot start a job process: %s', str(x))
             return 0
+        if process is None:
+            logger.debug('No free slot for job %s, it will be started once one is free', fqid)
+            return 1
+        self._started(process)
+        return 1
+
+    def _started(self, process):
+        """
+        Record the wrapper script of the job once it has been started
+        Args:
+            process (Popen): The process of the wrapper script
+        """
         self.wrapper_pid = process.pid
         self.actualCE = GangaCore.Utility.util.hostname()
-        return 1
+
+    def _startedPath(self):
+        return self.getJobObject().getInputWorkspace().getPath('__wrapperpid__')
+
+    def _claimStarted(self):
+        """
+        Record the wrapper script of a job waiting for a slot if it has been started since, returns whether it has.
+        The scripts started from the queue only have their pid written to the input workspace, which also tells a
+        later session not to start them again, so the job is updated here by the thread holding it rather than by
+        the scheduler
+        """
+        process = local_scheduler.claim(self.getJobObject().getFQID('.'))
+        if process is not None:
+            self._started(process)
+            return True
+        started = _read_started(self._startedPath())
+        if started is None:
+            return False
+        self.wrapper_pid, self.actualCE = started
+        return True
 
     def peek(self, filename="", command=""):
         """
@@ -258,6 +331,11 @@ class Localhost(IBackend):
 
         job = self.getJobObject()
 
+        if self.wrapper_pid == -1 and (local_scheduler.cancel(job.getFQID('.')) or not self._claimStarted()):
+            # The job was still waiting for a slot so there is nothing running
+            self.remove_workdir()
+            return 1
+
         ok = True
         try:
             # kill the wrapper script
@@ -269,10 +347,14 @@ class Localhost(IBackend):
             ok = False
 
         # waitpid to avoid zombies
-        try:
-            ws = os.waitpid(self.wrapper_pid, 0)
-        except OSError as x:
-            logger.warning('problem while waitpid %s: %s', job.getFQID('.'), x)
+        if local_scheduler.owns(self.wrapper_pid):
+            local_scheduler.wait(self.wrapper_pid)
+            local_scheduler.forget(self.wrapper_pid)
+        else:
+            try:
+                ws = os.waitpid(self.wrapper_pid, 0)
+            except OSError as x:
+                logger.warning('problem while waitpid %s: %s', job.getFQID('.'), x)
 
         from GangaCore.Utility.files import recursive_copy
 
@@ -325,6 +407,21 @@ class Localhost(IBackend):
         logger.debug('local ping: %s', str(jobs))
 
         for j in jobs:
+            backend = stripProxy(j.backend)
+
+            if j.status == 'submitted' and backend.wrapper_pid == -1:
+                # Still waiting for a slot unless it was started since the last update
+                if not backend._claimStarted() and not backend.run(j.getInputWorkspace().getPath('__jobscript__'), wait_for_slot=True):
+                    j.updateStatus('failed')
+                continue
+
+            # The wrapper scripts started in this session are waited on so only look at the status file once they
+            # have exited, or to find the pid of the application once they have started
+            owned = local_scheduler.owns(backend.wrapper_pid)
+            wrapper_exitcode = local_scheduler.poll(backend.wrapper_pid) if owned else None
+            if owned and wrapper_exitcode is None and j.status == 'running':
+                continue
+
             outw = j.getOutputWorkspace()
 
             # try to get the application exit code from the status file
@@ -350,18 +447,24 @@ class Localhost(IBackend):
 
             # check if the exit code of the wrapper script is available (non-blocking check)
             # if the wrapper script exited with non zero this is an error
-            try:
-                ws = os.waitpid(stripProxy(j.backend).wrapper_pid, os.WNOHANG)
-                if not GangaCore.Utility.logic.implies(ws[0] != 0, ws[1] == 0):
-                    # FIXME: for some strange reason the logger DOES NOT LOG (checked in python 2.3 and 2.5)
-                    # print 'logger problem', logger.name
-                    # print 'logger',logger.getEffectiveLevel()
-                    logger.critical('wrapper script for job %s exit with code %d', str(j.getFQID('.')), ws[1])
+            if owned:
+                if wrapper_exitcode:
+                    logger.critical('wrapper script for job %s exit with code %d', str(j.getFQID('.')), wrapper_exitcode)
                     logger.critical('report this as a bug at https://github.com/ganga-devs/ganga/issues/')
                     j.updateStatus('failed')
-            except OSError as x:
-                if x.errno != errno.ECHILD:
-                    logger.warning('cannot do waitpid for %d: %s', stripProxy(j.backend).wrapper_pid, str(x))
+            else:
+                try:
+                    ws = os.waitpid(backend.wrapper_pid, os.WNOHANG)
+                    if not GangaCore.Utility.logic.implies(ws[0] != 0, ws[1] == 0):
+                        # FIXME: for some strange reason the logger DOES NOT LOG (checked in python 2.3 and 2.5)
+                        # print 'logger problem', logger.name
+                        # print 'logger',logger.getEffectiveLevel()
+                        logger.critical('wrapper script for job %s exit with code %d', str(j.getFQID('.')), ws[1])
+                        logger.critical('report this as a bug at https://github.com/ganga-devs/ganga/issues/')
+                        j.updateStatus('failed')
+                except OSError as x:
+                    if x.errno != errno.ECHILD:
+                        logger.warning('cannot do waitpid for %d: %s', backend.wrapper_pid, str(x))
 
             # if the exit code was collected for the application get the exit
             # code back
@@ -382,3 +485,10 @@ class Localhost(IBackend):
 
                 j.backend.remove_workdir()
 
+            if j.status in ['completed', 'failed']:
+                # Nothing more is needed from the wrapper script
+                local_scheduler.forget(backend.wrapper_pid)
+            elif not owned:
+                # Left running by an earlier session, it takes up a slot until it exits
+                local_scheduler.adopt(backend.wrapper_pid)
+
@@ -14,12 +14,22 @@ from GangaCore.GPIDev.Adapters.IGangaFile import IGangaFile
 from GangaCore.Utility.Config import ConfigError, getConfig
 from GangaCore.Utility.Plugin import allPlugins
 from GangaCore.Utility.logging import getLogger
+from GangaCore.Utility.files import ParallelGzipWriter, block_size, kernel_copy as _kernel_copy
 import subprocess
 import os
+import io
 import copy
+import shlex
+import gzip
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 logger = getLogger()
 
+# The size of the chunks files are copied and compressed in, this bounds the memory used by a merge
+_merge_block_size = block_size
+
 
 def getMergerObject(file_ext):
     """Returns an instance of the correct merger tool, or None if there is not one"""
@@ -47,6 +57,21 @@ def getMergerObject(file_ext):
     return result
 
 
+def _append_file(file_name, out_file):
+    """Append the contents of a file, which may be gzipped, to out_file in bounded chunks"""
+    if file_name.lower().endswith('.gz'):
+        with gzip.open(file_name, 'rb') as in_file:
+            shutil.copyfileobj(in_file, out_file, _merge_block_size)
+        return
+    # Unbuffered so that the kernel copy and the fallback agree on the position in the file
+    with open(file_name, 'rb', buffering=0) as in_file:
+        if isinstance(out_file, io.BufferedWriter):
+            out_file.flush()
+            if _kernel_copy(in_file.fileno(), out_file.fileno()):
+                return
+        shutil.copyfileobj(in_file, out_file, _merge_block_size)
+
+
 class TextMerger(IMerger):
 
     """Merger class for text
@@ -106,37 +131,61 @@ class TextMerger(IMerger):
     _schema.datadict['compress'] = SimpleItem(
         defvalue=False, doc='Output should be compressed with gzip.')
 
+    def _writePart(self, part_file, file_list, compress, threads, header=b'', footer=b''):
+        """Write the merge of file_list, surrounded by header and footer, to part_file"""
+        with open(part_file, 'wb') as out_file:
+            writer = ParallelGzipWriter(out_file, threads) if compress else out_file
+            try:
+                writer.write(header)
+                for f in file_list:
+                    writer.write(('# Start of file %s #\n' % str(f)).encode('utf-8'))
+                    _append_file(f, writer)
+                    writer.write(b'\n')
+                writer.write(footer)
+            finally:
+                if compress:
+                    writer.close()
+
     def mergefiles(self, file_list, output_file):
 
         import time
 
-        if self.compress or output_file.lower().endswith('.gz'):
-            # use gzip
-            import gzip
-            if not output_file.lower().endswith('.gz'):
-                output_file += '.gz'
-            out_file = gzip.GzipFile(output_file, 'w')
-        else:
-            out_file = open(output_file, 'w')
-
-        out_file.write('# Ganga TextMergeTool - %s #\n' % time.asctime())
-        for f in file_list:
+        compress = self.compress or output_file.lower().endswith('.gz')
+        if compress and not output_file.lower().endswith('.gz'):
+            output_file += '.gz'
 
-            if not f.lower().endswith('.gz'):
-                in_file = open(f)
-            else:
-                import gzip
-                in_file = gzip.GzipFile(f)
+        merge_config = getConfig('Mergers')
+        threads = max(1, merge_config['text_merge_threads'])
+        tree_min_files = merge_config['text_merge_tree_min_files']
 
-            out_file.write('# Start of file %s #\n' % str(f))
-            out_file.write(in_file.read())
-            out_file.write('\n')
+        header = ('# Ganga TextMergeTool - %s #\n' % time.asctime()).encode('utf-8')
+        footer = b'# Ganga Merge Ended Successfully #\n'
 
-            in_file.close()
+        if threads == 1 or not tree_min_files or len(file_list) < tree_min_files:
+            self._writePart(output_file, file_list, compress, threads, header, footer)
+            return
 
-        out_file.write('# Ganga Merge Ended Successfully #\n')
-        out_file.flush()
-        out_file.close()
+        # Merge groups of files at the same time then join the results. Concatenated gzip files are a valid gzip file
+        # so the parts can be joined without decompressing them.
+        group_size = -(-len(file_list) // threads)
+        groups = [file_list[i:i + group_size] for i in range(0, len(file_list), group_size)]
+        part_dir = tempfile.mkdtemp(prefix='.merge_parts_', dir=os.path.dirname(os.path.abspath(output_file)))
+        try:
+            parts = [os.path.join(part_dir, 'part%d' % i) for i in range(len(groups))]
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                merges = [executor.submit(self._writePart, part, group, compress, 1,
+                                          header if i == 0 else b'', footer if i == len(groups) - 1 else b'')
+                          for i, (part, group) in enumerate(zip(parts, groups))]
+                for merge in merges:
+                    merge.result()
+            with open(output_file, 'wb') as out_file:
+                for part in parts:
+                    with open(part, 'rb', buffering=0) as part_file:
+                        out_file.flush()
+                        if not _kernel_copy(part_file.fileno(), out_file.fileno()):
+                            shutil.copyfileobj(part_file, out_file, _merge_block_size)
+        finally:
+            shutil.rmtree(part_dir, ignore_errors=True)
 
 
 class RootMerger(IMerger):
@@ -187,6 +236,13 @@ class RootMerger(IMerger):
     If outputdir is not specified, the default location specfied
     in the [Mergers] section of the .gangarc file will be used.
 
+    No more than root_merge_batch_size files are given to one hadd. When there
+    are more, batches of files are merged by root_merge_processes hadds at once
+    and then the results are merged in the same way. If root_merge_resume is set
+    the intermediate files of a failed merge are kept and those which are still
+    valid are reused when the merge is run again. These options are in the
+    [Mergers] section of the .gangarc file.
+
     """
 
     _category = 'postprocessor'
@@ -195,6 +251,39 @@ class RootMerger(IMerger):
     _schema.datadict['args'] = SimpleItem(defvalue=None, doc='Arguments to be passed to hadd.',
                                           typelist=[str, None])
 
+    def _hadd(self, merge_cmd, output_file, file_list, log):
+        """Run one hadd of file_list into output_file with its output going to the open file log. Returns the command and its return code"""
+        cmd = merge_cmd + ' '.join(shlex.quote(f) for f in [output_file] + list(file_list))
+        log.flush()
+        return cmd, subprocess.call(cmd, shell=True, stdout=log, stderr=subprocess.STDOUT)
+
+    @staticmethod
+    def _fileStamp(path):
+        """Returns a line with the path, size and modification time of a file, to tell whether it has changed"""
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return '%s missing' % path
+        return '%s %d %d' % (path, file_stat.st_size, file_stat.st_mtime_ns)
+
+    def _haddBatch(self, merge_cmd, output_file, file_list, resume):
+        """Run a hadd of one batch of a tree merge, skipping it if it was done by an earlier merge which failed later on
+        and neither its inputs nor its output have changed since. Its output goes to a log file next to output_file.
+        Returns the command and its return code"""
+        done_file = output_file + '.done'
+        inputs = '\n'.join([merge_cmd] + [self._fileStamp(f) for f in file_list])
+        if resume and os.path.exists(done_file) and os.path.exists(output_file):
+            with open(done_file) as done:
+                if done.read() == inputs + '\n' + self._fileStamp(output_file):
+                    logger.debug('Reusing %s from an earlier merge', output_file)
+                    return 'reused %s' % output_file, 0
+        with open(output_file + '.hadd_output', 'w') as log:
+            cmd, rc = self._hadd(merge_cmd, output_file, file_list, log)
+        if rc == 0:
+            with open(done_file, 'w') as done:
+                done.write(inputs + '\n' + self._fileStamp(output_file))
+        return cmd, rc
+
     def mergefiles(self, file_list, output_file):
 
         from GangaCore.Utility.root import getrootprefix, checkrootprefix
@@ -218,22 +307,51 @@ class RootMerger(IMerger):
         if not default_arguments in merge_cmd:
             merge_cmd += ' %s ' % default_arguments
 
-        # add the list of files, output file first
-        arg_list = [output_file]
-        arg_list.extend(file_list)
-        merge_cmd += ' '.join(arg_list)
-
-        rc, out = subprocess.getstatusoutput(merge_cmd)
+        merge_config = getConfig('Mergers')
+        batch_size = max(2, merge_config['root_merge_batch_size'])
+        resume = merge_config['root_merge_resume']
 
         log_file = '%s.hadd_output' % output_file
+        # Intermediate results of a tree merge, kept after a failure when resuming
+        parts_dir = '%s.hadd_parts' % output_file
         with open(log_file, 'w') as log:
             log.write('# -- Hadd output -- #\n')
-            log.write('%s\n' % out)
+
+            # Merge batches of files in parallel, then batches of the results, until one hadd can do the rest
+            level = 0
+            to_merge = list(file_list)
+            while len(to_merge) > batch_size:
+                if not os.path.isdir(parts_dir):
+                    os.makedirs(parts_dir)
+                batches = [to_merge[i:i + batch_size] for i in range(0, len(to_merge), batch_size)]
+                outputs = [os.path.join(parts_dir, 'level%d_%d.root' % (level, i)) for i in range(len(batches))]
+                with ThreadPoolExecutor(max_workers=max(1, merge_config['root_merge_processes'])) as executor:
+                    results = list(executor.map(lambda batch: self._haddBatch(merge_cmd, batch[0], batch[1], resume),
+                                                zip(outputs, batches)))
+                for (cmd, rc), batch_output in zip(results, outputs):
+                    log.write('# -- %s -- #\n' % cmd)
+                    if os.path.exists(batch_output + '.hadd_output'):
+                        with open(batch_output + '.hadd_output') as batch_log:
+                            shutil.copyfileobj(batch_log, log)
+                    if rc:
+                        if not resume:
+                            shutil.rmtree(parts_dir, ignore_errors=True)
+                        logger.error('hadd failed, see %s', log_file)
+                        raise PostProcessException(
+                            'The ROOT merge failed to complete. The command used was %s.' % cmd)
+                to_merge = outputs
+                level += 1
+
+            cmd, rc = self._hadd(merge_cmd, output_file, to_merge, log)
 
         if rc:
-            logger.error(out)
+            if not resume:
+                shutil.rmtree(parts_dir, ignore_errors=True)
+            logger.error('hadd failed, see %s', log_file)
             raise PostProcessException(
-                'The ROOT merge failed to complete. The command used was %s.' % merge_cmd)
+                'The ROOT merge failed to complete. The command used was %s.' % cmd)
+
+        shutil.rmtree(parts_dir, ignore_errors=True)
 
 
 class CustomMerger(IMerger):
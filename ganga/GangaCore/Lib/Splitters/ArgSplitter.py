@@ -7,7 +7,6 @@
 import copy
 from GangaCore.Core.exceptions import SplitterError
 from GangaCore.GPIDev.Adapters.ISplitter import ISplitter
-from GangaCore.GPIDev.Base.Proxy import stripProxy
 from GangaCore.GPIDev.Schema import Schema, Version, SimpleItem
 from GangaCore.GPIDev.Lib.GangaList.GangaList import GangaList
 from GangaCore.Utility.logging import getLogger
@@ -53,10 +52,9 @@ class ArgSplitter(ISplitter):
 
     def split(self, job):
 
-        subjobs = []
+        subjobs = self.createSubjobs(job, len(self.args), ['application'])
 
-        for arg in self.args:
-            j = self.createSubjob(job,['application'])
+        for j, arg in zip(subjobs, self.args):
             # Add new arguments to subjob
             app = copy.deepcopy(job.application)
             if hasattr(app, 'args'):
@@ -65,10 +63,10 @@ class ArgSplitter(ISplitter):
                 app.extraArgs = arg
             else:
                 raise SplitterError('Application has neither args or extraArgs in its schema') 
-                    
-            j.application = app
+
+            # app is already a copy so doesn't need copying again by the attribute descriptor
+            j.setSchemaAttribute('application', app)
             logger.debug('Arguments for split job is: ' + str(arg))
-            subjobs.append(stripProxy(j))
 
         return subjobs
 
@@ -21,14 +21,12 @@ class ExeSplitter(ISplitter):
     })
 
     def split(self, job):
-        subjobs = []
-        for a in self.apps:
-            # for each subjob make a full copy of the master job
-            j = self.createSubjob(job)
+        # for each subjob make a full copy of the master job
+        subjobs = self.createSubjobs(job, len(self.apps))
+        for j, a in zip(subjobs, self.apps):
             j.application = a
             if not a.exe:
                 j.application.exe = job.application.exe
-            subjobs.append(j)
         return subjobs
 
 
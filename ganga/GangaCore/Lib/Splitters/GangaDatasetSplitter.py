@@ -25,7 +25,6 @@ class GangaDatasetSplitter(ISplitter):
     })
 
     def split(self, job):
-        subjobs = []
 
         if not job.inputdata or not isType(job.inputdata, GangaDataset):
             raise ApplicationConfigurationError(
@@ -50,18 +49,14 @@ class GangaDatasetSplitter(ISplitter):
         masterType = type(job.inputdata)
 
         # split based on all the sub files
-        fid = 0
-        subjobs = []
         filesToRun = len(full_list)
         if not self.maxFiles == -1:
             filesToRun = min(self.maxFiles, filesToRun)
-        while fid < filesToRun:
-            j = self.createSubjob(job)
+        first_files = range(0, filesToRun, self.files_per_subjob)
+        subjobs = self.createSubjobs(job, len(first_files))
+        for j, fid in zip(subjobs, first_files):
             j.inputdata = masterType()
             for sf in full_list[fid:fid + self.files_per_subjob]:
                 j.inputdata.files.append(sf)
 
-            fid += self.files_per_subjob
-            subjobs.append(j)
-
         return subjobs
@@ -6,7 +6,7 @@
 
 from GangaCore.Core.exceptions import ApplicationConfigurationError
 from GangaCore.GPIDev.Adapters.ISplitter import ISplitter
-from GangaCore.GPIDev.Base.Proxy import addProxy, stripProxy
+from GangaCore.GPIDev.Base.Proxy import ProxyDataDescriptor, GangaAttributeError, getName
 from GangaCore.GPIDev.Schema import Schema, Version, SimpleItem
 
 from GangaCore.Utility.logging import getLogger
@@ -62,8 +62,6 @@ class GenericSplitter(ISplitter):
 
     def split(self, job):
 
-        subjobs = []
-
         # sort out multiple arg splitting
         if (self.attribute != '' or len(self.values) > 0) and len(self.multi_attrs) > 0:
             raise ApplicationConfigurationError("Setting both 'attribute'/'values' and 'multi_attrs' is unsupported")
@@ -102,23 +100,23 @@ class GenericSplitter(ISplitter):
                     "Number of attributes to split over doesn't equal number of values in list '%s'" % vallist)
 
         # now perform the split
-        for vallist in values:
+        subjobs = self.createSubjobs(job, len(values))
 
-            # for each list of values, set the attributes
-            j = addProxy(self.createSubjob(job))
+        for j, vallist in zip(subjobs, values):
 
+            # for each list of values, set the attributes on the subjob, with the same checks as setting them in the GPI
             for i in range(0, len(attrlist)):
                 attrs = attrlist[i].split('.')
                 obj = j
                 for attr in attrs[:-1]:
                     obj = getattr(obj, attr)
                 attr = attrs[-1]
-                setattr(obj, attr, vallist[i])
+                if not obj._schema.hasAttribute(attr):
+                    raise GangaAttributeError("Can't assign '%s' as it does NOT appear in the object schema for class '%s'" % (attr, getName(obj)))
+                setattr(obj, attr, ProxyDataDescriptor._process_set_value(obj, vallist[i], attr))
                 logger.debug('set %s = %s to subjob.' %
                              (attrlist[i], getattr(obj, attr)))
 
-            subjobs.append(stripProxy(j))
-
         return subjobs
 #
 #
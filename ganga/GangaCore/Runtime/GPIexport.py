@@ -38,6 +38,49 @@ def exportToInterface(myInterface, name, _object, doc_section, docstring=None):
     _addToInterface(myInterface, name, _object)
     adddoc(name, getattr(myInterface, name), doc_section, docstring)
 
+class LazyPluginClass(object):
+    """
+    Stands in for a GPI class whose plugin module hasn't been imported yet. The module is imported when this is first
+    used and the real class is exported in its place.
+    """
+
+    __slots__ = ('_interface', '_name', '_category', '_plugin_name', '_doc_section')
+
+    def __init__(self, interface, name, category, plugin_name, doc_section):
+        self._interface = interface
+        self._name = name
+        self._category = category
+        self._plugin_name = plugin_name
+        self._doc_section = doc_section
+
+    def _load(self):
+        from GangaCore.Utility.Plugin import allPlugins
+        exported = getattr(self._interface, self._name, None)
+        if exported is None or exported is self:
+            exportToInterface(self._interface, self._name, allPlugins.find(self._category, self._plugin_name), self._doc_section)
+            exported = getattr(self._interface, self._name)
+        return exported
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __instancecheck__(self, obj):
+        return isinstance(obj, self._load())
+
+    def __repr__(self):
+        return "<GPI class %s (not loaded yet)>" % self._name
+
+
+def exportLazyToInterface(myInterface, name, category, plugin_name, doc_section):
+    '''
+    Make the plugin 'plugin_name' in 'category' available publicly as "name" in the interface module without importing
+    its module until it is first used.
+    '''
+    setattr(myInterface, name, LazyPluginClass(myInterface, name, category, plugin_name, doc_section))
+
 def exportToGPI(name, _object, doc_section, docstring=None):
     '''
     Make object available publicly as "name" in GangaCore.GPI module. Add automatic documentation to gangadoc system.
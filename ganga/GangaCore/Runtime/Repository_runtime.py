@@ -163,6 +163,38 @@ def updateLocksNow():
     return
 
 
+def migrateRepository(source_type='LocalXML'):
+    """
+    Import the jobs, tasks, box and prep objects of the LocalXML repository in this gangadir into the repositories of
+    this session. This is only supported when running with [Configuration]repositorytype=SQLite.
+    Objects which already exist in the SQLite repositories are left untouched so this can be safely re-run.
+    Args:
+        source_type (str): The type of the repository to import from, currently only LocalXML
+    """
+    if source_type != 'LocalXML':
+        raise GangaException("Migrating from a '%s' repository is not supported" % source_type)
+    if config['repositorytype'] != 'SQLite':
+        raise GangaException("Migrating a repository requires [Configuration]repositorytype=SQLite, not '%s'" % config['repositorytype'])
+
+    source_root = os.path.join(expandfilename(config['gangadir'], True), 'repository', config['user'], source_type, '6.0')
+
+    migrated = {}
+    for registry in bootstrap_getreg():
+        if registry.name not in started_registries:
+            continue
+        for this_reg in [registry.metadata, registry]:
+            if this_reg is None or not hasattr(this_reg.repository, 'migrate_from_xml'):
+                continue
+            xml_root = os.path.join(source_root, this_reg.name)
+            if not os.path.isdir(xml_root):
+                logger.debug("Nothing to migrate for '%s' in: %s" % (this_reg.name, xml_root))
+                continue
+            with this_reg._flush_lock:
+                with this_reg._read_lock:
+                    migrated[this_reg.name] = this_reg.repository.migrate_from_xml(xml_root)
+    return migrated
+
+
 def shutdown():
     # Shutdown method for all repgistries in order
     from GangaCore.Utility.logging import getLogger
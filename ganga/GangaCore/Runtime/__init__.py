@@ -14,8 +14,15 @@ def setupGanga(argv=sys.argv, interactive=True):
     import GangaCore.Runtime
     GangaCore.Runtime._prog = GangaProgram(argv=argv)
     GangaCore.Runtime._prog.parseOptions()
+    from GangaCore.Utility.StartupProfiler import startup_profiler
+    if GangaCore.Runtime._prog.options.profile_startup:
+        startup_profiler.start()
     GangaCore.Runtime._prog.configure()
     GangaCore.Runtime._prog.initEnvironment()
     GangaCore.Runtime._prog.bootstrap(GangaCore.Runtime._prog.interactive)
+    if GangaCore.Runtime._prog.options.profile_startup:
+        startup_profiler.stop()
+        from GangaCore.Utility.logging import getLogger
+        getLogger().info(startup_profiler.report())
     GangaCore.Runtime._prog.new_user_wizard(interactive)
 
@@ -200,6 +200,9 @@ def manualExportToGPI(my_interface=None):
     from GangaCore.GPIDev.Lib.Registry.JobRegistry import jobSlice
     exportToInterface(my_interface, "jobSlice", jobSlice, "Functions")
 
+    from GangaCore.Runtime.Repository_runtime import migrateRepository
+    exportToInterface(my_interface, "migrateRepository", migrateRepository, "Functions")
+
 class GangaProgram(object):
 
     """ High level API to create instances of Ganga programs and configure/run it """
@@ -310,6 +313,9 @@ under certain conditions; type license() for details.
         parser.add_option("--daemon", dest='daemon', action="store_true", default=False,
                           help='run Ganga as service.')
 
+        parser.add_option("--profile-startup", dest='profile_startup', action="store_true", default=False,
+                          help='report how long the modules imported while starting Ganga took to import')
+
         parser.set_defaults(force_interactive=False, config_file=None,
                             force_loglevel=None, rexec=1, monitoring=1, prompt=1, generate_config=None)
         parser.disable_interspersed_args()
@@ -24,34 +24,31 @@ import GangaCore.Lib.Splitters
 
 logger.debug("Loading Executable")
 import GangaCore.Lib.Executable
-logger.debug("Loading Root")
-import GangaCore.Lib.Root
-logger.debug("Loading Notebook")
-import GangaCore.Lib.Notebook
 
 logger.debug("Loading LocalHost")
 import GangaCore.Lib.Localhost
-logger.debug("Loading LCG")
-import GangaCore.Lib.LCG
-logger.debug("Loading Condor")
-import GangaCore.Lib.Condor
-logger.debug("Loading Interactive")
-import GangaCore.Lib.Interactive
-logger.debug("Loading Batch")
-import GangaCore.Lib.Batch
-logger.debug("Loading Remote")
-import GangaCore.Lib.Remote
 
 logger.debug("Loading Tasks")
 import GangaCore.GPIDev.Lib.Tasks
 
-
-logger.debug("Loading Checkers")
-import GangaCore.Lib.Checkers
-logger.debug("Loading Notifier")
-import GangaCore.Lib.Notifier
-
-logger.debug("Loading virtualization classes")
-import GangaCore.Lib.Virtualization
+# The plugins of these modules are only imported when they are first used if Configuration.LazyPlugins is set
+lazy_plugin_modules = ['GangaCore.Lib.Root',
+                       'GangaCore.Lib.Notebook',
+                       'GangaCore.Lib.LCG',
+                       'GangaCore.Lib.Condor',
+                       'GangaCore.Lib.Interactive',
+                       'GangaCore.Lib.Batch',
+                       'GangaCore.Lib.Remote',
+                       'GangaCore.Lib.Checkers',
+                       'GangaCore.Lib.Notifier',
+                       'GangaCore.Lib.Virtualization']
+
+logger.debug("Loading lazy plugins")
+import os.path
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.Plugin.PluginManifest import loadPluginModules
+_conf = getConfig('Configuration')
+loadPluginModules(lazy_plugin_modules,
+                  os.path.expanduser(os.path.expandvars(_conf['PluginManifest'])) if _conf['LazyPlugins'] else None)
 
 logger.debug("Finished Runtime.plugins")
@@ -90,10 +90,13 @@ There is a GPI wrapper in GangaCore.GPIDev.Lib.Config which:
 
 """
 
+import json
 import os
 import re
+import threading
 import traceback
 from collections import defaultdict
+from contextlib import contextmanager
 from functools import reduce
 
 from GangaCore.Core.exceptions import GangaException
@@ -182,7 +185,7 @@ def makeConfig(name, docstring, **kwds):
     Create a config package and attach metadata to it. makeConfig() should be called once for each package.
     """
 
-    if _after_bootstrap:
+    if _after_bootstrap and not getattr(_late_sections, 'allowed', False):
         raise ConfigError('attempt to create a configuration section [%s] after bootstrap' % name)
 
     try:
@@ -374,6 +377,12 @@ class ConfigOption(object):
 
         super(ConfigOption, self).__setattr__(name, value)
         super(ConfigOption, self).__setattr__('hasModified', True)
+        _optionsChanged()
+
+    def __delattr__(self, name):
+        super(ConfigOption, self).__delattr__(name)
+        super(ConfigOption, self).__setattr__('hasModified', True)
+        _optionsChanged()
 
     def check_defined(self):
         return hasattr(self, 'default_value')
@@ -442,6 +451,40 @@ class ConfigOption(object):
 # indicate if the GPI proxies for the configuration have been created
 _after_bootstrap = False
 
+# incremented whenever an option is changed, the effective values cached by the PackageConfigs are only used while it is
+# unchanged
+_options_generation = 0
+
+
+def _optionsChanged():
+    global _options_generation
+    _options_generation += 1
+
+# whether the current thread may still make configuration sections after bootstrap
+_late_sections = threading.local()
+
+
+@contextmanager
+def lateConfigSections():
+    """
+    Allow the code run in this context to make configuration sections and options after bootstrap, e.g. the default
+    values of the plugins which are only imported when first used. The GPI proxies of the new sections are made at the end.
+    """
+    if not _after_bootstrap or getattr(_late_sections, 'allowed', False):
+        yield
+        return
+
+    existing = set(allConfigs)
+    _late_sections.allowed = True
+    try:
+        yield
+    finally:
+        _late_sections.allowed = False
+        from GangaCore.GPIDev.Lib.Config.Config import createSectionProxy
+        for name in allConfigs:
+            if name not in existing:
+                createSectionProxy(name)
+
 # Scope used by eval when reading-in the configuration.
 # Symbols defined in this scope will be correctly evaluated. For example, File class adds itself here.
 # This dictionary may also be used by other parts of the system, e.g. XML
@@ -471,7 +514,7 @@ class PackageConfig(object):
 
     """
 
-    __slots__ = ('name', 'options', 'docstring', 'hidden', 'cfile', '_user_handlers', '_session_handlers', 'is_open', '_config_made', 'hasModified', '__dict__')
+    __slots__ = ('name', 'options', 'docstring', 'hidden', 'cfile', '_user_handlers', '_session_handlers', 'is_open', '_config_made', 'hasModified', '_effective', '__dict__')
 
     def __init__(self, name, docstring, **meta):
         """ Arguments:
@@ -501,6 +544,9 @@ class PackageConfig(object):
 
         self.hasModified = False
 
+        # (options generation, {name: effective value}) of the options looked up since the last change
+        self._effective = (None, {})
+
     def _addOpenOption(self, name, value):
         self.addOption(name, value, "", override=True)
 
@@ -517,7 +563,7 @@ class PackageConfig(object):
         """
         Add a new option to the configuration.
         """
-        if _after_bootstrap and not self.is_open:
+        if _after_bootstrap and not self.is_open and not getattr(_late_sections, 'allowed', False):
             raise ConfigError('attempt to add a new option [%s]%s after bootstrap' % (self.name, name))
 
         # has the option already been made
@@ -705,14 +751,26 @@ class PackageConfig(object):
     def getEffectiveOptions(self):
         eff = {}
         for name in self.options:
-            eff[name] = self.options[name].value
+            eff[name] = self.getEffectiveOption(name)
         return eff
 
     def getEffectiveOption(self, name):
+        # the generation is read before the value so that a value changed meanwhile is looked up again next time
+        generation = _options_generation
+        cached_generation, effective = self._effective
+        if cached_generation != generation:
+            effective = {}
+            self._effective = (generation, effective)
+        try:
+            return effective[name]
+        except KeyError:
+            pass
         try:
-            return self.options[name].value
+            value = self.options[name].value
         except KeyError:
             raise ConfigError('option "%s" does not exist in "%s"' % (name, self.name))
+        effective[name] = value
+        return value
 
     def getEffectiveLevel(self, name):
         """ Return 0 if option is effectively set at the user level, 1
@@ -740,6 +798,7 @@ class PackageConfig(object):
             post = lambda opt, val: None
 
         self._user_handlers.append((pre, post))
+        _optionsChanged()
 
     def attachSessionHandler(self, pre, post):
         """See attachUserHandler(). """
@@ -751,6 +810,7 @@ class PackageConfig(object):
             post = lambda opt, val: None
 
         self._session_handlers.append((pre, post))
+        _optionsChanged()
 
 
     def attachGangarcHandler(self, pre, post):
@@ -763,11 +823,13 @@ class PackageConfig(object):
             post = lambda opt, val: None
 
         self._gangarc_handlers.append((pre, post))
+        _optionsChanged()
 
     def deleteUndefinedOptions(self):
-        for o in self.options.keys():
+        for o in list(self.options.keys()):
             if not self.options[o].check_defined():
                 del self.options[o]
+        _optionsChanged()
 
 try:
     import configparser
@@ -835,10 +897,95 @@ def transform_PATH_option(name, new_value, current_value):
     return new_value
 
 
+# The file the merged options of the config files are cached in, see read_ini_files(). This can't be a config option as it
+# is needed before the config files are read. None disables the cache.
+config_cache_file = os.path.join(os.path.expanduser('~'), '.cache', 'Ganga', 'config_cache.json')
+
+# the number of sets of config files the cache keeps the options of
+_config_cache_size = 8
+
+
+def _configFilesKey(filenames, system_vars):
+    """ Return the key of the config files in the cache made of their names, sizes and modification times and the system
+    variables, or None if a file can't be found in which case the files aren't cached """
+    files = []
+    for f in filenames:
+        try:
+            st = os.stat(f)
+        except OSError:
+            return None
+        files.append([f, st.st_size, st.st_mtime_ns])
+    # the @{VAR} in the files are expanded from the System section
+    system = allConfigs['System'].getEffectiveOptions() if 'System' in allConfigs else {}
+    # round trip the key through json so that it compares equal to the one read back from the cache
+    return json.loads(json.dumps({'files': files, 'system_vars': system_vars, 'system': system},
+                                 sort_keys=True, default=str))
+
+
+def _readConfigCache():
+    try:
+        with open(config_cache_file) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError) as err:
+        getLogger().debug("Cannot read the config cache %s: %s" % (config_cache_file, err))
+        return []
+
+
+def _writeConfigCache(entries):
+    try:
+        cache_dir = os.path.dirname(config_cache_file)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        tmp_file = '%s.%s.tmp' % (config_cache_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_file, config_cache_file)
+    except (IOError, OSError, TypeError, ValueError) as err:
+        getLogger().debug("Cannot write the config cache %s: %s" % (config_cache_file, err))
+
+
 def read_ini_files(filenames, system_vars):
     """ Return  a ConfigParser object  which contains  all options  from the
     sequence of files (which are parsed from left-to-right).
-    Apply special rules for PATH-like variables - see transform_PATH_option() """
+    Apply special rules for PATH-like variables - see transform_PATH_option()
+
+    The merged options are cached in config_cache_file and are only read from the files again when one of them, the
+    system variables or the environment variables they refer to have changed. """
+
+    logger = getLogger()
+
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    filenames = [f for f in filenames if f is not None and f != '']
+
+    key = _configFilesKey(filenames, system_vars) if config_cache_file and filenames else None
+    if key is None:
+        return _read_ini_files(filenames, system_vars, {})
+
+    entries = _readConfigCache()
+    for entry in entries:
+        if entry.get('key') == key and all(os.environ.get(var) == val for var, val in entry['environ'].items()):
+            logger.debug('using the cached options of the config files %s', filenames)
+            main = make_config_parser(system_vars)
+            for sec, options in entry['sections']:
+                main.add_section(sec)
+                for name, value in options:
+                    main.set(sec, name, value)
+            return main
+
+    environ = {}
+    main = _read_ini_files(filenames, system_vars, environ)
+    sections = [[sec, [[name, main.get(sec, name, raw=True)] for name in main.options(sec) if name not in main.defaults()]]
+                for sec in main.sections()]
+    entries = [entry for entry in entries if entry.get('key') != key]
+    entries.insert(0, {'key': key, 'environ': environ, 'sections': sections})
+    _writeConfigCache(entries[:_config_cache_size])
+    return main
+
+
+def _read_ini_files(filenames, system_vars, environ):
+    """ Read the config files as described in read_ini_files(), recording the environment variables they refer to in
+    the dict environ """
 
     import GangaCore.Utility.logging
 
@@ -851,9 +998,6 @@ def read_ini_files(filenames, system_vars):
     # load all config files and apply special rules for PATH-like variables
     # note: main.read(filenames) cannot be used because of that
 
-    if isinstance(filenames, str):
-        filenames = [filenames]
-
     for f in filenames:
         if f is None or f == '':
             continue
@@ -919,6 +1063,7 @@ def read_ini_files(filenames, system_vars):
 
                     # is env variable
                     logger.debug('looking for ' + str(envvarclean) + ' in the shell environment')
+                    environ[envvarclean] = os.environ.get(envvarclean)
                     if envvarclean in os.environ:
                         envval = os.environ[envvarclean]
                         logger.debug(str(envvarclean) + ' is set as ' + envval + ' in the shell environment')
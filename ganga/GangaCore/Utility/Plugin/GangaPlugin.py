@@ -1,3 +1,6 @@
+import importlib
+import threading
+
 from GangaCore.Utility.logging import getLogger
 from GangaCore.Core.exceptions import GangaValueError
 logger = getLogger()
@@ -15,16 +18,22 @@ class PluginManagerError(GangaValueError):
 #
 # If you do not use category all plugins are registered in a flat list. Otherwise
 # there is a list of names for each category seaprately.
+#
+# A plugin may also be added lazily with the name of the module which defines it.
+# The module is only imported when the plugin is first looked up.
 
 
 class PluginManager(object):
 
-    __slots__ = ('all_dict', 'first', '_prev_found')
+    __slots__ = ('all_dict', 'first', '_prev_found', '_lazy', '_lazy_lock')
 
     def __init__(self):
         self.all_dict = {}
         self.first = {}
         self._prev_found = {}
+        # category -> {name: (module name, name the module adds the plugin with)} of the plugins not yet imported
+        self._lazy = {}
+        self._lazy_lock = threading.RLock()
 
     def find(self, category, name):
         """
@@ -42,6 +51,9 @@ class PluginManager(object):
         if key in self._prev_found:
             return self._prev_found[key]
 
+        if self._lazy:
+            self._loadLazy(category, name)
+
         try:
             if name is not None:
                 if category in self.first:
@@ -97,8 +109,70 @@ class PluginManager(object):
         cat = self.all_dict.setdefault(category, {})
         self.first.setdefault(category, pluginobj)
         cat[name] = pluginobj
+        self._lazy.get(category, {}).pop(name, None)
         logger.debug('adding plugin %s (category "%s") ' % (name, category))
 
+    def addLazy(self, category, name, module, plugin_name=None):
+        """ Add a plugin which is only imported from module when it is first looked up.
+        If plugin_name is given then name is an alias of the plugin the module adds as plugin_name.
+        """
+        with self._lazy_lock:
+            if name not in self.all_dict.get(category, {}):
+                self._lazy.setdefault(category, {})[name] = (module, plugin_name or name)
+
+    def isLazy(self, category, name):
+        """ Whether the plugin was added with addLazy() and has not been imported yet """
+        return name in self._lazy.get(category, {})
+
+    def lazyPlugins(self):
+        """ Return a dict of category -> {name: (module, plugin_name)} of the plugins which have not been imported yet """
+        with self._lazy_lock:
+            return dict((category, dict(names)) for category, names in self._lazy.items() if names)
+
+    def _loadLazy(self, category, name):
+        """ Import the module of a lazy plugin, or of the first lazy plugin in the category when name is None.
+        The plugin is looked for in the other categories if it isn't in this one """
+        with self._lazy_lock:
+            if name is not None and name not in self._lazy.get(category, {}):
+                category = next((c for c in self._lazy if name in self._lazy[c]), category)
+            names = self._lazy.get(category)
+            if not names or (name is None and category in self.first):
+                return
+            if name is None:
+                name = next(iter(names))
+            if name not in names:
+                return
+            module = names[name][0]
+        self._importModule(module)
+
+    def _importModule(self, module):
+        """ Import a module of lazy plugins, its plugins are added by their classes as it is imported """
+        with self._lazy_lock:
+            aliases = []
+            for category, names in self._lazy.items():
+                for name, (this_module, plugin_name) in list(names.items()):
+                    if this_module == module:
+                        del names[name]
+                        if name != plugin_name:
+                            aliases.append((category, name, plugin_name))
+        logger.debug('importing plugin module %s' % module)
+        from GangaCore.Utility.Config.Config import lateConfigSections
+        with lateConfigSections():
+            importlib.import_module(module)
+        for category, name, plugin_name in aliases:
+            if plugin_name in self.all_dict.get(category, {}):
+                self.add(self.all_dict[category][plugin_name], category, name)
+
+    def loadAll(self, category=None):
+        """ Import the modules of all of the lazy plugins, or only of those in the given category """
+        with self._lazy_lock:
+            modules = set()
+            for this_category, names in self._lazy.items():
+                if category is None or this_category == category:
+                    modules.update(m for m, _ in names.values())
+        for module in sorted(modules):
+            self._importModule(module)
+
     def setDefault(self, category, name):
         """ Make the plugin 'name' be default in a given 'category'.
         You must first add() the plugin object before calling this method. Otherwise
@@ -109,9 +183,13 @@ class PluginManager(object):
         self.first[category] = pluginobj
 
     def allCategories(self):
+        if self._lazy:
+            self.loadAll()
         return self.all_dict
 
     def allClasses(self, category):
+        if self._lazy:
+            self.loadAll(category)
         cat = self.all_dict.get(category)
         if cat:
             return cat
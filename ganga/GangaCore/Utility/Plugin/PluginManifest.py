@@ -0,0 +1,131 @@
+"""
+Lazy loading of the plugin modules which are only needed by some Ganga sessions.
+
+Rather than importing these modules at startup their plugins are added to allPlugins from a manifest which maps the
+category and name of each plugin to the module defining it, so that a module is only imported when one of its plugins
+is first looked up. The manifest is cached in a file and made again, by importing all of the modules, whenever the
+version of Ganga or the source of one of the modules changes.
+"""
+import importlib.util
+import json
+import os
+
+from GangaCore.Utility.logging import getLogger
+from .GangaPlugin import allPlugins
+
+logger = getLogger()
+
+# GPI name -> (category, name) of the lazy plugins which are exported to the GPI
+_lazy_gpi_names = {}
+
+
+def lazyGPINames():
+    """ Return a dict of GPI name -> (category, name) of the plugins added from the manifest to be exported to the GPI """
+    return dict(_lazy_gpi_names)
+
+
+def _sourceStamp(modules):
+    """ Return the latest modification time of the python files of the modules, or None if a module can't be found """
+    latest = 0
+    for module in modules:
+        spec = importlib.util.find_spec(module)
+        if spec is None or spec.origin is None:
+            return None
+        if spec.submodule_search_locations:
+            for location in spec.submodule_search_locations:
+                for dirpath, _, filenames in os.walk(location):
+                    for filename in filenames:
+                        if filename.endswith('.py'):
+                            latest = max(latest, os.path.getmtime(os.path.join(dirpath, filename)))
+        else:
+            latest = max(latest, os.path.getmtime(spec.origin))
+    return latest
+
+
+def _manifestKey(modules):
+    from GangaCore import _gangaVersion
+    return {'version': _gangaVersion, 'modules': list(modules), 'stamp': _sourceStamp(modules)}
+
+
+def readManifest(manifest_file, modules):
+    """
+    Return the list of plugins in the manifest file if it is up to date with the modules, otherwise None
+    Args:
+        manifest_file (str): The file the manifest is cached in
+        modules (list): The names of the modules the manifest is for
+    """
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError) as err:
+        logger.debug("Cannot read the plugin manifest %s: %s" % (manifest_file, err))
+        return None
+    if manifest.get('key') != _manifestKey(modules):
+        logger.debug("The plugin manifest %s is out of date" % manifest_file)
+        return None
+    return manifest['plugins']
+
+
+def writeManifest(manifest_file, modules, plugins):
+    """
+    Cache the manifest of the plugins of the modules in the manifest file
+    Args:
+        manifest_file (str): The file to cache the manifest in
+        modules (list): The names of the modules the manifest is for
+        plugins (list): The [module, category, name, GPI names] of each plugin as returned by importPluginModules
+    """
+    try:
+        manifest_dir = os.path.dirname(manifest_file)
+        if manifest_dir and not os.path.isdir(manifest_dir):
+            os.makedirs(manifest_dir)
+        tmp_file = '%s.%s.tmp' % (manifest_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump({'key': _manifestKey(modules), 'plugins': plugins}, f)
+        os.replace(tmp_file, manifest_file)
+    except (IOError, OSError) as err:
+        logger.debug("Cannot write the plugin manifest %s: %s" % (manifest_file, err))
+
+
+def importPluginModules(modules):
+    """
+    Import the modules and return the [module, category, name, GPI names] of each plugin they add
+    Args:
+        modules (list): The names of the modules to import
+    """
+    plugins = []
+    for module in modules:
+        before = set((category, name) for category in allPlugins.all_dict for name in allPlugins.all_dict[category])
+        logger.debug("Loading %s" % module)
+        importlib.import_module(module)
+        for category, names in allPlugins.all_dict.items():
+            for name, cls in names.items():
+                if (category, name) in before:
+                    continue
+                # a plugin belongs to the module it is defined in if that is one of the modules
+                owner = next((m for m in modules if cls.__module__ == m or cls.__module__.startswith(m + '.')), module)
+                gpi_names = []
+                if not cls._declared_property('hidden'):
+                    gpi_names = [name] if name == cls.__name__ else [cls.__name__, name]
+                plugins.append([owner, category, name, gpi_names])
+    return plugins
+
+
+def loadPluginModules(modules, manifest_file=None):
+    """
+    Add the plugins of the modules to allPlugins, only importing the modules when their plugins are first used if the
+    manifest is up to date. Otherwise the modules are imported now and the manifest made again.
+    Args:
+        modules (list): The names of the modules defining the plugins
+        manifest_file (str): The file the manifest is cached in, None to import the modules now
+    """
+    plugins = readManifest(manifest_file, modules) if manifest_file else None
+    if plugins is None:
+        plugins = importPluginModules(modules)
+        if manifest_file:
+            writeManifest(manifest_file, modules, plugins)
+        return
+
+    for module, category, name, gpi_names in plugins:
+        allPlugins.addLazy(category, name, module)
+        for gpi_name in gpi_names:
+            _lazy_gpi_names[gpi_name] = (category, name)
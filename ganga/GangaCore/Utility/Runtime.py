@@ -316,16 +316,21 @@ def autoPopulateGPI(my_interface=None):
     if not my_interface:
         import GangaCore.GPI
         my_interface = GangaCore.GPI
-    from GangaCore.Runtime.GPIexport import exportToInterface
+    from GangaCore.Runtime.GPIexport import exportToInterface, exportLazyToInterface
     from GangaCore.Utility.Plugin import allPlugins
+    from GangaCore.Utility.Plugin.PluginManifest import lazyGPINames
     # make all plugins visible in GPI
-    for k in allPlugins.allCategories():
-        for n in allPlugins.allClasses(k):
+    for k in allPlugins.all_dict:
+        for n in allPlugins.all_dict[k]:
             cls = allPlugins.find(k, n)
             if not cls._declared_property('hidden'):
                 if n != cls.__name__:
                     exportToInterface(my_interface, cls.__name__, cls, 'Classes')
                 exportToInterface(my_interface, n, cls, 'Classes')
+    # the plugins which haven't been imported yet are imported when first used
+    for gpi_name, (k, n) in lazyGPINames().items():
+        if allPlugins.isLazy(k, n):
+            exportLazyToInterface(my_interface, gpi_name, k, n, 'Classes')
 
 def setPluginDefaults(my_interface=None):
     """
@@ -357,6 +362,16 @@ def setPluginDefaults(my_interface=None):
     # configuration)
 
     batch_default_name = getConfig('Configuration').getEffectiveOption('Batch')
+    from GangaCore.Runtime.GPIexport import exportToInterface, exportLazyToInterface
+    if not my_interface:
+        import GangaCore.GPI
+        my_interface = GangaCore.GPI
+    if allPlugins.isLazy('backends', batch_default_name):
+        # don't import the batch backends until they are used
+        module = allPlugins.lazyPlugins()['backends'][batch_default_name][0]
+        allPlugins.addLazy('backends', 'Batch', module, batch_default_name)
+        exportLazyToInterface(my_interface, 'Batch', 'backends', 'Batch', 'Classes')
+        return
     try:
         batch_default = allPlugins.find('backends', batch_default_name)
     except Exception as x:
@@ -364,10 +379,6 @@ def setPluginDefaults(my_interface=None):
         raise ConfigError('Check configuration. Unable to set default Batch backend alias (%s)' % str(x))
     else:
         allPlugins.add(batch_default, 'backends', 'Batch')
-        from GangaCore.Runtime.GPIexport import exportToInterface
-        if not my_interface:
-            import GangaCore.GPI
-            my_interface = GangaCore.GPI
         exportToInterface(my_interface, 'Batch', batch_default, 'Classes')
 
 
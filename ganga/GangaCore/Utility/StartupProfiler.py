@@ -0,0 +1,98 @@
+"""
+Measure how long each module takes to import while Ganga starts up, see the --profile-startup option.
+
+The profiler puts a finder at the front of sys.meta_path which wraps the loader of every module found, timing how long
+the module takes to execute. The time of a module includes the modules it imports, its own time does not.
+"""
+import sys
+import time
+
+
+class _TimedLoader(object):
+    """ Wraps the loader of a module to time its execution """
+
+    def __init__(self, profiler, loader):
+        self._profiler = profiler
+        self._loader = loader
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._execModule(self._loader, module)
+
+
+class StartupProfiler(object):
+    """ Records the import time of the modules imported between start() and stop() """
+
+    def __init__(self):
+        self.start_time = None
+        self.stop_time = None
+        # module name -> [total time, own time]
+        self.times = {}
+        # the total time of the modules imported by the modules being imported
+        self._children = []
+
+    def started(self):
+        return self.start_time is not None and self.stop_time is None
+
+    def start(self):
+        if self.started():
+            return
+        self.start_time = time.time()
+        self.stop_time = None
+        sys.meta_path.insert(0, self)
+
+    def stop(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        self.stop_time = time.time()
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(self, spec.loader)
+                return spec
+        return None
+
+    def _execModule(self, loader, module):
+        self._children.append(0.)
+        start = time.time()
+        try:
+            loader.exec_module(module)
+        finally:
+            total = time.time() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += total
+            self.times[module.__name__] = [total, total - children]
+
+    def report(self, limit=30):
+        """ Return a table of the modules which took the longest to import, by the time including their imports """
+        end = self.stop_time if self.stop_time is not None else time.time()
+        lines = ['Ganga startup took %.3f s, %d modules were imported' % (end - self.start_time, len(self.times)),
+                 '%10s %10s  %s' % ('total/ms', 'own/ms', 'module')]
+        by_total = sorted(self.times.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (total, own) in by_total[:limit]:
+            lines.append('%10.1f %10.1f  %s' % (total * 1000, own * 1000, name))
+        return '\n'.join(lines)
+
+
+startup_profiler = StartupProfiler()
+
+
+def requested(argv):
+    """ Whether --profile-startup is one of the Ganga options at the start of argv, before any script name """
+    for arg in argv[1:]:
+        if arg == '--profile-startup':
+            return True
+        if not arg.startswith('-'):
+            return False
+    return False
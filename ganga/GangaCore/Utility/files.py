@@ -10,8 +10,15 @@ Helper functions for operations on files.
 
 import os
 import glob
+import gzip
 import stat
+import errno
 import shutil
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+# The size of the chunks files are copied and compressed in, this bounds the memory used to copy a file
+block_size = 1 << 20
 
 _stored_expanded_paths = {}
 _stored_full_paths = {}
@@ -133,6 +140,77 @@ def remove_prefix(fn, path_list):
 
     return fn
 
+
+def kernel_copy(in_fd, out_fd):
+    """Copy the rest of in_fd to out_fd without the data passing through python, returning False if this isn't possible.
+    A partial copy leaves both files positioned after the copied data so the copy can be finished some other way."""
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is not None:
+        try:
+            while copy_file_range(in_fd, out_fd, block_size):
+                pass
+            return True
+        except OSError as err:
+            if err.errno not in (errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF):
+                raise
+    sendfile = getattr(os, 'sendfile', None)
+    if sendfile is not None:
+        offset = os.lseek(in_fd, 0, os.SEEK_CUR)
+        try:
+            sent = sendfile(out_fd, in_fd, offset, block_size)
+            while sent:
+                offset += sent
+                sent = sendfile(out_fd, in_fd, offset, block_size)
+            return True
+        except OSError as err:
+            if err.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF):
+                raise
+        finally:
+            os.lseek(in_fd, offset, os.SEEK_SET)
+    return False
+
+
+class ParallelGzipWriter(object):
+    """Writes a gzip file as a series of gzip members, one for each block of data, compressing the blocks on several
+    threads. Anything reading gzip files treats the members as one stream. At most two blocks per thread are held in
+    memory at a time."""
+
+    def __init__(self, out_file, threads):
+        """
+        Args:
+            out_file (file): The binary file to write the compressed data to
+            threads (int): The number of threads to compress with
+        """
+        self._out_file = out_file
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads))
+        self._max_pending = 2 * max(1, threads)
+        self._pending = collections.deque()
+        self._buffer = bytearray()
+
+    def _compress(self, block):
+        self._pending.append(self._executor.submit(gzip.compress, block))
+        while len(self._pending) > self._max_pending:
+            self._out_file.write(self._pending.popleft().result())
+
+    def write(self, data):
+        self._buffer.extend(data)
+        while len(self._buffer) >= block_size:
+            self._compress(bytes(self._buffer[:block_size]))
+            del self._buffer[:block_size]
+        return len(data)
+
+    def close(self):
+        """Compress what is left and write out all of the blocks. The underlying file is not closed"""
+        try:
+            if self._buffer:
+                self._compress(bytes(self._buffer))
+                self._buffer = bytearray()
+            while self._pending:
+                self._out_file.write(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown()
+
+
 if __name__ == "__main__":
 
     workdir = 'test_recursive_copy'
@@ -106,6 +106,9 @@ some packages such as GangaTest may be taken from the release area.""",
         examples="""RUNTIME_PATH = GangaGUI
 RUNTIME_PATH = /my/SpecialExtensions:GangaTest""")
 
+conf_config.addOption('LazyPlugins', True, 'Only import the optional plugin modules of Ganga, such as the LCG, Condor and batch backends, when one of their plugins is first used')
+conf_config.addOption('PluginManifest', '~/.cache/Ganga/plugin_manifest.json',
+                 'File caching the manifest of the plugins which are imported when first used (see LazyPlugins). It is made again when Ganga changes')
 conf_config.addOption('TextShell', 'IPython', """ The type of the interactive shell: IPython (cooler) or Console (limited)""")
 conf_config.addOption('StartupGPI', '', 'block of GPI commands executed at startup')
 conf_config.addOption('ReleaseNotes', True, 'Flag to print out the relevent subsection of release notes for each experiment at start up')
@@ -113,9 +116,13 @@ conf_config.addOption('used_versions_path', '~/.cache/Ganga/', 'Path to the dire
 conf_config.addOption('gangadir', expandvars(None, '~/gangadir'),
                  'Location of local job repositories and workspaces. Default is ~/gangadir but in somecases (such as LSF CNAF) this needs to be modified to point to the shared file system directory.', filter=GangaCore.Utility.Config.expandvars)
 conf_config.addOption('repositorytype', 'LocalXML', 'Type of the repository.', examples='LocalXML')
+conf_config.addOption('fastXMLLoader', False, 'Load objects from LocalXML repository files with the FastLoader which builds the same objects as the default XML Loader with less work per element')
 conf_config.addOption('lockingStrategy', 'UNIX', 'Type of locking strategy which can be used. UNIX or FIXED . default = UNIX')
 conf_config.addOption('workspacetype', 'LocalFilesystem',
                  'Type of workspace. Workspace is a place where input and output sandbox of jobs are stored. Currently the only supported type is LocalFilesystem.')
+conf_config.addOption('packedSandboxCache', True,
+                 'Build each distinct packed input sandbox once, caching it by the contents of its files in the workspace, and hard link it into the input workspace of every job using it')
+conf_config.addOption('packedSandboxThreads', 4, 'Number of threads used to compress a packed input sandbox')
 conf_config.addOption('user', getpass.getuser(),
     'User name. The same person may have different roles (user names) and still use the same gangadir. Unless explicitly set this option defaults to the real user name.')
 conf_config.addOption('resubmitOnlyFailedSubjobs', True,
@@ -144,6 +151,7 @@ conf_config.addOption('ServerPort', 434343, 'Port for the Ganga server to listen
 conf_config.addOption('ServerTimeout', 60, 'Timeout in minutes for auto-server shutdown')
 conf_config.addOption('ServerUserScript', "", "Full path to user script to call periodically. The script will be executed as if called within Ganga by 'execfile'.")
 conf_config.addOption('ServerUserScriptWaitTime', 300, "Time in seconds between executions of the user script")
+conf_config.addOption('ServerWorkers', 1, "Number of commands sent to the Ganga server which may run at the same time")
 
 conf_config.addOption('confirm_exit', True, 'Ask the user on exit if we should exit, (this is passed along to IPython)')
 conf_config.addOption('force_start', False, 'Ignore disk checking on startup')
@@ -280,6 +288,8 @@ root_config.addOption('version', '6.04.02', 'Version of ROOT')
 local_config = makeConfig('Local', 'parameters of the local backend (jobs in the background on localhost)')
 local_config.addOption('remove_workdir', True, 'remove automatically the local working directory when the job completed')
 local_config.addOption('location', None, 'The location where the workdir will be created. If None it defaults to the value of $TMPDIR')
+local_config.addOption('max_concurrent_jobs', 0, 'The maximum number of local jobs running at once, jobs wait in the submitted state for a free slot. 0 for no limit')
+local_config.addOption('min_free_memory', 0, 'Local jobs waiting for a slot are not started while less than this many MB of memory is available. 0 to not check')
 
 # ------------------------------------------------
 # LCG
@@ -343,7 +353,10 @@ lcg_config.addOption('StatusPollingTimeout', 300,
                  'sets the gLite job status polling timeout in seconds')
 
 lcg_config.addOption('OutputDownloaderThread', 10,
-                 'sets the number of concurrent threads for downloading job\'s output sandbox from gLite WMS')
+                 'sets the number of job\'s output sandboxes downloaded from gLite WMS at once, on at most half of the monitoring worker threads')
+
+lcg_config.addOption('OutputDownloaderPerCE', 0,
+                 'sets the maximum number of output sandboxes of jobs which ran on the same CE downloaded at once, 0 for no limit')
 
 lcg_config.addOption('SandboxTransferTimeout', 60,
                  'sets the transfer timeout of the oversized input sandbox')
@@ -463,6 +476,13 @@ def filefilter(fn):
 lsf_config.addOption('postexecute', tempstr, "String contains commands executing before submiting job to queue")
 lsf_config.addOption('jobnameopt', 'J', "String contains option name for name of job in batch system")
 lsf_config.addOption('timeout', 600, 'Timeout in seconds after which a job is declared killed if it has not touched its heartbeat file. Heartbeat is touched every 30s so do not set this below 120 or so.')
+lsf_config.addOption('queue_query_str', 'bjobs -w -a',
+                     "Command listing the jobs in the queue, run once per monitoring loop. Empty to read every job's status file instead")
+lsf_config.addOption('queue_query_res_pattern', r'^(?P<id>\d+)\s+\S+\s+(?P<status>\S+)',
+                     "String pattern for the id and status of each job in the output of the queue query")
+lsf_config.addOption('queue_pending_states', ['PEND', 'PSUSP', 'WAIT'], "Queue statuses of jobs waiting to run")
+lsf_config.addOption('queue_running_states', ['RUN', 'USUSP', 'SSUSP'],
+                     "Queue statuses of running jobs. Jobs in any other state, or missing from the queue, have their status file checked")
 
 # ------------------------------------------------
 # PBS
@@ -506,6 +526,13 @@ pbs_config.addOption('postexecute', tempstr,
 pbs_config.addOption('jobnameopt', 'N', "String contains option name for name of job in batch system")
 pbs_config.addOption('timeout', 600,
                  'Timeout in seconds after which a job is declared killed if it has not touched its heartbeat file. Heartbeat is touched every 30s so do not set this below 120 or so.')
+pbs_config.addOption('queue_query_str', 'qstat',
+                     "Command listing the jobs in the queue, run once per monitoring loop. Empty to read every job's status file instead")
+pbs_config.addOption('queue_query_res_pattern', r'^(?P<id>\d+)\.\S*\s+\S+\s+\S+\s+\S+\s+(?P<status>\w)\s',
+                     "String pattern for the id and status of each job in the output of the queue query")
+pbs_config.addOption('queue_pending_states', ['Q', 'H', 'W', 'T'], "Queue statuses of jobs waiting to run")
+pbs_config.addOption('queue_running_states', ['R', 'S'],
+                     "Queue statuses of running jobs. Jobs in any other state, or missing from the queue, have their status file checked")
 
 # ------------------------------------------------
 # SGE
@@ -548,6 +575,13 @@ sge_config.addOption('preexecute', 'os.chdir(os.environ["TMPDIR"])\nos.environ["
 sge_config.addOption('postexecute', '', "String contains commands executing before submiting job to queue")
 sge_config.addOption('jobnameopt', 'N', "String contains option name for name of job in batch system")
 sge_config.addOption('timeout', 600, 'Timeout in seconds after which a job is declared killed if it has not touched its heartbeat file. Heartbeat is touched every 30s so do not set this below 120 or so.')
+sge_config.addOption('queue_query_str', 'qstat',
+                     "Command listing the jobs in the queue, run once per monitoring loop. Empty to read every job's status file instead")
+sge_config.addOption('queue_query_res_pattern', r'^\s*(?P<id>\d+)\s+\S+\s+\S+\s+\S+\s+(?P<status>\w+)\s',
+                     "String pattern for the id and status of each job in the output of the queue query")
+sge_config.addOption('queue_pending_states', ['qw', 'hqw', 'hRwq', 't'], "Queue statuses of jobs waiting to run")
+sge_config.addOption('queue_running_states', ['r', 'Rr', 's', 'S', 'T'],
+                     "Queue statuses of running jobs. Jobs in any other state, or missing from the queue, have their status file checked")
 
 # ------------------------------------------------
 # Slurm
@@ -618,6 +652,13 @@ slurm_config.addOption('postexecute', tempstr,
 slurm_config.addOption('jobnameopt', 'J', "String contains option name for name of job in batch system")
 slurm_config.addOption('timeout', 600,
                        'Timeout in seconds after which a job is declared killed if it has not touched its heartbeat file. Heartbeat is touched every 30s so do not set this below 120 or so.')
+slurm_config.addOption('queue_query_str', 'squeue -h -u $USER -o "%i %t"',
+                       "Command listing the jobs in the queue, run once per monitoring loop. Empty to read every job's status file instead")
+slurm_config.addOption('queue_query_res_pattern', r'^(?P<id>\d+)\s+(?P<status>\S+)',
+                       "String pattern for the id and status of each job in the output of the queue query")
+slurm_config.addOption('queue_pending_states', ['PD', 'CF', 'RF', 'RH', 'RQ', 'RS'], "Queue statuses of jobs waiting to run")
+slurm_config.addOption('queue_running_states', ['R', 'S', 'ST'],
+                       "Queue statuses of running jobs. Jobs in any other state, or missing from the queue, have their status file checked")
 
 # ------------------------------------------------
 # Mergers
@@ -628,6 +669,11 @@ gangadir = getConfig('Configuration')['gangadir']
 merge_config.addOption('merge_output_dir', gangadir +
                  '/merge_results', "location of the merger's outputdir")
 merge_config.addOption('std_merge', 'TextMerger', 'Standard (default) merger')
+merge_config.addOption('text_merge_threads', 4, 'Number of threads the TextMerger uses to compress its output and merge groups of files')
+merge_config.addOption('text_merge_tree_min_files', 100, 'The TextMerger merges groups of files in parallel before joining the results when there are at least this many files. 0 to always merge in one pass')
+merge_config.addOption('root_merge_batch_size', 100, 'The maximum number of files the RootMerger passes to one hadd, more files are merged in a tree of hadds')
+merge_config.addOption('root_merge_processes', 4, 'Number of hadd processes the RootMerger runs at once when merging in a tree')
+merge_config.addOption('root_merge_resume', True, 'Keep the intermediate files of a failed RootMerger tree merge and reuse them when the merge is run again')
 
 # ------------------------------------------------
 # Preparable
@@ -931,7 +977,8 @@ disp_config.addOption(
 # ------------------------------------------------
 # Tasks
 tasks_config = makeConfig('Tasks', 'Tasks configuration options')
-tasks_config.addOption('TaskLoopFrequency', 60., "Frequency of Task Monitoring loop in seconds")
+tasks_config.addOption('TaskLoopFrequency', 60., "Frequency of Task Monitoring loop in seconds. The tasks with jobs whose status changed are updated straight away")
+tasks_config.addOption('TaskFullUpdateFrequency', 600., "Frequency in seconds of updating every Task, rather than only the ones whose jobs changed status or which are waiting to submit jobs")
 tasks_config.addOption('ForceTaskMonitoring', False, "Monitor tasks even if the monitoring loop isn't enabled")
 tasks_config.addOption('disableTaskMon', False, "Should I disable the Task Monitoring loop?")
 
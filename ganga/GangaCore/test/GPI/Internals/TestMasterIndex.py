@@ -0,0 +1,67 @@
+import os
+import time
+from os import path
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+testStr = "testFooString"
+
+
+def getMasterIndex():
+    from GangaCore.Runtime.Repository_runtime import getLocalRoot
+    return path.join(getLocalRoot(), '6.0', 'jobs', 'master.idx')
+
+
+def readMasterIndex():
+    """ Return the master index entries keyed by id, this raises if the file can't be trusted"""
+    from GangaCore.Core.GangaRepository.PickleStreamer import from_file
+    from GangaCore.Core.GangaRepository.GangaRepositoryXML import _unpack_master_cache
+    with open(getMasterIndex(), 'rb') as handler:
+        entries = _unpack_master_cache(from_file(handler)[0])
+    return dict((entry[0], entry) for entry in entries)
+
+
+class TestMasterIndex(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests"""
+        extra_opts = [('Registry', 'AutoFlusherWaitTime', 1), ('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestMasterIndex, self).setUp(extra_opts=extra_opts)
+
+    def test_a_FlusherWritesIndex(self):
+        """ Check the registry flusher keeps master.idx up to date while Ganga is running"""
+        from GangaCore.GPI import Job
+        for i in range(3):
+            Job(name=testStr + str(i))
+
+        for _ in range(20):
+            if path.isfile(getMasterIndex()) and len(readMasterIndex()) == 3:
+                break
+            time.sleep(0.5)
+
+        entries = readMasterIndex()
+        assert sorted(entries) == [0, 1, 2]
+        assert [entries[i][4]['name'] for i in range(3)] == [testStr + str(i) for i in range(3)]
+
+        # The index is readable by whoever can read the rest of the repository, like a file created with open
+        umask = os.umask(0o022)
+        os.umask(umask)
+        assert os.stat(getMasterIndex()).st_mode & 0o777 == 0o666 & ~umask
+
+    def test_b_IndexKeptOnStartup(self):
+        """ Check the master index isn't thrown away once it has been read, then corrupt it"""
+        from GangaCore.GPI import jobs
+        assert path.isfile(getMasterIndex())
+        assert sorted(readMasterIndex()) == [0, 1, 2]
+        assert len(jobs) == 3
+
+        with open(getMasterIndex(), 'r+b') as handler:
+            handler.seek(-8, 2)
+            handler.write(b'\x00' * 8)
+
+    def test_c_CorruptIndexIgnored(self):
+        """ Check a corrupt master index is ignored and replaced with a valid one"""
+        from GangaCore.GPI import jobs
+        assert len(jobs) == 3
+        assert [j.name for j in jobs] == [testStr + str(i) for i in range(3)]
+        assert sorted(readMasterIndex()) == [0, 1, 2]
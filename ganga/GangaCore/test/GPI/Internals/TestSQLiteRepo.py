@@ -0,0 +1,155 @@
+from os import path
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+testStr = "testFooString"
+
+
+def getDBFile(name='jobs'):
+    from GangaCore.Runtime.Repository_runtime import getLocalRoot
+    return path.join(getLocalRoot(), '6.0', name, 'repository.db')
+
+
+class TestSQLiteRepo(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests"""
+        extra_opts = [('Configuration', 'repositorytype', 'SQLite'), ('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestSQLiteRepo, self).setUp(extra_opts=extra_opts)
+
+    def test_a_JobConstruction(self):
+        """ First construct some Job objects"""
+        from GangaCore.GPI import Job, jobs
+        for i in range(3):
+            j = Job()
+            j.name = testStr + str(i)
+        assert len(jobs) == 3
+        assert path.isfile(getDBFile())
+
+    def test_b_JobsLazyLoaded(self):
+        """ Check the jobs come back from the index without being loaded"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        assert len(jobs) == 3
+        for j in jobs:
+            assert not stripProxy(j)._getRegistry().has_loaded(stripProxy(j))
+
+        reg_slice = stripProxy(jobs)
+        assert [reg_slice._get_display_value(stripProxy(j), 'name') for j in jobs] == [testStr + str(i) for i in range(3)]
+
+    def test_c_JobsLoad(self):
+        """ Check the full content of the jobs is correctly stored"""
+        from GangaCore.GPI import jobs
+        for i, j in enumerate(jobs):
+            assert j.name == testStr + str(i)
+            assert j.status == 'new'
+        jobs(1).remove()
+        assert len(jobs) == 2
+
+    def test_d_JobsRemoved(self):
+        """ Check the removal survived the restart and that new ids are not reused"""
+        from GangaCore.GPI import Job, jobs
+        assert jobs.ids() == [0, 2]
+        j = Job()
+        assert j.id == 3
+
+    def test_e_IndexColumns(self):
+        """ Check the queryable index columns are kept up to date"""
+        import sqlite3
+        con = sqlite3.connect(getDBFile())
+        rows = con.execute("SELECT id, status, backend, name FROM objects ORDER BY id").fetchall()
+        con.close()
+        assert rows == [(0, 'new', 'Localhost', testStr + '0'), (2, 'new', 'Localhost', testStr + '2'), (3, 'new', 'Localhost', '')]
+
+    def test_f_SubjobConstruction(self):
+        """ Construct a job with some subjobs"""
+        from GangaCore.GPI import Job, ArgSplitter
+        j = Job(splitter=ArgSplitter(args=[[1], [2], [3]]))
+        j.submit()
+        assert j.id == 4
+        assert len(j.subjobs) == 3
+
+    def test_g_SubjobRows(self):
+        """ Check the subjobs are stored in their own rows and only loaded when needed"""
+        import sqlite3
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository.SubJobSQLiteList import SubJobSQLiteList
+
+        con = sqlite3.connect(getDBFile())
+        rows = con.execute("SELECT master, id, status FROM subjobs ORDER BY id").fetchall()
+        master_data = con.execute("SELECT data FROM objects WHERE id = 4").fetchone()[0]
+        con.close()
+        assert [row[:2] for row in rows] == [(4, 0), (4, 1), (4, 2)]
+        assert b'<attribute name="subjobs">' not in master_data
+
+        j = jobs(4)
+        subjobs = stripProxy(j).subjobs
+        assert isinstance(subjobs, SubJobSQLiteList)
+        assert len(subjobs) == 3
+        assert subjobs.getAllSJStatus() == [row[2] for row in rows]
+        assert not any(subjobs.isLoaded(i) for i in range(3))
+
+        assert j.subjobs(1).application.args[0] == 2
+        assert subjobs.isLoaded(1)
+        assert not subjobs.isLoaded(0)
+        assert [sj.application.args[0] for sj in j.subjobs] == [1, 2, 3]
+
+
+class TestSQLiteMigration(GangaUnitTest):
+
+    @classmethod
+    def gangadir(cls):
+        """Both repository types are used from the same gangadir"""
+        return path.join(path.dirname(GangaUnitTest.gangadir()), cls.__name__)
+
+    def setUp(self):
+        """The first test writes a LocalXML repository, the others run with SQLite"""
+        repositorytype = 'LocalXML' if self._testMethodName.startswith('test_a') else 'SQLite'
+        extra_opts = [('Configuration', 'repositorytype', repositorytype), ('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestSQLiteMigration, self).setUp(extra_opts=extra_opts)
+
+    def test_a_MakeXMLJobs(self):
+        """ Construct some jobs in a LocalXML repository"""
+        from GangaCore.GPI import Job, ArgSplitter, jobs
+        j = Job(name=testStr, splitter=ArgSplitter(args=[[1], [2], [3]]))
+        j.submit()
+        assert len(j.subjobs) == 3
+        Job(name=testStr + '1')
+        assert len(jobs) == 2
+
+    def test_b_Migrate(self):
+        """ Import the LocalXML repository into SQLite"""
+        from GangaCore.GPI import jobs, migrateRepository
+        assert len(jobs) == 0
+        migrated = migrateRepository()
+        assert migrated['jobs'] == [0, 1]
+        assert len(jobs) == 2
+        # Running again must not duplicate anything
+        assert migrateRepository()['jobs'] == []
+
+    def test_c_MigratedJobsLoad(self):
+        """ Check the migrated jobs survive a restart with their subjobs"""
+        from GangaCore.GPI import jobs
+        assert len(jobs) == 2
+        j = jobs(0)
+        assert j.name == testStr
+        assert len(j.subjobs) == 3
+        assert [sj.application.args[0] for sj in j.subjobs] == [1, 2, 3]
+        assert jobs(1).name == testStr + '1'
+
+
+class TestSQLiteRepoHammer(GangaUnitTest):
+
+    def setUp(self):
+        extra_opts = [('Configuration', 'repositorytype', 'SQLite'), ('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestSQLiteRepoHammer, self).setUp(extra_opts=extra_opts)
+
+    def test_pass1(self):
+        """ Run the random add/delete/load/lock/flush actions of TestRepo against the SQLite repository"""
+        from .TestRepo import testRepository
+        t = testRepository(1)
+        while not t.isReadyForCheck():
+            pass
+        t.checkTest()
@@ -0,0 +1,60 @@
+from os import path
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+n_subjobs = 5
+
+
+class TestSubJobStatusIndex(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests"""
+        super(TestSubJobStatusIndex, self).setUp(extra_opts=[('TestingFramework', 'AutoCleanup', 'False')])
+
+    def test_a_SubmitSplitJob(self):
+        """ Submit a job with some subjobs, wait for it to finish and make sure all the subjobs are completed"""
+        from GangaCore.GPI import Job, ArgSplitter
+        from GangaTest.Framework.utils import sleep_until_completed, is_job_finished
+        j = Job(splitter=ArgSplitter(args=[[str(i)] for i in range(n_subjobs)]))
+        j.submit()
+        sleep_until_completed(j)
+        assert is_job_finished(j)
+        for sj in j.subjobs:
+            sj.force_status('completed')
+        assert j.returnSubjobStatuses() == "0/0/0/%s" % n_subjobs
+
+    def test_b_StatusIndexPersisted(self):
+        """ Check the status index is read from disk without loading any subjobs"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = stripProxy(jobs(0))
+        subjobs = j.subjobs
+        assert path.isfile(path.join(subjobs._jobDirectory, 'subjobs.status'))
+        assert subjobs._statusIndex is not None
+        assert subjobs.getSJStatusCounts() == {'completed': n_subjobs}
+        assert subjobs.getSJIdsWithStatus('submitted', 'running') == []
+        assert j.returnSubjobStatuses() == "0/0/0/%s" % n_subjobs
+        assert not any(subjobs.isLoaded(i) for i in range(n_subjobs))
+
+    def test_c_StatusIndexUpdated(self):
+        """ Check a status change of a subjob is reflected in the index straight away"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        jobs(0).subjobs(2).force_status('failed')
+        subjobs = stripProxy(jobs(0)).subjobs
+        assert subjobs.getSJStatusCounts() == {'completed': n_subjobs - 1, 'failed': 1}
+        assert subjobs.getAllSJStatus()[2] == 'failed'
+        assert jobs(0).returnSubjobStatuses() == "0/1/0/%s" % (n_subjobs - 1)
+
+    def test_d_IndexJournalReplayed(self):
+        """ Check the change of a single subjob was journaled rather than rewriting the whole index, and is read back"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        subjobs = stripProxy(jobs(0)).subjobs
+        assert path.isfile(path.join(subjobs._jobDirectory, 'subjobs.idx.journal'))
+        assert subjobs._subjobIndexData[2]['status'] == 'failed'
+        assert subjobs.getSJStatusCounts() == {'completed': n_subjobs - 1, 'failed': 1}
+        assert not any(subjobs.isLoaded(i) for i in range(n_subjobs))
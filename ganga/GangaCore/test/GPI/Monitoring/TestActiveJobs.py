@@ -0,0 +1,81 @@
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestActiveJobs(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests and that nothing is monitored in the background"""
+        extra_opts = [('PollThread', 'autostart', 'False'), ('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestActiveJobs, self).setUp(extra_opts=extra_opts)
+
+    def test_a_StatusTransitions(self):
+        """ Check the active jobs follow the status transitions of the jobs"""
+        from GangaCore.GPI import Job
+        from GangaCore.Core.GangaRepository import getRegistry
+
+        registry = getRegistry('jobs')
+        j0 = Job()
+        j1 = Job()
+        assert registry.getActiveJobIds() == []
+
+        registry.activeJobsChanged.clear()
+        j1.submit()
+        assert registry.getActiveJobIds() == [j1.id]
+        assert registry.activeJobsChanged.is_set()
+
+        j2 = Job()
+        j2.submit()
+        assert registry.getActiveJobIds() == [j1.id, j2.id]
+
+        j1.force_status('failed')
+        assert registry.getActiveJobIds() == [j2.id]
+
+        j2.remove()
+        assert registry.getActiveJobIds() == []
+        assert j0.status == 'new'
+
+    def test_b_SubmitAgain(self):
+        """ Submit the job which is left in the new status"""
+        from GangaCore.GPI import jobs
+        assert jobs(1).status == 'failed'
+        jobs(0).submit()
+
+    def test_c_ActiveAfterRestart(self):
+        """ Check the active jobs are found from the index after a restart"""
+        from GangaCore.Core.GangaRepository import getRegistry
+        registry = getRegistry('jobs')
+        assert registry.getActiveJobIds() == [0]
+        assert registry.getActiveJobIds(rescan=True) == [0]
+
+    def test_d_BackendBackOff(self):
+        """ Check backends whose jobs don't change are checked less and less often"""
+        from GangaCore.GPI import jobs
+        from GangaCore.Core import monitoring_component
+        from GangaCore.Utility.Config import getConfig
+
+        config = getConfig('PollThread')
+        jobList = [jobs(0)]
+        monitoring_component.steps = 0
+        monitoring_component._backendPolling.clear()
+
+        assert monitoring_component._isBackendDue('Localhost', jobList)
+        assert not monitoring_component._isBackendDue('Localhost', jobList)
+
+        intervals = []
+        for _ in range(6):
+            monitoring_component._recordBackendActivity('Localhost', False)
+            intervals.append(monitoring_component._backendPolling['Localhost']['interval'])
+        assert intervals == sorted(intervals)
+        assert intervals[0] > config['base_poll_rate']
+        assert intervals[-1] == (config['Localhost'] if 'Localhost' in config else config['default_backend_poll_rate'])
+
+        # Any change goes back to checking at every step
+        monitoring_component._recordBackendActivity('Localhost', True)
+        assert monitoring_component._backendPolling['Localhost']['interval'] == config['base_poll_rate']
+
+        # as does asking for monitoring on demand
+        monitoring_component._backendPolling['Localhost']['interval'] = 1000
+        assert not monitoring_component._isBackendDue('Localhost', jobList)
+        monitoring_component.steps = 1
+        assert monitoring_component._isBackendDue('Localhost', jobList)
+        monitoring_component.steps = 0
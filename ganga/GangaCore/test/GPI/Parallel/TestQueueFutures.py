@@ -0,0 +1,98 @@
+
+
+import threading
+
+import pytest
+
+from GangaCore.testlib.decorators import add_config
+
+global_num_threads = 3
+
+
+@add_config([('Queues', 'NumWorkerThreads', global_num_threads)])
+@pytest.mark.usefixtures('gpi')
+class TestQueueFutures(object):
+
+    def test_a_Results(self):
+        from GangaCore.GPI import queues
+
+        def square(x):
+            return x * x
+
+        futures = [queues.add(square, args=(i,)) for i in range(20)]
+        done, not_done = queues.waitForAll(futures)
+        assert len(done) == 20 and not not_done
+        assert [f.result() for f in futures] == [i * i for i in range(20)]
+
+    def test_b_ExceptionAndCallback(self):
+        from GangaCore.GPI import queues
+
+        def fail():
+            raise ValueError('expected failure')
+
+        called = []
+        future = queues._user_threadpool.add_function(len, args=([1, 2, 3],), callback_func=called.append)
+        failed = queues.add(fail)
+        queues.waitForAll([future, failed, None])
+        # The callback has always been run by the time the future is resolved
+        assert called == [3]
+        assert future.result() == 3
+        assert isinstance(failed.exception(), ValueError)
+
+    def test_c_WaitForAny(self):
+        from GangaCore.GPI import queues
+
+        release = threading.Event()
+        blocked = queues.add(release.wait)
+        quick = queues.add(len, args=('abc',))
+        done, not_done = queues.waitForAny([blocked, quick], timeout=30)
+        assert quick in done
+        assert blocked in not_done
+
+        done, not_done = queues.waitForAll([blocked], timeout=0.1)
+        assert not done
+        release.set()
+        done, not_done = queues.waitForAll([blocked], timeout=30)
+        assert blocked in done
+
+    def test_d_PurgeCancels(self):
+        from GangaCore.GPI import queues
+
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def block():
+            started.release()
+            return release.wait()
+
+        blocking = [queues.add(block) for _ in range(global_num_threads)]
+        # Make sure every worker is busy so that the next task stays in the queue
+        for _ in blocking:
+            assert started.acquire(timeout=30)
+        queued = queues.add(len, args=('abc',), priority=9)
+        queues.purge(force=True)
+        assert queued.cancelled()
+        release.set()
+        queues.waitForAll(blocking)
+        assert all(f.result() for f in blocking)
+
+    def test_e_ParallelSubmit(self):
+        from GangaCore.GPI import Job, ArgSplitter
+
+        j = Job(splitter=ArgSplitter(args=[[str(i)] for i in range(10)]))
+        j.parallel_submit = True
+        j.submit()
+        assert len(j.subjobs) == 10
+        for sj in j.subjobs:
+            assert sj.status not in ['new', 'submitting']
+
+    def test_f_SystemExit(self):
+        from GangaCore.GPI import queues
+
+        def leave():
+            raise SystemExit(1)
+
+        future = queues.add(leave)
+        done, not_done = queues.waitForAll([future], timeout=30)
+        assert future in done
+        assert isinstance(future.exception(), SystemExit)
@@ -0,0 +1,59 @@
+
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestTaskEvents(GangaUnitTest):
+    """Check the Tasks loop follows the status changes of the jobs rather than polling every task"""
+
+    def setUp(self):
+        # A long loop frequency means the task can only finish in time by reacting to the job status changes
+        extra_opts = [('Tasks', 'TaskLoopFrequency', 300.), ('Tasks', 'ForceTaskMonitoring', True),
+                      ('Local', 'max_concurrent_jobs', 10)]
+        super(TestTaskEvents, self).setUp(extra_opts=extra_opts)
+
+    def test_a_StatusCounts(self):
+        """Check the job registry keeps the status counts of a job up to date"""
+        from GangaCore.GPI import Job
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository import getRegistry
+
+        jobs_registry = getRegistry('jobs')
+        changed = []
+        jobs_registry.addStatusListener(changed.append)
+
+        j = Job()
+        assert jobs_registry.getJobStatusCounts(j.id) == {'new': 1}
+
+        generation = jobs_registry.status_generation
+        stripProxy(j).updateStatus('submitting')
+        assert j.id in changed
+        assert jobs_registry.status_generation > generation
+        assert jobs_registry.getJobStatusCounts(j.id) == {'submitting': 1}
+
+        jobs_registry.removeStatusListener(changed.append)
+
+    def test_b_TaskFollowsJobs(self):
+        """Check the units of a task complete without waiting for the next polling of the tasks"""
+        import time
+        from GangaCore.GPI import runMonitoring, CoreTask, CoreTransform, Executable, GenericSplitter
+
+        t = CoreTask()
+        trf = CoreTransform()
+        trf.application = Executable()
+        trf.unit_splitter = GenericSplitter()
+        trf.unit_splitter.attribute = "application.args"
+        trf.unit_splitter.values = ['arg 1', 'arg 2', 'arg 3']
+        t.appendTransform(trf)
+        t.float = 20
+        t.run()
+
+        end_time = time.time() + 240
+        while t.status != 'completed' and time.time() < end_time:
+            runMonitoring()
+            time.sleep(1)
+        assert t.status == 'completed'
+        assert t.transforms[0].n_all() == 3
+        assert t.transforms[0].n_status('completed') == 3
+        for unit in t.transforms[0].units:
+            assert unit.status == 'completed'
@@ -0,0 +1,76 @@
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestCreateSubjobs(GangaUnitTest):
+
+    def test_a_independent_subjobs(self):
+        """Check the subjobs created together are full copies of the master which don't share anything changeable"""
+        from GangaCore.GPI import Job, Executable, LocalFile
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Lib.Splitters.ArgSplitter import ArgSplitter
+
+        j = Job(name='master', application=Executable(exe='echo', args=['a']), outputfiles=[LocalFile('out.txt')])
+        subjobs = ArgSplitter().createSubjobs(stripProxy(j), 3)
+
+        self.assertEqual(len(subjobs), 3)
+        for sj in subjobs:
+            self.assertEqual(sj.name, 'master')
+            self.assertEqual(sj.application.exe, 'echo')
+            self.assertEqual(sj.application.args, ['a'])
+            self.assertEqual([f.namePattern for f in sj.outputfiles], ['out.txt'])
+            self.assertEqual(sj.status, 'new')
+            self.assertIsNone(sj.splitter)
+            self.assertIs(sj.application._getParent(), sj)
+            self.assertIs(sj.outputfiles[0]._getParent(), sj)
+
+        subjobs[1].application.args.append('b')
+        subjobs[1].outputfiles[0].namePattern = 'other.txt'
+        self.assertEqual(subjobs[0].application.args, ['a'])
+        self.assertEqual(subjobs[2].application.args, ['a'])
+        self.assertEqual(subjobs[2].outputfiles[0].namePattern, 'out.txt')
+        self.assertEqual(j.application.args, ['a'])
+
+    def test_b_share_counter(self):
+        """Check each subjob copy of a prepared application is counted as a reference to its shared directory"""
+        from GangaCore.GPI import Job, Executable, GenericSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository import getRegistry
+
+        j = Job(application=Executable())
+        j.prepare()
+        shareref = getRegistry("prep").getShareRef()
+        name = j.application.is_prepared.name
+        count = shareref.name[name]
+
+        s = GenericSplitter(attribute='application.args', values=[['1'], ['2'], ['3']])
+        subjobs = stripProxy(s).split(stripProxy(j))
+        self.assertEqual([sj.application.args for sj in subjobs], [['1'], ['2'], ['3']])
+        self.assertEqual(shareref.name[name], count + 3)
+
+    def test_c_generic_splitter_checks(self):
+        """Check GenericSplitter still applies the GPI checks to the values it sets"""
+        from GangaCore.GPI import Job, GenericSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy, GangaAttributeError, ProtectedAttributeError
+
+        j = Job()
+        with self.assertRaises(GangaAttributeError):
+            stripProxy(GenericSplitter(attribute='application.nothing', values=['1'])).split(stripProxy(j))
+        with self.assertRaises(ProtectedAttributeError):
+            stripProxy(GenericSplitter(attribute='status', values=['completed'])).split(stripProxy(j))
+
+    def test_d_submit(self):
+        """Check the subjobs are set up and submitted as usual"""
+        from GangaCore.GPI import Job, Executable, GenericSplitter
+        from GangaTest.Framework.utils import sleep_until_completed, file_contains
+
+        j = Job(application=Executable(exe='echo'))
+        j.splitter = GenericSplitter(multi_attrs={'application.args': [['x1'], ['x2']], 'name': ['n1', 'n2']})
+        j.submit()
+
+        self.assertEqual(len(j.subjobs), 2)
+        self.assertEqual([sj.id for sj in j.subjobs], [0, 1])
+        self.assertEqual([sj.name for sj in j.subjobs], ['n1', 'n2'])
+        self.assertNotEqual(j.subjobs[0].info.uuid, j.subjobs[1].info.uuid)
+        self.assertTrue(sleep_until_completed(j, 60), 'Timeout on completing job')
+        for i, sj in enumerate(j.subjobs):
+            self.assertTrue(file_contains(sj.outputdir + '/stdout', 'x%d' % (i + 1)))
@@ -0,0 +1,30 @@
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestLocalSlots(GangaUnitTest):
+
+    def setUp(self):
+        """Only allow one local job to run at once"""
+        extra_opts = [('Local', 'max_concurrent_jobs', 1)]
+        super(TestLocalSlots, self).setUp(extra_opts=extra_opts)
+
+    def testQueuedSubjobs(self):
+        """Check subjobs wait in the submitted state for a free slot and all of them are run in the end"""
+        from GangaCore.GPI import Job, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaTest.Framework.utils import sleep_until_completed, file_contains
+
+        j = Job()
+        j.splitter = ArgSplitter(args=[['1'], ['2'], ['3']])
+        j.submit()
+
+        started = [s for s in j.subjobs if stripProxy(s.backend).wrapper_pid != -1]
+        self.assertEqual(len(started), 1)
+        for s in j.subjobs:
+            self.assertIn(s.status, ['submitted', 'running', 'completed'])
+
+        self.assertTrue(sleep_until_completed(j, 120), 'Timeout on completing job')
+
+        for i, s in enumerate(j.subjobs):
+            self.assertEqual(s.status, 'completed')
+            self.assertTrue(file_contains(s.outputdir + '/stdout', '%d' % (i + 1)))
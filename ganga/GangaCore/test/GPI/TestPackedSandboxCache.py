@@ -0,0 +1,53 @@
+import os
+import tarfile
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestPackedSandboxCache(GangaUnitTest):
+
+    def testSharedSandbox(self):
+        """Check jobs with the same sandbox files share one cached tarball which is rebuilt when a file changes"""
+        from GangaCore.GPI import Job
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.GPIDev.Lib.File.File import File
+        from GangaCore.GPIDev.Lib.File.FileBuffer import FileBuffer
+        from GangaCore.Core.Sandbox.Sandbox import SANDBOX_CACHE_DIR
+
+        input_file = os.path.join(self.gangadir(), 'sandbox_input.txt')
+        with open(input_file, 'w') as f:
+            f.write('input\n')
+
+        def sandbox_files():
+            return [File(input_file), FileBuffer('script.sh', '#!/bin/sh\necho hello\n', executable=1)]
+
+        j1 = stripProxy(Job())
+        j2 = stripProxy(Job())
+        tarball1 = j1.createPackedInputSandbox(sandbox_files())[0]
+        tarball2 = j2.createPackedInputSandbox(sandbox_files())[0]
+
+        self.assertNotEqual(tarball1, tarball2)
+        self.assertTrue(os.path.samefile(tarball1, tarball2))
+        cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(tarball1))), SANDBOX_CACHE_DIR)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        with tarfile.open(tarball2, 'r:gz') as tf:
+            self.assertEqual(sorted(tf.getnames()), ['./sandbox_input.txt', 'script.sh'])
+            self.assertEqual(tf.extractfile('./sandbox_input.txt').read(), b'input\n')
+            self.assertTrue(tf.getmember('script.sh').mode & 0o100)
+
+        with open(input_file, 'a') as f:
+            f.write('changed\n')
+        tarball3 = stripProxy(Job()).createPackedInputSandbox(sandbox_files())[0]
+        self.assertFalse(os.path.samefile(tarball1, tarball3))
+        with tarfile.open(tarball3, 'r:gz') as tf:
+            self.assertEqual(tf.extractfile('./sandbox_input.txt').read(), b'input\nchanged\n')
+
+        # Reusing a cached tarball refreshes it so that pruning leaves it alone
+        cached = os.path.join(cache_dir, sorted(os.listdir(cache_dir), key=lambda name: os.stat(os.path.join(cache_dir, name)).st_mtime)[0])
+        os.utime(cached, (0, 0))
+        with open(input_file, 'w') as f:
+            f.write('input\n')
+        tarball4 = stripProxy(Job()).createPackedInputSandbox(sandbox_files())[0]
+        self.assertTrue(os.path.samefile(cached, tarball4))
+        self.assertGreater(os.stat(cached).st_mtime, 0)
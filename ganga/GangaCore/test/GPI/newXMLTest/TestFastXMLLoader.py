@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+from .utilFunctions import getJobsPath, getXMLFile
+
+testStr = "testFooString"
+
+# Number of jobs in the synthetic repository used to compare the loaders
+benchmark_jobs = 500
+
+
+def getAllXMLFiles():
+    """ Return the paths of all of the job and subjob data files in the jobs repo"""
+    all_files = []
+    for dirpath, dirnames, filenames in os.walk(getJobsPath()):
+        all_files.extend(os.path.join(dirpath, f) for f in filenames if f == 'data')
+    return sorted(all_files)
+
+
+def loadWith(loader_class, xml_file):
+    """ Load the object in a file with the given loader and return it with the errors
+    Args:
+        loader_class (class): Loader or FastLoader
+        xml_file (str): the path of the XML file
+    """
+    with open(xml_file) as handler:
+        return loader_class().parse(handler.read())
+
+
+def toXML(obj):
+    """ Return the XML which would be written to disk for obj"""
+    from GangaCore.Core.GangaRepository.VStreamer import to_file
+    sio = StringIO()
+    to_file(obj, sio, '')
+    return sio.getvalue()
+
+
+def checkParents(obj):
+    """ Check every Node in the tree below obj has obj as its parent as the Loader sets them"""
+    from GangaCore.GPIDev.Base.Objects import GangaObject, Node
+    from GangaCore.GPIDev.Lib.GangaList.GangaList import GangaList
+    for value in obj._data.values():
+        if isinstance(value, Node):
+            assert value._getParent() is obj
+        if isinstance(value, GangaList):
+            for elem in value._list:
+                if isinstance(elem, GangaObject):
+                    assert elem._getParent() is obj
+        if isinstance(value, GangaObject) and not isinstance(value, GangaList):
+            checkParents(value)
+
+
+class TestFastXMLLoader(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests"""
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False')]
+        if self._testMethodName.startswith('test_b'):
+            extra_opts.append(('Configuration', 'fastXMLLoader', True))
+        super(TestFastXMLLoader, self).setUp(extra_opts=extra_opts)
+
+    def test_a_LoadersAgree(self):
+        """ Check the FastLoader builds the same objects as the Loader from every file in the repo"""
+        from GangaCore.GPI import Job, ArgSplitter, LocalFile
+        from GangaCore.Core.GangaRepository.VStreamer import Loader, FastLoader
+
+        j = Job(name=testStr)
+        j.inputfiles = [LocalFile('a.txt'), LocalFile('b.txt')]
+        j.splitter = ArgSplitter(args=[[1], ['&<two>'], ['three', '3.0']])
+        j.submit()
+        assert len(j.subjobs) == 3
+        j2 = Job(name=testStr + '2')
+        j2.application.args = [[1, 2], 'x']
+        j2.outputfiles = [LocalFile('d.txt')]
+
+        from GangaCore.Runtime.Repository_runtime import flush_all
+        flush_all()
+
+        all_files = getAllXMLFiles()
+        assert len(all_files) == 5
+        for xml_file in all_files:
+            slow_obj, slow_errs = loadWith(Loader, xml_file)
+            fast_obj, fast_errs = loadWith(FastLoader, xml_file)
+            assert not slow_errs and not fast_errs
+            assert type(fast_obj) is type(slow_obj)
+            assert toXML(fast_obj) == toXML(slow_obj)
+            checkParents(fast_obj)
+
+    def test_b_RepositoryLoad(self):
+        """ Check the jobs are loaded correctly by the repository when using the FastLoader"""
+        from GangaCore.GPI import jobs
+        from GangaCore.Utility.Config import getConfig
+        assert getConfig('Configuration')['fastXMLLoader']
+        assert len(jobs) == 2
+        j = jobs(0)
+        assert j.name == testStr
+        assert [f.namePattern for f in j.inputfiles] == ['a.txt', 'b.txt']
+        assert [sj.application.args for sj in j.subjobs] == [[1], ['&<two>'], ['three', '3.0']]
+        assert jobs(1).application.args == [[1, 2], 'x']
+
+    def test_c_Benchmark(self):
+        """ Load a synthetic repository made of copies of the jobs with both loaders and check the FastLoader is quicker"""
+        from GangaCore.Core.GangaRepository.VStreamer import Loader, FastLoader
+
+        synthetic_dir = tempfile.mkdtemp()
+        try:
+            all_files = []
+            templates = getAllXMLFiles()
+            for i in range(benchmark_jobs):
+                this_dir = os.path.join(synthetic_dir, '%sxxx' % (i // 1000), str(i))
+                os.makedirs(this_dir)
+                this_file = os.path.join(this_dir, 'data')
+                shutil.copy(templates[i % len(templates)], this_file)
+                all_files.append(this_file)
+
+            rates = {}
+            for loader_class in (Loader, FastLoader, Loader, FastLoader):
+                start = time.time()
+                for xml_file in all_files:
+                    obj, errs = loadWith(loader_class, xml_file)
+                    assert not errs
+                rate = len(all_files) / max(time.time() - start, 1e-6)
+                rates[loader_class] = max(rates.get(loader_class, 0), rate)
+        finally:
+            shutil.rmtree(synthetic_dir)
+
+        assert rates[FastLoader] > rates[Loader], 'FastLoader %.1f jobs/sec, Loader %.1f jobs/sec' % (rates[FastLoader], rates[Loader])
+        assert getXMLFile(0) in templates
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+from .TestFastXMLLoader import getAllXMLFiles, loadWith
+from .TestNestedXMLWorking import getNestedList
+
+testStr = "testFooString"
+
+
+class CountingWriter(StringIO):
+    """ StringIO which counts the number of writes made to it"""
+
+    def __init__(self):
+        super(CountingWriter, self).__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super(CountingWriter, self).write(s)
+
+
+def bothXML(obj, ignore_subs=''):
+    """ Return the XML for obj written by the FastXMLWriter and by the VStreamer visitor"""
+    from GangaCore.Core.GangaRepository.VStreamer import to_file, _raw_to_file
+    fast = StringIO()
+    to_file(obj, fast, ignore_subs)
+    slow = StringIO()
+    _raw_to_file(obj, slow, [ignore_subs])
+    return fast.getvalue(), slow.getvalue()
+
+
+class TestFastXMLWriter(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests"""
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestFastXMLWriter, self).setUp(extra_opts=extra_opts)
+
+    def test_a_SameAsVStreamer(self):
+        """ Check the fast writer produces exactly the same XML as the VStreamer"""
+        from GangaCore.GPI import Job, ArgSplitter, LocalFile, Executable
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = Job(name=testStr + ' & <"quoted">')
+        j.comment = "it's \\ escaped\nover two lines"
+        j.inputfiles = [LocalFile('a.txt'), LocalFile('b.txt')]
+        j.application = Executable(args=['1', '&<two>', "'three'"], env={'FOO': 'bar', 'N': '1'})
+        j.splitter = ArgSplitter(args=getNestedList())
+        j2 = Job(name=testStr)
+        j2.splitter = ArgSplitter(args=[['1'], ['2'], ['3']])
+        j2.submit()
+        assert len(j2.subjobs) == 3
+
+        for obj in [j, j2, j2.subjobs(1), j.application, j.inputfiles]:
+            fast, slow = bothXML(stripProxy(obj))
+            assert fast == slow
+        fast, slow = bothXML(stripProxy(j2), 'subjobs')
+        assert fast == slow
+        assert 'name="subjobs"' not in fast
+
+    def test_b_RoundTrip(self):
+        """ Check every file on disk loads and writes back the same XML with both loaders and writers"""
+        from GangaCore.Core.GangaRepository.VStreamer import Loader, FastLoader
+        from GangaCore.GPI import jobs
+        assert len(jobs) == 2
+
+        all_files = getAllXMLFiles()
+        assert len(all_files) == 5
+        for xml_file in all_files:
+            for loader_class in (Loader, FastLoader):
+                obj, errs = loadWith(loader_class, xml_file)
+                assert not errs
+                fast, slow = bothXML(obj)
+                assert fast == slow
+                # Loading what was written must give back the same object
+                reloaded, errs = loader_class().parse(fast)
+                assert not errs
+                assert bothXML(reloaded)[0] == fast
+
+    def test_c_Streaming(self):
+        """ Check large objects are written to the file object in pieces"""
+        from GangaCore.Core.GangaRepository.VStreamer import FastXMLWriter, _raw_to_file
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.GPI import Job, LocalFile
+
+        j = Job()
+        j.inputfiles = [LocalFile('file%s.txt' % i) for i in range(1000)]
+
+        fobj = CountingWriter()
+        FastXMLWriter(fobj, ['subjobs']).write_root(stripProxy(j))
+        assert fobj.writes > 1
+
+        slow = StringIO()
+        _raw_to_file(stripProxy(j), slow, ['subjobs'])
+        assert fobj.getvalue() == slow.getvalue()
@@ -6,7 +6,7 @@ from os import path, stat, unlink
 
 import time
 
-from .utilFunctions import getJobsPath, getXMLDir, getXMLFile, getSJXMLFile, getSJXMLIndex, getIndexFile
+from .utilFunctions import getJobsPath, getXMLDir, getXMLFile, getSJXMLFile, getSJXMLIndex, getSJXMLIndexJournal, getIndexFile
 
 testStr = "testFooString"
 testArgs = [[1],[2],[3],[4],[5]]
@@ -259,6 +259,16 @@ class TestSJXMLGenAndLoad(GangaUnitTest):
 
             assert isinstance(obj, dict)
 
+            # Records written since the index was last compacted are appended to the journal
+            if path.isfile(getSJXMLIndexJournal(j)):
+                import pickle
+                with open(getSJXMLIndexJournal(j), 'rb') as journal:
+                    while True:
+                        try:
+                            obj.update(pickle.load(journal))
+                        except EOFError:
+                            break
+
             from GangaCore.GPIDev.Base.Proxy import stripProxy, getName
             raw_j = stripProxy(j)
 
@@ -38,6 +38,14 @@ def getSJXMLIndex(this_j):
     """
     return path.join(getXMLDir(this_j), 'subjobs.idx')
 
+# Journal of the updates to the XML sub-j index of job
+def getSJXMLIndexJournal(this_j):
+    """ Returns the path of the journal of updates to the subjob index file for a given job (Job or id) within the jobs repo
+    Args:
+        this_job (Job, int): The Job or Job_ID of interest
+    """
+    return path.join(getXMLDir(this_j), 'subjobs.idx.journal')
+
 # XML of sub-j
 def getSJXMLFile(this_sj):
     """ Returns the path of the XML data file for a given job (subJob or id) within the jobs repo
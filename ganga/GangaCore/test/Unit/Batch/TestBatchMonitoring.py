@@ -0,0 +1,116 @@
+import os
+import sys
+
+import pytest
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from GangaCore.Utility.Config import getConfig
+
+fake_queue = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_queue.py')
+
+
+@pytest.yield_fixture
+def queue(tmpdir):
+    """Point the Slurm queue query at the fake queue CLI and return the files it reads and records its calls in"""
+    queue_file = tmpdir.join('queue')
+    calls_file = tmpdir.join('calls')
+    config = getConfig('Slurm')
+    config.setSessionValue('queue_query_str', '%s %s %s %s' % (sys.executable, fake_queue, queue_file, calls_file))
+    yield queue_file, calls_file
+    config.revertToDefault('queue_query_str')
+
+
+def _make_job(tmpdir, batch_id, status, status_file=None):
+    """A job on the Slurm backend with its output workspace in tmpdir"""
+    outdir = tmpdir.mkdir('job%s' % batch_id)
+    if status_file is not None:
+        outdir.join('__jobstatus__').write(status_file)
+    job = Mock(spec=['status', 'subjobs', 'backend', 'getOutputWorkspace', 'updateStatus', 'getFQID', '_getSessionLock'])
+    job.status = status
+    job.subjobs = []
+    job.backend = Mock(spec=['_name', 'id', 'actualqueue', 'actualCE', 'exitcode'])
+    job.backend._name = 'Slurm'
+    job.backend.id = batch_id
+    job.backend.actualqueue = ''
+    job.getOutputWorkspace.return_value.getPath.return_value = str(outdir)
+
+    def updateStatus(new_status):
+        job.status = new_status
+    job.updateStatus.side_effect = updateStatus
+    return job
+
+
+def test_query_queue(queue):
+    """Check the queue listing is parsed into the status of each job and a failed query gives None"""
+    from GangaCore.Lib.Batch.Batch import query_queue
+    queue_file, calls_file = queue
+    queue_file.write('101 PD\n102 R\nnot a job line\n103 CG\n')
+    assert query_queue(getConfig('Slurm')) == {'101': 'PD', '102': 'R', '103': 'CG'}
+    queue_file.remove()
+    assert query_queue(getConfig('Slurm')) is None
+
+
+def test_status_files_only_read_on_change(queue, tmpdir):
+    """Check jobs which are waiting or still running in the queue are left alone without reading their status files"""
+    from GangaCore.Lib.Batch.Batch import Batch
+    queue_file, calls_file = queue
+    queue_file.write('101 PD\n102 R\n103 R\n')
+    pending = _make_job(tmpdir, '101', 'submitted', 'PID: 101\n')
+    running = _make_job(tmpdir, '102', 'running', 'PID: 102\nQUEUE: short\n')
+    started = _make_job(tmpdir, '103', 'submitted', 'PID: 103\nQUEUE: short\n')
+    finished = _make_job(tmpdir, '104', 'running', 'PID: 104\nEXITCODE: 0\n')
+    jobs = [pending, running, started, finished]
+
+    # The monitoring loop passes the jobs to the backend in bunches
+    with Batch.monitoringCycle(jobs):
+        Batch.updateMonitoringInformation(jobs[:2])
+        Batch.updateMonitoringInformation(jobs[2:])
+
+    # One query for the whole monitoring loop
+    assert len(calls_file.readlines()) == 1
+    assert [j.status for j in jobs] == ['submitted', 'running', 'running', 'completed']
+    assert started.backend.actualqueue == 'short'
+    assert finished.backend.exitcode == 0
+    # The status files of jobs which haven't changed in the queue aren't looked at
+    assert pending.getOutputWorkspace.call_count == 0
+    assert running.getOutputWorkspace.call_count == 0
+
+
+def test_fallback_without_queue(queue, tmpdir):
+    """Check every status file is read when the queue can't be queried"""
+    from GangaCore.Lib.Batch.Batch import Batch
+    queue_file, calls_file = queue
+    pending = _make_job(tmpdir, '101', 'submitted', 'PID: 101\n')
+    failed = _make_job(tmpdir, '102', 'running', 'PID: 102\nEXITCODE: 3\n')
+
+    Batch.updateMonitoringInformation([pending, failed])
+
+    assert len(calls_file.readlines()) == 1
+    assert pending.status == 'running'
+    assert failed.status == 'failed'
+    assert failed.backend.exitcode == 3
+
+
+def test_snapshot_per_thread(queue, tmpdir):
+    """Check the queue query of a monitoring loop is only used by that loop and not once it has finished"""
+    import threading
+    from GangaCore.Lib.Batch.Batch import Batch
+    queue_file, calls_file = queue
+    queue_file.write('101 PD\n')
+    job = _make_job(tmpdir, '101', 'submitted', 'PID: 101\n')
+
+    with Batch.monitoringCycle([job]):
+        # Another monitoring thread makes its own query
+        other = threading.Thread(target=Batch.updateMonitoringInformation, args=([job],))
+        other.start()
+        other.join()
+        assert len(calls_file.readlines()) == 2
+        Batch.updateMonitoringInformation([job])
+        assert len(calls_file.readlines()) == 2
+
+    Batch.updateMonitoringInformation([job])
+    assert len(calls_file.readlines()) == 3
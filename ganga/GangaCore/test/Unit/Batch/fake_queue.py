@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""
+A stand in for the queue query of a batch system (bjobs, qstat, squeue) for the tests.
+
+Usage: fake_queue.py QUEUE_FILE [CALLS_FILE]
+
+Prints the contents of QUEUE_FILE, which holds one "<id> <status>" line per job in the queue, and records the call
+by appending a line to CALLS_FILE. Exits with an error, as if the batch system were down, if QUEUE_FILE is missing.
+"""
+import sys
+
+
+def main():
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'a') as calls_file:
+            calls_file.write('called\n')
+
+    try:
+        with open(sys.argv[1]) as queue_file:
+            sys.stdout.write(queue_file.read())
+    except IOError:
+        sys.stderr.write('fake_queue: cannot contact the batch system\n')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
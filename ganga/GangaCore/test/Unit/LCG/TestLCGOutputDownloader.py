@@ -0,0 +1,120 @@
+from GangaCore.Lib.LCG.LCGOutputDownloader import LCGOutputDownloader
+
+
+class FakePool(object):
+    """
+    Keeps the functions added to it until they are run
+    """
+
+    def __init__(self, num_threads=20):
+        self.tasks = []
+        self.num_threads = num_threads
+
+    def add_function(self, function, args=(), kwargs={}, priority=5, name=None):
+        self.tasks.append((function, args))
+        return True
+
+    def worker_status(self):
+        return [('Worker_%d' % i, 'idle', 'N/A') for i in range(self.num_threads)]
+
+    def run(self):
+        while self.tasks:
+            function, args = self.tasks.pop(0)
+            function(*args)
+
+
+class FakeBackend(object):
+
+    def __init__(self, ce):
+        self.actualCE = ce
+
+
+class FakeJob(object):
+
+    def __init__(self, fqid, ce):
+        self.fqid = fqid
+        self.backend = FakeBackend(ce)
+
+    def getFQID(self, sep):
+        return self.fqid
+
+
+def make_downloader(tmpdir, pool, downloaded, **kwargs):
+    downloader = LCGOutputDownloader(journal=str(tmpdir.join('lcg_output_downloads')), pool=pool, **kwargs)
+
+    def process(item):
+        downloaded.append((item.jobObj.fqid, item.resumed))
+        return 100
+
+    downloader.algorithm.process = process
+    return downloader
+
+
+def test_limits(tmpdir):
+    """
+    Test that no more than the allowed number of downloads run at once, overall and per CE, and that jobs are only
+    downloaded once
+    """
+    pool = FakePool()
+    downloaded = []
+    downloader = make_downloader(tmpdir, pool, downloaded, numThread=3, maxPerCE=1)
+    downloader.start()
+
+    jobs = [FakeJob('0', 'ceA'), FakeJob('1', 'ceA'), FakeJob('2.0', 'ceB'), FakeJob('2.1', 'ceC'), FakeJob('3', 'ceD')]
+    for job in jobs + jobs[:2]:
+        downloader.addTask(job)
+
+    assert downloader.countAliveAgent() == 3
+    assert [args[0] for function, args in pool.tasks] == ['0', '2.0', '2.1']
+    assert downloader.getStatistics()['queued'] == 2
+
+    pool.run()
+    assert sorted(downloaded) == [(job.fqid, False) for job in jobs]
+    stats = downloader.getStatistics()
+    assert stats['queued'] == 0 and stats['running'] == 0
+    assert stats['CEs']['ceA']['downloads'] == 2
+    assert stats['CEs']['ceA']['bytes'] == 200
+
+    # the downloads leave half of the threads of the pool to the other tasks
+    pool = FakePool(num_threads=5)
+    downloader = make_downloader(tmpdir.mkdir('small'), pool, downloaded, numThread=10)
+    downloader.start()
+    for job in jobs:
+        downloader.addTask(job)
+    assert downloader.countAliveAgent() == 2
+    assert downloader.getStatistics()['queued'] == 3
+    downloader.stop()
+
+
+def test_resume(tmpdir, mocker):
+    """
+    Test that the downloads which didn't finish are resumed by the next downloader using the journal
+    """
+    jobs = dict((fqid, FakeJob(fqid, 'ce')) for fqid in ['0', '1', '2'])
+    mocker.patch('GangaCore.Lib.LCG.LCGOutputDownloader._findJob', side_effect=lambda fqid: jobs[fqid])
+
+    pool = FakePool()
+    downloaded = []
+    downloader = make_downloader(tmpdir, pool, downloaded, numThread=1)
+    downloader.start()
+    for fqid in sorted(jobs):
+        downloader.addTask(jobs[fqid])
+    function, args = pool.tasks.pop(0)
+    function(*args)
+    assert downloaded == [('0', False)]
+    downloader.stop()
+
+    # job 1 was handed to the pool and job 2 was still queued when the session stopped
+    pool = FakePool()
+    downloaded = []
+    downloader = make_downloader(tmpdir, pool, downloaded, numThread=1)
+    downloader.start()
+    pool.run()
+    assert downloaded == [('1', True), ('2', True)]
+    downloader.stop()
+    assert downloader._journal_file is None
+
+    downloaded = []
+    make_downloader(tmpdir, pool, downloaded).start()
+    pool.run()
+    assert downloaded == []
@@ -0,0 +1,113 @@
+import sys
+import time
+import subprocess
+
+import pytest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from GangaCore.Utility.Config import getConfig
+
+
+def _sleep(seconds):
+    return [sys.executable, '-c', 'import time; time.sleep(%s)' % seconds]
+
+
+@pytest.yield_fixture
+def scheduler():
+    from GangaCore.Lib.Localhost.LocalScheduler import LocalScheduler
+    config = getConfig('Local')
+    config.setSessionValue('max_concurrent_jobs', 2)
+    local_scheduler = LocalScheduler()
+    yield local_scheduler
+    local_scheduler.clear_pending()
+    for pid in list(local_scheduler._running):
+        local_scheduler._running[pid].kill()
+        local_scheduler.wait(pid)
+    config.revertToDefault('max_concurrent_jobs')
+    config.revertToDefault('min_free_memory')
+
+
+def test_slots(scheduler):
+    """Check no more than max_concurrent_jobs are started unless forced and that exited jobs free their slot"""
+    first = scheduler.start(_sleep(0))
+    second = scheduler.start(_sleep(30))
+    assert scheduler.owns(first.pid) and scheduler.owns(second.pid)
+    first.wait()
+
+    # The first has finished so there is room for one more
+    third = scheduler.start(_sleep(30), wait_for_slot=True)
+    assert third is not None
+    assert scheduler.poll(first.pid) == 0
+    assert scheduler.poll(second.pid) is None
+    assert scheduler.start(_sleep(30), wait_for_slot=True) is None
+    assert scheduler.numRunning() == 2
+
+    # Resubmitting without waiting ignores the limit
+    forced = scheduler.start(_sleep(0))
+    assert scheduler.numRunning() == 3
+    assert scheduler.wait(forced.pid) == 0
+
+    second.kill()
+    assert scheduler.wait(second.pid) != 0
+    scheduler.forget(second.pid)
+    assert not scheduler.owns(second.pid)
+    assert scheduler.start(_sleep(30), wait_for_slot=True) is not None
+
+
+def test_memory_admission(scheduler):
+    """Check jobs wait while there isn't enough memory free, unless there is nothing running"""
+    getConfig('Local').setSessionValue('min_free_memory', 1000)
+    with patch('GangaCore.Lib.Localhost.LocalScheduler.available_memory', return_value=500):
+        assert scheduler.start(_sleep(30), wait_for_slot=True) is not None
+        assert scheduler.start(_sleep(30), wait_for_slot=True) is None
+    with patch('GangaCore.Lib.Localhost.LocalScheduler.available_memory', return_value=2000):
+        assert scheduler.start(_sleep(30), wait_for_slot=True) is not None
+
+
+def test_waiting_jobs_started(scheduler):
+    """Check the jobs waiting for a slot are started in turn once one is free, without anything polling"""
+    scheduler.poll_interval = 0.1
+    started = []
+    first = scheduler.start(_sleep(1), wait_for_slot=True, key='0', on_start=started.append)
+    scheduler.start(_sleep(30), wait_for_slot=True, key='1', on_start=started.append)
+    assert first is not None and started == []
+
+    assert scheduler.start(_sleep(30), wait_for_slot=True, key='2', on_start=started.append) is None
+    assert scheduler.start(_sleep(30), wait_for_slot=True, key='3', on_start=started.append) is None
+    # Asking again doesn't queue the job twice
+    assert scheduler.start(_sleep(30), wait_for_slot=True, key='2', on_start=started.append) is None
+    assert scheduler.cancel('3')
+    assert not scheduler.cancel('3')
+
+    first.wait()
+    for _ in range(50):
+        if started:
+            break
+        time.sleep(0.1)
+    assert len(started) == 1
+    assert scheduler.owns(started[0].pid)
+    time.sleep(0.5)
+    assert len(started) == 1
+
+    # The job picks up the process itself, only once
+    assert scheduler.start(_sleep(30), wait_for_slot=True, key='2', on_start=started.append) is started[0]
+    assert scheduler.claim('2') is None
+    assert not scheduler.cancel('2')
+
+
+def test_adopted_jobs(scheduler):
+    """Check the wrapper scripts left running by an earlier session take up a slot until they exit"""
+    earlier = subprocess.Popen(_sleep(1))
+    try:
+        scheduler.adopt(earlier.pid)
+        assert not scheduler.owns(earlier.pid)
+        assert scheduler.start(_sleep(30), wait_for_slot=True) is not None
+        assert scheduler.numRunning() == 2
+        assert scheduler.start(_sleep(30), wait_for_slot=True) is None
+    finally:
+        earlier.wait()
+    assert scheduler.start(_sleep(30), wait_for_slot=True) is not None
@@ -0,0 +1,114 @@
+import os
+import stat
+import sys
+
+import pytest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from GangaCore.Utility.Config import getConfig
+
+fake_hadd = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_hadd.py')
+
+
+@pytest.yield_fixture
+def root(tmpdir, monkeypatch):
+    """Use the fake hadd in place of ROOT and return the file it records its calls in"""
+    bindir = tmpdir.mkdir('bin')
+    hadd = bindir.join('hadd')
+    hadd.write('#!/bin/sh\nexec "%s" "%s" "$@"\n' % (sys.executable, fake_hadd))
+    hadd.chmod(stat.S_IRWXU)
+    calls = tmpdir.join('calls')
+    monkeypatch.setenv('FAKE_HADD_CALLS', str(calls))
+    config = getConfig('Mergers')
+    with patch('GangaCore.Utility.root.getrootprefix', return_value=(0, str(bindir) + '/')), \
+            patch('GangaCore.Utility.root.checkrootprefix', return_value=0):
+        yield calls
+    config.revertToDefault('root_merge_batch_size')
+    config.revertToDefault('root_merge_resume')
+
+
+def _make_files(tmpdir, n):
+    indir = tmpdir.mkdir('in put')
+    paths = []
+    for i in range(n):
+        indir.join('%d.root' % i).write('%d\n' % i)
+        paths.append(str(indir.join('%d.root' % i)))
+    return paths
+
+
+def _calls(calls):
+    return [int(n) for n in calls.readlines()]
+
+
+def test_single_hadd(tmpdir, root):
+    """Check a few files are merged by one hadd with its output in the log file"""
+    from GangaCore.Lib.Mergers.Merger import RootMerger
+    paths = _make_files(tmpdir, 5)
+    output = str(tmpdir.join('merged.root'))
+    RootMerger().mergefiles(paths, output)
+
+    assert open(output).read() == ''.join('%d\n' % i for i in range(5))
+    assert _calls(root) == [5]
+    log = open(output + '.hadd_output').read()
+    assert log.startswith('# -- Hadd output -- #\n')
+    assert 'hadd Source file 5: %s' % paths[4] in log
+
+
+def test_tree_merge(tmpdir, root):
+    """Check many files are merged in batches, then the batches merged, keeping the order"""
+    from GangaCore.Lib.Mergers.Merger import RootMerger
+    getConfig('Mergers').setSessionValue('root_merge_batch_size', 3)
+    paths = _make_files(tmpdir, 20)
+    output = str(tmpdir.join('merged.root'))
+    RootMerger().mergefiles(paths, output)
+
+    assert open(output).read() == ''.join('%d\n' % i for i in range(20))
+    # 20 files -> 7 batches -> 3 batches -> 1
+    assert sorted(_calls(root)) == sorted([3] * 6 + [2] + [3, 3, 1] + [3])
+    assert 'hadd Source file 2: %s' % paths[19] in open(output + '.hadd_output').read()
+    assert not os.path.exists(output + '.hadd_parts')
+
+
+def test_resume(tmpdir, root):
+    """Check the batches which were merged before a failure are reused when the merge is run again"""
+    from GangaCore.Lib.Mergers.Merger import RootMerger
+    from GangaCore.GPIDev.Adapters.IPostProcessor import PostProcessException
+    getConfig('Mergers').setSessionValue('root_merge_batch_size', 3)
+    paths = _make_files(tmpdir, 9)
+    tmpdir.join('in put', '7.root').write('corrupt\n')
+    output = str(tmpdir.join('merged.root'))
+
+    with pytest.raises(PostProcessException):
+        RootMerger().mergefiles(paths, output)
+    assert 'is not a ROOT file' in open(output + '.hadd_output').read()
+    assert sorted(_calls(root)) == [3, 3, 3]
+
+    tmpdir.join('in put', '7.root').write('7\n')
+    root.remove()
+    RootMerger().mergefiles(paths, output)
+    assert open(output).read() == ''.join('%d\n' % i for i in range(9))
+    # Only the failed batch and the final merge are run again
+    assert _calls(root) == [3, 3]
+    assert not os.path.exists(output + '.hadd_parts')
+
+    # A batch whose inputs changed since it was merged is merged again
+    tmpdir.join('in put', '7.root').write('corrupt\n')
+    with pytest.raises(PostProcessException):
+        RootMerger().mergefiles(paths, output)
+    tmpdir.join('in put', '7.root').write('7\n')
+    tmpdir.join('in put', '1.root').write('one\n')
+    root.remove()
+    RootMerger().mergefiles(paths, output)
+    assert open(output).read() == ''.join('%s\n' % i for i in ['0', 'one'] + list(range(2, 9)))
+    assert _calls(root) == [3, 3, 3]
+
+    # Without resuming nothing is kept after a failure
+    getConfig('Mergers').setSessionValue('root_merge_resume', False)
+    tmpdir.join('in put', '0.root').write('corrupt\n')
+    with pytest.raises(PostProcessException):
+        RootMerger().mergefiles(paths, output)
+    assert not os.path.exists(output + '.hadd_parts')
@@ -0,0 +1,82 @@
+import gzip
+
+import pytest
+
+from GangaCore.Utility.Config import getConfig
+
+
+@pytest.yield_fixture
+def merge_config():
+    config = getConfig('Mergers')
+    yield config
+    config.revertToDefault('text_merge_threads')
+    config.revertToDefault('text_merge_tree_min_files')
+
+
+def _make_files(tmpdir, contents):
+    """Write each of contents to a file, gzipping every third one, and return the paths"""
+    paths = []
+    for i, content in enumerate(contents):
+        if i % 3 == 2:
+            path = str(tmpdir.join('in%d.txt.gz' % i))
+            with gzip.open(path, 'wb') as f:
+                f.write(content)
+        else:
+            path = str(tmpdir.join('in%d.txt' % i))
+            with open(path, 'wb') as f:
+                f.write(content)
+        paths.append(path)
+    return paths
+
+
+def _expected(paths, contents):
+    body = b''.join(b'# Start of file ' + p.encode() + b' #\n' + c + b'\n' for p, c in zip(paths, contents))
+    return body + b'# Ganga Merge Ended Successfully #\n'
+
+
+def _read_merge(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        header = f.readline()
+        assert header.startswith(b'# Ganga TextMergeTool - ')
+        return f.read()
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_merge(tmpdir, merge_config, compress):
+    """Check plain and gzipped files, including ones bigger than a block, are merged in order"""
+    from GangaCore.Lib.Mergers.Merger import TextMerger
+    contents = [b'first line\nsecond line', b'', b'x' * (3 * 1024 * 1024 + 17), b'\xff\xfe not utf-8'] + \
+               [('line %d\n' % i).encode() * 1000 for i in range(5)]
+    paths = _make_files(tmpdir, contents)
+
+    merger = TextMerger()
+    merger.compress = compress
+    output = str(tmpdir.join('merged.txt'))
+    merger.mergefiles(paths, output)
+
+    if compress:
+        output += '.gz'
+    assert _read_merge(output) == _expected(paths, contents)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_merge_tree(tmpdir, merge_config, compress):
+    """Check merging groups of files in parallel gives the same result as one pass"""
+    from GangaCore.Lib.Mergers.Merger import TextMerger
+    contents = [('file %d\n' % i).encode() * (i * 100) for i in range(11)]
+    paths = _make_files(tmpdir, contents)
+    merge_config.setSessionValue('text_merge_threads', 3)
+    merge_config.setSessionValue('text_merge_tree_min_files', 2)
+
+    merger = TextMerger()
+    merger.compress = compress
+    output = str(tmpdir.join('merged.txt'))
+    merger.mergefiles(paths, output)
+
+    if compress:
+        output += '.gz'
+    assert _read_merge(output) == _expected(paths, contents)
+    # The parts are cleaned up
+    assert sorted(f.basename for f in tmpdir.listdir() if f.basename.startswith('merged')) == [tmpdir.join(output).basename]
+    assert not [f for f in tmpdir.listdir() if f.basename.startswith('.merge_parts_')]
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""
+A stand in for ROOT's hadd for the tests.
+
+Usage: fake_hadd.py [OPTIONS] TARGET SOURCE...
+
+Treats the files as text and writes the sources one after the other into the target, printing a line for each file
+like hadd does. Fails, leaving a partial target, if a source contains 'corrupt'. Each call is recorded as a line with
+the number of sources in the file named by $FAKE_HADD_CALLS, if set.
+"""
+import os
+import sys
+
+
+def main():
+    files = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    target, sources = files[0], files[1:]
+    if os.environ.get('FAKE_HADD_CALLS'):
+        with open(os.environ['FAKE_HADD_CALLS'], 'a') as calls:
+            calls.write('%d\n' % len(sources))
+
+    print('hadd Target file: %s' % target)
+    with open(target, 'w') as out:
+        for i, source in enumerate(sources):
+            print('hadd Source file %d: %s' % (i + 1, source))
+            with open(source) as f:
+                content = f.read()
+            if 'corrupt' in content:
+                print('Error in <TFile::Init>: %s is not a ROOT file' % source)
+                sys.exit(1)
+            out.write(content)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import io
+
+from GangaCore.Core.GangaRepository.SubJobStatusIndex import SubJobStatusIndex
+
+
+def _makeIndex():
+    index = SubJobStatusIndex()
+    for sj_id, status in enumerate(['submitted', 'running', 'completed', 'running', 'failed', 'completed']):
+        index.set(sj_id, status, backend_id=str(100 + sj_id), modified=float(sj_id))
+    return index
+
+
+def test_counts_and_ids():
+    """Check the aggregate queries agree with the per-subjob statuses"""
+    index = _makeIndex()
+    assert len(index) == 6
+    assert index.statuses() == ['submitted', 'running', 'completed', 'running', 'failed', 'completed']
+    assert index.counts() == {'submitted': 1, 'running': 2, 'completed': 2, 'failed': 1}
+    assert index.count('running', 'submitted') == 3
+    assert index.count('killed') == 0
+    assert index.ids('submitted', 'running') == [0, 1, 3]
+    assert index.ids('killed') == []
+
+
+def test_update_and_resize():
+    """Check updating a status moves the subjob between the counts and that new entries are unknown"""
+    index = _makeIndex()
+    index.set(1, 'completed')
+    assert index.counts() == {'submitted': 1, 'running': 1, 'completed': 3, 'failed': 1}
+    assert index.getBackendId(1) == '101'
+    index.resize(8)
+    assert index.getStatus(7) is None
+    assert index.getBackendId(7) is None
+    assert sum(index.counts().values()) == 6
+    index.resize(2)
+    assert index.statuses() == ['submitted', 'completed']
+
+
+def test_file_round_trip():
+    """Check the index survives being written and read back"""
+    index = _makeIndex()
+    fobj = io.BytesIO()
+    index.to_file(fobj)
+    fobj.seek(0)
+    loaded = SubJobStatusIndex.from_file(fobj)
+    assert loaded.statuses() == index.statuses()
+    assert [loaded.getBackendId(i) for i in range(len(loaded))] == [str(100 + i) for i in range(6)]
+    assert loaded.getModified(5) == 5.
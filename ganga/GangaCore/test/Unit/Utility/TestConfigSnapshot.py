@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from GangaCore.Utility.Config import Config
+
+config_ini = """
+[Snapshot]
+a = 1
+b = $$GANGA_TEST_SNAPSHOT$$
+c = ${a}/x
+"""
+
+
+@pytest.yield_fixture
+def section():
+    """
+    A section only defined for the test
+    """
+    c = Config.PackageConfig('Snapshot', 'section for the config snapshot tests')
+    yield c
+
+
+@pytest.yield_fixture
+def cache_file(tmpdir, monkeypatch):
+    """
+    A config cache in a temporary directory
+    """
+    filename = str(tmpdir.join('cache', 'config_cache.json'))
+    monkeypatch.setattr(Config, 'config_cache_file', filename)
+    monkeypatch.setenv('GANGA_TEST_SNAPSHOT', 'first')
+    yield filename
+
+
+def test_snapshot(section):
+    """Check the effective values are cached until an option is changed"""
+    section.addOption('a', 1, '')
+    section.addOption('b', ['x'], '')
+    section.addOption('c_PATH', 'x', '')
+
+    assert section['a'] == 1
+    assert section['b'] is section['b']
+    assert section['c_PATH'] == 'x'
+
+    section.setSessionValue('a', 2)
+    assert section['a'] == 2
+    section.setUserValue('a', 3)
+    section.setSessionValue('c_PATH', 'y')
+    assert section['a'] == 3
+    assert section['c_PATH'] == 'y:x:'
+
+    section.revertToSession('a')
+    assert section['a'] == 2
+    section.revertToDefault('a')
+    assert section['a'] == 1
+    assert section.getEffectiveOptions() == {'a': 1, 'b': ['x'], 'c_PATH': 'y:x:'}
+
+    with pytest.raises(Config.ConfigError):
+        section['missing']
+
+
+def test_ini_cache(cache_file, tmpdir, monkeypatch):
+    """Check the options of the config files are read from the cache until a file or the environment changes"""
+    ini = tmpdir.join('snapshot.ini')
+    ini.write(config_ini)
+
+    cfg = Config.read_ini_files(str(ini), {})
+    assert cfg.get('Snapshot', 'b') == 'first'
+    assert cfg.get('Snapshot', 'c') == '1/x'
+    assert os.path.exists(cache_file)
+
+    # the options are read from the cache, not the files
+    monkeypatch.setattr(Config, '_read_ini_files', None)
+    cfg = Config.read_ini_files([str(ini)], {})
+    assert cfg.items('Snapshot') == [('a', '1'), ('b', 'first'), ('c', '1/x')]
+    monkeypatch.undo()
+    monkeypatch.setattr(Config, 'config_cache_file', cache_file)
+
+    # a different value of an environment variable used by the file
+    monkeypatch.setenv('GANGA_TEST_SNAPSHOT', 'second')
+    assert Config.read_ini_files([str(ini)], {}).get('Snapshot', 'b') == 'second'
+
+    # a change to the file
+    ini.write(config_ini.replace('a = 1', 'a = 10'))
+    assert Config.read_ini_files([str(ini)], {}).get('Snapshot', 'c') == '10/x'
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+
+import pytest
+
+from GangaCore.Utility.Plugin import GangaPlugin, PluginManifest
+
+plugin_module = """
+from GangaCore.Utility.Plugin.GangaPlugin import allPlugins
+
+class FakePlugin(object):
+    @classmethod
+    def _declared_property(cls, name):
+        return False
+
+class OtherPlugin(FakePlugin):
+    pass
+
+allPlugins.add(FakePlugin, 'fakebackends', 'FakePlugin')
+allPlugins.add(OtherPlugin, 'fakebackends', 'Other')
+"""
+
+
+@pytest.yield_fixture
+def plugins(tmpdir, monkeypatch):
+    """
+    A fresh plugin manager and a module of plugins which adds itself to it when imported
+    """
+    tmpdir.join('fake_plugins.py').write(plugin_module)
+    monkeypatch.syspath_prepend(str(tmpdir))
+    manager = GangaPlugin.PluginManager()
+    monkeypatch.setattr(GangaPlugin, 'allPlugins', manager)
+    monkeypatch.setattr(PluginManifest, 'allPlugins', manager)
+    monkeypatch.setattr(PluginManifest, '_lazy_gpi_names', {})
+    yield manager
+    sys.modules.pop('fake_plugins', None)
+
+
+def test_lazy_find(plugins):
+    """Check a lazy plugin's module is only imported when the plugin is looked up"""
+    plugins.addLazy('fakebackends', 'FakePlugin', 'fake_plugins')
+    plugins.addLazy('fakebackends', 'Fake', 'fake_plugins', 'FakePlugin')
+    assert 'fake_plugins' not in sys.modules
+    assert plugins.isLazy('fakebackends', 'FakePlugin')
+
+    # the default of a category with only lazy plugins is the first one
+    assert plugins.find('fakebackends', None).__name__ == 'FakePlugin'
+    assert 'fake_plugins' in sys.modules
+    assert not plugins.isLazy('fakebackends', 'FakePlugin')
+    assert plugins.lazyPlugins() == {}
+
+    # the alias is added once its module is imported
+    assert plugins.find('fakebackends', 'Fake') is plugins.find('fakebackends', 'FakePlugin')
+    assert plugins.find('fakebackends', 'Other').__name__ == 'OtherPlugin'
+
+    with pytest.raises(GangaPlugin.PluginManagerError):
+        plugins.find('fakebackends', 'Missing')
+
+
+def test_all_classes_loads_lazy(plugins):
+    """Check listing the plugins of a category imports its lazy plugins"""
+    plugins.addLazy('fakebackends', 'FakePlugin', 'fake_plugins')
+    assert sorted(plugins.allClasses('fakebackends')) == ['FakePlugin', 'Other']
+
+
+def test_manifest(plugins, tmpdir):
+    """Check the manifest is made by importing the modules and then used to add their plugins lazily"""
+    manifest_file = str(tmpdir.join('cache', 'manifest.json'))
+
+    PluginManifest.loadPluginModules(['fake_plugins'], manifest_file)
+    assert 'fake_plugins' in sys.modules
+    assert os.path.exists(manifest_file)
+    assert PluginManifest.readManifest(manifest_file, ['fake_plugins']) == [
+        ['fake_plugins', 'fakebackends', 'FakePlugin', ['FakePlugin']],
+        ['fake_plugins', 'fakebackends', 'Other', ['OtherPlugin', 'Other']]]
+
+    # A new session only imports the module when it is needed
+    del sys.modules['fake_plugins']
+    manager = GangaPlugin.PluginManager()
+    GangaPlugin.allPlugins = PluginManifest.allPlugins = manager
+    PluginManifest.loadPluginModules(['fake_plugins'], manifest_file)
+    assert 'fake_plugins' not in sys.modules
+    assert PluginManifest.lazyGPINames() == {'FakePlugin': ('fakebackends', 'FakePlugin'),
+                                             'OtherPlugin': ('fakebackends', 'Other'),
+                                             'Other': ('fakebackends', 'Other')}
+    assert manager.find('fakebackends', 'Other').__name__ == 'OtherPlugin'
+
+    # The manifest is out of date once the module changes
+    source = str(tmpdir.join('fake_plugins.py'))
+    os.utime(source, (time.time() + 10, time.time() + 10))
+    assert PluginManifest.readManifest(manifest_file, ['fake_plugins']) is None
@@ -1,11 +1,8 @@
 import os
 import sys
-import time
-import socket
 import inspect
 import traceback
 import pickle
-import uuid
 from GangaCore.Runtime.GPIexport import exportToGPI
 from GangaCore.GPIDev.Base.Proxy import addProxy, stripProxy
 from GangaCore.Utility.Config import getConfig
@@ -49,72 +46,41 @@ exportToGPI('diracAPI', diracAPI, 'Functions')
 
 #\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/#
 
-running_dirac_process = False
-dirac_process = None
-dirac_process_ids = None
+dirac_process_pools = {}
+def getDiracProcessPool(cred_req=None):
+    '''
+    Return the pool of DIRAC server processes used to run DIRAC commands with the given credential, creating it if needed
+    Args:
+        cred_req (ICredentialRequirement): The credential the DIRAC commands need, None for the default DIRAC environment
+    '''
+    key = repr(cred_req) if cred_req is not None else None
+    if key not in dirac_process_pools:
+        from GangaDirac.Lib.Server.DiracProcessClient import DiracProcessPool
+        from GangaDirac.Lib.Utilities.DiracUtilities import getDiracCredentialEnv, getDiracCommandIncludes
+        dirac_process_pools.setdefault(key, DiracProcessPool(getConfig('DIRAC')['NumDiracProcesses'],
+                                                             lambda: getDiracCredentialEnv(cred_req),
+                                                             getDiracCommandIncludes))
+    return dirac_process_pools[key]
+
 def startDiracProcess():
     '''
-    Start a subprocess that runs the DIRAC commands
+    Start a subprocess that runs the DIRAC commands. Any processes which are already running are stopped first.
     '''
-    HOST = 'localhost'  #Connect to localhost
-    end_trans = '###END-TRANS###'
-    import subprocess
-    from GangaDirac.Lib.Utilities.DiracUtilities import getDiracEnv, getDiracCommandIncludes, GangaDiracError
-    global dirac_process
-    #Some magic to locate the python script to run
-    from GangaDirac.Lib.Server.InspectionClient import runClient
-    #Create a socket and bind it to 0 to find a free port
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.bind((HOST, 0))
-    PORT = s.getsockname()[1]
-    s.close()
-    #Pass the port no as an argument to the popen
-    serverpath = os.path.join(os.path.dirname(inspect.getsourcefile(runClient)), 'DiracProcess.py')
-    popen_cmd = ['python',serverpath, str(PORT)]
-    dirac_process = subprocess.Popen(popen_cmd, env = getDiracEnv(), stdin=subprocess.PIPE)
-    global running_dirac_process
-    running_dirac_process = (dirac_process.pid, PORT)
-
-    #Now set a random string to make sure only commands from this sessions are executed
-    rand_hash = uuid.uuid4()
-    global dirac_process_ids
-    dirac_process_ids = (dirac_process.pid, PORT, rand_hash)
-    #Pipe the random string without waiting for the process to finish.
-    dirac_process.stdin.write(str(rand_hash).encode("utf-8"))
-    dirac_process.stdin.close()
-
-    data = ''
-    #We have to wait a little bit for the subprocess to start the server so we try until the connection stops being refused. Set a limit of one minute.
-    connection_timeout = time.time() + 60
-    started = False
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    while time.time()<connection_timeout and not started:
-        try:
-            s.connect((HOST, PORT))
-            started = True
-        except socket.error as serr:
-            time.sleep(1)
-    if not started:
-        raise GangaDiracError("Failed to start the Dirac server process!")
-    #Now setup the Dirac environment in the subprocess
-    dirac_command = str(rand_hash)
-    dirac_command = dirac_command + getDiracCommandIncludes()
-    dirac_command = dirac_command + end_trans
-    s.sendall(dirac_command.encode("utf-8"))
-    data = s.recv(1024)
-    s.close()
+    stopDiracProcess()
+    pool = getDiracProcessPool()
+    # Running a command starts the first process
+    pool.execute('None')
 
 exportToGPI('startDiracProcess', startDiracProcess, 'Functions')
 
 def stopDiracProcess():
     '''
-    Stop the Dirac process if it is running
+    Stop the Dirac processes if they are running
     '''
-    global running_dirac_process
-    if running_dirac_process:
+    if dirac_process_pools:
         logger.info('Stopping the DIRAC process')
-        dirac_process.kill()
-        running_dirac_process = False
+    while dirac_process_pools:
+        dirac_process_pools.popitem()[1].stop()
 
 exportToGPI('stopDiracProcess', stopDiracProcess, 'Functions')
 
@@ -175,6 +141,12 @@ exportToGPI('getDiracFiles', getDiracFiles, 'Functions')
 
 #\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/#
 
+from GangaDirac.Lib.Utilities.ReplicaCache import invalidateReplicaCache, replicaCacheStats
+exportToGPI('invalidateReplicaCache', invalidateReplicaCache, 'Functions')
+exportToGPI('replicaCacheStats', replicaCacheStats, 'Functions')
+
+#\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/#
+
 
 def dumpObject(object, filename):
     '''
@@ -10,7 +10,8 @@ import datetime
 import shutil
 import tempfile
 import math
-from collections import defaultdict
+import threading
+from collections import defaultdict, deque
 from GangaCore.GPIDev.Schema import Schema, Version, SimpleItem, ComponentItem
 from GangaCore.GPIDev.Adapters.IBackend import IBackend, group_jobs_by_backend_credential
 from GangaCore.GPIDev.Lib.Job.Job import Job
@@ -34,6 +35,70 @@ default_downloadOutputSandbox = configDirac['default_downloadOutputSandbox']
 default_unpackOutputSandbox = configDirac['default_unpackOutputSandbox']
 logger = getLogger()
 regex = re.compile(r'[*?\[\]]')
+# Finalisations waiting for one of the maxConcurrentFinalisations places in the monitoring pool
+_finalisation_lock = threading.Lock()
+_waiting_finalisations = deque()
+_running_finalisations = 0
+
+
+def queue_finalisation(function, args, name):
+    """
+    Add a finalisation to the monitoring pool once fewer than maxConcurrentFinalisations are in it, so that
+    finalisations waiting to download output from DIRAC never hold on to the threads of the pool
+    Args:
+        function (callable): The finalisation to run
+        args (tuple): The arguments to call it with
+        name (str): The name of the task in the pool
+    """
+    with _finalisation_lock:
+        _waiting_finalisations.append((function, args, name))
+    _start_finalisations()
+
+
+def _start_finalisations():
+    """Add as many of the waiting finalisations to the monitoring pool as there are free places"""
+    global _running_finalisations
+    to_start = []
+    with _finalisation_lock:
+        while _waiting_finalisations and _running_finalisations < max(1, configDirac['maxConcurrentFinalisations']):
+            to_start.append(_waiting_finalisations.popleft())
+            _running_finalisations += 1
+    for function, args, name in to_start:
+        future = getQueues()._monitoring_threadpool.add_function(_run_finalisation, args=(function, args), priority=5, name=name)
+        if future is None:
+            # The queues are frozen as Ganga is shutting down
+            with _finalisation_lock:
+                _running_finalisations -= 1
+                _waiting_finalisations.clear()
+            return
+        future.add_done_callback(_finalisation_cancelled)
+
+
+def _finalisation_done():
+    """Free the place of a finalisation and start the next one waiting"""
+    global _running_finalisations
+    with _finalisation_lock:
+        _running_finalisations -= 1
+    _start_finalisations()
+
+
+def _run_finalisation(function, args):
+    """
+    Run a finalisation in the monitoring pool, then start the next one waiting
+    Args:
+        function (callable): The finalisation to run
+        args (tuple): The arguments to call it with
+    """
+    try:
+        function(*args)
+    finally:
+        _finalisation_done()
+
+
+def _finalisation_cancelled(future):
+    """Free the place of a finalisation which was purged from the monitoring pool before it ran"""
+    if future.cancelled():
+        _finalisation_done()
 
 class DiracBase(IBackend):
 
@@ -968,6 +1033,126 @@ class DiracBase(IBackend):
         # FIXME should I add something here to cleanup on sandboxes pulled from
         # malformed job output?
 
+    @staticmethod
+    def _start_completing(job):
+        """
+        Move a job which has completed in DIRAC to completing before its output is retrieved.
+        Returns False if the user has removed or killed the job in the meantime
+        Args:
+            job (Job): The job which is about to be finalised
+        """
+        # firstly update job to completing
+        DiracBase._getStateTime(job, 'completing')
+        if job.status in ['removed', 'killed']:
+            return False
+        elif (job.master and job.master.status in ['removed', 'killed']):
+            return False  # user changed it under us
+
+        job.updateStatus('completing')
+        if job.master:
+            job.master.updateMasterJobStatus()
+        return True
+
+    @staticmethod
+    def _write_location_records(job, file_info_dict):
+        """
+        Record where the DiracFile outputs of a job were uploaded to in its PostProcessLocationsFileName file.
+        All of the records for the job are written in one go.
+        Args:
+            job (Job): The job whose outputs are being recorded
+            file_info_dict (dict): The OutputDataInfo returned from DIRAC for the job
+        """
+        # Set DiracFile metadata
+        if hasattr(job.outputfiles, 'get'):
+            dirac_files = job.outputfiles.get(DiracFile)
+        else:
+            dirac_files = []
+        wildcards = [f.namePattern for f in dirac_files if regex.search(f.namePattern) is not None]
+
+        lfn_store = os.path.join(job.getOutputWorkspace().getPath(), getConfig('Output')['PostProcessLocationsFileName'])
+
+        records = []
+        if dirac_files:
+            if not hasattr(file_info_dict, 'keys'):
+                logger.error("Error understanding OutputDataInfo: %s" % str(file_info_dict))
+                raise GangaDiracError("Error understanding OutputDataInfo: %s" % str(file_info_dict))
+
+            ## Caution is not clear atm whether this 'Value' is an LHCbism or bug
+            list_of_files = file_info_dict.get('Value', list(file_info_dict.keys()))
+
+            for file_name in list_of_files:
+                file_name = os.path.basename(file_name)
+                info = file_info_dict.get(file_name)
+                #logger.debug("file_name: %s,\tinfo: %s" % (str(file_name), str(info)))
+
+                if not hasattr(info, 'get'):
+                    logger.error("Error getting OutputDataInfo for: %s" % str(job.getFQID('.')))
+                    logger.error("Please check the Dirac Job still exists or attempt a job.backend.reset() to try again!")
+                    logger.error("Err: %s" % str(info))
+                    logger.error("file_info_dict: %s" % str(file_info_dict))
+                    raise GangaDiracError("Error getting OutputDataInfo")
+
+                valid_wildcards = [wc for wc in wildcards if fnmatch.fnmatch(file_name, wc)]
+                if not valid_wildcards:
+                    valid_wildcards.append('')
+
+                for wc in valid_wildcards:
+                    records.append('DiracFile:::%s&&%s->%s:::%s:::%s\n' % (wc,
+                                                                          file_name,
+                                                                          info.get('LFN', 'Error Getting LFN!'),
+                                                                          str(info.get('LOCATIONS', ['NotAvailable'])),
+                                                                          info.get('GUID', 'NotAvailable')
+                                                                          ))
+
+        # The file is always made on disk even when there is nothing to record
+        with open(lfn_store, 'a') as postprocesslocationsfile:
+            postprocesslocationsfile.write(''.join(records))
+        logger.debug("Written: %s" % records)
+
+    @staticmethod
+    def _finish_completed_job(job, getSandboxResult, file_info_dict, completeTimeResult):
+        """
+        Finish the finalisation of a completing job once its output has been retrieved from DIRAC
+        Args:
+            job (Job): The job being finalised
+            getSandboxResult (dict): The result of downloading the output sandbox, None if it wasn't downloaded
+            file_info_dict (dict): The OutputDataInfo from DIRAC
+            completeTimeResult (dict): The time the job completed in DIRAC
+        """
+        output_path = job.getOutputWorkspace().getPath()
+        DiracBase._write_location_records(job, file_info_dict)
+
+        # check outputsandbox downloaded correctly
+        if job.backend.downloadSandbox and not result_ok(getSandboxResult):
+            logger.warning('Problem retrieving outputsandbox: %s' % str(getSandboxResult))
+            DiracBase._getStateTime(job, 'failed')
+            if job.status in ['removed', 'killed']:
+                return
+            elif (job.master and job.master.status in ['removed', 'killed']):
+                return  # user changed it under us
+            job.updateStatus('failed')
+            if job.master:
+                job.master.updateMasterJobStatus()
+            raise BackendError('Dirac', 'Problem retrieving outputsandbox: %s' % str(getSandboxResult))
+        #If the sandbox dict includes a Succesful key then the sandbox has been download from grid storage, likely due to being oversized. Untar it and issue a warning.
+        elif job.backend.downloadSandbox and isinstance(getSandboxResult['Value'], dict) and getSandboxResult['Value'].get('Successful', False):
+                try:
+                    sandbox_name = list(getSandboxResult['Value']['Successful'].values())[0]
+                    check_output(['tar', '-xvf', sandbox_name, '-C', output_path])
+                    check_output(['rm', sandbox_name])
+                    logger.warning('Output sandbox for job %s downloaded from grid storage due to being oversized.' % job.fqid)
+                except CalledProcessError:
+                    logger.error('Failed to unpack output sandbox for job %s' % job.fqid)
+        # finally update job to completed
+        DiracBase._getStateTime(job, 'completed', completeTimeResult)
+        if job.status in ['removed', 'killed']:
+            return
+        elif (job.master and job.master.status in ['removed', 'killed']):
+            return  # user changed it under us
+        job.updateStatus('completed')
+        if job.master:
+            job.master.updateMasterJobStatus()
+
     @staticmethod
     def _internal_job_finalisation(job, updated_dirac_status):
         """
@@ -990,16 +1175,8 @@ class DiracBase(IBackend):
 
         if updated_dirac_status == 'completed':
             start = time.time()
-            # firstly update job to completing
-            DiracBase._getStateTime(job, 'completing')
-            if job.status in ['removed', 'killed']:
+            if not DiracBase._start_completing(job):
                 return
-            elif (job.master and job.master.status in ['removed', 'killed']):
-                return  # user changed it under us
-
-            job.updateStatus('completing')
-            if job.master:
-                job.master.updateMasterJobStatus()
 
             output_path = job.getOutputWorkspace().getPath()
 
@@ -1014,91 +1191,7 @@ class DiracBase(IBackend):
             #logger.info('Job ' + job.fqid + ' OutputSandbox: ' + str(getSandboxResult))
             #logger.info('Job ' + job.fqid + ' normCPUTime: ' + str(job.backend.normCPUTime))
 
-            # Set DiracFile metadata
-            if hasattr(job.outputfiles, 'get'):
-                wildcards = [f.namePattern for f in job.outputfiles.get(DiracFile) if regex.search(f.namePattern) is not None]
-            else:
-                wildcards = []
-
-            lfn_store = os.path.join(output_path, getConfig('Output')['PostProcessLocationsFileName'])
-
-            # Make the file on disk with a nullop...
-            if not os.path.isfile(lfn_store):
-                with open(lfn_store, 'w'):
-                    pass
-
-            if hasattr(job.outputfiles, 'get') and job.outputfiles.get(DiracFile):
-
-                # Now we can iterate over the contents of the file without touching it
-                with open(lfn_store, 'ab') as postprocesslocationsfile:
-                    if not hasattr(file_info_dict, 'keys'):
-                        logger.error("Error understanding OutputDataInfo: %s" % str(file_info_dict))
-                        raise GangaDiracError("Error understanding OutputDataInfo: %s" % str(file_info_dict))
-
-                    ## Caution is not clear atm whether this 'Value' is an LHCbism or bug
-                    list_of_files = file_info_dict.get('Value', list(file_info_dict.keys()))
-
-                    for file_name in list_of_files:
-                        file_name = os.path.basename(file_name)
-                        info = file_info_dict.get(file_name)
-                        #logger.debug("file_name: %s,\tinfo: %s" % (str(file_name), str(info)))
-
-                        if not hasattr(info, 'get'):
-                            logger.error("Error getting OutputDataInfo for: %s" % str(job.getFQID('.')))
-                            logger.error("Please check the Dirac Job still exists or attempt a job.backend.reset() to try again!")
-                            logger.error("Err: %s" % str(info))
-                            logger.error("file_info_dict: %s" % str(file_info_dict))
-                            raise GangaDiracError("Error getting OutputDataInfo")
-
-                        valid_wildcards = [wc for wc in wildcards if fnmatch.fnmatch(file_name, wc)]
-                        if not valid_wildcards:
-                            valid_wildcards.append('')
-
-                        for wc in valid_wildcards:
-                            #logger.debug("wildcard: %s" % str(wc))
-
-                            DiracFileData = 'DiracFile:::%s&&%s->%s:::%s:::%s\n' % (wc,
-                                                                                    file_name,
-                                                                                    info.get('LFN', 'Error Getting LFN!'),
-                                                                                    str(info.get('LOCATIONS', ['NotAvailable'])),
-                                                                                    info.get('GUID', 'NotAvailable')
-                                                                                    )
-                            #logger.debug("DiracFileData: %s" % str(DiracFileData))
-                            postprocesslocationsfile.write(DiracFileData.encode())
-                            postprocesslocationsfile.flush()
-
-                logger.debug("Written: %s" % open(lfn_store, 'r').readlines())
-
-            # check outputsandbox downloaded correctly
-            if job.backend.downloadSandbox and not result_ok(getSandboxResult):
-                logger.warning('Problem retrieving outputsandbox: %s' % str(getSandboxResult))
-                DiracBase._getStateTime(job, 'failed')
-                if job.status in ['removed', 'killed']:
-                    return
-                elif (job.master and job.master.status in ['removed', 'killed']):
-                    return  # user changed it under us
-                job.updateStatus('failed')
-                if job.master:
-                    job.master.updateMasterJobStatus()
-                raise BackendError('Dirac', 'Problem retrieving outputsandbox: %s' % str(getSandboxResult))
-            #If the sandbox dict includes a Succesful key then the sandbox has been download from grid storage, likely due to being oversized. Untar it and issue a warning.
-            elif job.backend.downloadSandbox and isinstance(getSandboxResult['Value'], dict) and getSandboxResult['Value'].get('Successful', False):
-                    try:
-                        sandbox_name = list(getSandboxResult['Value']['Successful'].values())[0]
-                        check_output(['tar', '-xvf', sandbox_name, '-C', output_path])
-                        check_output(['rm', sandbox_name])
-                        logger.warning('Output sandbox for job %s downloaded from grid storage due to being oversized.' % job.fqid)
-                    except CalledProcessError:
-                        logger.error('Failed to unpack output sandbox for job %s' % job.fqid)
-            # finally update job to completed
-            DiracBase._getStateTime(job, 'completed', completeTimeResult)
-            if job.status in ['removed', 'killed']:
-                return
-            elif (job.master and job.master.status in ['removed', 'killed']):
-                return  # user changed it under us
-            job.updateStatus('completed')
-            if job.master:
-                job.master.updateMasterJobStatus()
+            DiracBase._finish_completed_job(job, getSandboxResult, file_info_dict, completeTimeResult)
             now = time.time()
             logger.debug('Job ' + job.fqid + ' Time for complete update : ' + str(now - start))
 
@@ -1184,7 +1277,7 @@ class DiracBase(IBackend):
 
         for i in range(0,int(nProcessToUse)):
             jobSlice = jobs[i*nPerProcess:(i+1)*nPerProcess]      
-            getQueues()._monitoring_threadpool.add_function(DiracBase.finalise_jobs_thread_func, (jobSlice, downloadSandbox))
+            queue_finalisation(DiracBase.finalise_jobs_thread_func, (jobSlice, downloadSandbox), "Finalizing %s Jobs" % len(jobSlice))
 
     @staticmethod
     def finalise_jobs_thread_func(jobSlice, downloadSandbox = True):
@@ -1197,7 +1290,7 @@ class DiracBase(IBackend):
         for sj in jobSlice:
             inputDict[sj.backend.id] = sj.getOutputWorkspace().getPath()
         statusmapping = configDirac['statusmapping']
-        returnDict, statusList = execute("finaliseJobs(%s, %s, %s)" % (inputDict, repr(statusmapping), downloadSandbox), cred_req=jobSlice[0].backend.credential_requirements, new_subprocess = True)
+        returnDict, statusList = execute("finaliseJobs(%s, %s, %s)" % (inputDict, repr(statusmapping), downloadSandbox), cred_req=jobSlice[0].backend.credential_requirements)
 
         #Cycle over the jobs and store the info
         for sj in jobSlice:
@@ -1214,62 +1307,94 @@ class DiracBase(IBackend):
             #Set the CPU time
             sj.backend.normCPUTime = returnDict[sj.backend.id]['cpuTime']
 
-            # Set DiracFile metadata - this circuitous route is copied from the standard so as to be consistent with the rest of the job finalisation code.
-            if hasattr(sj.outputfiles, 'get'):
-                wildcards = [f.namePattern for f in sj.outputfiles.get(DiracFile) if regex.search(f.namePattern) is not None]
-            else:
-                wildcards = []
-
-            lfn_store = os.path.join(sj.getOutputWorkspace().getPath(), getConfig('Output')['PostProcessLocationsFileName'])
-
-            # Make the file on disk with a nullop...
-            if not os.path.isfile(lfn_store):
-                with open(lfn_store, 'w'):
-                    pass
-
-            if hasattr(sj.outputfiles, 'get') and sj.outputfiles.get(DiracFile):
-                # Now we can iterate over the contents of the file without touching it
-                with open(lfn_store, 'ab') as postprocesslocationsfile:
-                    if not hasattr(returnDict[sj.backend.id]['outDataInfo'], 'keys'):
-                        logger.error("Error understanding OutputDataInfo: %s" % str(returnDict[sj.backend.id]['outDataInfo']))
-                        raise GangaDiracError("Error understanding OutputDataInfo: %s" % str(returnDict[sj.backend.id]['outDataInfo']))
-
-                    ## Caution is not clear atm whether this 'Value' is an LHCbism or bug
-                    list_of_files = returnDict[sj.backend.id]['outDataInfo'].get('Value', list(returnDict[sj.backend.id]['outDataInfo'].keys()))
-                    for file_name in list_of_files:
-                        file_name = os.path.basename(file_name)
-                        info = returnDict[sj.backend.id]['outDataInfo'].get(file_name)
-                        #logger.debug("file_name: %s,\tinfo: %s" % (str(file_name), str(info)))
-
-                        if not hasattr(info, 'get'):
-                            logger.error("Error getting OutputDataInfo for: %s" % str(sj.getFQID('.')))
-                            logger.error("Please check the Dirac Job still exists or attempt a job.backend.reset() to try again!")
-                            logger.error("Err: %s" % str(info))
-                            logger.error("file_info_dict: %s" % str(returnDict[sj.backend.id]['outDataInfo']))
-                            raise GangaDiracError("Error getting OutputDataInfo")
-
-                        valid_wildcards = [wc for wc in wildcards if fnmatch.fnmatch(file_name, wc)]
-                        if not valid_wildcards:
-                            valid_wildcards.append('')
-
-                        for wc in valid_wildcards:
-                            #logger.debug("wildcard: %s" % str(wc))
-
-                            DiracFileData = 'DiracFile:::%s&&%s->%s:::%s:::%s\n' % (wc,
-                                                                                    file_name,
-                                                                                    info.get('LFN', 'Error Getting LFN!'),
-                                                                                    str(info.get('LOCATIONS', ['NotAvailable'])),
-                                                                                    info.get('GUID', 'NotAvailable')
-                                                                                    )
-                            #logger.debug("DiracFileData: %s" % str(DiracFileData))
-                            postprocesslocationsfile.write(DiracFileData)
-                            postprocesslocationsfile.flush()
-
-                logger.debug("Written: %s" % open(lfn_store, 'r').readlines())
+            DiracBase._write_location_records(sj, returnDict[sj.backend.id]['outDataInfo'])
 
             #Set the status of the subjob
             sj.updateStatus(statusmapping[statusList['Value'][sj.backend.id]['Status']])
 
+    @staticmethod
+    def job_finalisation_batch(jobs):
+        """
+        Finalise a batch of jobs which have completed in DIRAC, possibly belonging to different master jobs.
+        The output of all of them is retrieved with a single DIRAC call. Any job which can't be finalised this
+        way goes through job_finalisation on its own so that it gets the usual retries.
+        Args:
+            jobs (list): Jobs sharing the same credential, downloadSandbox and unpackOutputSandbox settings
+        """
+        try:
+            DiracBase._job_finalisation_batch(jobs)
+        finally:
+            # Whatever happened, the jobs can be queued again by the next monitoring loop
+            for job in jobs:
+                job.been_queued = False
+
+    @staticmethod
+    def _job_finalisation_batch(jobs):
+        """
+        Does the work of job_finalisation_batch, which makes sure the jobs aren't left queued afterwards
+        Args:
+            jobs (list): Jobs sharing the same credential, downloadSandbox and unpackOutputSandbox settings
+        """
+        def finalise_alone(job, err):
+            logger.debug("Finalising job %s on its own: %s" % (job.getFQID('.'), err))
+            try:
+                DiracBase.job_finalisation(job, 'completed')
+            except Exception as err:
+                # job_finalisation has already reported the error and failed the job
+                logger.debug("Error finalising job %s: %s" % (job.getFQID('.'), err))
+
+        candidates = []
+        for job in jobs:
+            try:
+                # Check status is sane before we start
+                if job.status != "running" and (not job.status in ['completed', 'killed', 'removed']):
+                    job.updateStatus('submitted')
+                    job.updateStatus('running')
+            except Exception as err:
+                finalise_alone(job, err)
+                continue
+            if job.status not in ['completed', 'killed', 'removed']:
+                candidates.append(job)
+
+        if not candidates:
+            return
+
+        # Look up when the jobs finished running all at once rather than one job at a time
+        try:
+            DiracBase._bulk_updateStateTime({'completing': candidates})
+        except Exception as err:
+            logger.debug("Failed to get the completing times of the jobs together: %s" % err)
+
+        to_finalise = []
+        for job in candidates:
+            try:
+                if DiracBase._start_completing(job):
+                    to_finalise.append(job)
+            except Exception as err:
+                finalise_alone(job, err)
+
+        if not to_finalise:
+            return
+
+        start = time.time()
+        try:
+            backend = to_finalise[0].backend
+            inputDict = dict((job.backend.id, job.getOutputWorkspace().getPath()) for job in to_finalise)
+            returnDict, statusList = execute("finaliseJobs(%s, %s, %s, unpack=%s)" % (inputDict, repr(configDirac['statusmapping']), backend.downloadSandbox, backend.unpackOutputSandbox),
+                                             cred_req=backend.credential_requirements)
+        except Exception as err:
+            logger.warning("Failed to finalise %s jobs together, finalising them one at a time: %s" % (len(to_finalise), err))
+            returnDict = {}
+        logger.debug('%0.2fs taken to download output from DIRAC for %s jobs' % ((time.time() - start), len(to_finalise)))
+
+        for job in to_finalise:
+            try:
+                result = returnDict[job.backend.id]
+                job.backend.normCPUTime = result['cpuTime']
+                DiracBase._finish_completed_job(job, result['outSandbox'], result['outDataInfo'], result['outStateTime'])
+            except Exception as err:
+                finalise_alone(job, err)
+
     @staticmethod
     def requeue_dirac_finished_jobs(requeue_jobs, finalised_statuses):
         """
@@ -1279,6 +1404,9 @@ class DiracBase(IBackend):
             finalised_statuses (dict): Dict of the Dirac statuses vs the Ganga statuses after running
         """
 
+        # Completed jobs are finalised in batches which share the same output settings
+        batches = defaultdict(list)
+
         # requeue existing completed job
         for j in requeue_jobs:
             if j.been_queued:
@@ -1292,13 +1420,20 @@ class DiracBase(IBackend):
                 j.been_queued = False
                 continue
             if not configDirac['serializeBackend']:
-                getQueues()._monitoring_threadpool.add_function(DiracBase.job_finalisation,
-                                                           args=(j, finalised_statuses[j.backend.status]),
-                                                           priority=5, name="Job %s Finalizing" % j.fqid)
+                if finalised_statuses[j.backend.status] == 'completed' and not j.backend.finaliseOnMaster:
+                    batches[(j.backend.downloadSandbox, j.backend.unpackOutputSandbox)].append(j)
+                else:
+                    queue_finalisation(DiracBase.job_finalisation, (j, finalised_statuses[j.backend.status]), "Job %s Finalizing" % j.fqid)
                 j.been_queued = True
             else:
                 DiracBase.job_finalisation(j, finalised_statuses[j.backend.status])
 
+        nPerProcess = max(1, int(configDirac['maxSubjobsFinalisationPerProcess']))
+        for batch in batches.values():
+            for i in range(0, len(batch), nPerProcess):
+                jobSlice = batch[i:i + nPerProcess]
+                queue_finalisation(DiracBase.job_finalisation_batch, (jobSlice,), "Finalizing %s Jobs" % len(jobSlice))
+
 
     @staticmethod
     def monitor_dirac_running_jobs(monitor_jobs, finalised_statuses):
@@ -16,6 +16,7 @@ from GangaCore.GPIDev.Lib.Job.Job import Job
 from GangaCore.Utility.files import expandfilename
 from GangaCore.Core.exceptions import GangaFileError
 from GangaDirac.Lib.Utilities.DiracUtilities import getDiracEnv, execute, GangaDiracError
+from GangaDirac.Lib.Utilities.ReplicaCache import getReplicaCache, invalidateReplicaCache
 import GangaCore.Utility.Config
 from GangaCore.Runtime.GPIexport import exportToGPI
 from GangaCore.GPIDev.Credentials import require_credential
@@ -400,6 +401,7 @@ class DiracFile(IGangaFile):
         else:
             logger.debug('Removing file %s' % self.lfn)
         stdout = execute('removeFile("%s")' % self.lfn, cred_req=self.credential_requirements)
+        invalidateReplicaCache([self.lfn])
 
         self.lfn = ""
         self.locations = []
@@ -417,6 +419,7 @@ class DiracFile(IGangaFile):
         try:
             logger.info("Removing replica at %s for LFN %s" % (SE, self.lfn))
             stdout = execute('removeReplica("%s", "%s")' % (self.lfn, SE), cred_req=self.credential_requirements)
+            invalidateReplicaCache([self.lfn])
             self.locations.remove(SE)
         except GangaDiracError as err:
             raise err
@@ -512,18 +515,29 @@ class DiracFile(IGangaFile):
                 self._storedReplicas = copy.deepcopy(self._storedReplicas)
             if (self._storedReplicas == {} and len(self.subfiles) == 0) or forceRefresh:
 
-                try:
-                    self._storedReplicas = execute('getReplicas("%s")' % self.lfn, cred_req=self.credential_requirements)
-                except GangaDiracError as err:
-                    logger.error("Couldn't find replicas for: %s" % str(self.lfn))
-                    self._storedReplicas = {}
-                    raise
+                replica_cache = getReplicaCache()
+                cached = {}
+                if replica_cache is not None and not forceRefresh:
+                    cached = replica_cache.get([self.lfn], 'getReplicas')[0]
 
-                try:
-                    self._storedReplicas = self._storedReplicas['Successful']
-                except Exception as err:
-                    logger.error("Unknown Error: %s from %s" % (str(err), self._storedReplicas))
-                    raise
+                if cached:
+                    self._storedReplicas = cached
+                else:
+                    try:
+                        self._storedReplicas = execute('getReplicas("%s")' % self.lfn, cred_req=self.credential_requirements)
+                    except GangaDiracError as err:
+                        logger.error("Couldn't find replicas for: %s" % str(self.lfn))
+                        self._storedReplicas = {}
+                        raise
+
+                    try:
+                        self._storedReplicas = self._storedReplicas['Successful']
+                    except Exception as err:
+                        logger.error("Unknown Error: %s from %s" % (str(err), self._storedReplicas))
+                        raise
+
+                    if replica_cache is not None:
+                        replica_cache.put(self._storedReplicas, 'getReplicas')
 
                 logger.debug("getReplicas: %s" % str(self._storedReplicas))
 
@@ -636,6 +650,7 @@ class DiracFile(IGangaFile):
 
         logger.info("Replicating file %s to %s" % (self.lfn, destSE))
         stdout = execute('replicateFile("%s", "%s", "%s")' % (self.lfn, destSE, sourceSE), cred_req=self.credential_requirements)
+        invalidateReplicaCache([self.lfn])
 
         if destSE not in self.locations:
             self.locations.append(destSE)
@@ -776,6 +791,7 @@ class DiracFile(IGangaFile):
             logger.debug('execute: uploadFile("%s", "%s", %s)' % (lfn, os.path.join(sourceDir, name), str([storage_elements[0]])))
             try:
                 stdout = execute('uploadFile("%s", "%s", %s)' % (lfn, os.path.join(sourceDir, name), str([storage_elements[0]])), cred_req=self.credential_requirements)
+                invalidateReplicaCache([lfn])
             except GangaDiracError as err:
                 logger.warning("Couldn't upload file '%s': \'%s\'" % (os.path.basename(name), err))
                 failureReason = "Error in uploading file '%s' : '%s'" % (os.path.basename(name), err)
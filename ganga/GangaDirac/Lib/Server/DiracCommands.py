@@ -258,15 +258,15 @@ def finished_job(id, outputDir=os.getcwd(), unpack=True, oversized=True, noJobDi
 
 
 @diracCommand
-def finaliseJobs(inputDict, statusmapping, downloadSandbox=True, oversized=True, noJobDir=True):
+def finaliseJobs(inputDict, statusmapping, downloadSandbox=True, oversized=True, noJobDir=True, unpack=True):
     ''' A function to get the necessaries to finalise a whole bunch of jobs. Returns a dict of job information and a dict of stati.'''
     returnDict = {}
-    statusList = dirac.getJobStatus(inputDict.keys())
+    statusList = dirac.getJobStatus(list(inputDict.keys()))
     for diracID in inputDict.keys():
         returnDict[diracID] = {}
         returnDict[diracID]['cpuTime'] = normCPUTime(diracID, pipe_out=False)
         if downloadSandbox:
-            returnDict[diracID]['outSandbox'] = getOutputSandbox(diracID, inputDict[diracID], oversized, noJobDir, pipe_out=False)
+            returnDict[diracID]['outSandbox'] = getOutputSandbox(diracID, inputDict[diracID], unpack, oversized, noJobDir, pipe_out=False)
         else:
             returnDict[diracID]['outSandbox'] = None
         returnDict[diracID]['outDataInfo'] = getOutputDataInfo(diracID, pipe_out=False)
@@ -1,83 +1,121 @@
 #!/usr/bin/env python
+# Server which runs the Ganga DIRAC commands from within the DIRAC environment.
+#
+# Each server handles one persistent connection at a time. Every message on the
+# connection is a 4 byte big-endian length followed by a pickled dict. The first
+# message must be the random string given on stdin so we know the connection
+# came from a trusted source. After that each request is answered in the order
+# it was received, so a client may send several requests before reading the
+# responses:
+#   request:  {'id': n, 'cmd': '...', 'cwd': '...'}
+#   response: {'id': n, 'output': <last value passed to output()>, 'error': <traceback or None>}
+# A request {'close': True} stops the server.
 import sys
 import os
-import errno
 import socket
+import struct
+import pickle
 import traceback
 HOST = 'localhost'  # Standard loopback interface address (localhost)
 PORT = int(sys.argv[1])        # Port to listen on
-rand_hash = raw_input() 
-import time
+try:
+    rand_hash = raw_input()
+except NameError:
+    rand_hash = input()
+#Stop when no connection has been made for 30 minutes, unless told otherwise
+idle_timeout = int(sys.argv[2]) if len(sys.argv) > 2 else 1800
+header = struct.Struct('!I')
+# The highest protocol understood by both python 2 and 3
+pickle_protocol = 2
+
 #We have to define an output function as a placeholder here.
 def output(data):
     pass
 
-#A function to shutdown an existing processes
-def closeSocket():
-    sc = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sc.connect((HOST, PORT))
-    sc.sendall(b'close server')
-    sc.close()
-end_trans = '###END-TRANS###'
-#This is a wrapper for the client sockets
-class socketWrapper(object):
+class ConnectionClosed(Exception):
+    pass
+
+def readExactly(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionClosed()
+        data += chunk
+    return data
+
+def readFrame(conn):
+    size = header.unpack(readExactly(conn, header.size))[0]
+    return readExactly(conn, size)
+
+def readMessage(conn):
+    return pickle.loads(readFrame(conn))
 
-    def __init__(self, skt):
-        self._socket = skt
+def sendResponse(conn, request_id, out, err):
+    try:
+        payload = pickle.dumps({'id': request_id, 'output': out, 'error': err}, pickle_protocol)
+    except Exception:
+        payload = pickle.dumps({'id': request_id, 'output': None, 'error': 'Cannot transfer the output: %s' % repr(out)}, pickle_protocol)
+    conn.sendall(header.pack(len(payload)) + payload)
+
+def runCommand(cmd, cwd):
+    """ Run the command returning the last thing passed to output() and the traceback of any exception"""
+    global output
+    results = []
+    #Here we define the output method to just collect the output of the diracCommand wrapper.
+    def output(data):
+        results.append(data)
+    try:
+        if cwd:
+            os.chdir(cwd)
+        try:
+            code = compile(cmd, '<ganga>', 'eval')
+        except SyntaxError:
+            exec(compile(cmd, '<ganga>', 'exec'), globals())
+        else:
+            result = eval(code, globals())
+            if result is not None:
+                print(result)
+    except Exception:
+        return None, "Exception raised executing command (cmd) '%s'\n%s" % (cmd, traceback.format_exc())
+    return (results[-1] if results else None), None
 
-    def read(self):
-        cmd = ''
-        while end_trans not in cmd:
-            data = self._socket.recv(1024)
-            if not data:
-                cmd = '###BROKEN###'
-                break
-            cmd += data
-        #Check the random string is in the cmd so we know it came from a trusted source.
-        if not rand_hash in cmd:
-            return 'close-connection'
-        if cmd == '###BROKEN###':
-            return ''
-        return_string = cmd.replace(rand_hash, '')
-        return return_string.replace(end_trans, '')
+def serve(conn):
+    """ Answer the requests on a connection until it is closed. Returns True when the server should stop"""
+    conn.settimeout(idle_timeout)
+    #Nothing is unpickled until the connection has sent the random string
+    if readFrame(conn) != rand_hash.encode('utf-8'):
+        return False
+    #Ganga keeps the connection open for as long as it wants the server, which stops once it is closed
+    conn.settimeout(None)
+    while True:
+        request = readMessage(conn)
+        if request.get('close'):
+            return True
+        out, err = runCommand(request['cmd'], request.get('cwd'))
+        sendResponse(conn, request['id'], out, err)
 
 #Start the socket
 s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 s.bind((HOST, PORT))
 s.listen(1024)
-#Set 30 minute timeout
-s.settimeout(1800)
-while True:
+s.settimeout(idle_timeout)
+stop = False
+while not stop:
     try:
         conn, addr = s.accept()
-        sock = socketWrapper(conn)
-        cmd = sock.read()
-        #Here we define the output method to just send the output of the diracCommand wrapper.
-        def output(data):
-            conn.sendall(repr(data))
-
-        if cmd=='close-connection':
-            conn.shutdown(socket.SHUT_RDWR)
-            conn.close()
-            continue
-
-        if cmd=='close-server':
-            conn.shutdown(socket.SHUT_RDWR)
-            conn.close()
-            break
-        try:
-            print(eval(cmd))
-        except:
-            try:
-                exec(cmd)
-            except:
-                print("Exception raised executing command (cmd) '%s'\n" % cmd)
-                print(traceback.format_exc())
-
-        conn.sendall('###END-TRANS###')
     #Catch the timeout and exit
     except socket.timeout:
         break
+    try:
+        stop = serve(conn)
+    except (ConnectionClosed, socket.error):
+        pass
+    finally:
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        conn.close()
 
-s.shutdown(socket.SHUT_RDWR)
 s.close()
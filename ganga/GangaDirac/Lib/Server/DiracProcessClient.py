@@ -0,0 +1,273 @@
+import os
+import time
+import queue
+import socket
+import struct
+import pickle
+import inspect
+import itertools
+import threading
+import subprocess
+import uuid
+from GangaCore.Utility.logging import getLogger
+logger = getLogger()
+
+HOST = 'localhost'
+# See DiracProcess.py for the description of the protocol
+header = struct.Struct('!I')
+pickle_protocol = 2
+# Request ids are unique across all of the connections
+_request_ids = itertools.count(1)
+
+
+class DiracServerClosed(socket.error):
+    """
+    The server closed the connection before sending any of the responses being waited for, so the request can be sent again
+    """
+    pass
+
+
+class DiracProcessConnection(object):
+    """
+    A DiracProcess.py server running in the DIRAC environment and the persistent connection Ganga holds to it.
+    A connection must only be used by one thread at a time, the DiracProcessPool takes care of this.
+    """
+
+    def __init__(self, env, includes='', startup_timeout=60, idle_timeout=None):
+        """
+        Start the server process and connect to it
+        Args:
+            env (dict): The DIRAC environment to run the server in
+            includes (str): Code defining the Ganga DIRAC commands which is run once the server has started
+            startup_timeout (int): The number of seconds to wait for the server to accept the connection
+            idle_timeout (int): The number of seconds the server waits for a connection before stopping, 30 minutes by default
+        """
+        from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+        #Create a socket and bind it to 0 to find a free port
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind((HOST, 0))
+        self.port = s.getsockname()[1]
+        s.close()
+        #Pass the port no as an argument to the popen
+        serverpath = os.path.join(os.path.dirname(inspect.getsourcefile(DiracProcessConnection)), 'DiracProcess.py')
+        args = ['python', serverpath, str(self.port)]
+        if idle_timeout is not None:
+            args.append(str(idle_timeout))
+        self.process = subprocess.Popen(args, env=env, stdin=subprocess.PIPE)
+        #Now set a random string to make sure only commands from this session are executed
+        rand_hash = str(uuid.uuid4())
+        #Pipe the random string without waiting for the process to finish.
+        self.process.stdin.write((rand_hash + '\n').encode('utf-8'))
+        self.process.stdin.close()
+
+        self._socket = None
+        self._responses = {}
+        #We have to wait a little bit for the subprocess to start the server so we try until the connection stops being refused.
+        connection_timeout = time.time() + startup_timeout
+        while self._socket is None and time.time() < connection_timeout and self.process.poll() is None:
+            try:
+                self._socket = socket.create_connection((HOST, self.port))
+            except socket.error:
+                time.sleep(0.1)
+        if self._socket is None:
+            self.kill()
+            raise GangaDiracError("Failed to start the Dirac server process!")
+        self._sendFrame(rand_hash.encode('utf-8'))
+
+        #Now setup the Dirac environment in the subprocess
+        if includes:
+            error = self.call(includes)['error']
+            if error:
+                self.kill()
+                raise GangaDiracError("Failed to set up the Dirac server process: %s" % error)
+
+    def _sendFrame(self, payload):
+        self._socket.sendall(header.pack(len(payload)) + payload)
+
+    def _readExactly(self, size, first=False):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._socket.recv(size - len(data))
+            if not chunk:
+                if first and not data:
+                    raise DiracServerClosed("Connection to the Dirac server process was closed")
+                raise socket.error("Connection to the Dirac server process was closed")
+            data.extend(chunk)
+        return bytes(data)
+
+    def send(self, command, cwd=None):
+        """
+        Send a command to the server without waiting for it to finish and return the id of the request.
+        Several requests may be sent before reading the responses with receive()
+        Args:
+            command (str): The python code to be run by the server
+            cwd (str): The directory the server should run the command in
+        """
+        request_id = next(_request_ids)
+        self._sendFrame(pickle.dumps({'id': request_id, 'cmd': command, 'cwd': cwd}, pickle_protocol))
+        return request_id
+
+    def receive(self, request_id, timeout=None):
+        """
+        Wait for the response to a request and return it as a dict of the 'output' and 'error'
+        Args:
+            request_id (int): The id returned by send()
+            timeout (float): The maximum number of seconds to wait, None to wait forever
+        """
+        self._socket.settimeout(timeout)
+        first = True
+        while request_id not in self._responses:
+            size = header.unpack(self._readExactly(header.size, first))[0]
+            first = False
+            response = pickle.loads(self._readExactly(size), encoding='utf-8')
+            self._responses[response['id']] = response
+        return self._responses.pop(request_id)
+
+    def call(self, command, cwd=None, timeout=None):
+        """
+        Run a command on the server and return the response
+        """
+        return self.receive(self.send(command, cwd), timeout)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        """
+        Ask the server to stop, killing it if the connection has already broken
+        """
+        try:
+            self._sendFrame(pickle.dumps({'close': True}, pickle_protocol))
+            self._socket.close()
+            self.process.wait(timeout=5)
+        except Exception as err:
+            logger.debug("Error stopping the Dirac server process: %s" % err)
+            self.kill()
+
+    def kill(self):
+        if self._socket is not None:
+            self._socket.close()
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class DiracProcessPool(object):
+    """
+    A pool of persistent connections to DIRAC server processes. Each thread calling execute() takes an idle connection
+    so up to size DIRAC commands can be running at once. Server processes are started as they are needed.
+    """
+
+    def __init__(self, size, env_func, includes_func):
+        """
+        Args:
+            size (int): The maximum number of server processes
+            env_func (callable): Returns the environment to start the servers in
+            includes_func (callable): Returns the code to set up the DIRAC commands in the servers
+        """
+        self.size = max(1, size)
+        self._env_func = env_func
+        self._includes_func = includes_func
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _newConnection(self):
+        return DiracProcessConnection(self._env_func(), self._includes_func())
+
+    def _acquire(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                start_new = len(self._connections) < self.size
+                if start_new:
+                    # Hold the place in the pool while the server starts up
+                    self._connections.append(None)
+            if start_new:
+                return self._start()
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                # Check again in case a server failed to restart and left its place free
+                continue
+
+    def _start(self):
+        """
+        Start a new connection in a place held in the pool by None
+        """
+        try:
+            conn = self._newConnection()
+        except Exception:
+            with self._lock:
+                self._connections.remove(None)
+            raise
+        with self._lock:
+            self._connections[self._connections.index(None)] = conn
+        return conn
+
+    def _replace(self, conn):
+        """
+        Kill a broken or timed out connection and return a new one in its place
+        """
+        conn.kill()
+        with self._lock:
+            self._connections[self._connections.index(conn)] = None
+        return self._start()
+
+    def execute(self, command, cwd=None, timeout=None):
+        """
+        Run a command on one of the servers and return the response dict of the 'output' and 'error'.
+        A server which has died or closed the connection before answering is restarted and the command tried again once.
+        Args:
+            command (str): The python code to be run
+            cwd (str): The directory to run the command in
+            timeout (float): The maximum number of seconds to wait for the command, None to wait forever
+        """
+        from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+        conn = self._acquire()
+        try:
+            try:
+                if not conn.alive():
+                    raise socket.error("The Dirac server process has stopped")
+                request_id = conn.send(command, cwd)
+            except socket.error as err:
+                # Most likely the server has stopped after being idle for too long
+                logger.debug("Restarting the Dirac server process: %s" % err)
+                conn = self._replace(conn)
+                request_id = conn.send(command, cwd)
+            try:
+                try:
+                    return conn.receive(request_id, timeout)
+                except DiracServerClosed as err:
+                    # Nothing was answered, so the server went away rather than failing on the command
+                    logger.debug("Restarting the Dirac server process: %s" % err)
+                    conn = self._replace(conn)
+                    return conn.call(command, cwd, timeout)
+            except socket.timeout:
+                # We don't know what state the server is in so replace it
+                conn = self._replace(conn)
+                raise GangaDiracError("DIRAC command timed out")
+            except socket.error as err:
+                conn = self._replace(conn)
+                raise GangaDiracError("Lost the connection to the Dirac server process: %s" % err)
+        finally:
+            if conn in self._connections:
+                self._idle.put(conn)
+
+    def stop(self):
+        """
+        Stop all of the server processes
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for conn in connections:
+            if conn is not None:
+                conn.close()
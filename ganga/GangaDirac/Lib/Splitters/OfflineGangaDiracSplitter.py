@@ -5,9 +5,9 @@ from GangaCore.Utility.logging import getLogger
 from GangaDirac.Lib.Utilities.DiracUtilities import execute, GangaDiracError
 from GangaCore.Core.GangaThread.WorkerThreads import getQueues
 from GangaDirac.Lib.Files.DiracFile import DiracFile
+from GangaDirac.Lib.Utilities.ReplicaCache import getReplicaCache
 from copy import deepcopy
 import random
-import time
 import math
 
 """
@@ -312,15 +312,25 @@ def lookUpLFNReplicas(inputs, ignoremissing):
     for _lfn in inputs:
         LFNdict[_lfn.lfn] = _lfn
 
+    # Only the LFNs whose replicas aren't in the cache are looked up from DIRAC
+    replica_cache = getReplicaCache()
+    if replica_cache is not None:
+        cachedReplicas, queryLFNs = replica_cache.get(allLFNs, 'getReplicasForJobs')
+        if cachedReplicas:
+            logger.info("Found the replicas of %s of %s LFNs in the replica cache" % (len(cachedReplicas), len(allLFNs)))
+    else:
+        cachedReplicas, queryLFNs = {}, allLFNs
+
     # Request the replicas for all LFN 'LFN_parallel_limit' at a time to not overload the
     # server and give some feedback as this is going on
     global LFN_parallel_limit
-    for i in range(int(math.ceil(float(len(allLFNs)) / LFN_parallel_limit))):
+    lookups = []
+    for i in range(int(math.ceil(float(len(queryLFNs)) / LFN_parallel_limit))):
 
-        getQueues()._monitoring_threadpool.add_function(getLFNReplicas, (allLFNs, i, allLFNData))
+        lookups.append(getQueues()._monitoring_threadpool.add_function(getLFNReplicas, (queryLFNs, i, allLFNData)))
 
-    while len(allLFNData) != int(math.ceil(float(len(allLFNs)) / LFN_parallel_limit)):
-        time.sleep(1.)
+    while lookups:
+        lookups = getQueues().waitForAll(lookups, timeout=1.)[1]
         # This can take a while so lets protect any repo locks
         import GangaCore.Runtime.Repository_runtime
         GangaCore.Runtime.Repository_runtime.updateLocksNow()
@@ -328,7 +338,14 @@ def lookUpLFNReplicas(inputs, ignoremissing):
     bad_lfns = []
 
     # Sort this information and store is in the relevant Ganga objects
-    updateLFNData(bad_lfns, allLFNs, LFNdict, ignoremissing, allLFNData)
+    updateLFNData(bad_lfns, queryLFNs, LFNdict, ignoremissing, allLFNData)
+
+    for this_lfn, replicas in cachedReplicas.items():
+        LFNdict[this_lfn]._updateRemoteURLs({this_lfn: replicas})
+
+    if replica_cache is not None:
+        for output in allLFNData.values():
+            replica_cache.put(output.get('Successful', {}), 'getReplicasForJobs')
 
     file_replicas = {}
     for _lfn in LFNdict:
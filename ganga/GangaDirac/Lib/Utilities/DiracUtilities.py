@@ -6,8 +6,6 @@ import tempfile
 import shutil
 import json
 import time
-import socket
-import re
 from copy import deepcopy
 from GangaCore.Utility.Config import getConfig
 from GangaCore.Utility.logging import getLogger
@@ -23,7 +21,6 @@ DIRAC_ENV = {}
 DIRAC_INCLUDE = ''
 Dirac_Env_Lock = threading.Lock()
 Dirac_Proxy_Lock = threading.Lock()
-Dirac_Exec_Lock = threading.Lock()
 # /\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\
 
 class GangaDiracError(GangaException):
@@ -74,6 +71,21 @@ def getDiracEnv(sourceFile = None):
     return DIRAC_ENV[sourceFile]
 
 
+def getDiracCredentialEnv(cred_req=None):
+    """
+    Returns a copy of the DIRAC environment set up to use the given credential
+    Args:
+        cred_req (ICredentialRequirement): The credential to use, None for the default DIRAC environment
+    """
+    if cred_req is None:
+        return dict(getDiracEnv())
+    env = dict(getDiracEnv(cred_req.dirac_env))
+    env['X509_USER_PROXY'] = credential_store[cred_req].location
+    if os.getenv('KRB5CCNAME'):
+        env['KRB5CCNAME'] = os.getenv('KRB5CCNAME')
+    return env
+
+
 def get_env(env_source):
     """
     Given a source command, return the DIRAC environment that the
@@ -231,77 +243,47 @@ def execute(command,
         # We know were whe want to run, lets just run there
         cwd_ = cwd
 
-    from GangaDirac.BOOT import startDiracProcess
-    returnable = ''
-    if not new_subprocess:
-        with Dirac_Exec_Lock:
-            # First check if a Dirac process is running
-            from GangaDirac.BOOT import running_dirac_process
-            if not running_dirac_process:
-                startDiracProcess()
-            #Set up a socket to connect to the process
-            from GangaDirac.BOOT import dirac_process_ids
-            HOST = 'localhost'  # The server's hostname or IP address
-            PORT = dirac_process_ids[1]        # The port used by the server
-
-            #Put inside a try/except in case the existing process has timed out
-            try:
-                s= socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.connect((HOST, PORT))
-            except socket.error as serr:
-                #Start a new process
-                startDiracProcess()
-                from GangaDirac.BOOT import dirac_process_ids
-                PORT = dirac_process_ids[1]
-                s= socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.connect((HOST, PORT))
-
-            #Send a random string, then change the directory to carry out the command, then send the command
-            command_to_send  = str(dirac_process_ids[2])
-            command_to_send += 'os.chdir("%s")\n' % cwd_
-            command_to_send += command
-            s.sendall(('%s###END-TRANS###' % command_to_send).encode('utf-8'))
-            out = ''
-            while '###END-TRANS###' not in out:
-                data = s.recv(1024)
-                out += data.decode("utf-8")
-            s.close()
-            #Some regex nonsense to deal with the long representations in python 3
-            out = re.sub(r'((?:^|\s|,|{|\()\d+)L([^A-Za-z0-9\"\'])', r'\1\2', out)
-            returnable = eval(out)
+    try:
+        returnable = ''
+        if not new_subprocess:
+            # Commands are shared out between the persistent DIRAC server processes so several can run at once
+            from GangaDirac.BOOT import getDiracProcessPool
+            response = getDiracProcessPool(cred_req).execute(command, cwd=cwd_, timeout=timeout)
+            # Any error is not a dict so it is raised below
+            returnable = response['error'] or response['output']
 
-    else:
-        if env is None:
-            if cred_req is None:
-                env = getDiracEnv()
-            else:
-                env = getDiracEnv(cred_req.dirac_env)
-        if python_setup == '':
-            python_setup = getDiracCommandIncludes()
-
-        if cred_req is not None:
-            env['X509_USER_PROXY'] = credential_store[cred_req].location
-            if os.getenv('KRB5CCNAME'):
-                env['KRB5CCNAME'] = os.getenv('KRB5CCNAME')
-
-        returnable = gexecute.execute(command,
-                                      timeout=timeout,
-                                      env=env,
-                                      cwd=cwd_,
-                                      shell=shell,
-                                      python_setup=python_setup,
-                                      eval_includes=eval_includes,
-                                      update_env=update_env)
-
-        # If the time 
-        if returnable == 'Command timed out!':
-            raise GangaDiracError("DIRAC command timed out")
-
-        # TODO we would like some way of working out if the code has been executed correctly
-        # Most commands will be OK now that we've added the check for the valid proxy before executing commands here
-
-    if cwd is None:
-        shutil.rmtree(cwd_, ignore_errors=True)
+        else:
+            if env is None:
+                if cred_req is None:
+                    env = getDiracEnv()
+                else:
+                    env = getDiracEnv(cred_req.dirac_env)
+            if python_setup == '':
+                python_setup = getDiracCommandIncludes()
+
+            if cred_req is not None:
+                env['X509_USER_PROXY'] = credential_store[cred_req].location
+                if os.getenv('KRB5CCNAME'):
+                    env['KRB5CCNAME'] = os.getenv('KRB5CCNAME')
+
+            returnable = gexecute.execute(command,
+                                          timeout=timeout,
+                                          env=env,
+                                          cwd=cwd_,
+                                          shell=shell,
+                                          python_setup=python_setup,
+                                          eval_includes=eval_includes,
+                                          update_env=update_env)
+
+            # If the time 
+            if returnable == 'Command timed out!':
+                raise GangaDiracError("DIRAC command timed out")
+
+            # TODO we would like some way of working out if the code has been executed correctly
+            # Most commands will be OK now that we've added the check for the valid proxy before executing commands here
+    finally:
+        if cwd is None:
+            shutil.rmtree(cwd_, ignore_errors=True)
 
     if isinstance(returnable, dict):
         if return_raw_dict:
@@ -0,0 +1,189 @@
+"""
+A cache of the replicas of LFNs kept in an SQLite file, so that splitting or resubmitting jobs over the same
+dataset again doesn't have to ask DIRAC where all of its files are.
+
+The replicas are cached separately for each DIRAC command they were looked up with, as getReplicasForJobs only
+returns the replicas which may be used by jobs while getReplicas returns all of the active ones. Cached replicas
+expire after [DIRAC]ReplicaCacheTTL seconds.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+_create_statements = ["CREATE TABLE IF NOT EXISTS replicas (lfn TEXT NOT NULL, command TEXT NOT NULL, "
+                      "replicas TEXT NOT NULL, time REAL NOT NULL, PRIMARY KEY (lfn, command))"]
+
+# The maximum number of LFNs in one query, below the limit SQLite puts on the number of variables in a statement
+_max_query_lfns = 500
+
+
+class ReplicaCache(object):
+    """
+    The replicas of LFNs, as returned in the 'Successful' dict of the DIRAC replica commands, cached in an SQLite file.
+    The cache keeps count of the LFNs it has been asked for which it had or didn't have the replicas of.
+    """
+
+    def __init__(self, dbfile, ttl):
+        """
+        Args:
+            dbfile (str): The SQLite file to keep the replicas in
+            ttl (float): The number of seconds replicas are kept for
+        """
+        self.dbfile = dbfile
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._db_lock = threading.RLock()
+        self.con = None
+
+    def _connect(self):
+        """ Return the connection to the database, opening it and creating the table if needed """
+        if self.con is None:
+            db_dir = os.path.dirname(self.dbfile)
+            if db_dir and not os.path.isdir(db_dir):
+                os.makedirs(db_dir, exist_ok=True)
+            con = sqlite3.connect(self.dbfile, timeout=60, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            for statement in _create_statements:
+                con.execute(statement)
+            self.con = con
+        return self.con
+
+    def get(self, lfns, command):
+        """
+        Return a dict of LFN -> {SE: PFN} of the LFNs which have unexpired replicas in the cache and the list of
+        the LFNs which don't
+        Args:
+            lfns (list): The LFNs to look up
+            command (str): The name of the DIRAC command the replicas were looked up with
+        """
+        found = {}
+        oldest = time.time() - self.ttl
+        try:
+            with self._db_lock:
+                con = self._connect()
+                for i in range(0, len(lfns), _max_query_lfns):
+                    chunk = lfns[i:i + _max_query_lfns]
+                    rows = con.execute("SELECT lfn, replicas FROM replicas WHERE command = ? AND time > ? AND lfn IN (%s)"
+                                       % ",".join("?" * len(chunk)), [command, oldest] + list(chunk)).fetchall()
+                    for lfn, replicas in rows:
+                        found[lfn] = json.loads(replicas)
+        except (OSError, sqlite3.Error, ValueError) as err:
+            logger.debug("Cannot read the replica cache %s: %s" % (self.dbfile, err))
+            found = {}
+        missing = [lfn for lfn in lfns if lfn not in found]
+        with self._db_lock:
+            self.hits += len(lfns) - len(missing)
+            self.misses += len(missing)
+        return found, missing
+
+    def put(self, replicas, command):
+        """
+        Add the replicas to the cache. LFNs without any replicas aren't cached so they are always looked up again.
+        Args:
+            replicas (dict): LFN -> {SE: PFN} as returned by the DIRAC command
+            command (str): The name of the DIRAC command the replicas were looked up with
+        """
+        now = time.time()
+        rows = [(lfn, command, json.dumps(reps), now) for lfn, reps in replicas.items() if reps]
+        if not rows:
+            return
+        try:
+            with self._db_lock:
+                con = self._connect()
+                con.execute("BEGIN IMMEDIATE")
+                try:
+                    con.executemany("INSERT OR REPLACE INTO replicas (lfn, command, replicas, time) VALUES (?, ?, ?, ?)",
+                                    rows)
+                    con.execute("DELETE FROM replicas WHERE time <= ?", (now - self.ttl,))
+                except BaseException:
+                    con.execute("ROLLBACK")
+                    raise
+                con.execute("COMMIT")
+        except (OSError, sqlite3.Error, TypeError, ValueError) as err:
+            logger.debug("Cannot write the replica cache %s: %s" % (self.dbfile, err))
+
+    def invalidate(self, lfns=None):
+        """
+        Remove the replicas of the LFNs from the cache, for all of the commands
+        Args:
+            lfns (list): The LFNs to remove, None to empty the cache
+        """
+        try:
+            with self._db_lock:
+                con = self._connect()
+                if lfns is None:
+                    con.execute("DELETE FROM replicas")
+                    return
+                lfns = list(lfns)
+                for i in range(0, len(lfns), _max_query_lfns):
+                    chunk = lfns[i:i + _max_query_lfns]
+                    con.execute("DELETE FROM replicas WHERE lfn IN (%s)" % ",".join("?" * len(chunk)), chunk)
+        except (OSError, sqlite3.Error) as err:
+            logger.debug("Cannot invalidate the replica cache %s: %s" % (self.dbfile, err))
+
+    def stats(self):
+        """ Return a dict of the number of LFNs which were and weren't found in the cache """
+        with self._db_lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._db_lock:
+            if self.con is not None:
+                try:
+                    self.con.close()
+                except sqlite3.Error as err:
+                    logger.debug("Error closing the replica cache %s: %s" % (self.dbfile, err))
+                finally:
+                    self.con = None
+
+
+_replica_cache = None
+_replica_cache_lock = threading.Lock()
+
+
+def getReplicaCache():
+    """
+    Return the replica cache configured in the DIRAC section, or None if [DIRAC]ReplicaCacheTTL is 0
+    """
+    global _replica_cache
+    config = getConfig('DIRAC')
+    if not config['ReplicaCacheTTL']:
+        return None
+    dbfile = os.path.expanduser(os.path.expandvars(config['ReplicaCacheFile']))
+    with _replica_cache_lock:
+        if _replica_cache is None or _replica_cache.dbfile != dbfile:
+            if _replica_cache is not None:
+                _replica_cache.close()
+            _replica_cache = ReplicaCache(dbfile, config['ReplicaCacheTTL'])
+        _replica_cache.ttl = config['ReplicaCacheTTL']
+        return _replica_cache
+
+
+def invalidateReplicaCache(lfns=None):
+    """
+    Forget the cached replicas of the LFNs so that they are looked up from DIRAC the next time they are needed
+
+    Args:
+        lfns (list): The LFNs to forget, all of them if None
+    """
+    cache = getReplicaCache()
+    if cache is not None:
+        cache.invalidate(lfns)
+
+
+def replicaCacheStats():
+    """
+    Return a dict of the number of LFNs whose replicas were and weren't found in the replica cache in this session
+    """
+    cache = getReplicaCache()
+    if cache is None:
+        return {'hits': 0, 'misses': 0}
+    return cache.stats()
@@ -20,6 +20,9 @@ if not _after_bootstrap:
     configDirac.addOption('Timeout', 1000,
                       'Default timeout (seconds) for Dirac commands')
 
+    configDirac.addOption('NumDiracProcesses', 3,
+                      'Number of DIRAC server processes which Ganga keeps running to execute DIRAC commands in parallel')
+
     configDirac.addOption('splitFilesChunks', 5000,
                       'when splitting datasets, pre split into chunks of this int')
     diracenv = ""
@@ -58,6 +61,9 @@ if not _after_bootstrap:
 
     configDirac.addOption('DiracFileAutoGet', True, 'Should the DiracFile object automatically poll the Dirac backend for missing information on an lfn?')
 
+    configDirac.addOption('ReplicaCacheFile', '~/.cache/Ganga/dirac_replicas.sqlite', 'SQLite file in which the replicas of LFNs looked up from DIRAC are cached')
+    configDirac.addOption('ReplicaCacheTTL', 86400, 'Number of seconds the replicas of an LFN are cached for before they are looked up from DIRAC again. 0 disables the cache')
+
     configDirac.addOption('OfflineSplitterFraction', 0.75, 'If subset is above OfflineSplitterFraction*filesPerJob then keep the subset')
     configDirac.addOption('OfflineSplitterMaxCommonSites', 2, 'Maximum number of storage sites all LFN should share in the same dataset. This is reduced to 1 as the splitter gets more desperate to group the data.')
     configDirac.addOption('OfflineSplitterUniqueSE', False, 'Should the Sites chosen be accessing different Storage Elements.')
@@ -94,6 +100,7 @@ if not _after_bootstrap:
 
     configDirac.addOption('maxSubjobsPerProcess', 100, 'Set the maximum number of subjobs to be submitted per process.')
     configDirac.addOption('maxSubjobsFinalisationPerProcess', 40, 'Set the maximum number of subjobs to be finalised per process. Not too high to avoid DIRAC timeouts')
+    configDirac.addOption('maxConcurrentFinalisations', 2, 'Set the maximum number of finalisations in the monitoring queue at the same time, the rest wait until one has finished. Each one downloads the output of its jobs one at a time.')
 
     configDirac.addOption('default_finaliseOnMaster', False, 'Finalise all the subjobs in one go')
     configDirac.addOption('default_downloadOutputSandbox', True, 'Donwload output sandboxes by default')
@@ -434,3 +434,158 @@ def test_getOutputDataLFNs(db):
 
         subjob = True
         assert db.getOutputDataLFNs() == ['a', 'b', 'c'] * 3
+
+
+def _fake_finalise_job(dirac_id, tmpdir, status='running'):
+    job = Mock()
+    job.status = status
+    job.master = None
+    job.been_queued = True
+    job.backend.id = dirac_id
+    job.backend.status = 'Done'
+    job.backend.finaliseOnMaster = False
+    job.backend.downloadSandbox = True
+    job.backend.unpackOutputSandbox = True
+    job.getOutputWorkspace.return_value.getPath.return_value = str(tmpdir)
+    job.getFQID.return_value = str(dirac_id)
+    return job
+
+
+def test__write_location_records(db, tmpdir):
+    from GangaCore.Utility.Config import getConfig
+    job = _fake_finalise_job(1, tmpdir)
+    job.outputfiles.get.return_value = [Mock(namePattern='*.root'), Mock(namePattern='a.txt')]
+    file_info = {'Value': ['/some/dir/a.txt', 'b.root'],
+                 'a.txt': {'LFN': '/lfn/a.txt', 'LOCATIONS': ['SE1'], 'GUID': 'guid-a'},
+                 'b.root': {'LFN': '/lfn/b.root', 'LOCATIONS': ['SE1', 'SE2'], 'GUID': 'guid-b'}}
+
+    db._write_location_records(job, file_info)
+    with open(os.path.join(str(tmpdir), getConfig('Output')['PostProcessLocationsFileName'])) as lfn_store:
+        assert lfn_store.readlines() == ["DiracFile:::&&a.txt->/lfn/a.txt:::['SE1']:::guid-a\n",
+                                         "DiracFile:::*.root&&b.root->/lfn/b.root:::['SE1', 'SE2']:::guid-b\n"]
+
+    file_info['Value'] = ['missing.txt']
+    with pytest.raises(GangaDiracError):
+        db._write_location_records(job, file_info)
+
+
+def test_job_finalisation_batch(db, tmpdir):
+    from GangaDirac.Lib.Backends.DiracBase import DiracBase
+    jobs = [_fake_finalise_job(i, tmpdir) for i in range(1, 4)]
+    jobs.append(_fake_finalise_job(4, tmpdir, status='killed'))
+    returnDict = dict((i, {'cpuTime': i, 'outSandbox': {'OK': True, 'Value': ''}, 'outDataInfo': {}, 'outStateTime': {}}) for i in (1, 3))
+
+    with patch('GangaDirac.Lib.Backends.DiracBase.execute', return_value=(returnDict, {'OK': True, 'Value': {}})) as execute, \
+            patch.object(DiracBase, '_bulk_updateStateTime') as bulk_time, \
+            patch.object(DiracBase, '_start_completing', return_value=True), \
+            patch.object(DiracBase, '_finish_completed_job') as finish, \
+            patch.object(DiracBase, 'job_finalisation') as job_finalisation:
+        DiracBase.job_finalisation_batch(jobs)
+
+        # One DIRAC call for all of the jobs which need finalising
+        execute.assert_called_once()
+        assert execute.call_args[0][0].startswith("finaliseJobs({1: '%s', 2: '%s', 3: '%s'}" % ((str(tmpdir),) * 3))
+        bulk_time.assert_called_once_with({'completing': jobs[:3]})
+        assert [c[0][0] for c in finish.call_args_list] == [jobs[0], jobs[2]]
+        assert jobs[2].backend.normCPUTime == 3
+        # The job missing from the DIRAC output is finalised on its own
+        job_finalisation.assert_called_once_with(jobs[1], 'completed')
+        assert not any(j.been_queued for j in jobs)
+
+    with patch('GangaDirac.Lib.Backends.DiracBase.execute', side_effect=GangaDiracError('test Exception')), \
+            patch.object(DiracBase, '_bulk_updateStateTime'), \
+            patch.object(DiracBase, '_start_completing', return_value=True), \
+            patch.object(DiracBase, 'job_finalisation') as job_finalisation:
+        DiracBase.job_finalisation_batch(jobs[:2])
+        assert [c[0][0] for c in job_finalisation.call_args_list] == jobs[:2]
+
+    # Nothing is looked up in DIRAC when none of the jobs need finalising
+    jobs[3].been_queued = True
+    with patch.object(DiracBase, '_bulk_updateStateTime') as bulk_time:
+        DiracBase.job_finalisation_batch(jobs[3:])
+        bulk_time.assert_not_called()
+        assert not jobs[3].been_queued
+
+    # Any error from the batch makes the jobs be finalised on their own rather than being left queued
+    for j in jobs[:2]:
+        j.been_queued = True
+    with patch('GangaDirac.Lib.Backends.DiracBase.execute', side_effect=KeyError('test Exception')), \
+            patch.object(DiracBase, '_bulk_updateStateTime', side_effect=IndexError('test Exception')), \
+            patch.object(DiracBase, '_start_completing', return_value=True), \
+            patch.object(DiracBase, 'job_finalisation', side_effect=GangaDiracError('test Exception')) as job_finalisation:
+        DiracBase.job_finalisation_batch(jobs[:2])
+        assert [c[0][0] for c in job_finalisation.call_args_list] == jobs[:2]
+        assert not any(j.been_queued for j in jobs[:2])
+
+
+def test_requeue_dirac_finished_jobs(db, tmpdir, finalisation_queue):
+    from GangaDirac.Lib.Backends.DiracBase import DiracBase
+    from GangaCore.Utility.Config import getConfig
+    jobs = [_fake_finalise_job(i, tmpdir) for i in range(5)]
+    for j in jobs:
+        j.been_queued = False
+    jobs[1].backend.status = 'Failed'
+    jobs[2].backend.unpackOutputSandbox = False
+    finalised_statuses = {'Done': 'completed', 'Failed': 'failed'}
+
+    getConfig('DIRAC').setSessionValue('maxSubjobsFinalisationPerProcess', 2)
+    getConfig('DIRAC').setSessionValue('maxConcurrentFinalisations', 10)
+    try:
+        with patch('GangaDirac.Lib.Backends.DiracBase.getQueues') as getQueues:
+            DiracBase.requeue_dirac_finished_jobs(jobs, finalised_statuses)
+    finally:
+        getConfig('DIRAC').revertToDefault('maxSubjobsFinalisationPerProcess')
+        getConfig('DIRAC').revertToDefault('maxConcurrentFinalisations')
+
+    added = [c[1]['args'] for c in getQueues()._monitoring_threadpool.add_function.call_args_list]
+    assert (DiracBase.job_finalisation, (jobs[1], 'failed')) in added
+    assert (DiracBase.job_finalisation_batch, ([jobs[0], jobs[3]],)) in added
+    assert (DiracBase.job_finalisation_batch, ([jobs[4]],)) in added
+    assert (DiracBase.job_finalisation_batch, ([jobs[2]],)) in added
+    assert len(added) == 4
+    assert all(j.been_queued for j in jobs)
+
+
+
+@pytest.yield_fixture
+def finalisation_queue():
+    """Start and finish with no finalisations queued, as the monitoring pool is mocked they are never run"""
+    from GangaDirac.Lib.Backends import DiracBase as module
+    module._running_finalisations = 0
+    module._waiting_finalisations.clear()
+    yield module
+    module._running_finalisations = 0
+    module._waiting_finalisations.clear()
+
+
+def test_finalisation_queue(finalisation_queue):
+    """Check no more than maxConcurrentFinalisations are in the monitoring pool and the next starts once one finishes"""
+    from GangaCore.Utility.Config import getConfig
+    module = finalisation_queue
+    done = []
+
+    getConfig('DIRAC').setSessionValue('maxConcurrentFinalisations', 2)
+    try:
+        with patch('GangaDirac.Lib.Backends.DiracBase.getQueues') as getQueues:
+            add_function = getQueues()._monitoring_threadpool.add_function
+            for i in range(4):
+                module.queue_finalisation(done.append, (i,), 'Finalisation %s' % i)
+            assert add_function.call_count == 2
+
+            # Running a finalisation in the pool starts the next one waiting
+            module._run_finalisation(*add_function.call_args_list[0][1]['args'])
+            assert done == [0]
+            assert add_function.call_count == 3
+
+            # As does one which was purged from the pool before it ran
+            future = add_function.return_value
+            future.cancelled.return_value = True
+            module._finalisation_cancelled(future)
+            assert add_function.call_count == 4
+
+            for call in add_function.call_args_list[2:]:
+                module._run_finalisation(*call[1]['args'])
+            assert done == [0, 2, 3]
+    finally:
+        getConfig('DIRAC').revertToDefault('maxConcurrentFinalisations')
+    assert module._running_finalisations == 0
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+import pytest
+
+from GangaCore.testlib.GangaUnitTest import load_config_files, clear_config
+
+# Stands in for the Ganga DIRAC commands so that no DIRAC installation is needed
+test_includes = """
+import time
+def echo(value):
+    output({'OK': True, 'Value': value})
+def slow(seconds, value):
+    time.sleep(seconds)
+    output({'OK': True, 'Value': value})
+def whereAmI():
+    output({'OK': True, 'Value': os.getcwd()})
+def exitOnce(flag, value):
+    if not os.path.exists(flag):
+        open(flag, 'w').close()
+        os._exit(0)
+    output({'OK': True, 'Value': value})
+"""
+
+
+@pytest.yield_fixture(scope='module', autouse=True)
+def config_files():
+    """
+    Load the config files in a way similar to a full Ganga session
+    """
+    load_config_files()
+    yield
+    clear_config()
+
+
+@pytest.yield_fixture
+def pool():
+    from GangaDirac.Lib.Server.DiracProcessClient import DiracProcessPool
+    process_pool = DiracProcessPool(3, lambda: dict(os.environ), lambda: test_includes)
+    yield process_pool
+    process_pool.stop()
+
+
+def test_structured_results(pool, tmpdir):
+    """Check results come back with their types intact rather than as repr strings"""
+    value = {1: (2, 3.5), 'lfn': ['/some/lfn', None], 'big': 2**70, 'text': u'café'}
+    response = pool.execute('echo(%r)' % (value,))
+    assert response == {'id': response['id'], 'output': {'OK': True, 'Value': value}, 'error': None}
+
+    response = pool.execute('whereAmI()', cwd=str(tmpdir))
+    assert response['output']['Value'] == str(tmpdir)
+
+    # Commands which don't call output() return None and statements are run too
+    assert pool.execute('x = 1')['output'] is None
+    assert pool.execute('echo(x + 1)')['output']['Value'] == 2
+
+
+def test_errors(pool):
+    """Check an exception in a command is reported and the connection can still be used"""
+    response = pool.execute('echo(undefined_name)')
+    assert response['output'] is None
+    assert 'NameError' in response['error']
+    assert pool.execute('echo(3)')['output']['Value'] == 3
+
+
+def test_pipelined_requests(pool):
+    """Check several requests can be in flight on one connection and are matched up by id"""
+    conn = pool._acquire()
+    request_ids = [conn.send('echo(%s)' % i) for i in range(10)]
+    for i, request_id in reversed(list(enumerate(request_ids))):
+        assert conn.receive(request_id)['output']['Value'] == i
+    pool._idle.put(conn)
+
+
+def test_parallel_execution(pool):
+    """Check the commands from different threads run at the same time on different processes"""
+    results = {}
+
+    def run(i):
+        results[i] = pool.execute('slow(1, %s)' % i)['output']['Value']
+
+    start = time.time()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {0: 0, 1: 1, 2: 2}
+    assert time.time() - start < 2.5
+    assert len(pool._connections) == 3
+
+
+def test_restart(pool):
+    """Check a timed out or dead server process is replaced"""
+    from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+    with pytest.raises(GangaDiracError):
+        pool.execute('slow(10, 0)', timeout=0.5)
+    assert pool.execute('echo(1)')['output']['Value'] == 1
+
+    for conn in pool._connections:
+        conn.process.kill()
+        conn.process.wait()
+    assert pool.execute('echo(2)')['output']['Value'] == 2
+
+
+def test_idle_connection(pool, tmpdir):
+    """Check a connection left idle for longer than the server timeout can still be used"""
+    from GangaDirac.Lib.Server.DiracProcessClient import DiracProcessConnection
+    pool._newConnection = lambda: DiracProcessConnection(dict(os.environ), test_includes, idle_timeout=1)
+    assert pool.execute('echo(1)')['output']['Value'] == 1
+    process = pool._connections[0].process
+    time.sleep(3)
+    assert pool.execute('echo(2)')['output']['Value'] == 2
+    assert pool._connections[0].process is process
+
+    # A server which goes away before answering is replaced and the command sent again
+    flag = str(tmpdir.join('exited'))
+    assert pool.execute('exitOnce(%r, 3)' % flag)['output']['Value'] == 3
+    assert pool._connections[0].process is not process
+
+
+def test_execute(pool):
+    """Check DiracUtilities.execute uses the process pool and handles the DIRAC return dict"""
+    import GangaDirac.BOOT
+    from GangaDirac.Lib.Utilities.DiracUtilities import execute, GangaDiracError
+    GangaDirac.BOOT.dirac_process_pools[None] = pool
+    try:
+        assert execute('echo([1, 2])') == [1, 2]
+        assert execute('echo([1, 2])', return_raw_dict=True) == {'OK': True, 'Value': [1, 2]}
+        with pytest.raises(GangaDiracError):
+            execute('output({"OK": False, "Message": "failed"})')
+        with pytest.raises(GangaDiracError):
+            execute('echo(undefined_name)')
+    finally:
+        del GangaDirac.BOOT.dirac_process_pools[None]
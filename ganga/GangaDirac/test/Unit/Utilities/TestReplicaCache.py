@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from GangaDirac.Lib.Utilities.ReplicaCache import ReplicaCache
+
+
+@pytest.yield_fixture
+def cache(tmpdir):
+    replica_cache = ReplicaCache(str(tmpdir.join('cache', 'replicas.sqlite')), 100)
+    yield replica_cache
+    replica_cache.close()
+
+
+def test_get_put(cache):
+    """Check replicas are cached per command and LFNs without replicas are not cached"""
+    lfns = ['/lhcb/file%d' % i for i in range(1200)]
+    replicas = dict((lfn, {'CERN-DST': 'root://cern/%s' % lfn}) for lfn in lfns[:1000])
+    replicas[lfns[1000]] = {}
+    cache.put(replicas, 'getReplicasForJobs')
+
+    found, missing = cache.get(lfns, 'getReplicasForJobs')
+    assert found == dict((lfn, replicas[lfn]) for lfn in lfns[:1000])
+    assert missing == lfns[1000:]
+    assert cache.stats() == {'hits': 1000, 'misses': 200}
+
+    assert cache.get(lfns[:10], 'getReplicas') == ({}, lfns[:10])
+
+    # A new session uses the same file
+    other = ReplicaCache(cache.dbfile, 100)
+    assert other.get(lfns[:1], 'getReplicasForJobs') == ({lfns[0]: replicas[lfns[0]]}, [])
+    other.close()
+
+
+def test_expiry_and_invalidate(cache):
+    """Check replicas expire after the TTL and can be invalidated in bulk"""
+    cache.put({'/lhcb/a': {'SE1': 'a'}, '/lhcb/b': {'SE1': 'b'}, '/lhcb/c': {'SE2': 'c'}}, 'getReplicas')
+    cache.put({'/lhcb/a': {'SE1': 'a'}}, 'getReplicasForJobs')
+
+    cache.invalidate(['/lhcb/a', '/lhcb/b'])
+    assert cache.get(['/lhcb/a', '/lhcb/b', '/lhcb/c'], 'getReplicas') == ({'/lhcb/c': {'SE2': 'c'}}, ['/lhcb/a', '/lhcb/b'])
+    assert cache.get(['/lhcb/a'], 'getReplicasForJobs')[0] == {}
+
+    cache.invalidate()
+    assert cache.get(['/lhcb/c'], 'getReplicas')[0] == {}
+
+    cache.put({'/lhcb/d': {'SE1': 'd'}}, 'getReplicas')
+    cache.ttl = 0.5
+    time.sleep(0.6)
+    assert cache.get(['/lhcb/d'], 'getReplicas')[0] == {}
@@ -1,6 +1,7 @@
 #\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\#
 import os
 from copy import deepcopy
+from bisect import bisect_right
 import tempfile
 import fnmatch
 from GangaCore.Core.exceptions import GangaException
@@ -98,9 +99,13 @@ class LHCbCompressedDataset(GangaDataset):
                       'difference', 'isSubset', 'isSuperset', 'intersection',
                       'symmetricDifference', 'union', 'bkMetadata', 'getMetadata',
                       'getLuminosity', 'getEvtStat', 'getRunNumbers', 'isEmpty', 'getPFNs'] 
+    _additional_slots = ['_offsets', '_offsets_key', '_iterator']
 
     def __init__(self, files=None, metadata = None, persistency=None, depth=0, fromRef=False):
         super(LHCbCompressedDataset, self).__init__()
+        self._offsets = None
+        self._offsets_key = None
+        self._iterator = None
         self.files = []
         #if files is an LHCbDataset
 
@@ -145,86 +150,121 @@ class LHCbCompressedDataset(GangaDataset):
         logger.debug("Dataset Created")
 
 
+    def _setDirty(self):
+        '''Forget the file offsets whenever the dataset or one of its sets is modified'''
+        self._offsets = None
+        super(LHCbCompressedDataset, self)._setDirty()
+
+    def _offsetsKey(self):
+        '''Returns what identifies the state of the list of sets, which changes whenever the list is changed'''
+        return (id(self.files), getattr(self.files, '_mutations', 0))
+
+    def _fileOffsets(self):
+        '''Return the index in the dataset of the first file of each set followed by the total no. of files.
+        This is only worked out again once the list of sets or one of the sets has been changed'''
+        offsets = getattr(self, '_offsets', None)
+        key = self._offsetsKey()
+        if offsets is None or getattr(self, '_offsets_key', None) != key:
+            offsets = [0]
+            for _set in self.files:
+                # Changes to the set are then passed on to _setDirty
+                if _set._getParent() is not self:
+                    _set._setParent(self)
+                offsets.append(offsets[-1] + len(_set))
+            self._offsets = offsets
+            self._offsets_key = key
+            self.total = offsets[-1]
+        return offsets
+
     def _location(self, i):
         '''Figure out where a file of index i is. Returns the subset no and the location within that subset'''
-        setNo = 0
-        fileTotal = 0
-        while fileTotal < i+1 and setNo < len(self.files):
-            fileTotal += len(self.files[setNo])
-            setNo += 1
-        if fileTotal < i:
+        offsets = self._fileOffsets()
+        if i < 0 or i >= offsets[-1]:
             return -1, -1
-        setNo = setNo - 1
-        fileTotal = fileTotal - len(self.files[setNo])
-        setLocation = i - fileTotal
-        return setNo, setLocation
+        setNo = bisect_right(offsets, i) - 1
+        return setNo, i - offsets[setNo]
 
     def _totalNFiles(self):
         '''Return the total no. of files in the dataset'''
-        total = 0
-        for _set in self.files:
-            total += len(_set)
-        return total
+        return self._fileOffsets()[-1]
 
     def __len__(self):
         '''Redefine the __len__ function'''
-        return self.total
+        return self._totalNFiles()
+
+    def _sliceSets(self, indices):
+        '''Return the (prefix, suffixes) of the files at the indices (a range) taken from each set in turn'''
+        offsets = self._fileOffsets()
+        if not indices:
+            return
+        first = bisect_right(offsets, indices[0]) - 1
+        last = bisect_right(offsets, indices[-1]) - 1
+        step = 1 if indices.step > 0 else -1
+        for setNo in range(first, last + step, step):
+            begin, end = offsets[setNo], offsets[setNo + 1]
+            # The part of indices which lies within this set
+            if indices.step > 0:
+                within = indices[max(0, -((indices.start - begin) // indices.step)):
+                                 max(0, -((indices.start - end) // indices.step))]
+            else:
+                within = indices[max(0, -((end - 1 - indices.start) // -indices.step)):
+                                 max(0, (indices.start - begin) // -indices.step + 1)]
+            if not within:
+                continue
+            _set = self.files[setNo]
+            suffixes = _set.suffixes
+            yield _set.lfn_prefix, [suffixes[_i - begin] for _i in within]
 
     def __getitem__(self, i):
         '''Proivdes scripting (e.g. ds[2] returns the 3rd file) '''
         if type(i) == type(slice(0)):
-            #We construct a list of all LFNs first. Not the most efficient but it allows us to use the standard slice machinery
-            newLFNs = self.getLFNs()[i]
-            #We define these here for future speed
-            indexLen = len(newLFNs)
-            #Now pull out the prefixes/suffixes
-            setNo = 0
-            step = 1
-            #If we are going backwards start at the end
-            if i.step and i.step < 0:
-                step = -1
-                setNo = len(self.files)-1
-            currentPrefix = None
-            #Iterate over the LFNs and find out where it came from
+            #Take the files from each set in turn rather than building the list of all LFNs
             ds = LHCbCompressedDataset()
-            tempList = []
-            j = 0
-            while j < len(newLFNs):
-                if newLFNs[j] in self.files[setNo].getLFNs():
-                    tempList.append(newLFNs[j])
-                    j += 1
-                else:
-                    if len(tempList) > 0:
-                        ds.addSet(LHCbCompressedFileSet(tempList))
-                    setNo += step
-                    tempList = []
-            ds.addSet(LHCbCompressedFileSet(tempList))
+            for prefix, suffixes in self._sliceSets(range(*i.indices(len(self)))):
+                ds.addSet(LHCbCompressedFileSet(suffixes, prefix))
         else:
             #Figure out where the file lies
+            if i < 0:
+                i += len(self)
             setNo, setLocation = self._location(i)
-            if setNo < 0 or i >= self._totalNFiles():
+            if setNo < 0:
                 logger.error("Unable to retrieve file %s. It is larger than the dataset size" % i)
                 return None
             ds = DiracFile(lfn = self.files[setNo].getLFN(setLocation), credential_requirements = self.credential_requirements)
         return ds
 
+    def _iterFiles(self, start=0):
+        '''Generate a DiracFile for each file in the dataset from index start onwards'''
+        for prefix, suffixes in self._sliceSets(range(start, len(self))):
+            for _suffix in suffixes:
+                yield DiracFile(lfn = prefix + _suffix, credential_requirements = self.credential_requirements)
+
     def __iter__(self):
         '''Fix the iterator'''
         self.current = 0
+        self._iterator = self._iterFiles()
         return self
 
     def __next__(self):
         '''Fix the iterator'''
-        if self.current == self.total:
-            raise StopIteration
-        else:
-            self.current += 1
-            return self[self.current-1]
+        if getattr(self, '_iterator', None) is None:
+            self._iterator = self._iterFiles(self.current)
+        try:
+            this_file = next(self._iterator)
+        except StopIteration:
+            self._iterator = None
+            raise
+        self.current += 1
+        return this_file
 
     def addSet(self, newSet):
         '''Add a new FileSet to the dataset'''
+        offsets = self._fileOffsets()
         self.files.append(newSet)
-        self.total = self._totalNFiles()
+        newSet._setParent(self)
+        offsets.append(offsets[-1] + len(newSet))
+        self._offsets_key = self._offsetsKey()
+        self.total = offsets[-1]
 
     def getFileNames(self):
         'Returns a list of the names of all files stored in the dataset'
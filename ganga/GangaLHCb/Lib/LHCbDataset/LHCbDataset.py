@@ -60,9 +60,12 @@ class LHCbDataset(GangaDataset):
                       'difference', 'isSubset', 'isSuperset', 'intersection',
                       'symmetricDifference', 'union', 'bkMetadata',
                       'isEmpty', 'hasPFNs', 'getPFNs']  # ,'pop']
+    _additional_slots = ['_name_index', '_name_index_key']
 
     def __init__(self, files=None, persistency=None, depth=0, fromRef=False):
         super(LHCbDataset, self).__init__()
+        self._name_index = None
+        self._name_index_key = None
         if files is None:
             files = []
         self.files = GangaList()
@@ -221,25 +224,73 @@ class LHCbDataset(GangaDataset):
         for _this_file in _to_remove:
             _external_files.pop(_external_files.index(_this_file))
 
+        name_index = self._nameIndex()
+        new_files = []
         for this_f in _external_files:
             _file = getDataFile(this_f)
             if _file is None:
                 _file = this_f
             if not isinstance(_file, IGangaFile):
                 raise GangaException('Cannot extend LHCbDataset based on this object type: %s' % type(_file) )
-            myName = _file.namePattern
-            from GangaDirac.Lib.Files.DiracFile import DiracFile
-            if isType(_file, DiracFile):
-                myName = _file.lfn
-            if unique and myName in self.getFileNames():
-                continue
-            self.files.append(stripProxy(_file))
+            myName = self._fileName(_file)
+            if myName in name_index and not self._isIndexed(myName, name_index[myName], new_files):
+                # a file was renamed since the index was made
+                self._name_index = None
+                name_index = self._nameIndex()
+                for i, _f in enumerate(new_files):
+                    name_index.setdefault(self._fileName(_f), len(self.files) + i)
+            if myName in name_index:
+                if unique:
+                    continue
+            else:
+                name_index[myName] = len(self.files) + len(new_files)
+            new_files.append(stripProxy(_file))
+
+        # Add the files in one go, in case they extend w/ self
+        self.files.extend(new_files)
+        self._name_index_key = self._nameIndexKey()
 
     def removeFile(self, input_file):
         try:
             self.files.remove(input_file)
         except:
             raise GangaException('Dataset has no file named %s' % input_file.namePattern)
+        self._name_index = None
+
+    @staticmethod
+    def _fileName(_file):
+        '''Returns the name a file is known by in the dataset, the LFN of a DiracFile or the namePattern otherwise'''
+        if hasattr(_file, 'lfn'):
+            return _file.lfn
+        return _file.namePattern
+
+    def _nameIndexKey(self):
+        '''Returns what identifies the state of the list of files, which changes whenever the list is changed'''
+        _list = self.files._list
+        return (id(_list), len(_list), getattr(self.files, '_mutations', 0))
+
+    def _isIndexed(self, name, pos, new_files=()):
+        '''Returns whether the file at pos in the files followed by new_files still has the name it was indexed by'''
+        _list = self.files._list
+        if pos < len(_list):
+            return self._fileName(_list[pos]) == name
+        pos -= len(_list)
+        return pos < len(new_files) and self._fileName(new_files[pos]) == name
+
+    def _nameIndex(self):
+        '''
+        Returns a dict with keys the file names and the values the position of the first file of that name.
+        This is kept up to date by extend and only worked out again when the list of files has been changed otherwise
+        '''
+        key = self._nameIndexKey()
+        name_index = getattr(self, '_name_index', None)
+        if name_index is None or getattr(self, '_name_index_key', None) != key:
+            name_index = {}
+            for i, _f in enumerate(self.files._list):
+                name_index.setdefault(self._fileName(_f), i)
+            self._name_index = name_index
+            self._name_index_key = key
+        return name_index
 
     def getLFNs(self):
         'Returns a list of all LFNs (by name) stored in the dataset.'
@@ -384,32 +435,31 @@ class LHCbDataset(GangaDataset):
 
     def _pathAndFileDict(self):
         '''
-        Returns a dict with keys the full file name and the values the file itself. For comparisons
+        Returns a dict with keys the full file name and the values the file itself, in the order of the dataset. For comparisons
         '''
-        returnDict = {}
-        for _f in self.files:
-            if hasattr(_f, 'lfn'):               
-                returnDict[_f.lfn] = _f
-            else:
-                returnDict[_f.namePattern] = _f
-        return returnDict
+        name_index = self._nameIndex()
+        if not all(self._isIndexed(name, i) for name, i in name_index.items()):
+            # a file was renamed since the index was made
+            self._name_index = None
+            name_index = self._nameIndex()
+        _list = self.files._list
+        return dict((name, _list[i]) for name, i in name_index.items())
 
     def _pathAndFileDictOther(self, other):
         '''
         Returns a dict with keys the full file name and the values the file itself. For comparisons
         '''
         returnDict = {}
-        if isType(other, [LHCbDataset, GangaLHCb.Lib.LHCbDataset.LHCbCompressedDataset]):
-            for _f in other.files:
-                if hasattr(_f, 'lfn'):               
-                    returnDict[_f.lfn] = _f
-                else:
-                    returnDict[_f.namePattern] = _f
+        if isType(other, LHCbDataset):
+            returnDict = stripProxy(other)._pathAndFileDict()
+        elif isType(other, GangaLHCb.Lib.LHCbDataset.LHCbCompressedDataset):
+            returnDict = stripProxy(other).getFullDataset()._pathAndFileDict()
         elif isType(other, [GangaList, []]):
             for _f in other:
+                _f = stripProxy(_f)
                 if isinstance(_f, DiracFile):
                     returnDict[_f.lfn] = _f
-                elif isinstance(_f, LocalFile, MassStorageFile):
+                elif isinstance(_f, (LocalFile, MassStorageFile)):
                     returnDict[_f.namePattern] = _f
                 elif isinstance(_f, str):
                     returnDict[_f] = string_datafile_shortcut_lhcb(_f, None)
@@ -425,12 +475,7 @@ class LHCbDataset(GangaDataset):
         '''Returns a new data set w/ files in this that are not in other.'''
         other_files = self._pathAndFileDictOther(other)
         self_files = self._pathAndFileDict()
-        files = set(self_files.keys()).difference(other_files.keys())
-        data = LHCbDataset()
-        self_files.update(other_files)
-        for _f in files:
-            data.extend(self_files[_f])
-        return data
+        return LHCbDataset([_f for name, _f in self_files.items() if name not in other_files], fromRef=True)
 
     def isSubset(self, other):
         '''Is every file in this data set in other?'''
@@ -447,34 +492,23 @@ class LHCbDataset(GangaDataset):
         both.'''
         other_files = self._pathAndFileDictOther(other)
         self_files = self._pathAndFileDict()
-        files = set(self_files.keys()).symmetric_difference(other_files.keys())
-        data = LHCbDataset()
-        self_files.update(other_files)
-        for _f in files:
-            data.extend(self_files[_f])
-        return data
+        files = [_f for name, _f in self_files.items() if name not in other_files]
+        files.extend(_f for name, _f in other_files.items() if name not in self_files)
+        return LHCbDataset(files, fromRef=True)
 
     def intersection(self, other):
         '''Returns a new data set w/ files common to this and other.'''
         other_files = self._pathAndFileDictOther(other)
         self_files = self._pathAndFileDict()
-        files = set(self_files.keys()).intersection(other_files.keys())
-        data = LHCbDataset()
-        self_files.update(other_files)
-        for _f in files:
-            data.extend(self_files[_f])
-        return data
+        return LHCbDataset([other_files[name] for name in self_files if name in other_files], fromRef=True)
 
     def union(self, other):
         '''Returns a new data set w/ files from this and other.'''
         other_files = self._pathAndFileDictOther(other)
         self_files = self._pathAndFileDict()
-        files = set(self_files.keys()).union(other_files.keys())
-        data = LHCbDataset()
-        self_files.update(other_files)
-        for _f in files:
-            data.extend(self_files[_f])
-        return data
+        files = [other_files.get(name, _f) for name, _f in self_files.items()]
+        files.extend(_f for name, _f in other_files.items() if name not in self_files)
+        return LHCbDataset(files, fromRef=True)
 
     def bkMetadata(self):
         'Returns the bookkeeping metadata for all LFNs. '
@@ -57,6 +57,26 @@ class TestDatasets(GangaUnitTest):
         assert isinstance(ds3.difference(ds4)[0], DiracFile)
         assert isinstance(ds4.difference(ds3)[0], LocalFile)
 
+        # check unique extends skip repeated files, also after the files are changed directly
+        ds5 = LHCbDataset(['lfn:a', 'lfn:b'])
+        ds5.extend(['lfn:b', 'lfn:c', 'lfn:c'], True)
+        assert ds5.getFileNames() == ['a', 'b', 'c']
+        ds5.files.append('lfn:d')
+        ds5.extend(['lfn:d'], True)
+        assert ds5.getFileNames() == ['a', 'b', 'c', 'd']
+        assert ds5.union(LHCbDataset(['lfn:e', 'lfn:a'])).getFileNames() == ['a', 'b', 'c', 'd', 'e']
+
+        # check the files are still found after the list is changed without changing its length
+        ds5.files[0] = 'lfn:x'
+        assert ds5.intersection(LHCbDataset(['lfn:a', 'lfn:x'])).getFileNames() == ['x']
+        ds5.extend(['lfn:a', 'lfn:x'], True)
+        assert ds5.getFileNames() == ['x', 'b', 'c', 'd', 'a']
+        ds5.files.pop(0)
+        ds5.files.append('lfn:e')
+        assert sorted(ds5.difference(LHCbDataset(['lfn:b'])).getFileNames()) == ['a', 'c', 'd', 'e']
+        ds5.extend(['lfn:e', 'lfn:x'], True)
+        assert ds5.getFileNames() == ['b', 'c', 'd', 'a', 'e', 'x']
+
     @external
     def testDatasets(self):
 
@@ -113,4 +133,14 @@ class TestDatasets(GangaUnitTest):
         assert len(ds1) == 4
         assert ds1.getLFNs() == ['/path/to/some/file/a', '/path/to/some/otherfile/b', '/otherpath/to/some/file/c', '/path/to/some/otherfile/d']
 
+        #Check the files are still found after the sets are changed in place
+        ds1.files[0] = LHCbCompressedDataset(['/x/e', '/x/f', '/x/g']).files[0]
+        assert len(ds1) == 5
+        assert ds1[3].lfn == '/otherpath/to/some/file/c'
+        ds1.files[0].suffixes.append('/h')
+        assert len(ds1) == 6
+        assert ds1[3].lfn == '/x/h'
+        assert ds1[4].lfn == '/otherpath/to/some/file/c'
+        assert ds1[5].lfn == '/path/to/some/otherfile/d'
+
 
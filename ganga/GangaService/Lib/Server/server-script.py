@@ -1,13 +1,16 @@
 import os
 import sys
-import pickle
+import io
 import traceback
-import StringIO
 import time
-from socket import *
+import asyncio
+import logging
 import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-from GangaCore.Utility.logging import getLogger
+from GangaCore.Utility.logging import getLogger, main_logger
+from GangaService.Lib.ServiceAPI.Protocol import ProtocolError, readMessage, writeMessage
 logger = getLogger(modulename=True)
 
 class WatchdogThread ( threading.Thread ):
@@ -33,18 +36,18 @@ class UserScriptThread ( threading.Thread ):
     def __init__(self):
         super(UserScriptThread,self).__init__()
         self.running = False
-        
+
         # check for some valid script path (note could be None)
         if not config["Configuration"]["ServerUserScript"] or len(config["Configuration"]["ServerUserScript"]) < 2:
             logger.error("No User Script specified. Exiting from thread...")
             return
-            
-        try:            
+
+        try:
             self.script_text = open(config["Configuration"]["ServerUserScript"], "r").read()
         except:
             logger.error("UserScriptThread: ERROR: Could not load script '%s'. Reason: '%s'" % (config["Configuration"]["ServerUserScript"], formatTraceback()))
             return
-        
+
         self.running = True
 
     def run ( self ):
@@ -58,36 +61,256 @@ class UserScriptThread ( threading.Thread ):
             time.sleep(config["Configuration"]["ServerUserScriptWaitTime"])
 
 
+class CommandOutput(io.TextIOBase):
+    """
+    Replaces sys.stdout/sys.stderr so that what a command prints goes to the output of that command while it runs
+    in a worker thread, and to the original stream otherwise
+    """
+
+    def __init__(self, stream):
+        super(CommandOutput, self).__init__()
+        self.stream = stream
+
+    def write(self, text):
+        buf = getattr(_command_output, 'buffer', None)
+        if buf is None:
+            return self.stream.write(text)
+        return buf.write(text)
+
+    def flush(self):
+        if getattr(_command_output, 'buffer', None) is None:
+            self.stream.flush()
+
+    def fileno(self):
+        return self.stream.fileno()
+
+    @property
+    def encoding(self):
+        return self.stream.encoding
+
+
+class CommandLogHandler(logging.Handler):
+    """ Adds the messages logged by a command to its output, as the server log file used to be read back for """
+
+    def emit(self, record):
+        buf = getattr(_command_output, 'buffer', None)
+        if buf is not None:
+            try:
+                buf.write(self.format(record) + "\n")
+            except Exception:
+                self.handleError(record)
+
+
+# The output of the command run by each worker thread
+_command_output = threading.local()
+
+
 def formatTraceback():
     "Helper function to printout a traceback as a string"
     return "\n %s\n%s\n%s\n" % (''.join( traceback.format_tb(sys.exc_info()[2])), sys.exc_info()[0], sys.exc_info()[1])
-        
+
+
+def runCommand(code):
+    "Run the code of an exec request in a worker thread and return what it printed and logged"
+    _command_output.buffer = io.StringIO()
+    try:
+        try:
+            exec(code, globals())
+        except:
+            logger.error("Error while executing script: %s" % formatTraceback())
+        return _command_output.buffer.getvalue()
+    finally:
+        _command_output.buffer = None
+
+
+def jobStatus(ids=None):
+    "Return the id, name, status and subjob status counts of the jobs, from the index where they aren't loaded"
+    from GangaCore.Core.GangaRepository import getRegistry
+    from GangaCore.GPIDev.Lib.Job.Job import lazyLoadJobStatus, lazyLoadJobObject
+    registry = getRegistry('jobs')
+    if ids is None:
+        ids = registry.ids()
+    jobs = []
+    for this_id in ids:
+        try:
+            this_job = registry[int(this_id)]
+        except (KeyError, TypeError, ValueError):
+            jobs.append({'id': this_id, 'error': 'No job with id %s' % this_id})
+            continue
+        jobs.append({'id': int(this_id),
+                     'name': lazyLoadJobObject(this_job, 'name', False),
+                     'status': lazyLoadJobStatus(this_job),
+                     'subjobs': dict(registry.getJobStatusCounts(int(this_id)))})
+    return jobs
+
+
+def jobCounts():
+    "Return the number of jobs and of subjobs (or jobs without subjobs) in each status"
+    from GangaCore.Core.GangaRepository import getRegistry
+    from GangaCore.GPIDev.Lib.Job.Job import lazyLoadJobStatus
+    registry = getRegistry('jobs')
+    jobs = Counter()
+    subjobs = Counter()
+    for this_id in registry.ids():
+        try:
+            jobs[lazyLoadJobStatus(registry[this_id])] += 1
+            subjobs.update(registry.getJobStatusCounts(this_id))
+        except KeyError:
+            # removed while counting
+            continue
+    return dict(jobs), dict(subjobs)
+
+
+class GangaServer(object):
+    """
+    Serves requests from any number of clients at once. exec requests are queued and run in turn by a pool of
+    [Configuration]ServerWorkers threads, the job queries are answered from the registry index without running any code
+    """
+
+    def __init__(self, port, workers, timeout):
+        self.port = port
+        self.workers = workers
+        self.timeout = timeout
+        self.reset_time = time.time()
+        self.running_commands = 0
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.queue = asyncio.Queue()
+        self.stopping = asyncio.Event()
+        self.server = None
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # the job queries are kept apart so they don't wait behind the commands
+        self.query_executor = ThreadPoolExecutor(max_workers=2)
+
+    async def worker(self):
+        "Run the queued commands, setting the result of the future of each one"
+        loop = asyncio.get_event_loop()
+        while True:
+            code, future = await self.queue.get()
+            self.running_commands += 1
+            try:
+                output = await loop.run_in_executor(self.executor, runCommand, code)
+                if not future.done():
+                    future.set_result(output)
+            except Exception as err:
+                if not future.done():
+                    future.set_exception(err)
+            finally:
+                self.running_commands -= 1
+                self.reset_time = time.time()
+                self.queue.task_done()
+
+    async def handleRequest(self, request):
+        "Return the response to a request"
+        loop = asyncio.get_event_loop()
+        req_type = request.get('type')
+        if req_type == 'exec':
+            if not isinstance(request.get('cmd'), str):
+                return {'ok': False, 'error': "exec request without a 'cmd'"}
+            if self.stopping.is_set():
+                return {'ok': False, 'error': 'Server is stopping'}
+            future = loop.create_future()
+            await self.queue.put((request['cmd'], future))
+            return {'ok': True, 'output': await future}
+        elif req_type == 'status':
+            ids = request.get('ids')
+            return {'ok': True, 'jobs': await loop.run_in_executor(self.query_executor, jobStatus, ids)}
+        elif req_type == 'counts':
+            jobs, subjobs = await loop.run_in_executor(self.query_executor, jobCounts)
+            return {'ok': True, 'jobs': jobs, 'subjobs': subjobs}
+        elif req_type == 'info':
+            return {'ok': True, 'queued': self.queue.qsize(), 'running': self.running_commands, 'workers': self.workers}
+        elif req_type == 'stop':
+            self.stopping.set()
+            return {'ok': True, 'stopped': True}
+        return {'ok': False, 'error': 'Unknown request type: %s' % req_type}
+
+    async def handleClient(self, reader, writer):
+        "Answer the requests sent over one connection until the client closes it"
+        try:
+            while True:
+                try:
+                    request = await readMessage(reader)
+                except ProtocolError as err:
+                    await writeMessage(writer, {'ok': False, 'error': str(err)})
+                    break
+                if request is None:
+                    break
+                self.reset_time = time.time()
+                try:
+                    response = await self.handleRequest(request)
+                except Exception as err:
+                    logger.error("Error while handling request: %s" % formatTraceback())
+                    response = {'ok': False, 'error': str(err)}
+                await writeMessage(writer, response)
+        except (ConnectionError, asyncio.IncompleteReadError) as err:
+            logger.debug("Lost connection to client: %s" % err)
+        finally:
+            writer.close()
+
+    async def watchStop(self):
+        "Stop when asked to, when the kill file appears or when idle for longer than the timeout"
+        kill_file = os.path.join(config["Configuration"]["gangadir"], "server", "server.kill")
+        while not self.stopping.is_set():
+            idle = self.queue.empty() and self.running_commands == 0
+            if os.path.exists(kill_file) or (idle and (time.time() - self.reset_time) > self.timeout):
+                self.stopping.set()
+                break
+            try:
+                await asyncio.wait_for(self.stopping.wait(), 5)
+            except asyncio.TimeoutError:
+                pass
+
+    def listen(self):
+        "Start listening on the port, raises OSError if it can't be used"
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handleClient, 'localhost', self.port))
+
+    async def serve(self):
+        workers = [asyncio.ensure_future(self.worker()) for _ in range(self.workers)]
+        await self.watchStop()
+
+        # finish the commands which have been queued before stopping
+        self.server.close()
+        await self.queue.join()
+        for this_worker in workers:
+            this_worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def run(self):
+        "Serve the clients until stopped"
+        try:
+            self.loop.run_until_complete(self.serve())
+        finally:
+            self.executor.shutdown()
+            self.query_executor.shutdown()
+            self.loop.close()
+
+
 # get the port from the config
 port = config['Configuration']['ServerPort']
 
-# try and connect to this port
-addr = ('localhost',port)
-sock = socket(AF_INET,SOCK_STREAM)
-sock.settimeout(5)
-try: sock.bind(addr)
-except:
+# try and listen on this port
+ganga_server = GangaServer(port, max(1, config['Configuration']['ServerWorkers']), config['Configuration']['ServerTimeout'] * 60)
+try:
+    ganga_server.listen()
+except OSError:
     logger.error("ERROR: Couldn't connect on port %d" % port)
     sys.exit(2)
 
-# listen for a connection
-sock.listen(5)
-
 # create the watchdog settings
 wdog = WatchdogThread()
 wdog.start()
 
-timeout = config['Configuration']['ServerTimeout'] * 60
-running = True
-reset_time = time.time()
-
 # get the logger
 logger = getLogger()
 
+# send what the commands print and log back to the clients
+sys.stdout = CommandOutput(sys.__stdout__)
+sys.stderr = CommandOutput(sys.__stderr__)
+log_handler = CommandLogHandler()
+log_handler.setFormatter(logging.Formatter('%(levelname)-8s %(message)s'))
+main_logger.addHandler(log_handler)
+
 # start the monitoring
 from GangaCore.Core import monitoring_component
 monitoring_component.enableMonitoring()
@@ -96,90 +319,12 @@ monitoring_component.enableMonitoring()
 usr_thd = UserScriptThread()
 usr_thd.start()
 
-# main loop
-while True:
-    
-    # accept connections
-    while running:
-        
-        conn_failed = False
-        
-        try:
-            conn, addr = sock.accept()
-        except:
-            conn_failed = True
-            pass
-        
-        if not conn_failed:
-            break
-        
-        # check for kill file or timeout
-        if os.path.exists( os.path.join(config["Configuration"]["gangadir"], "server", "server.kill") ) or (time.time() - reset_time) > timeout:
-            if not conn_failed:
-                conn.close()
-
-            sock.close()
-
-            # close watchdog
-            wdog.running = False
-            wdog.join()
-
-            # close the suer thread
-            usr_thd.running = False
-            usr_thd.join()
-            
-            os.system("rm -f %s" % os.path.join(config["Configuration"]["gangadir"], "server", "server.kill"))            
-            os.system("rm -f %s" % os.path.join(config["Configuration"]["gangadir"], "server", "server.info"))
-                    
-            sys.exit(0)
-            
-    # grab the data
-    data = conn.recv(1024)
-    while data.find("###ENDCMD###") == -1 and data.find("###STOP###") == -1:
-        data += conn.recv(1024)
-
-    # update the reset time
-    reset_time = time.time()
-    
-    # check for graceful shutdown
-    if not data or data == "###STOP###":
-        # exit and then close
-        conn.send("###STOPPED###")
-        conn.close()
-        break
-    else:
-        # set the stdout/stderr
-        codeOut = StringIO.StringIO()
-
-
-        tstamp = time.time()
-        logger.info("###Server command started %d ###" % tstamp)
-        
-        sys.stdout = codeOut
-        sys.stderr = codeOut
+# serve the clients until stopped
+ganga_server.run()
 
-        try:
-            exec(data)
-        except:
-            logger.error("Error while executing script: %s" % formatTraceback())
-            
-        sys.stdout = sys.__stdout__
-        sys.stderr = sys.__stderr__
-
-        logger.info("###Server command completed###")
-
-        # grab the logger results
-        stdout = open( os.path.join(config["Configuration"]["gangadir"], "server", "server-%s.stdout" % os.uname()[1]) ).read()
-        start_pos = stdout.find("###Server command started %d ###" % tstamp)
-        end_pos = stdout.find("###Server command completed###", start_pos)
-        msg = stdout[start_pos + len("###Server command started %d ###" % tstamp):end_pos]
-        
-        # send everything
-        conn.send(msg + codeOut.getvalue() + "###ENDMSG###")
-        conn.close()
-        
-# close the connection
-sock.close()
+main_logger.removeHandler(log_handler)
+sys.stdout = sys.__stdout__
+sys.stderr = sys.__stderr__
 
 # close watchdog
 wdog.running = False
@@ -188,7 +333,5 @@ wdog.join()
 usr_thd.running = False
 usr_thd.join()
 
-os.system("rm -f %s" % os.path.join(config["Configuration"]["gangadir"], "server", "server.kill"))            
+os.system("rm -f %s" % os.path.join(config["Configuration"]["gangadir"], "server", "server.kill"))
 os.system("rm -f %s" % os.path.join(config["Configuration"]["gangadir"], "server", "server.info"))
-
-
@@ -0,0 +1,107 @@
+"""
+The messages sent between the GangaService client and server. Each message is a JSON object encoded as UTF-8 and
+preceded by its length in bytes as a 4 byte big-endian unsigned integer.
+
+A request has a 'type' of:
+    exec     run the python code in 'cmd' on the server and return what it printed or logged as 'output'
+    status   return the id, name, status and subjob status counts of the jobs in 'ids' (all of them if not given)
+    counts   return the number of jobs and of subjobs in each status
+    info     return the number of commands queued and running on the server
+    stop     stop the server once the queued commands have run
+Every response has 'ok', and 'error' when it is False.
+"""
+import json
+import struct
+import asyncio
+
+# The length of the message which follows
+_header = struct.Struct('!I')
+
+# Don't try to read anything bigger than this, it can't be a message
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encodeMessage(message):
+    """
+    Return the bytes to send for the message
+    Args:
+        message (dict): The request or response, which can be encoded as JSON
+    """
+    data = json.dumps(message).encode('utf-8')
+    if len(data) > MAX_MESSAGE_SIZE:
+        raise ProtocolError("Message of %d bytes is too big to send" % len(data))
+    return _header.pack(len(data)) + data
+
+
+def decodeMessage(data):
+    """ Return the message encoded in the bytes following the header """
+    try:
+        message = json.loads(data.decode('utf-8'))
+    except ValueError as err:
+        raise ProtocolError("Message is not valid JSON: %s" % err)
+    if not isinstance(message, dict):
+        raise ProtocolError("Message is not a JSON object")
+    return message
+
+
+def _checkLength(header):
+    length = _header.unpack(header)[0]
+    if length > MAX_MESSAGE_SIZE:
+        raise ProtocolError("Message length %d is bigger than the maximum of %d" % (length, MAX_MESSAGE_SIZE))
+    return length
+
+
+def _recvExactly(sock, size):
+    """ Read size bytes from the socket, or fewer if it is closed first """
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def sendMessage(sock, message):
+    """ Send the message over a blocking socket """
+    sock.sendall(encodeMessage(message))
+
+
+def recvMessage(sock):
+    """ Return the next message from a blocking socket, or None if the other end closed it before sending one """
+    header = _recvExactly(sock, _header.size)
+    if not header:
+        return None
+    if len(header) < _header.size:
+        raise ProtocolError("Connection closed in the middle of a message")
+    length = _checkLength(header)
+    data = _recvExactly(sock, length)
+    if len(data) < length:
+        raise ProtocolError("Connection closed in the middle of a message")
+    return decodeMessage(data)
+
+
+async def readMessage(reader):
+    """ Return the next message from an asyncio stream, or None if the other end closed it before sending one """
+    try:
+        header = await reader.readexactly(_header.size)
+    except asyncio.IncompleteReadError as err:
+        if not err.partial:
+            return None
+        raise ProtocolError("Connection closed in the middle of a message")
+    try:
+        data = await reader.readexactly(_checkLength(header))
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Connection closed in the middle of a message")
+    return decodeMessage(data)
+
+
+async def writeMessage(writer, message):
+    """ Send the message over an asyncio stream """
+    writer.write(encodeMessage(message))
+    await writer.drain()
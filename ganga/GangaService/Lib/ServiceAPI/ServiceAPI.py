@@ -4,9 +4,10 @@ import pickle
 import traceback
 from socket import *
 import time
-from commands import getstatusoutput
+from subprocess import getstatusoutput
 
 from GangaCore.Utility.logging import getLogger
+from GangaService.Lib.ServiceAPI.Protocol import ProtocolError, sendMessage, recvMessage
 logger = getLogger(modulename=True)
 
 # Ganga Service class that provides the interface to the server
@@ -77,11 +78,14 @@ class GangaService:
                         logger.info("Could not connect to server on port %d" % port)
                         return False
 
-                    sock.send("###STOP###")
-                    data = sock.recv(1024)
-                    while data.find("###STOPPED###") == -1:
-                        data += sock.recv(1024)
-                    sock.close()
+                    try:
+                        sendMessage(sock, {'type': 'stop'})
+                        recvMessage(sock)
+                    except (OSError, ProtocolError) as err:
+                        logger.info("Error sending the stop signal: %s" % err)
+                        return False
+                    finally:
+                        sock.close()
 
                     # check the process has gone away
                     logger.info("Stop signal sent. Waiting for Ganga process to finish...")
@@ -191,13 +195,14 @@ class GangaService:
         
         return True
 
-    def sendCmd(self, cmd):
+    def sendRequest(self, request):
+        """send a request (see Protocol) to the server, starting it if required, and return the response or None"""
 
         # check if server is up
         if not self.startServer():
             logger.info("Could not start the Ganga Server.")
-            return ""
-        
+            return None
+
         # try and connect to this port
         addr = ('localhost',self.port)
         sock = socket(AF_INET,SOCK_STREAM)
@@ -205,13 +210,42 @@ class GangaService:
             sock.connect(addr)
         except:
             logger.info("Could not connect to server on port %d" % self.port)
-            return ""
+            return None
 
-        sock.send(cmd + "\n###ENDCMD###")
-        logger.info("Command sent. Waiting for output from GangaCore...")
-        data = sock.recv(1024)
-        while data.find("###ENDMSG###") == -1:
-            data += sock.recv(1024)
-        sock.close()
+        try:
+            sendMessage(sock, request)
+            logger.info("Request sent. Waiting for the response from GangaCore...")
+            response = recvMessage(sock)
+        except (OSError, ProtocolError) as err:
+            logger.info("Error talking to the server on port %d: %s" % (self.port, err))
+            return None
+        finally:
+            sock.close()
+
+        if response is not None and not response.get('ok'):
+            logger.info("Server error: %s" % response.get('error'))
+        return response
 
-        return data.replace("###ENDMSG###", "")
+    def sendCmd(self, cmd):
+        """run the python code on the server and return what it printed and logged"""
+        response = self.sendRequest({'type': 'exec', 'cmd': cmd})
+        if not response:
+            return ""
+        return response.get('output', "")
+
+    def getJobStatus(self, ids=None):
+        """return a list of dicts of the id, name, status and subjob status counts of the jobs (all if ids is None)"""
+        request = {'type': 'status'}
+        if ids is not None:
+            request['ids'] = list(ids)
+        response = self.sendRequest(request)
+        if not response or not response.get('ok'):
+            return []
+        return response['jobs']
+
+    def getJobCounts(self):
+        """return a tuple of dicts of the number of jobs and of subjobs in each status"""
+        response = self.sendRequest({'type': 'counts'})
+        if not response or not response.get('ok'):
+            return {}, {}
+        return response['jobs'], response['subjobs']